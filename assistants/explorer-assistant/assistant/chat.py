@@ -8,10 +8,13 @@
 import logging
 from typing import Any
 
+import anthropic_client
 import deepmerge
+import openai_client
 from assistant_extensions.artifacts import ArtifactsExtension
 from assistant_extensions.artifacts._model import ArtifactsConfigModel
 from assistant_extensions.attachments import AttachmentsExtension
+from assistant_extensions.history import HistoryWindowExtension
 from assistant_extensions.workflows import WorkflowsConfigModel, WorkflowsExtension
 from content_safety.evaluators import CombinedContentSafetyEvaluator
 from semantic_workbench_api_model.workbench_model import (
@@ -79,6 +82,9 @@ async def workflows_config_provider(context: AssistantContext) -> WorkflowsConfi
 
 artifacts_extension = ArtifactsExtension(assistant, artifacts_config_provider)
 attachments_extension = AttachmentsExtension(assistant)
+# the history has the message types that the responses were built from before the history extension; that is, the
+# default of ConversationContext.get_messages
+history_extension = HistoryWindowExtension(assistant, message_types=(MessageType.chat,))
 workflows_extension = WorkflowsExtension(assistant, "content_safety", workflows_config_provider)
 
 #
@@ -106,6 +112,15 @@ app = assistant.fastapi_app()
 #
 
 
+@assistant.events.on_service_shutdown
+async def on_service_shutdown() -> None:
+    """
+    Close the LLM clients that are shared by the responses.
+    """
+    await anthropic_client.close_clients()
+    await openai_client.close_clients()
+
+
 @assistant.events.conversation.message.chat.on_created
 async def on_message_created(
     context: ConversationContext, event: ConversationEvent, message: ConversationMessage
@@ -123,10 +138,43 @@ async def on_message_created(
       - @assistant.events.conversation.message.on_created
     """
 
+    config = await assistant_config.get(context.assistant)
+    if config.respond_once_to_message_batches:
+        # the message is responded to by on_message_created_batch
+        return
+
     # check if the assistant should respond to the message
     if not await should_respond_to_message(context, message):
         return
 
+    await respond_to_message(context, event)
+
+
+@assistant.events.conversation.message.chat.on_created_batch
+async def on_message_created_batch(
+    context: ConversationContext, events: list[ConversationEvent], messages: list[ConversationMessage]
+) -> None:
+    """
+    Handle the chat messages that were queued for the assistant together. This is usually a single message, but
+    includes every message that was sent while the assistant was busy, such as while it was responding.
+
+    When respond_once_to_message_batches is enabled, the assistant responds once, to the latest of the messages that
+    it should respond to; the history of the response includes the others.
+    """
+    config = await assistant_config.get(context.assistant)
+    if not config.respond_once_to_message_batches:
+        return
+
+    for event, message in reversed(list(zip(events, messages))):
+        if await should_respond_to_message(context, message):
+            await respond_to_message(context, event)
+            return
+
+
+async def respond_to_message(context: ConversationContext, event: ConversationEvent) -> None:
+    """
+    Respond to the conversation, for the message of the event.
+    """
     # update the participant status to indicate the assistant is thinking
     async with context.set_status("thinking..."):
         config = await assistant_config.get(context.assistant)
@@ -137,6 +185,7 @@ async def on_message_created(
             await respond_to_conversation(
                 artifacts_extension=artifacts_extension,
                 attachments_extension=attachments_extension,
+                history_extension=history_extension,
                 context=context,
                 config=config,
                 metadata=metadata,
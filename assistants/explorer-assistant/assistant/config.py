@@ -5,6 +5,7 @@ from assistant_extensions.artifacts import ArtifactsConfigModel
 from assistant_extensions.attachments import AttachmentsConfigModel
 from assistant_extensions.workflows import WorkflowsConfigModel
 from content_safety.evaluators import CombinedContentSafetyEvaluatorConfig
+from openai_client import DebugLevel
 from pydantic import BaseModel, Field
 from semantic_workbench_assistant.config import UISchema
 
@@ -91,6 +92,17 @@ class AssistantConfigModel(BaseModel):
         ),
     ] = False
 
+    debug_metadata_level: Annotated[
+        DebugLevel,
+        Field(
+            title="Debug Metadata",
+            description=(
+                "How much of the requests and responses of the AI model to include in the debug metadata of"
+                " conversation messages: off, a summary, or in full with long content cut short."
+            ),
+        ),
+    ] = DebugLevel.full
+
     instruction_prompt: Annotated[
         str,
         Field(
@@ -151,6 +163,17 @@ class AssistantConfigModel(BaseModel):
         ),
     ] = False
 
+    respond_once_to_message_batches: Annotated[
+        bool,
+        Field(
+            title="Respond Once to Messages Sent Together",
+            description=(
+                "Respond once to the chat messages that are sent while the assistant is busy, such as while it is"
+                " responding, rather than to each of them."
+            ),
+        ),
+    ] = False
+
     high_token_usage_warning: Annotated[
         HighTokenUsageWarning,
         Field(
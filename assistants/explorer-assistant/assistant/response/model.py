@@ -1,7 +1,8 @@
-from typing import Any, Protocol, Sequence
+from typing import Any, Awaitable, Callable, Protocol, Sequence
 
 from assistant_extensions.ai_clients.model import CompletionMessage
 from attr import dataclass
+from openai_client import DebugCapture
 from semantic_workbench_api_model.workbench_model import (
     MessageType,
 )
@@ -22,11 +23,15 @@ class ResponseResult:
     completion_total_tokens: int
 
 
+ContentDeltaHandler = Callable[[str], Awaitable[None]]
+
+
 class ResponseProvider(Protocol):
     async def get_response(
         self,
         messages: list[CompletionMessage],
         metadata_key: str,
+        on_content_delta: ContentDeltaHandler | None = None,
     ) -> ResponseResult: ...
 
     async def num_tokens_from_messages(
@@ -34,4 +39,15 @@ class ResponseProvider(Protocol):
         messages: Sequence[CompletionMessage],
         model: str,
         metadata_key: str,
+        reconcile: bool = False,
     ) -> NumberTokensResult: ...
+
+
+def debug_metadata(debug: DebugCapture, metadata_key: str, value: Callable[[], Any]) -> dict[str, Any]:
+    """
+    Returns the debug metadata for the value returned by the function, captured at the level of the debug capture,
+    or no metadata if the level is off, in which case the function is not called.
+    """
+    if not debug.enabled:
+        return {}
+    return {"debug": {metadata_key: debug.capture(value)}}
@@ -8,12 +8,13 @@
 import logging
 import re
 import time
-from typing import Any, Awaitable, Callable, Sequence
+from typing import Any, Sequence
 
 import deepmerge
 from assistant_extensions.ai_clients.model import CompletionMessage
 from assistant_extensions.artifacts import ArtifactsExtension
 from assistant_extensions.attachments import AttachmentsExtension
+from assistant_extensions.history import HistoryWindowExtension
 from semantic_workbench_api_model.workbench_model import (
     ConversationMessage,
     ConversationParticipant,
@@ -22,6 +23,7 @@ from semantic_workbench_api_model.workbench_model import (
 )
 from semantic_workbench_assistant.assistant_app import (
     ConversationContext,
+    ConversationMessageStream,
 )
 
 from ..config import AssistantConfigModel
@@ -41,6 +43,7 @@ logger = logging.getLogger(__name__)
 async def respond_to_conversation(
     artifacts_extension: ArtifactsExtension,
     attachments_extension: AttachmentsExtension,
+    history_extension: HistoryWindowExtension,
     context: ConversationContext,
     config: AssistantConfigModel,
     metadata: dict[str, Any] = {},
@@ -153,13 +156,26 @@ async def respond_to_conversation(
     # calculate the total available tokens for the response generation
     available_tokens = request_config.max_tokens - request_config.response_tokens
 
-    history_messages = await _get_history_messages(
-        response_provider=response_provider,
+    async def count_history_tokens(messages: list[CompletionMessage]) -> int:
+        result = await _num_tokens_from_messages(
+            context=context,
+            response_provider=response_provider,
+            messages=messages,
+            model=request_config.model,
+            metadata={},
+            metadata_key="get_history_messages",
+        )
+        return result.count if result is not None else 0
+
+    # the history extension caches the converted messages and their token counts, so only the messages that are
+    # new since the last response are converted and counted
+    history_messages = await history_extension.get_history_messages(
         context=context,
         participants=participants_response.participants,
         converter=_conversation_message_to_completion_messages,
-        model=request_config.model,
+        token_counter=count_history_tokens,
         token_limit=available_tokens - token_count,
+        cache_key=(config.ai_client_config.ai_service_type, request_config.model),
     )
 
     # add the attachment messages to the completion messages, either inline or as separate messages
@@ -180,6 +196,8 @@ async def respond_to_conversation(
         model=request_config.model,
         metadata=metadata,
         metadata_key=method_metadata_key,
+        # the parts of the prompt are estimated locally; reconcile the estimate for the whole prompt once
+        reconcile=True,
     )
     if result is not None:
         estimated_token_count = result.count
@@ -201,10 +219,14 @@ async def respond_to_conversation(
     # set default response message type
     message_type = MessageType.chat
 
+    # stream the response to the conversation as it is generated
+    response_stream = _ResponseStream(context.stream_message(), silence_token=silence_token)
+
     # generate a response from the AI model
     response_result = await response_provider.get_response(
         messages=completion_messages,
         metadata_key=method_metadata_key,
+        on_content_delta=response_stream.on_content_delta,
     )
     content = response_result.content
     message_type = response_result.message_type
@@ -271,8 +293,8 @@ async def respond_to_conversation(
         if content.startswith("/"):
             message_type = MessageType.command_response
 
-    # send the response to the conversation
-    await context.send_messages(
+    # send the response to the conversation, replacing the streamed content
+    await response_stream.message_stream.finalize(
         NewConversationMessage(
             content=content or "[no response from openai]",
             message_type=message_type,
@@ -315,6 +337,39 @@ async def respond_to_conversation(
 # region Helpers
 #
 
+
+class _ResponseStream:
+    """
+    Streams the response content to the conversation once it is clear that the response is not the silence token,
+    a command response, or prefixed with a participant name, which are handled when the response is complete.
+    """
+
+    def __init__(self, message_stream: ConversationMessageStream, silence_token: str) -> None:
+        self.message_stream = message_stream
+        self._silence_token = silence_token
+        self._held_content: list[str] = []
+        self._streaming: bool | None = None
+
+    async def on_content_delta(self, delta: str) -> None:
+        if self._streaming is False:
+            return
+
+        if self._streaming is None:
+            self._held_content.append(delta)
+            held_content = "".join(self._held_content).lstrip()
+            if self._silence_token.startswith(held_content.replace(" ", "")):
+                return
+
+            self._streaming = not held_content.startswith(("[", "/"))
+            if not self._streaming:
+                return
+
+            delta = "".join(self._held_content)
+            self._held_content.clear()
+
+        await self.message_stream.append(delta)
+
+
 # TODO: move to a common module, such as either the openai_client or attachment module for easy re-use in other assistants
 
 
@@ -325,13 +380,14 @@ async def _num_tokens_from_messages(
     model: str,
     metadata: dict[str, Any],
     metadata_key: str,
+    reconcile: bool = False,
 ) -> NumberTokensResult | None:
     """
     Calculate the number of tokens required to generate the completion messages.
     """
     try:
         return await response_provider.num_tokens_from_messages(
-            messages=messages, model=model, metadata_key=metadata_key
+            messages=messages, model=model, metadata_key=metadata_key, reconcile=reconcile
         )
     except Exception as e:
         logger.exception(f"exception occurred calculating token count: {e}")
@@ -388,70 +444,6 @@ async def _conversation_message_to_completion_messages(
     return completion_messages
 
 
-async def _get_history_messages(
-    response_provider: ResponseProvider,
-    context: ConversationContext,
-    participants: list[ConversationParticipant],
-    converter: Callable[
-        [ConversationContext, ConversationMessage, list[ConversationParticipant]],
-        Awaitable[list[CompletionMessage]],
-    ],
-    model: str,
-    token_limit: int | None = None,
-) -> list[CompletionMessage]:
-    """
-    Get all messages in the conversation, formatted for use in a completion.
-    """
-
-    # each call to get_messages will return a maximum of 100 messages
-    # so we need to loop until all messages are retrieved
-    # if token_limit is provided, we will stop when the token limit is reached
-
-    history = []
-    token_count = 0
-    before_message_id = None
-
-    while True:
-        # get the next batch of messages
-        messages_response = await context.get_messages(limit=100, before=before_message_id)
-        messages_list = messages_response.messages
-
-        # if there are no more messages, break the loop
-        if not messages_list or messages_list.count == 0:
-            break
-
-        # set the before_message_id for the next batch of messages
-        before_message_id = messages_list[0].id
-
-        # messages are returned in reverse order, so we need to reverse them
-        for message in reversed(messages_list):
-            # format the message
-            formatted_message_list = await converter(context, message, participants)
-            try:
-                results = await _num_tokens_from_messages(
-                    context=context,
-                    response_provider=response_provider,
-                    messages=formatted_message_list,
-                    model=model,
-                    metadata={},
-                    metadata_key="get_history_messages",
-                )
-                if results is not None:
-                    token_count += results.count
-            except Exception as e:
-                logger.exception(f"exception occurred calculating token count: {e}")
-
-            # if a token limit is provided and the token count exceeds the limit, break the loop
-            if token_limit and token_count > token_limit:
-                break
-
-            # insert the formatted messages into the beginning of the history list
-            history = formatted_message_list + history
-
-    # return the formatted messages
-    return history
-
-
 def _inject_attachments_inline(
     history_messages: list[CompletionMessage],
     attachment_messages: Sequence[CompletionMessage],
@@ -5,6 +5,7 @@ from typing import Iterable, Sequence
 
 import anthropic_client
 import deepmerge
+import openai_client
 from anthropic import NotGiven
 from anthropic.types import Message, MessageParam, TextBlock, ToolUseBlock
 from assistant_extensions.ai_clients.config import AnthropicClientConfigModel
@@ -14,7 +15,7 @@ from semantic_workbench_api_model.workbench_model import (
 )
 
 from ..config import AssistantConfigModel
-from .model import NumberTokensResult, ResponseProvider, ResponseResult
+from .model import ContentDeltaHandler, NumberTokensResult, ResponseProvider, ResponseResult, debug_metadata
 
 logger = logging.getLogger(__name__)
 
@@ -28,60 +29,67 @@ class AnthropicResponseProvider(ResponseProvider):
         self.assistant_config = assistant_config
         self.service_config = anthropic_client_config.service_config
         self.request_config = anthropic_client_config.request_config
+        self.debug = openai_client.DebugCapture(level=assistant_config.debug_metadata_level)
 
     async def num_tokens_from_messages(
         self,
         messages: Sequence[CompletionMessage],
         model: str,
         metadata_key: str,
+        reconcile: bool = False,
     ) -> NumberTokensResult:
         """
         Calculate the number of tokens in a message.
+
+        The count is estimated locally. If reconcile is set, the count is taken from the Anthropic API instead,
+        which also calibrates the local estimates, so it should be set for at most one count per prompt.
         """
 
         beta_message_params = anthropic_client.beta_convert_from_completion_messages(messages)
         results = NumberTokensResult(
             count=0,
-            metadata={
-                "debug": {
-                    metadata_key: {
-                        "request": {
-                            "model": model,
-                            "messages": beta_message_params,
-                        },
+            metadata=debug_metadata(
+                self.debug,
+                metadata_key,
+                lambda: {
+                    "request": {
+                        "model": model,
+                        "messages": beta_message_params,
                     },
                 },
-            },
+            ),
             metadata_key=metadata_key,
         )
 
         if len(beta_message_params) == 0:
             return results
 
-        async with anthropic_client.create_client(self.service_config) as client:
-            try:
-                count = await client.beta.messages.count_tokens(
-                    model=model,
-                    messages=beta_message_params,
-                )
-                results.count = count.input_tokens
-            except Exception as e:
-                logger.exception(f"exception occurred calling openai count tokens: {e}")
-                deepmerge.always_merger.merge(
-                    results.metadata,
-                    {"debug": {metadata_key: {"error": str(e)}}},
-                )
+        results.count = anthropic_client.num_tokens_from_messages(beta_message_params, model=model)
+        if not reconcile:
+            return results
+
+        client = anthropic_client.get_client(self.service_config)
+        try:
+            results.count = await anthropic_client.count_tokens(client, beta_message_params, model=model)
+        except Exception as e:
+            logger.exception(f"exception occurred calling anthropic count tokens: {e}")
+            deepmerge.always_merger.merge(
+                results.metadata,
+                {"debug": {metadata_key: {"error": str(e)}}},
+            )
         return results
 
     async def get_response(
         self,
         messages: list[CompletionMessage],
         metadata_key: str,
+        on_content_delta: ContentDeltaHandler | None = None,
     ) -> ResponseResult:
         """
         Respond to a conversation message.
 
-        This method uses the OpenAI API to generate a response to the message.
+        This method uses the Anthropic API to generate a response to the message. If on_content_delta is provided,
+        the response is streamed, and the handler is called with each chunk of content as it is generated.
 
         It includes any attachments as individual system messages before the chat history, along with references
         to the attachments in the point in the conversation where they were mentioned. This allows the model to
@@ -115,46 +123,59 @@ class AnthropicResponseProvider(ResponseProvider):
         chat_message_params: Iterable[MessageParam] = anthropic_client.convert_from_completion_messages(messages)
 
         # generate a response from the AI model
-        async with anthropic_client.create_client(self.service_config) as client:
-            try:
-                if self.assistant_config.extensions_config.artifacts.enabled:
-                    raise NotImplementedError("Artifacts are not yet supported with our Anthropic support.")
-
-                else:
-                    # call the Anthropic API to generate a completion
-                    response_message = await client.messages.create(
-                        model=self.request_config.model,
-                        max_tokens=self.request_config.response_tokens,
-                        system=system_prompt,
-                        messages=chat_message_params,
-                    )
-                    content = response_message.content
-
-                    if not isinstance(content, list):
-                        raise ValueError("Anthropic API did not return a list of messages.")
-
-                    for item in content:
-                        if isinstance(item, TextBlock):
-                            response_result.content = item.text
-                            continue
-
-                        if isinstance(item, ToolUseBlock):
-                            raise ValueError("Anthropic API returned a ToolUseBlock which is not yet supported.")
-
-                        raise ValueError(f"Anthropic API returned an unexpected type: {type(item)}")
-
-            except Exception as e:
-                logger.exception(f"exception occurred calling openai chat completion: {e}")
-                response_result.content = (
-                    "An error occurred while calling the OpenAI API. Is it configured correctly?"
-                    " View the debug inspector for more information."
-                )
-                response_result.message_type = MessageType.notice
-                deepmerge.always_merger.merge(
-                    response_result.metadata,
-                    {"debug": {method_metadata_key: {"error": str(e)}}},
+        client = anthropic_client.get_client(self.service_config)
+        try:
+            if self.assistant_config.extensions_config.artifacts.enabled:
+                raise NotImplementedError("Artifacts are not yet supported with our Anthropic support.")
+
+            elif on_content_delta is not None:
+                async with client.messages.stream(
+                    model=self.request_config.model,
+                    max_tokens=self.request_config.response_tokens,
+                    system=system_prompt,
+                    messages=chat_message_params,
+                ) as stream:
+                    async for text in stream.text_stream:
+                        await on_content_delta(text)
+                    response_message = await stream.get_final_message()
+
+            else:
+                # call the Anthropic API to generate a completion
+                response_message = await client.messages.create(
+                    model=self.request_config.model,
+                    max_tokens=self.request_config.response_tokens,
+                    system=system_prompt,
+                    messages=chat_message_params,
                 )
 
+            if response_message is not None:
+                content = response_message.content
+
+                if not isinstance(content, list):
+                    raise ValueError("Anthropic API did not return a list of messages.")
+
+                for item in content:
+                    if isinstance(item, TextBlock):
+                        response_result.content = item.text
+                        continue
+
+                    if isinstance(item, ToolUseBlock):
+                        raise ValueError("Anthropic API returned a ToolUseBlock which is not yet supported.")
+
+                    raise ValueError(f"Anthropic API returned an unexpected type: {type(item)}")
+
+        except Exception as e:
+            logger.exception(f"exception occurred calling openai chat completion: {e}")
+            response_result.content = (
+                "An error occurred while calling the OpenAI API. Is it configured correctly?"
+                " View the debug inspector for more information."
+            )
+            response_result.message_type = MessageType.notice
+            deepmerge.always_merger.merge(
+                response_result.metadata,
+                {"debug": {method_metadata_key: {"error": str(e)}}},
+            )
+
         if response_message is not None:
             # get the total tokens used for the completion
             response_result.completion_total_tokens = (
@@ -164,21 +185,19 @@ class AnthropicResponseProvider(ResponseProvider):
         # update the metadata with debug information
         deepmerge.always_merger.merge(
             response_result.metadata,
-            {
-                "debug": {
-                    method_metadata_key: {
-                        "request": {
-                            "model": self.request_config.model,
-                            "system": system_prompt,
-                            "messages": chat_message_params,
-                            "max_tokens": self.request_config.response_tokens,
-                        },
-                        "response": response_message.model_dump()
-                        if response_message
-                        else "[no response from anthropic]",
+            debug_metadata(
+                self.debug,
+                method_metadata_key,
+                lambda: {
+                    "request": {
+                        "model": self.request_config.model,
+                        "system": system_prompt,
+                        "messages": chat_message_params,
+                        "max_tokens": self.request_config.response_tokens,
                     },
+                    "response": response_message if response_message else "[no response from anthropic]",
                 },
-            },
+            ),
         )
 
         # send the response to the conversation
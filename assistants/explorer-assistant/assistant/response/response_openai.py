@@ -22,7 +22,7 @@ from semantic_workbench_assistant.assistant_app import (
 )
 
 from ..config import AssistantConfigModel
-from .model import NumberTokensResult, ResponseProvider, ResponseResult
+from .model import ContentDeltaHandler, NumberTokensResult, ResponseProvider, ResponseResult, debug_metadata
 
 logger = logging.getLogger(__name__)
 
@@ -40,15 +40,17 @@ class OpenAIResponseProvider(ResponseProvider):
         self.assistant_config = assistant_config
         self.service_config = openai_client_config.service_config
         self.request_config = openai_client_config.request_config
+        self.debug = openai_client.DebugCapture(level=assistant_config.debug_metadata_level)
 
     async def num_tokens_from_messages(
         self,
         messages: Sequence[CompletionMessage],
         model: str,
         metadata_key: str,
+        reconcile: bool = False,
     ) -> NumberTokensResult:
         """
-        Calculate the number of tokens in a message.
+        Calculate the number of tokens in a message. The count is always local, so reconcile has no effect.
         """
         count = openai_client.num_tokens_from_messages(
             model=model, messages=openai_client.convert_from_completion_messages(messages)
@@ -56,17 +58,17 @@ class OpenAIResponseProvider(ResponseProvider):
 
         return NumberTokensResult(
             count=count,
-            metadata={
-                "debug": {
-                    metadata_key: {
-                        "request": {
-                            "model": model,
-                            "messages": messages,
-                        },
-                        "response": count,
+            metadata=debug_metadata(
+                self.debug,
+                metadata_key,
+                lambda: {
+                    "request": {
+                        "model": model,
+                        "messages": messages,
                     },
+                    "response": count,
                 },
-            },
+            ),
             metadata_key=metadata_key,
         )
 
@@ -74,11 +76,13 @@ class OpenAIResponseProvider(ResponseProvider):
         self,
         messages: list[CompletionMessage],
         metadata_key: str,
+        on_content_delta: ContentDeltaHandler | None = None,
     ) -> ResponseResult:
         """
         Respond to a conversation message.
 
-        This method uses the OpenAI API to generate a response to the message.
+        This method uses the OpenAI API to generate a response to the message. If on_content_delta is provided,
+        the response is streamed, and the handler is called with each chunk of content as it is generated.
 
         It includes any attachments as individual system messages before the chat history, along with references
         to the attachments in the point in the conversation where they were mentioned. This allows the model to
@@ -106,92 +110,103 @@ class OpenAIResponseProvider(ResponseProvider):
         )
 
         # generate a response from the AI model
-        async with openai_client.create_client(self.service_config) as client:
-            try:
-                if self.request_config.is_reasoning_model:
-                    # convert all messages that use system role to user role as reasoning models do not support system role
-                    chat_message_params = [
-                        {
-                            "role": "user",
-                            "content": message["content"],
-                        }
-                        if message["role"] == "system"
-                        else message
-                        for message in chat_message_params
-                    ]
+        client = openai_client.get_client(self.service_config)
+        try:
+            if self.request_config.is_reasoning_model:
+                # convert all messages that use system role to user role as reasoning models do not support system role
+                chat_message_params = [
+                    {
+                        "role": "user",
+                        "content": message["content"],
+                    }
+                    if message["role"] == "system"
+                    else message
+                    for message in chat_message_params
+                ]
+
+                # for reasoning models, use max_completion_tokens instead of max_tokens
+                completion = await client.chat.completions.create(
+                    messages=chat_message_params,
+                    model=self.request_config.model,
+                    max_completion_tokens=self.request_config.response_tokens,
+                )
 
+                response_result.content = completion.choices[0].message.content
+
+            elif self.assistant_config.extensions_config.artifacts.enabled:
+                response = await self.artifacts_extension.get_openai_completion_response(
+                    client,
+                    chat_message_params,
+                    self.request_config.model,
+                    self.request_config.response_tokens,
+                )
+
+                completion = response.completion
+                response_result.content = response.assistant_response
+                artifacts_to_create_or_update = response.artifacts_to_create_or_update
+
+                for artifact in artifacts_to_create_or_update:
+                    self.artifacts_extension.create_or_update_artifact(
+                        self.conversation_context,
+                        artifact,
+                    )
+                # send an event to notify the artifact state was updated
+                await self.conversation_context.send_conversation_state_event(
+                    AssistantStateEvent(
+                        state_id="artifacts",
+                        event="updated",
+                        state=None,
+                    )
+                )
+                # send a focus event to notify the assistant to focus on the artifacts
+                await self.conversation_context.send_conversation_state_event(
+                    AssistantStateEvent(
+                        state_id="artifacts",
+                        event="focus",
+                        state=None,
+                    )
+                )
+
+            else:
+                # call the OpenAI API to generate a completion
+                if self.request_config.is_reasoning_model:
                     # for reasoning models, use max_completion_tokens instead of max_tokens
                     completion = await client.chat.completions.create(
                         messages=chat_message_params,
                         model=self.request_config.model,
                         max_completion_tokens=self.request_config.response_tokens,
                     )
-
-                    response_result.content = completion.choices[0].message.content
-
-                elif self.assistant_config.extensions_config.artifacts.enabled:
-                    response = await self.artifacts_extension.get_openai_completion_response(
-                        client,
-                        chat_message_params,
-                        self.request_config.model,
-                        self.request_config.response_tokens,
+                elif on_content_delta is not None:
+                    async with client.beta.chat.completions.stream(
+                        messages=chat_message_params,
+                        model=self.request_config.model,
+                        max_tokens=self.request_config.response_tokens,
+                        stream_options={"include_usage": True},
+                    ) as stream:
+                        async for event in stream:
+                            if event.type == "content.delta":
+                                await on_content_delta(event.delta)
+                        completion = await stream.get_final_completion()
+                else:
+                    completion = await client.chat.completions.create(
+                        messages=chat_message_params,
+                        model=self.request_config.model,
+                        max_tokens=self.request_config.response_tokens,
                     )
 
-                    completion = response.completion
-                    response_result.content = response.assistant_response
-                    artifacts_to_create_or_update = response.artifacts_to_create_or_update
-
-                    for artifact in artifacts_to_create_or_update:
-                        self.artifacts_extension.create_or_update_artifact(
-                            self.conversation_context,
-                            artifact,
-                        )
-                    # send an event to notify the artifact state was updated
-                    await self.conversation_context.send_conversation_state_event(
-                        AssistantStateEvent(
-                            state_id="artifacts",
-                            event="updated",
-                            state=None,
-                        )
-                    )
-                    # send a focus event to notify the assistant to focus on the artifacts
-                    await self.conversation_context.send_conversation_state_event(
-                        AssistantStateEvent(
-                            state_id="artifacts",
-                            event="focus",
-                            state=None,
-                        )
-                    )
+                response_result.content = completion.choices[0].message.content
 
-                else:
-                    # call the OpenAI API to generate a completion
-                    if self.request_config.is_reasoning_model:
-                        # for reasoning models, use max_completion_tokens instead of max_tokens
-                        completion = await client.chat.completions.create(
-                            messages=chat_message_params,
-                            model=self.request_config.model,
-                            max_completion_tokens=self.request_config.response_tokens,
-                        )
-                    else:
-                        completion = await client.chat.completions.create(
-                            messages=chat_message_params,
-                            model=self.request_config.model,
-                            max_tokens=self.request_config.response_tokens,
-                        )
-
-                    response_result.content = completion.choices[0].message.content
-
-            except Exception as e:
-                logger.exception(f"exception occurred calling openai chat completion: {e}")
-                response_result.content = (
-                    "An error occurred while calling the OpenAI API. Is it configured correctly?"
-                    " View the debug inspector for more information."
-                )
-                response_result.message_type = MessageType.notice
-                deepmerge.always_merger.merge(
-                    response_result.metadata,
-                    {"debug": {method_metadata_key: {"error": str(e)}}},
-                )
+        except Exception as e:
+            logger.exception(f"exception occurred calling openai chat completion: {e}")
+            response_result.content = (
+                "An error occurred while calling the OpenAI API. Is it configured correctly?"
+                " View the debug inspector for more information."
+            )
+            response_result.message_type = MessageType.notice
+            deepmerge.always_merger.merge(
+                response_result.metadata,
+                {"debug": {method_metadata_key: {"error": str(e)}}},
+            )
 
         if completion is not None:
             # get the total tokens used for the completion
@@ -200,18 +215,18 @@ class OpenAIResponseProvider(ResponseProvider):
         # update the metadata with debug information
         deepmerge.always_merger.merge(
             response_result.metadata,
-            {
-                "debug": {
-                    method_metadata_key: {
-                        "request": {
-                            "model": self.request_config.model,
-                            "messages": chat_message_params,
-                            "max_tokens": self.request_config.response_tokens,
-                        },
-                        "response": completion.model_dump() if completion else "[no response from openai]",
+            debug_metadata(
+                self.debug,
+                method_metadata_key,
+                lambda: {
+                    "request": {
+                        "model": self.request_config.model,
+                        "messages": chat_message_params,
+                        "max_tokens": self.request_config.response_tokens,
                     },
+                    "response": completion if completion else "[no response from openai]",
                 },
-            },
+            ),
         )
 
         # send the response to the conversation
@@ -101,6 +101,14 @@ app = assistant.fastapi_app()
 #
 
 
+@assistant.events.on_service_shutdown
+async def on_service_shutdown() -> None:
+    """
+    Close the LLM clients that are shared by the responses.
+    """
+    await openai_client.close_clients()
+
+
 @assistant.events.conversation.message.chat.on_created
 async def on_message_created(
     context: ConversationContext, event: ConversationEvent, message: ConversationMessage
@@ -178,7 +186,7 @@ async def respond_to_conversation(context: ConversationContext, metadata: dict[s
     try:
         content = await guided_conversation.step_conversation(
             conversation_context=context,
-            openai_client=openai_client.create_client(config.service_config),
+            openai_client=openai_client.get_client(config.service_config),
             request_config=config.request_config,
             agent_config=config.guided_conversation_agent,
         )
@@ -190,24 +190,24 @@ class Step(BaseModel):
             chat_completion_messages.append(_outline_system_message(outline))
 
         # make completion call to openai
-        async with openai_client.create_client(config.service_config) as client:
-            try:
-                completion_args = {
-                    "messages": chat_completion_messages,
-                    "model": config.request_config.openai_model,
-                    "response_format": {"type": "text"},
-                }
-                completion = await client.chat.completions.create(**completion_args)
-                message_content = completion.choices[0].message.content
-                _on_success_metadata_update(metadata, method_metadata_key, config, chat_completion_messages, completion)
-
-            except Exception as e:
-                logger.exception(f"Document Agent State: Exception occurred calling openai chat completion: {e}")
-                message_content = (
-                    "An error occurred while calling the OpenAI API. Is it configured correctly?"
-                    "View the debug inspector for more information."
-                )
-                _on_error_metadata_update(metadata, method_metadata_key, config, chat_completion_messages, e)
+        client = openai_client.get_client(config.service_config)
+        try:
+            completion_args = {
+                "messages": chat_completion_messages,
+                "model": config.request_config.openai_model,
+                "response_format": {"type": "text"},
+            }
+            completion = await client.chat.completions.create(**completion_args)
+            message_content = completion.choices[0].message.content
+            _on_success_metadata_update(metadata, method_metadata_key, config, chat_completion_messages, completion)
+
+        except Exception as e:
+            logger.exception(f"Document Agent State: Exception occurred calling openai chat completion: {e}")
+            message_content = (
+                "An error occurred while calling the OpenAI API. Is it configured correctly?"
+                "View the debug inspector for more information."
+            )
+            _on_error_metadata_update(metadata, method_metadata_key, config, chat_completion_messages, e)
 
         # store only latest version for now (will keep all versions later as need arises)
         (storage_directory_for_context(context) / "document_agent/outline.txt").write_text(message_content)
@@ -244,7 +244,7 @@ class Step(BaseModel):
         gc_outline_feedback_config: GuidedConversationConfigModel = GCDraftOutlineFeedbackConfigModel()
         guided_conversation = GuidedConversation(
             config=config,
-            openai_client=openai_client.create_client(config.service_config),
+            openai_client=openai_client.get_client(config.service_config),
             agent_config=gc_outline_feedback_config,
             conversation_context=context,
         )
@@ -383,24 +383,24 @@ class Step(BaseModel):
 
         # make completion call to openai
         content: str | None = None
-        async with openai_client.create_client(config.service_config) as client:
-            try:
-                completion_args = {
-                    "messages": chat_completion_messages,
-                    "model": config.request_config.openai_model,
-                    "response_format": {"type": "text"},
-                }
-                completion = await client.chat.completions.create(**completion_args)
-                content = completion.choices[0].message.content
-                _on_success_metadata_update(metadata, method_metadata_key, config, chat_completion_messages, completion)
-
-            except Exception as e:
-                logger.exception(f"Document Agent State: Exception occurred calling openai chat completion: {e}")
-                content = (
-                    "An error occurred while calling the OpenAI API. Is it configured correctly?"
-                    "View the debug inspector for more information."
-                )
-                _on_error_metadata_update(metadata, method_metadata_key, config, chat_completion_messages, e)
+        client = openai_client.get_client(config.service_config)
+        try:
+            completion_args = {
+                "messages": chat_completion_messages,
+                "model": config.request_config.openai_model,
+                "response_format": {"type": "text"},
+            }
+            completion = await client.chat.completions.create(**completion_args)
+            content = completion.choices[0].message.content
+            _on_success_metadata_update(metadata, method_metadata_key, config, chat_completion_messages, completion)
+
+        except Exception as e:
+            logger.exception(f"Document Agent State: Exception occurred calling openai chat completion: {e}")
+            content = (
+                "An error occurred while calling the OpenAI API. Is it configured correctly?"
+                "View the debug inspector for more information."
+            )
+            _on_error_metadata_update(metadata, method_metadata_key, config, chat_completion_messages, e)
 
         if content is not None:
             # store only latest version for now (will keep all versions later as need arises)
@@ -438,7 +438,7 @@ class Step(BaseModel):
         gc_outline_feedback_config: GuidedConversationConfigModel = GCDraftContentFeedbackConfigModel()
         guided_conversation = GuidedConversation(
             config=config,
-            openai_client=openai_client.create_client(config.service_config),
+            openai_client=openai_client.get_client(config.service_config),
             agent_config=gc_outline_feedback_config,
             conversation_context=context,
         )
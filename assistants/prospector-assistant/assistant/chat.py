@@ -108,6 +108,14 @@ app = assistant.fastapi_app()
 #
 
 
+@assistant.events.on_service_shutdown
+async def on_service_shutdown() -> None:
+    """
+    Close the LLM clients that are shared by the responses.
+    """
+    await openai_client.close_clients()
+
+
 @assistant.events.conversation.message.on_created
 async def on_message_created(
     context: ConversationContext, event: ConversationEvent, message: ConversationMessage
@@ -227,7 +235,7 @@ async def form_fill_execute(context: ConversationContext, message: ConversationM
     participants = await context.get_participants(include_inactive=True)
     await form_fill_extension.execute(
         llm_config=LLMConfig(
-            openai_client_factory=lambda: openai_client.create_client(config.service_config),
+            openai_client_factory=lambda: openai_client.get_client(config.service_config),
             openai_model=config.request_config.openai_model,
             max_response_tokens=config.request_config.response_tokens,
         ),
@@ -454,143 +462,143 @@ async def respond_to_conversation(
 
         # generate a response from the AI model
         completion_total_tokens: int | None = None
-        async with openai_client.create_client(config.service_config) as client:
-            try:
-                # call the OpenAI API to generate a completion
-                completion = await client.beta.chat.completions.parse(
-                    messages=completion_messages,
-                    model=config.request_config.openai_model,
-                    max_tokens=config.request_config.response_tokens,
-                    response_format=StructuredResponseFormat,
-                )
-                content = completion.choices[0].message.content
-
-                # get the prospector response from the completion
-                structured_response = completion.choices[0].message.parsed
-                # get the assistant response from the prospector response
-                content = structured_response.assistant_response if structured_response else content
-                # get the artifacts to create or update from the prospector response
-                if structured_response and structured_response.artifacts_to_create_or_update:
-                    for artifact in structured_response.artifacts_to_create_or_update:
-                        ArtifactAgent.create_or_update_artifact(
-                            context,
-                            artifact,
-                        )
-                    # send an event to notify the artifact state was updated
-                    await context.send_conversation_state_event(
-                        AssistantStateEvent(
-                            state_id="artifacts",
-                            event="updated",
-                            state=None,
-                        )
+        client = openai_client.get_client(config.service_config)
+        try:
+            # call the OpenAI API to generate a completion
+            completion = await client.beta.chat.completions.parse(
+                messages=completion_messages,
+                model=config.request_config.openai_model,
+                max_tokens=config.request_config.response_tokens,
+                response_format=StructuredResponseFormat,
+            )
+            content = completion.choices[0].message.content
+
+            # get the prospector response from the completion
+            structured_response = completion.choices[0].message.parsed
+            # get the assistant response from the prospector response
+            content = structured_response.assistant_response if structured_response else content
+            # get the artifacts to create or update from the prospector response
+            if structured_response and structured_response.artifacts_to_create_or_update:
+                for artifact in structured_response.artifacts_to_create_or_update:
+                    ArtifactAgent.create_or_update_artifact(
+                        context,
+                        artifact,
                     )
-
-                    # send a focus event to notify the assistant to focus on the artifacts
-                    await context.send_conversation_state_event(
-                        AssistantStateEvent(
-                            state_id="artifacts",
-                            event="focus",
-                            state=None,
-                        )
+                # send an event to notify the artifact state was updated
+                await context.send_conversation_state_event(
+                    AssistantStateEvent(
+                        state_id="artifacts",
+                        event="updated",
+                        state=None,
                     )
+                )
 
-                # get the total tokens used for the completion
-                completion_total_tokens = completion.usage.total_tokens if completion.usage else None
+                # send a focus event to notify the assistant to focus on the artifacts
+                await context.send_conversation_state_event(
+                    AssistantStateEvent(
+                        state_id="artifacts",
+                        event="focus",
+                        state=None,
+                    )
+                )
 
-                # add the completion to the metadata for debugging
-                deepmerge.always_merger.merge(
-                    metadata,
-                    {
-                        "debug": {
-                            method_metadata_key: {
-                                "request": {
-                                    "model": config.request_config.openai_model,
-                                    "messages": completion_messages,
-                                    "max_tokens": config.request_config.response_tokens,
-                                    "response_format": StructuredResponseFormat.model_json_schema(),
-                                },
-                                "response": completion.model_dump() if completion else "[no response from openai]",
+            # get the total tokens used for the completion
+            completion_total_tokens = completion.usage.total_tokens if completion.usage else None
+
+            # add the completion to the metadata for debugging
+            deepmerge.always_merger.merge(
+                metadata,
+                {
+                    "debug": {
+                        method_metadata_key: {
+                            "request": {
+                                "model": config.request_config.openai_model,
+                                "messages": completion_messages,
+                                "max_tokens": config.request_config.response_tokens,
+                                "response_format": StructuredResponseFormat.model_json_schema(),
                             },
-                        }
-                    },
-                )
-            except Exception as e:
-                logger.exception(f"exception occurred calling openai chat completion: {e}")
-                content = (
-                    "An error occurred while calling the OpenAI API. Is it configured correctly?"
-                    " View the debug inspector for more information."
-                )
-                message_type = MessageType.notice
-                deepmerge.always_merger.merge(
-                    metadata,
-                    {
-                        "debug": {
-                            method_metadata_key: {
-                                "request": {
-                                    "model": config.request_config.openai_model,
-                                    "messages": completion_messages,
-                                },
-                                "error": str(e),
+                            "response": completion.model_dump() if completion else "[no response from openai]",
+                        },
+                    }
+                },
+            )
+        except Exception as e:
+            logger.exception(f"exception occurred calling openai chat completion: {e}")
+            content = (
+                "An error occurred while calling the OpenAI API. Is it configured correctly?"
+                " View the debug inspector for more information."
+            )
+            message_type = MessageType.notice
+            deepmerge.always_merger.merge(
+                metadata,
+                {
+                    "debug": {
+                        method_metadata_key: {
+                            "request": {
+                                "model": config.request_config.openai_model,
+                                "messages": completion_messages,
                             },
-                        }
-                    },
-                )
+                            "error": str(e),
+                        },
+                    }
+                },
+            )
 
     # fallback to prior approach to generate a response from the AI model when artifacts are not enabled
     if not config.agents_config.artifact_agent.enabled:
         # generate a response from the AI model
         completion_total_tokens: int | None = None
-        async with openai_client.create_client(config.service_config) as client:
-            try:
-                # call the OpenAI API to generate a completion
-                completion = await client.chat.completions.create(
-                    messages=completion_messages,
-                    model=config.request_config.openai_model,
-                    max_tokens=config.request_config.response_tokens,
-                )
-                content = completion.choices[0].message.content
-
-                # get the total tokens used for the completion
-                completion_total_tokens = completion.usage.total_tokens if completion.usage else None
-
-                # add the completion to the metadata for debugging
-                deepmerge.always_merger.merge(
-                    metadata,
-                    {
-                        "debug": {
-                            method_metadata_key: {
-                                "request": {
-                                    "model": config.request_config.openai_model,
-                                    "messages": completion_messages,
-                                    "max_tokens": config.request_config.response_tokens,
-                                },
-                                "response": completion.model_dump() if completion else "[no response from openai]",
+        client = openai_client.get_client(config.service_config)
+        try:
+            # call the OpenAI API to generate a completion
+            completion = await client.chat.completions.create(
+                messages=completion_messages,
+                model=config.request_config.openai_model,
+                max_tokens=config.request_config.response_tokens,
+            )
+            content = completion.choices[0].message.content
+
+            # get the total tokens used for the completion
+            completion_total_tokens = completion.usage.total_tokens if completion.usage else None
+
+            # add the completion to the metadata for debugging
+            deepmerge.always_merger.merge(
+                metadata,
+                {
+                    "debug": {
+                        method_metadata_key: {
+                            "request": {
+                                "model": config.request_config.openai_model,
+                                "messages": completion_messages,
+                                "max_tokens": config.request_config.response_tokens,
                             },
-                        }
-                    },
-                )
+                            "response": completion.model_dump() if completion else "[no response from openai]",
+                        },
+                    }
+                },
+            )
 
-            except Exception as e:
-                logger.exception(f"exception occurred calling openai chat completion: {e}")
-                content = (
-                    "An error occurred while calling the OpenAI API. Is it configured correctly?"
-                    " View the debug inspector for more information."
-                )
-                message_type = MessageType.notice
-                deepmerge.always_merger.merge(
-                    metadata,
-                    {
-                        "debug": {
-                            method_metadata_key: {
-                                "request": {
-                                    "model": config.request_config.openai_model,
-                                    "messages": completion_messages,
-                                },
-                                "error": str(e),
+        except Exception as e:
+            logger.exception(f"exception occurred calling openai chat completion: {e}")
+            content = (
+                "An error occurred while calling the OpenAI API. Is it configured correctly?"
+                " View the debug inspector for more information."
+            )
+            message_type = MessageType.notice
+            deepmerge.always_merger.merge(
+                metadata,
+                {
+                    "debug": {
+                        method_metadata_key: {
+                            "request": {
+                                "model": config.request_config.openai_model,
+                                "messages": completion_messages,
                             },
-                        }
-                    },
-                )
+                            "error": str(e),
+                        },
+                    }
+                },
+            )
 
     if content:
         # strip out the username from the response
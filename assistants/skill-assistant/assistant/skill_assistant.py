@@ -7,6 +7,7 @@
 # using the AssistantApp class from the semantic-workbench-assistant package and leveraging
 # the skills library to create a skill-based assistant.
 
+import dataclasses
 from pathlib import Path
 from typing import Any, Optional
 
@@ -15,7 +16,12 @@ from assistant_drive import Drive, DriveConfig
 from common_skill import CommonSkillDefinition
 from content_safety.evaluators import CombinedContentSafetyEvaluator
 from guided_conversation_skill import GuidedConversationSkillDefinition
-from openai_client.chat_driver import ChatDriverConfig
+from openai_client.chat_driver import (
+    AppendOnlyMessageHistoryProvider,
+    AppendOnlyMessageHistoryProviderConfig,
+    ChatDriverConfig,
+)
+from openai_client.messages import format_with_liquid
 from posix_skill import PosixSkillDefinition
 from semantic_workbench_api_model.workbench_model import (
     ConversationEvent,
@@ -29,6 +35,7 @@ from semantic_workbench_assistant.assistant_app import (
     ContentSafety,
     ContentSafetyEvaluator,
     ConversationContext,
+    storage_directory_for_context,
 )
 from skill_library import Assistant
 from skill_library.types import Metadata
@@ -212,10 +219,22 @@ async def get_or_register_assistant(
             instructions=config.chat_driver_config.instructions,
         )
 
+        # the assistant's chat history is kept with the other data of the conversation, rather than in memory
+        assistant_chat_driver_config = dataclasses.replace(
+            chat_driver_config,
+            message_provider=AppendOnlyMessageHistoryProvider(
+                AppendOnlyMessageHistoryProviderConfig(
+                    session_id=assistant_id,
+                    data_dir=storage_directory_for_context(conversation_context) / "chat_driver",
+                    formatter=format_with_liquid,
+                )
+            ),
+        )
+
         assistant = Assistant(
             assistant_id=conversation_context.id,
             name="Assistant",
-            chat_driver_config=chat_driver_config,
+            chat_driver_config=assistant_chat_driver_config,
             drive_root=assistant_drive_root,
             metadata_drive_root=assistant_metadata_drive_root,
             skills=[
@@ -110,6 +110,14 @@ app = assistant.fastapi_app()
 #
 
 
+@assistant.events.on_service_shutdown
+async def on_service_shutdown() -> None:
+    """
+    Close the LLM clients that are shared by the responses.
+    """
+    await openai_client.close_clients()
+
+
 @assistant.events.conversation.message.chat.on_created
 async def on_message_created(
     context: ConversationContext, event: ConversationEvent, message: ConversationMessage
@@ -325,54 +333,54 @@ async def respond_to_conversation(
     #     return
 
     # generate a response from the AI model
-    async with openai_client.create_client(config.service_config, api_version="2024-06-01") as client:
-        try:
-            # call the OpenAI chat completion endpoint to get a response
-            completion = await client.chat.completions.create(
-                messages=completion_messages,
-                model=config.request_config.openai_model,
-                max_tokens=config.request_config.response_tokens,
-            )
-
-            # get the content from the completion response
-            content = completion.choices[0].message.content
-
-            # merge the completion response into the passed in metadata
-            deepmerge.always_merger.merge(
-                metadata,
-                {
-                    "debug": {
-                        f"{method_metadata_key}": {
-                            "request": {
-                                "model": config.request_config.openai_model,
-                                "messages": completion_messages,
-                                "max_tokens": config.request_config.response_tokens,
-                            },
-                            "response": completion.model_dump() if completion else "[no response from openai]",
+    client = openai_client.get_client(config.service_config, api_version="2024-06-01")
+    try:
+        # call the OpenAI chat completion endpoint to get a response
+        completion = await client.chat.completions.create(
+            messages=completion_messages,
+            model=config.request_config.openai_model,
+            max_tokens=config.request_config.response_tokens,
+        )
+
+        # get the content from the completion response
+        content = completion.choices[0].message.content
+
+        # merge the completion response into the passed in metadata
+        deepmerge.always_merger.merge(
+            metadata,
+            {
+                "debug": {
+                    f"{method_metadata_key}": {
+                        "request": {
+                            "model": config.request_config.openai_model,
+                            "messages": completion_messages,
+                            "max_tokens": config.request_config.response_tokens,
                         },
-                    }
-                },
-            )
-        except Exception as e:
-            logger.exception(f"exception occurred calling openai chat completion: {e}")
-            # if there is an error, set the content to an error message
-            content = "An error occurred while calling the OpenAI API. Is it configured correctly?"
-
-            # merge the error into the passed in metadata
-            deepmerge.always_merger.merge(
-                metadata,
-                {
-                    "debug": {
-                        f"{method_metadata_key}": {
-                            "request": {
-                                "model": config.request_config.openai_model,
-                                "messages": completion_messages,
-                            },
-                            "error": str(e),
+                        "response": completion.model_dump() if completion else "[no response from openai]",
+                    },
+                }
+            },
+        )
+    except Exception as e:
+        logger.exception(f"exception occurred calling openai chat completion: {e}")
+        # if there is an error, set the content to an error message
+        content = "An error occurred while calling the OpenAI API. Is it configured correctly?"
+
+        # merge the error into the passed in metadata
+        deepmerge.always_merger.merge(
+            metadata,
+            {
+                "debug": {
+                    f"{method_metadata_key}": {
+                        "request": {
+                            "model": config.request_config.openai_model,
+                            "messages": completion_messages,
                         },
-                    }
-                },
-            )
+                        "error": str(e),
+                    },
+                }
+            },
+        )
 
     # set the message type based on the content
     message_type = MessageType.chat
@@ -1,5 +1,7 @@
 from .client import (
+    close_clients,
     create_client,
+    get_client,
 )
 from .config import (
     AnthropicRequestConfig,
@@ -17,9 +19,17 @@ from .messages import (
     format_with_liquid,
     truncate_messages_for_logging,
 )
+from .tokens import (
+    count_tokens,
+    num_tokens_for_each_message,
+    num_tokens_from_message,
+    num_tokens_from_messages,
+)
 
 __all__ = [
     "beta_convert_from_completion_messages",
+    "close_clients",
+    "count_tokens",
     "create_client",
     "convert_from_completion_messages",
     "create_assistant_message",
@@ -29,6 +39,10 @@ __all__ = [
     "create_user_beta_message",
     "format_with_dict",
     "format_with_liquid",
+    "get_client",
+    "num_tokens_for_each_message",
+    "num_tokens_from_message",
+    "num_tokens_from_messages",
     "truncate_messages_for_logging",
     "AnthropicRequestConfig",
     "AnthropicServiceConfig",
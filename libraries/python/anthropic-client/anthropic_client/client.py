@@ -1,10 +1,49 @@
-from anthropic import AsyncAnthropic
+import hashlib
+import json
+
+import httpx
+from assistant_extensions.ai_clients.shared_clients import SharedClients
+from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
 
 from .config import AnthropicServiceConfig
 
+# clients are shared per service configuration, see get_client
+_shared_clients = SharedClients[AsyncAnthropic](name="anthropic")
+
+
+def get_client(service_config: AnthropicServiceConfig) -> AsyncAnthropic:
+    """
+    Returns the process-wide AsyncAnthropic client for the provided service configuration, creating it on first use,
+    so that requests reuse its pooled connections rather than connecting for each response.
+
+    The client is shared: do not close it, or use it with `async with`. Get the client for each operation rather than
+    keeping it, as clients that are not requested for a while, and have no requests in flight, are closed. Call
+    close_clients on shutdown.
+    """
+    return _shared_clients.get(
+        _config_hash(service_config),
+        lambda transport: create_client(service_config, http_client=DefaultAsyncHttpxClient(transport=transport)),
+    )
+
+
+async def close_clients() -> None:
+    """
+    Closes all shared clients. Clients requested afterwards are created anew.
+    """
+    await _shared_clients.close()
+
+
+def _config_hash(service_config: AnthropicServiceConfig) -> str:
+    # the hash covers the api key too, so that a change of key gets a new client, without keeping it in the key
+    config_json = json.dumps(service_config.model_dump(mode="python"), sort_keys=True, default=str)
+    return hashlib.sha256(config_json.encode()).hexdigest()
+
 
-def create_client(service_config: AnthropicServiceConfig) -> AsyncAnthropic:
+def create_client(
+    service_config: AnthropicServiceConfig, *, http_client: httpx.AsyncClient | None = None
+) -> AsyncAnthropic:
     """
-    Creates an AsyncAnthropic client based on the provided service configuration.
+    Creates an AsyncAnthropic client based on the provided service configuration. The client is owned by the caller,
+    which is responsible for closing it; see get_client for a shared client.
     """
-    return AsyncAnthropic(api_key=service_config.anthropic_api_key)
+    return AsyncAnthropic(api_key=service_config.anthropic_api_key, http_client=http_client)
@@ -0,0 +1,161 @@
+import base64
+import logging
+import math
+from io import BytesIO
+from typing import Any, Iterable, Mapping, Sequence
+
+from anthropic import AsyncAnthropic, NotGiven
+from anthropic.types import MessageParam
+from anthropic.types.beta import BetaMessageParam
+from assistant_extensions.ai_clients.images import image_dims_from_base64_header
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Anthropic does not publish the tokenizer of its models, so tokens are estimated from the length of the text. The
+# estimate is calibrated per model against the remote count, see count_tokens.
+CHARACTERS_PER_TOKEN = 3.5
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REQUEST = 8
+
+# images are resized to fit in this size, and cost about one token per 750 pixels
+# Reference: https://docs.anthropic.com/en/docs/build-with-claude/vision#calculate-image-costs
+IMAGE_MAX_EDGE_PIXELS = 1568
+IMAGE_PIXELS_PER_TOKEN = 750
+
+# weight of the latest remote count when updating the calibration of a model
+CALIBRATION_SMOOTHING = 0.5
+
+_calibration: dict[str, float] = {}
+
+
+def num_tokens_from_message(message: MessageParam | BetaMessageParam | Mapping[str, Any], model: str) -> int:
+    """
+    Return the estimated number of tokens used by a single message, without calling the Anthropic API.
+    """
+
+    return _calibrated(_estimate_message(message), model)
+
+
+def num_tokens_for_each_message(
+    messages: Iterable[MessageParam | BetaMessageParam | Mapping[str, Any]], model: str
+) -> list[int]:
+    """
+    Return the estimated number of tokens used by each message, in one pass, without calling the Anthropic API.
+    """
+
+    return [_calibrated(_estimate_message(message), model) for message in messages]
+
+
+def num_tokens_from_messages(
+    messages: Iterable[MessageParam | BetaMessageParam | Mapping[str, Any]], model: str, system: str | None = None
+) -> int:
+    """
+    Return the estimated number of tokens used by a request with the messages, in one pass, without calling the
+    Anthropic API.
+    """
+
+    estimate = _estimate_messages(messages, system)
+    return _calibrated(estimate, model)
+
+
+async def count_tokens(
+    client: AsyncAnthropic,
+    messages: Sequence[BetaMessageParam],
+    model: str,
+    system: str | None = None,
+) -> int:
+    """
+    Return the number of tokens used by a request with the messages, as counted by the Anthropic API, and calibrate
+    the local estimate for the model with it. Call this at most once per prompt, such as for the final prompt, and
+    use the local estimates for its parts.
+    """
+
+    result = await client.beta.messages.count_tokens(
+        model=model,
+        messages=messages,
+        system=system if system is not None else NotGiven(),
+    )
+
+    estimate = _estimate_messages(messages, system)
+    if estimate > 0:
+        ratio = result.input_tokens / estimate
+        previous_ratio = _calibration.get(model)
+        if previous_ratio is not None:
+            ratio = previous_ratio + CALIBRATION_SMOOTHING * (ratio - previous_ratio)
+        _calibration[model] = ratio
+
+    return result.input_tokens
+
+
+def _calibrated(estimate: float, model: str) -> int:
+    return math.ceil(estimate * _calibration.get(model, 1.0))
+
+
+def _estimate_messages(
+    messages: Iterable[MessageParam | BetaMessageParam | Mapping[str, Any]], system: str | None
+) -> float:
+    estimate = sum(_estimate_message(message) for message in messages)
+    if system:
+        estimate += _estimate_text(system)
+    return estimate + TOKENS_PER_REQUEST
+
+
+def _estimate_message(message: MessageParam | BetaMessageParam | Mapping[str, Any]) -> float:
+    content = message.get("content")
+    estimate = float(TOKENS_PER_MESSAGE)
+
+    if isinstance(content, str):
+        return estimate + _estimate_text(content)
+
+    for block in content or []:
+        if not isinstance(block, Mapping):
+            # content blocks from responses, such as TextBlock, are models rather than dicts
+            block = block.model_dump()
+
+        match block.get("type"):
+            case "text":
+                estimate += _estimate_text(block.get("text", ""))
+            case "image":
+                estimate += _estimate_image(block.get("source", {}))
+            case _:
+                # tool use and tool result blocks are counted by their serialized length
+                estimate += _estimate_text(str(block.get("input") or block.get("content") or ""))
+
+    return estimate
+
+
+def _estimate_text(text: str) -> float:
+    return len(text) / CHARACTERS_PER_TOKEN
+
+
+def _estimate_image(source: Mapping[str, Any]) -> float:
+    if source.get("type") != "base64":
+        return IMAGE_MAX_EDGE_PIXELS**2 / IMAGE_PIXELS_PER_TOKEN
+
+    data = source.get("data", "")
+    if data.startswith("data:"):
+        # attachments carry images as data URIs
+        data = data.split(",", 1)[-1]
+
+    try:
+        width, height = _image_dims(data)
+    except Exception:
+        logger.warning("could not read image dimensions; assuming the maximum image size")
+        return IMAGE_MAX_EDGE_PIXELS**2 / IMAGE_PIXELS_PER_TOKEN
+
+    if max(width, height) > IMAGE_MAX_EDGE_PIXELS:
+        ratio = IMAGE_MAX_EDGE_PIXELS / max(width, height)
+        width = int(width * ratio)
+        height = int(height * ratio)
+
+    return width * height / IMAGE_PIXELS_PER_TOKEN
+
+
+def _image_dims(data: str) -> tuple[int, int]:
+    dims = image_dims_from_base64_header(data)
+    if dims is not None:
+        return dims
+
+    with Image.open(BytesIO(base64.b64decode(data))) as image:
+        return image.size
@@ -0,0 +1,92 @@
+import asyncio
+import base64
+from io import BytesIO
+from types import SimpleNamespace
+from typing import Any
+from unittest import mock
+
+import anthropic_client
+import anthropic_client.tokens
+import pytest
+from PIL import Image
+
+
+@pytest.fixture(autouse=True)
+def calibration(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(anthropic_client.tokens, "_calibration", {})
+
+
+def image_block(image_format: str, size: tuple[int, int], mode: str = "RGB", lossless: bool = False) -> dict:
+    buffer = BytesIO()
+    Image.new(mode, size).save(buffer, format=image_format, lossless=lossless)
+    return {
+        "type": "image",
+        "source": {
+            "type": "base64",
+            "media_type": f"image/{image_format.lower()}",
+            "data": base64.b64encode(buffer.getvalue()).decode(),
+        },
+    }
+
+
+def test_num_tokens_from_messages() -> None:
+    # 35 characters are 10 tokens, and each message and request has an overhead
+    text = "a" * 35
+    assert anthropic_client.num_tokens_from_message({"role": "user", "content": text}, "model") == 4 + 10
+
+    messages: list[Any] = [
+        {"role": "user", "content": text},
+        {"role": "assistant", "content": [{"type": "text", "text": text}, {"type": "text", "text": text}]},
+    ]
+    assert anthropic_client.num_tokens_for_each_message(messages, "model") == [4 + 10, 4 + 20]
+    assert anthropic_client.num_tokens_from_messages(messages, "model") == 8 + 14 + 24
+    assert anthropic_client.num_tokens_from_messages(messages, "model", system=text) == 8 + 14 + 24 + 10
+
+
+@pytest.mark.parametrize(
+    ("image_format", "mode", "lossless"),
+    [
+        ("PNG", "RGB", False),
+        ("GIF", "RGB", False),
+        ("JPEG", "RGB", False),
+        ("WEBP", "RGB", False),
+        ("WEBP", "RGB", True),
+        ("WEBP", "RGBA", False),
+    ],
+)
+def test_num_tokens_for_images(image_format: str, mode: str, lossless: bool) -> None:
+    message = {"role": "user", "content": [image_block(image_format, (750, 2), mode, lossless)]}
+
+    # the dimensions are read from the header of the image, without decoding it
+    with mock.patch.object(Image, "open", side_effect=AssertionError("image should not be decoded")):
+        assert anthropic_client.num_tokens_from_message(message, "model") == 4 + 2
+
+
+def test_num_tokens_for_large_images() -> None:
+    # images are resized to fit the maximum edge
+    message = {"role": "user", "content": [image_block("PNG", (3136, 750))]}
+    assert anthropic_client.num_tokens_from_message(message, "model") == 4 + 1568 * 375 / 750
+
+
+def test_count_tokens_calibrates_estimates() -> None:
+    messages: list[Any] = [{"role": "user", "content": "a" * 35}]
+    estimate = anthropic_client.num_tokens_from_messages(messages, "model")
+    assert estimate == 8 + 14
+
+    def client(input_tokens: int) -> Any:
+        async def count_tokens(**kwargs: Any) -> Any:
+            return SimpleNamespace(input_tokens=input_tokens)
+
+        return SimpleNamespace(beta=SimpleNamespace(messages=SimpleNamespace(count_tokens=count_tokens)))
+
+    # the estimates of the model are scaled by the ratio of the remote count to the estimate
+    assert asyncio.run(anthropic_client.count_tokens(client(44), messages, "model")) == 44
+    assert anthropic_client.num_tokens_from_messages(messages, "model") == 44
+    assert anthropic_client.num_tokens_from_message(messages[0], "model") == 28
+
+    # later counts are smoothed into the calibration
+    asyncio.run(anthropic_client.count_tokens(client(22), messages, "model"))
+    assert anthropic_client.num_tokens_from_messages(messages, "model") == 33
+
+    # other models are not affected
+    assert anthropic_client.num_tokens_from_messages(messages, "other-model") == 22
@@ -0,0 +1,77 @@
+import base64
+import struct
+
+# the lengths of the base64 prefixes of an image to decode when looking for its dimensions, before decoding all of it;
+# the second is long enough for JPEG files with the largest metadata segments
+IMAGE_HEADER_BASE64_LENGTHS = (4 * 1024, 128 * 1024)
+
+
+def image_dims_from_base64_header(data: str) -> tuple[int, int] | None:
+    """
+    Return the width and height of a base64 encoded PNG, GIF, WebP or JPEG image, decoding only the start of it, or
+    None if the dimensions are not in the decoded header. The image needs to be decoded in full to find them.
+    """
+
+    # the common image formats store the dimensions in the header, so decode only the start of the image
+    for length in IMAGE_HEADER_BASE64_LENGTHS:
+        try:
+            dims = image_dims_from_header(base64.b64decode(data[:length]))
+        except ValueError:
+            dims = None
+        if dims is not None:
+            return dims
+        if length >= len(data):
+            break
+
+    return None
+
+
+def image_dims_from_header(data: bytes) -> tuple[int, int] | None:
+    """
+    Return the width and height of a PNG, GIF, WebP or JPEG image from the start of its content, or None if the
+    dimensions are not in it.
+    """
+
+    if data.startswith(b"\x89PNG\r\n\x1a\n") and data[12:16] == b"IHDR" and len(data) >= 24:
+        width, height = struct.unpack(">II", data[16:24])
+        return width, height
+
+    if data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        width, height = struct.unpack("<HH", data[6:10])
+        return width, height
+
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP" and len(data) >= 30:
+        match data[12:16]:
+            case b"VP8 ":
+                width, height = struct.unpack("<HH", data[26:30])
+                return width & 0x3FFF, height & 0x3FFF
+            case b"VP8L":
+                bits = int.from_bytes(data[21:25], "little")
+                return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+            case b"VP8X":
+                return int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+        return None
+
+    if data[:2] == b"\xff\xd8":
+        # walk the segments to the start of frame segment, which holds the dimensions
+        index = 2
+        while index + 9 <= len(data):
+            if data[index] != 0xFF:
+                return None
+            marker = data[index + 1]
+            if marker == 0xFF:
+                # fill byte
+                index += 1
+                continue
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">HH", data[index + 5 : index + 9])
+                return width, height
+            if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                # markers without a segment
+                index += 2
+                continue
+            (segment_length,) = struct.unpack(">H", data[index + 2 : index + 4])
+            index += 2 + segment_length
+        return None
+
+    return None
@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Generic, Hashable, Protocol, TypeVar
+
+import httpx
+from semantic_workbench_api_model.transport import InFlightCountingTransport
+
+logger = logging.getLogger(__name__)
+
+# limits of the connection pool of each shared client
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY_SECONDS = 60.0
+
+# shared clients that have not been requested for this long are closed
+CLIENT_IDLE_TIMEOUT_SECONDS = 15 * 60.0
+
+
+class _Client(Protocol):
+    def is_closed(self) -> bool: ...
+
+    async def close(self) -> None: ...
+
+
+ClientT = TypeVar("ClientT", bound=_Client)
+
+
+@dataclass
+class _SharedClient(Generic[ClientT]):
+    client: ClientT
+    transport: InFlightCountingTransport
+    last_used: float
+
+
+class SharedClients(Generic[ClientT]):
+    """
+    Process-wide SDK clients, shared per key, so that requests reuse the pooled connections of a client rather than
+    connecting for each response. Clients that are not requested for idle_timeout_seconds, and have no requests in
+    flight, are closed.
+    """
+
+    def __init__(self, name: str, idle_timeout_seconds: float = CLIENT_IDLE_TIMEOUT_SECONDS) -> None:
+        self._name = name
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self._clients: dict[Hashable, _SharedClient[ClientT]] = {}
+
+    def get(self, key: Hashable, create_client: Callable[[httpx.AsyncBaseTransport], ClientT]) -> ClientT:
+        """
+        Returns the client for the key, creating it on first use, or when it has been closed. create_client is given
+        the transport for the HTTP client of the new client.
+        """
+        now = time.monotonic()
+        self._close_idle_clients(now)
+
+        shared = self._clients.get(key)
+        if shared is None or shared.client.is_closed():
+            transport = InFlightCountingTransport(self._create_transport())
+            shared = _SharedClient(client=create_client(transport), transport=transport, last_used=now)
+            self._clients[key] = shared
+
+        shared.last_used = now
+        return shared.client
+
+    async def close(self) -> None:
+        """
+        Closes all shared clients. Clients requested afterwards are created anew.
+        """
+        shared_clients = list(self._clients.values())
+        self._clients.clear()
+        for shared in shared_clients:
+            try:
+                await shared.client.close()
+            except Exception:
+                logger.exception("error closing %s client", self._name)
+
+    def _create_transport(self) -> httpx.AsyncBaseTransport:
+        return httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+            )
+        )
+
+    def _close_idle_clients(self, now: float) -> None:
+        for key, shared in list(self._clients.items()):
+            if now - shared.last_used < self.idle_timeout_seconds:
+                continue
+            if shared.transport.in_flight > 0:
+                # a client that was requested before the timeout may still be sending requests
+                continue
+
+            del self._clients[key]
+            try:
+                asyncio.get_running_loop().create_task(shared.client.close())
+            except RuntimeError:
+                # without a running loop, the client is left to be garbage collected
+                pass
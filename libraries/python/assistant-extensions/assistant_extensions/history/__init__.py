@@ -0,0 +1,3 @@
+from ._history import HistoryWindowExtension, MessageConverter, TokenCounter
+
+__all__ = ["HistoryWindowExtension", "MessageConverter", "TokenCounter"]
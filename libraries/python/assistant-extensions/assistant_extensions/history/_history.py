@@ -0,0 +1,277 @@
+import asyncio
+import bisect
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Hashable, Iterable
+
+from semantic_workbench_api_model.workbench_model import (
+    ConversationEvent,
+    ConversationMessage,
+    ConversationParticipant,
+    MessageType,
+)
+from semantic_workbench_assistant.assistant_app import AssistantAppProtocol, ConversationContext
+
+from ..ai_clients.model import CompletionMessage
+
+
+MessageConverter = Callable[
+    [ConversationContext, ConversationMessage, list[ConversationParticipant]],
+    Awaitable[list[CompletionMessage]],
+]
+TokenCounter = Callable[[list[CompletionMessage]], Awaitable[int]]
+
+
+@dataclass
+class _HistoryEntry:
+    message: ConversationMessage
+    # the key the completion messages and token count were computed for, None until they are computed
+    converted_key: Hashable | None = None
+    completion_messages: list[CompletionMessage] = field(default_factory=list)
+    token_count: int = 0
+
+    @property
+    def sequence(self) -> int:
+        return self.message.sequence or 0
+
+
+@dataclass
+class _ConversationHistory:
+    # entries in sequence order
+    entries: list[_HistoryEntry] = field(default_factory=list)
+    # whether the entries reach back to the first message of the conversation
+    has_start: bool = False
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    def add(self, message: ConversationMessage) -> None:
+        if message.sequence is None or any(entry.message.id == message.id for entry in self.entries):
+            return
+
+        sequences = [entry.sequence for entry in self.entries]
+        index = bisect.bisect(sequences, message.sequence)
+        if index == 0 and self.entries and not self.has_start:
+            # older than the cached range; it will be fetched if the window reaches back that far
+            return
+
+        self.entries.insert(index, _HistoryEntry(message=message))
+
+    def remove(self, message_id: uuid.UUID) -> None:
+        self.entries = [entry for entry in self.entries if entry.message.id != message_id]
+
+
+class HistoryWindowExtension:
+    def __init__(
+        self,
+        assistant: AssistantAppProtocol,
+        message_types: Iterable[MessageType] = (MessageType.chat,),
+        page_size: int = 100,
+        max_conversations: int = 100,
+    ) -> None:
+        """
+        HistoryWindowExtension produces the chat completion messages for the most recent conversation messages
+        that fit in a token limit. The converted messages, and their token counts, are cached per conversation and
+        kept up to date from message events, so that building a prompt only converts and counts messages that are
+        new since the previous turn.
+
+        Args:
+            assistant: The assistant app to bind to.
+            message_types: The types of conversation messages to include in the history.
+            page_size: The number of messages to request from the workbench per call.
+            max_conversations: The number of conversations to keep cached history for.
+
+        Example:
+            ```python
+            from assistant_extensions.history import HistoryWindowExtension
+
+            assistant = AssistantApp(...)
+
+            history_extension = HistoryWindowExtension(assistant)
+
+
+            @assistant.events.conversation.message.chat.on_created
+            async def on_message_created(
+                context: ConversationContext, event: ConversationEvent, message: ConversationMessage
+            ) -> None:
+                ...
+                history_messages = await history_extension.get_history_messages(
+                    context,
+                    participants=participants,
+                    converter=converter,
+                    token_counter=token_counter,
+                    token_limit=token_limit,
+                    cache_key=model,
+                )
+            ```
+        """
+
+        self._message_types = list(message_types)
+        self._page_size = page_size
+        self._max_conversations = max_conversations
+        self._histories: OrderedDict[tuple[str, str], _ConversationHistory] = OrderedDict()
+
+        @assistant.events.conversation.message.on_created_including_mine
+        async def on_message_created(
+            context: ConversationContext, event: ConversationEvent, message: ConversationMessage
+        ) -> None:
+            """
+            Add a message to the cached history of the conversation, if there is one.
+            """
+
+            if message.message_type not in self._message_types:
+                return
+
+            history = self._histories.get(self._key(context))
+            if history is None:
+                return
+
+            async with history.lock:
+                history.add(message)
+
+        @assistant.events.conversation.message.on_deleted_including_mine
+        async def on_message_deleted(
+            context: ConversationContext, event: ConversationEvent, message: ConversationMessage
+        ) -> None:
+            """
+            Remove a message from the cached history of the conversation, if there is one.
+            """
+
+            history = self._histories.get(self._key(context))
+            if history is None:
+                return
+
+            async with history.lock:
+                history.remove(message.id)
+
+    async def get_history_messages(
+        self,
+        context: ConversationContext,
+        participants: list[ConversationParticipant],
+        converter: MessageConverter,
+        token_counter: TokenCounter,
+        token_limit: int | None = None,
+        cache_key: Hashable = None,
+    ) -> list[CompletionMessage]:
+        """
+        Get the most recent messages in the conversation that fit in the token limit, formatted for use in a
+        completion.
+
+        Args:
+            context: The conversation context.
+            participants: The participants of the conversation, passed to the converter.
+            converter: Converts a conversation message to completion messages.
+            token_counter: Counts the tokens of the completion messages for a conversation message.
+            token_limit: The maximum number of tokens for the history. If None, all messages are included.
+            cache_key: Identifies the converter and token counter, such as the model name. Cached messages are
+            converted and counted again when the key, or the participant names, change.
+
+        Returns:
+            A list of messages for the chat completion, in conversation order.
+        """
+
+        history = self._history(context)
+        converted_key = (cache_key, tuple((participant.id, participant.name) for participant in participants))
+
+        async with history.lock:
+            await self._fetch_new_messages(context, history)
+
+            history_messages: list[CompletionMessage] = []
+            token_count = 0
+            index = len(history.entries)
+
+            while True:
+                if index == 0:
+                    if history.has_start:
+                        break
+                    # the older messages are inserted before the current position
+                    index = await self._fetch_older_messages(context, history)
+                    if index == 0:
+                        break
+
+                index -= 1
+                entry = history.entries[index]
+
+                if entry.converted_key != converted_key:
+                    entry.completion_messages = await converter(context, entry.message, participants)
+                    entry.token_count = await token_counter(entry.completion_messages)
+                    entry.converted_key = converted_key
+
+                token_count += entry.token_count
+                if token_limit and token_count > token_limit:
+                    # entries before the window are not needed for the next turn, which only moves the window forward
+                    del history.entries[:index]
+                    history.has_start = False
+                    break
+
+                history_messages = entry.completion_messages + history_messages
+
+            return history_messages
+
+    def _history(self, context: ConversationContext) -> _ConversationHistory:
+        key = self._key(context)
+
+        history = self._histories.get(key)
+        if history is None:
+            history = _ConversationHistory()
+            self._histories[key] = history
+
+        self._histories.move_to_end(key)
+        while len(self._histories) > self._max_conversations:
+            self._histories.popitem(last=False)
+
+        return history
+
+    @staticmethod
+    def _key(context: ConversationContext) -> tuple[str, str]:
+        return (context.assistant.id, context.id)
+
+    async def _fetch_new_messages(self, context: ConversationContext, history: _ConversationHistory) -> None:
+        """
+        Fetch the messages after the newest cached message, which are the messages that were not delivered by
+        events yet, or the latest page of messages if there are none cached.
+        """
+
+        after_sequence = history.entries[-1].sequence if history.entries else None
+        while True:
+            messages_response = await context.get_messages(
+                message_types=self._message_types,
+                limit=self._page_size,
+                after_sequence=after_sequence,
+            )
+            messages = messages_response.messages
+            for message in messages:
+                history.add(message)
+
+            if after_sequence is None:
+                # older pages are fetched as the window needs them
+                history.has_start = len(messages) < self._page_size
+                return
+
+            # pages after the cursor are in sequence order, starting right after it
+            if len(messages) < self._page_size or messages[-1].sequence is None:
+                return
+
+            after_sequence = messages[-1].sequence
+
+    async def _fetch_older_messages(self, context: ConversationContext, history: _ConversationHistory) -> int:
+        """
+        Fetch the page of messages before the oldest cached message. Returns the number of messages added.
+        """
+
+        before_sequence = history.entries[0].sequence if history.entries else None
+        messages_response = await context.get_messages(
+            message_types=self._message_types,
+            limit=self._page_size,
+            before_sequence=before_sequence,
+        )
+        messages = messages_response.messages
+        history.has_start = len(messages) < self._page_size
+
+        cached_ids = {entry.message.id for entry in history.entries}
+        older_entries = [
+            _HistoryEntry(message=message)
+            for message in messages
+            if message.sequence is not None and message.id not in cached_ids
+        ]
+        history.entries[0:0] = older_entries
+        return len(older_entries)
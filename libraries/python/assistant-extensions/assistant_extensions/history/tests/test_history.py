@@ -0,0 +1,140 @@
+import datetime
+import uuid
+from unittest import mock
+
+from assistant_extensions.ai_clients.model import CompletionMessage
+from assistant_extensions.history import HistoryWindowExtension
+from semantic_workbench_api_model.workbench_model import (
+    ConversationEvent,
+    ConversationEventType,
+    ConversationMessage,
+    ConversationMessageList,
+    ConversationParticipant,
+    MessageSender,
+    MessageType,
+    ParticipantRole,
+)
+from semantic_workbench_assistant.assistant_app import AssistantAppProtocol, AssistantContext, ConversationContext
+from semantic_workbench_assistant.assistant_app.protocol import Events
+
+
+def create_message(sequence: int) -> ConversationMessage:
+    return ConversationMessage(
+        id=uuid.uuid4(),
+        sequence=sequence,
+        sender=MessageSender(participant_role=ParticipantRole.user, participant_id="user"),
+        timestamp=datetime.datetime.now(datetime.UTC),
+        content_type="text/plain",
+        content=f"message {sequence}",
+        filenames=[],
+        metadata={},
+        has_debug_data=False,
+    )
+
+
+async def test_get_history_messages_is_incremental() -> None:
+    mock_assistant_app = mock.MagicMock(spec=AssistantAppProtocol)
+    mock_assistant_app.events = Events()
+
+    messages = [create_message(sequence) for sequence in range(1, 6)]
+
+    async def get_messages(
+        message_types: list[MessageType],
+        limit: int,
+        before_sequence: int | None = None,
+        after_sequence: int | None = None,
+    ) -> ConversationMessageList:
+        matching = [
+            message
+            for message in messages
+            if (before_sequence is None or (message.sequence or 0) < before_sequence)
+            and (after_sequence is None or (message.sequence or 0) > after_sequence)
+        ]
+        # after a sequence, the page starts right after it; otherwise, the page is the latest messages
+        return ConversationMessageList(messages=matching[:limit] if after_sequence is not None else matching[-limit:])
+
+    mock_conversation_context = mock.MagicMock(
+        spec=ConversationContext(
+            id="conversation_id",
+            title="conversation_title",
+            assistant=AssistantContext(
+                id="assistant_id",
+                name="assistant_name",
+                _assistant_service_id="assistant_id",
+            ),
+        )
+    )
+    mock_conversation_context.id = "conversation_id"
+    mock_conversation_context.assistant.id = "assistant_id"
+    mock_conversation_context.get_messages.side_effect = get_messages
+
+    converted: list[str] = []
+
+    async def converter(
+        context: ConversationContext, message: ConversationMessage, participants: list[ConversationParticipant]
+    ) -> list[CompletionMessage]:
+        converted.append(message.content)
+        return [CompletionMessage(role="user", content=message.content)]
+
+    async def token_counter(completion_messages: list[CompletionMessage]) -> int:
+        return 10
+
+    extension = HistoryWindowExtension(assistant=mock_assistant_app, page_size=2)
+
+    async def get_history_messages() -> list[str]:
+        history_messages = await extension.get_history_messages(
+            mock_conversation_context,
+            participants=[],
+            converter=converter,
+            token_counter=token_counter,
+            token_limit=30,
+        )
+        return [str(message.content) for message in history_messages]
+
+    assert await get_history_messages() == ["message 3", "message 4", "message 5"]
+    assert converted == ["message 5", "message 4", "message 3", "message 2"]
+
+    # a message delivered by an event is added without fetching it
+    converted.clear()
+    messages.append(create_message(6))
+    await mock_assistant_app.events.conversation.message._on_created_handlers(
+        True,
+        mock_conversation_context,
+        ConversationEvent(conversation_id=uuid.uuid4(), event=ConversationEventType.message_created, data={}),
+        messages[-1],
+    )
+    mock_conversation_context.get_messages.reset_mock()
+
+    assert await get_history_messages() == ["message 4", "message 5", "message 6"]
+    assert converted == ["message 6"]
+    assert mock_conversation_context.get_messages.call_args_list == [
+        mock.call(message_types=[MessageType.chat], limit=2, after_sequence=6)
+    ]
+
+    # a message that is not delivered by an event is fetched
+    converted.clear()
+    messages.append(create_message(7))
+    assert await get_history_messages() == ["message 5", "message 6", "message 7"]
+    assert converted == ["message 7"]
+
+    # a deleted message is removed, and the window reaches back to an older message
+    converted.clear()
+    deleted_message = messages.pop(5)
+    await mock_assistant_app.events.conversation.message._on_deleted_handlers(
+        True,
+        mock_conversation_context,
+        ConversationEvent(conversation_id=uuid.uuid4(), event=ConversationEventType.message_deleted, data={}),
+        deleted_message,
+    )
+    assert await get_history_messages() == ["message 4", "message 5", "message 7"]
+    assert converted == ["message 3"]
+
+    # more messages than a page are not delivered by events; they are fetched a page at a time, in sequence order
+    converted.clear()
+    mock_conversation_context.get_messages.reset_mock()
+    messages.extend(create_message(sequence) for sequence in range(8, 11))
+    assert await get_history_messages() == ["message 8", "message 9", "message 10"]
+    assert mock_conversation_context.get_messages.call_args_list == [
+        mock.call(message_types=[MessageType.chat], limit=2, after_sequence=7),
+        mock.call(message_types=[MessageType.chat], limit=2, after_sequence=9),
+    ]
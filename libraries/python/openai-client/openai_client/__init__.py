@@ -1,7 +1,9 @@
 import logging as _logging  # Avoid name conflict with local logging module.
 
 from .client import (
+    close_clients,
     create_client,
+    get_client,
 )
 from .completion import message_content_from_completion, message_from_completion
 from .config import (
@@ -12,6 +14,10 @@ from .config import (
     OpenAIServiceConfig,
     ServiceConfig,
 )
+from .debug import (
+    DebugCapture,
+    DebugLevel,
+)
 from .errors import (
     CompletionError,
     validate_completion,
@@ -31,6 +37,8 @@ from .messages import (
     truncate_messages_for_logging,
 )
 from .tokens import (
+    num_tokens_for_each_message,
+    num_tokens_for_texts,
     num_tokens_from_message,
     num_tokens_from_messages,
     num_tokens_from_tools_and_messages,
@@ -43,7 +51,10 @@ __all__ = [
     "AzureOpenAIApiKeyAuthConfig",
     "AzureOpenAIAzureIdentityAuthConfig",
     "AzureOpenAIServiceConfig",
+    "close_clients",
     "CompletionError",
+    "DebugCapture",
+    "DebugLevel",
     "convert_from_completion_messages",
     "create_client",
     "create_assistant_message",
@@ -52,9 +63,12 @@ __all__ = [
     "extra_data",
     "format_with_dict",
     "format_with_liquid",
+    "get_client",
     "make_completion_args_serializable",
     "message_content_from_completion",
     "message_from_completion",
+    "num_tokens_for_each_message",
+    "num_tokens_for_texts",
     "num_tokens_from_message",
     "num_tokens_from_messages",
     "num_tokens_from_tools_and_messages",
@@ -2,7 +2,15 @@ from .chat_driver import (
     ChatDriver,
     ChatDriverConfig,
 )
+from .context_window import (
+    ContextWindowPolicy,
+    Summarizer,
+    TokenBudgetContextWindow,
+    create_completion_summarizer,
+)
 from .message_history_providers import (
+    AppendOnlyMessageHistoryProvider,
+    AppendOnlyMessageHistoryProviderConfig,
     InMemoryMessageHistoryProvider,
     LocalMessageHistoryProvider,
     LocalMessageHistoryProviderConfig,
@@ -10,10 +18,16 @@ from .message_history_providers import (
 )
 
 __all__ = [
+    "AppendOnlyMessageHistoryProvider",
+    "AppendOnlyMessageHistoryProviderConfig",
     "ChatDriver",
     "ChatDriverConfig",
+    "ContextWindowPolicy",
     "InMemoryMessageHistoryProvider",
     "LocalMessageHistoryProvider",
     "LocalMessageHistoryProviderConfig",
     "MessageHistoryProviderProtocol",
+    "Summarizer",
+    "TokenBudgetContextWindow",
+    "create_completion_summarizer",
 ]
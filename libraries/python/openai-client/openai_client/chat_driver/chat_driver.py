@@ -12,10 +12,12 @@ from openai.types.chat.completion_create_params import ResponseFormat
 from pydantic import BaseModel
 
 from openai_client.completion import TEXT_RESPONSE_FORMAT, message_content_from_completion
+from openai_client.debug import DebugCapture
 from openai_client.errors import CompletionError
 from openai_client.messages import MessageFormatter, format_with_dict
 from openai_client.tools import ToolFunction, ToolFunctions, complete_with_tool_calls, function_list_to_tool_choice
 
+from .context_window import ContextWindowPolicy
 from .message_history_providers import InMemoryMessageHistoryProvider, MessageHistoryProviderProtocol
 
 
@@ -28,6 +30,11 @@ class ChatDriverConfig:
     message_provider: MessageHistoryProviderProtocol | None = None
     commands: list[Callable] | None = None
     functions: list[Callable] | None = None
+    max_tool_rounds: int = 1
+    max_concurrent_tool_calls: int | None = None
+    tool_call_timeout_seconds: float | None = None
+    context_window: ContextWindowPolicy | None = None
+    debug: DebugCapture | None = None
 
 
 class ChatDriver:
@@ -75,6 +82,21 @@ class ChatDriver:
         self.function_list = ToolFunctions(functions=[ToolFunction(function) for function in (config.functions or [])])
         self.functions = self.function_list.functions
 
+        # Independent function calls of a response run concurrently, and the
+        # model can call functions again with their results for up to
+        # max_tool_rounds rounds.
+        self.max_tool_rounds = config.max_tool_rounds
+        self.max_concurrent_tool_calls = config.max_concurrent_tool_calls
+        self.tool_call_timeout_seconds = config.tool_call_timeout_seconds
+
+        # The context window chooses the history messages that are sent with
+        # each request. Without one, the whole history is sent.
+        self.context_window = config.context_window
+
+        # How much of the completion requests and responses to include in the
+        # metadata of responses.
+        self.debug = config.debug
+
         # Commands are functions that can be called by the user by typing a
         # command in the chat. When a command is received, the chat driver will
         # execute the corresponding function and return the result to the user
@@ -168,9 +190,15 @@ class ChatDriver:
         # Generate a response.
         metadata = metadata or {}
 
+        instructions = self._formatted_instructions(instruction_parameters)
+        if self.context_window:
+            history = await self.context_window.select(instructions, self.message_provider, self.model)
+        else:
+            history = await self.message_provider.get()
+
         completion_args = {
             "model": self.model,
-            "messages": [*self._formatted_instructions(instruction_parameters), *(await self.message_provider.get())],
+            "messages": [*instructions, *history],
             "response_format": response_format,
             "tool_choice": function_list_to_tool_choice(function_choice),
         }
@@ -180,6 +208,10 @@ class ChatDriver:
                 completion_args,
                 self.function_list,
                 metadata=metadata,
+                max_tool_rounds=self.max_tool_rounds,
+                max_concurrent_tool_calls=self.max_concurrent_tool_calls,
+                tool_call_timeout_seconds=self.tool_call_timeout_seconds,
+                debug=self.debug,
             )
         except CompletionError as e:
             return ErrorEvent(message=f"Error: {e.message}", metadata=metadata)
@@ -0,0 +1,260 @@
+import hashlib
+import json
+import logging
+import weakref
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Protocol
+
+from openai import AsyncAzureOpenAI, AsyncOpenAI
+from openai.types.chat import ChatCompletionMessageParam, ChatCompletionSystemMessageParam
+from openai_client.completion import message_content_from_completion
+from openai_client.tokens import num_tokens_for_each_message, num_tokens_from_messages
+
+from .message_history_providers import MessageHistoryProviderProtocol
+
+logger = logging.getLogger(__name__)
+
+# Summarizes messages that no longer fit in the context window, given the
+# summary of the messages before them, if any, and returns the new summary.
+Summarizer = Callable[[str | None, list[ChatCompletionMessageParam]], Awaitable[str]]
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+# The file, in the data_dir of a message provider, with the state of the window.
+STATE_FILE_NAME = "context_window.json"
+
+DEFAULT_SUMMARY_INSTRUCTIONS = (
+    "Summarize the conversation below for an assistant that will continue it without seeing it. Keep the facts,"
+    " decisions, open questions and user preferences, and leave out small talk. If there is a summary of the"
+    " conversation before it, produce one summary covering both."
+)
+
+
+class ContextWindowPolicy(Protocol):
+    """
+    Chooses the history messages that are sent to the model with the
+    instructions for a response. Pass one in the ChatDriverConfig to bound the
+    size of the prompt as the history grows.
+    """
+
+    async def select(
+        self,
+        instructions: list[ChatCompletionSystemMessageParam],
+        message_provider: MessageHistoryProviderProtocol,
+        model: str,
+    ) -> list[ChatCompletionMessageParam]: ...
+
+
+@dataclass
+class _WindowState:
+    summary: str | None = None
+    # The number of messages, from the start of the history, that have been
+    # dropped from the window, and summarized if there is a summarizer.
+    dropped_count: int = 0
+    # The digest of the last dropped message, to notice a replaced history.
+    last_dropped_digest: str | None = None
+    # The pinned messages among the dropped messages.
+    pinned: list[ChatCompletionMessageParam] = field(default_factory=list)
+
+
+@dataclass
+class TokenBudgetContextWindow:
+    """
+    A sliding window of the most recent messages that fit, with the
+    instructions, in max_tokens.
+
+    Messages are kept or dropped in groups, so that the tool messages of an
+    assistant message with tool calls are never separated from it. Groups with
+    a message of one of the pinned_roles are kept even when they are outside
+    the window; they still count towards the budget.
+
+    If a summarizer is set, the messages that are dropped are summarized, and
+    the summary is sent as a system message before the window. The summary is
+    rolled forward as more messages are dropped, so each message is summarized
+    once.
+
+    The summary and the dropped messages are tracked for each message provider,
+    and saved in its data_dir, if it has one, so that the window can be shared
+    by chat drivers and continues where it was after a restart. Only the
+    messages after the dropped ones are read and token-counted; providers with
+    `count` and `get_last`, such as the AppendOnlyMessageHistoryProvider, are
+    read from there rather than in full.
+    """
+
+    max_tokens: int
+    pinned_roles: set[str] = field(default_factory=lambda: {"system"})
+    summarizer: Summarizer | None = None
+    # The budget kept for the summary, when there is a summarizer.
+    max_summary_tokens: int = 500
+
+    _states: "weakref.WeakKeyDictionary[MessageHistoryProviderProtocol, _WindowState]" = field(
+        default_factory=weakref.WeakKeyDictionary, init=False, repr=False, compare=False
+    )
+
+    async def select(
+        self,
+        instructions: list[ChatCompletionSystemMessageParam],
+        message_provider: MessageHistoryProviderProtocol,
+        model: str,
+    ) -> list[ChatCompletionMessageParam]:
+        budget = self.max_tokens - num_tokens_from_messages(instructions, model)
+        if self.summarizer:
+            budget -= self.max_summary_tokens
+
+        state = self._state(message_provider)
+        # read from the last dropped message, to check that it is unchanged
+        messages = await _read_from(message_provider, max(state.dropped_count - 1, 0))
+        if messages is None or (
+            state.dropped_count > 0 and (not messages or _digest(messages[0]) != state.last_dropped_digest)
+        ):
+            # the history was replaced; start over
+            state = self._states[message_provider] = _WindowState()
+            messages = await _read_from(message_provider, 0) or []
+        elif state.dropped_count > 0:
+            messages = messages[1:]
+
+        groups = _group_messages(messages)
+        token_counts = num_tokens_for_each_message(messages, model)
+        group_token_counts = [sum(token_counts[start:end]) for start, end in groups]
+
+        pinned = [any(messages[index]["role"] in self.pinned_roles for index in range(*group)) for group in groups]
+        budget -= sum(count for count, is_pinned in zip(group_token_counts, pinned) if is_pinned)
+        if state.pinned:
+            budget -= sum(num_tokens_for_each_message(state.pinned, model))
+
+        # the oldest group in the window
+        first = len(groups)
+        while first > 0:
+            if pinned[first - 1]:
+                first -= 1
+                continue
+            if group_token_counts[first - 1] > budget and first < len(groups):
+                # the newest messages are always sent, even if over budget
+                break
+            budget -= group_token_counts[first - 1]
+            first -= 1
+
+        window_start = groups[first][0] if first < len(groups) else len(messages)
+        selected = [
+            *state.pinned,
+            *(
+                message
+                for group, is_pinned in zip(groups, pinned)
+                if is_pinned or group[0] >= window_start
+                for message in messages[group[0] : group[1]]
+            ),
+        ]
+
+        if window_start > 0:
+            dropped: list[ChatCompletionMessageParam] = []
+            for group, is_pinned in zip(groups[:first], pinned[:first]):
+                (state.pinned if is_pinned else dropped).extend(messages[group[0] : group[1]])
+            if dropped and self.summarizer:
+                state.summary = await self.summarizer(state.summary, dropped)
+            state.dropped_count += window_start
+            state.last_dropped_digest = _digest(messages[window_start - 1])
+            _save_state(message_provider, state)
+
+        if not state.summary:
+            return selected
+
+        summary_message: ChatCompletionSystemMessageParam = {
+            "role": "system",
+            "content": SUMMARY_PREFIX + state.summary,
+        }
+        return [summary_message, *selected]
+
+    def _state(self, message_provider: MessageHistoryProviderProtocol) -> _WindowState:
+        state = self._states.get(message_provider)
+        if state is None:
+            state = self._states[message_provider] = _load_state(message_provider) or _WindowState()
+        return state
+
+
+def create_completion_summarizer(
+    async_client: AsyncOpenAI | AsyncAzureOpenAI,
+    model: str,
+    instructions: str = DEFAULT_SUMMARY_INSTRUCTIONS,
+    max_tokens: int = 500,
+) -> Summarizer:
+    """
+    Create a summarizer for the TokenBudgetContextWindow that summarizes
+    messages with a chat completion.
+    """
+
+    async def summarize(summary: str | None, messages: list[ChatCompletionMessageParam]) -> str:
+        content = json.dumps(messages, indent=2)
+        if summary:
+            content = f"<SUMMARY>{summary}</SUMMARY>\n<CONVERSATION>{content}</CONVERSATION>"
+        completion = await async_client.beta.chat.completions.parse(
+            model=model,
+            messages=[
+                {"role": "system", "content": instructions},
+                {"role": "user", "content": content},
+            ],
+            max_tokens=max_tokens,
+        )
+        return message_content_from_completion(completion)
+
+    return summarize
+
+
+async def _read_from(
+    message_provider: MessageHistoryProviderProtocol, start: int
+) -> list[ChatCompletionMessageParam] | None:
+    """
+    Read the messages from the start index on, or None if there are fewer
+    messages than that.
+    """
+    count = getattr(message_provider, "count", None)
+    get_last = getattr(message_provider, "get_last", None)
+    if count and get_last:
+        message_count = await count()
+        return await get_last(message_count - start) if start <= message_count else None
+
+    messages = await message_provider.get()
+    return messages[start:] if start <= len(messages) else None
+
+
+def _digest(message: ChatCompletionMessageParam) -> str:
+    return hashlib.sha256(json.dumps(message, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _state_file(message_provider: MessageHistoryProviderProtocol) -> Path | None:
+    data_dir = getattr(message_provider, "data_dir", None)
+    return Path(data_dir) / STATE_FILE_NAME if data_dir else None
+
+
+def _load_state(message_provider: MessageHistoryProviderProtocol) -> _WindowState | None:
+    state_file = _state_file(message_provider)
+    if not state_file or not state_file.exists():
+        return None
+    try:
+        return _WindowState(**json.loads(state_file.read_text(encoding="utf-8")))
+    except (json.JSONDecodeError, TypeError):
+        logger.warning("ignoring unreadable context window state in %s", state_file)
+        return None
+
+
+def _save_state(message_provider: MessageHistoryProviderProtocol, state: _WindowState) -> None:
+    state_file = _state_file(message_provider)
+    if not state_file:
+        return
+    temp_file = state_file.with_suffix(".json.tmp")
+    temp_file.write_text(json.dumps(asdict(state), default=str), encoding="utf-8")
+    temp_file.replace(state_file)
+
+
+def _group_messages(messages: list[ChatCompletionMessageParam]) -> list[tuple[int, int]]:
+    """
+    Split the messages into (start, end) ranges, each a message and the tool
+    messages that follow it.
+    """
+    groups: list[tuple[int, int]] = []
+    for index, message in enumerate(messages):
+        if message["role"] == "tool" and groups:
+            groups[-1] = (groups[-1][0], index + 1)
+            continue
+        groups.append((index, index + 1))
+    return groups
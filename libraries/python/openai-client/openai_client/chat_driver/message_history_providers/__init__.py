@@ -1,3 +1,7 @@
+from .append_only_message_history_provider import (
+    AppendOnlyMessageHistoryProvider,
+    AppendOnlyMessageHistoryProviderConfig,
+)
 from .in_memory_message_history_provider import InMemoryMessageHistoryProvider
 from .local_message_history_provider import (
     LocalMessageHistoryProvider,
@@ -6,6 +10,8 @@ from .local_message_history_provider import (
 from .message_history_provider import MessageHistoryProviderProtocol
 
 __all__ = [
+    "AppendOnlyMessageHistoryProvider",
+    "AppendOnlyMessageHistoryProviderConfig",
     "LocalMessageHistoryProvider",
     "LocalMessageHistoryProviderConfig",
     "InMemoryMessageHistoryProvider",
@@ -0,0 +1,193 @@
+import json
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from os import PathLike
+from pathlib import Path
+from typing import Any
+
+from openai.types.chat import (
+    ChatCompletionMessageParam,
+)
+from openai_client.messages import MessageFormatter, format_with_liquid
+from openai_client.tokens import num_tokens_for_each_message
+
+from .message_history_provider import MessageHistoryProviderProtocol
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA_DIR = Path(".data")
+
+
+@dataclass
+class AppendOnlyMessageHistoryProviderConfig:
+    session_id: str
+    data_dir: PathLike | str | None = None
+    messages: list[ChatCompletionMessageParam] = field(default_factory=list)
+    formatter: MessageFormatter | None = None
+    # The number of most recent messages kept in memory. Reads that reach
+    # further back read the messages file.
+    tail_size: int = 200
+
+
+class AppendOnlyMessageHistoryProvider(MessageHistoryProviderProtocol):
+    """
+    A message history stored in a local JSON Lines file, one message per line.
+    Appending a message writes only that message, and the most recent messages
+    are kept in memory, so that the cost of a turn does not grow with the
+    length of the history. Replacing the messages, or compacting the history,
+    rewrites the file atomically.
+
+    Messages of an existing `messages.json` file, written by the
+    LocalMessageHistoryProvider, are moved to the new file on first use.
+    """
+
+    def __init__(self, config: AppendOnlyMessageHistoryProviderConfig) -> None:
+        if not config.data_dir:
+            self.data_dir = DEFAULT_DATA_DIR / "chat_driver" / config.session_id
+        else:
+            self.data_dir = Path(config.data_dir)
+        self.formatter = config.formatter or format_with_liquid
+
+        self.messages_file = self.data_dir / "messages.jsonl"
+        self._tail: deque[ChatCompletionMessageParam] = deque(maxlen=max(config.tail_size, 1))
+        self._count = 0
+        self._loaded = False
+
+        # Create the messages file if it doesn't exist.
+        if not self.data_dir.exists():
+            self.data_dir.mkdir(parents=True)
+        if not self.messages_file.exists():
+            legacy_messages_file = self.data_dir / "messages.json"
+            if legacy_messages_file.exists():
+                self._write(json.loads(legacy_messages_file.read_text()))
+                legacy_messages_file.unlink()
+            else:
+                self._write(config.messages)
+
+    async def get(self) -> list[ChatCompletionMessageParam]:
+        """
+        Get all messages. This method is required for conforming to the
+        MessageFormatter protocol.
+        """
+        self._load()
+        if self._count <= len(self._tail):
+            return list(self._tail)
+        return self._read()
+
+    async def count(self) -> int:
+        """
+        Get the number of messages.
+        """
+        self._load()
+        return self._count
+
+    async def get_last(self, count: int) -> list[ChatCompletionMessageParam]:
+        """
+        Get the most recent messages, up to count.
+        """
+        self._load()
+        if count <= 0:
+            return []
+        if count <= len(self._tail) or self._count <= len(self._tail):
+            return list(self._tail)[-count:]
+        return self._read()[-count:]
+
+    async def get_within_token_budget(self, token_budget: int, model: str) -> list[ChatCompletionMessageParam]:
+        """
+        Get the most recent messages whose tokens, as counted for the model,
+        fit in the token budget.
+        """
+        self._load()
+        messages = list(self._tail)
+        token_counts = num_tokens_for_each_message(messages, model)
+        if sum(token_counts) <= token_budget and self._count > len(messages):
+            # the budget reaches beyond the messages in memory
+            messages = self._read()
+            token_counts = num_tokens_for_each_message(messages, model)
+
+        start = len(messages)
+        token_count = 0
+        for token_count_of_message in reversed(token_counts):
+            token_count += token_count_of_message
+            if token_count > token_budget:
+                break
+            start -= 1
+        return messages[start:]
+
+    async def append(self, message: ChatCompletionMessageParam) -> None:
+        """
+        Append a message to the history. This method is required for conforming
+        to the MessageFormatter protocol.
+        """
+        await self.extend([message])
+
+    async def extend(self, messages: list[ChatCompletionMessageParam]) -> None:
+        """
+        Append a list of messages to the history.
+        """
+        self._load()
+        with self.messages_file.open("a", encoding="utf-8") as file:
+            file.write("".join(json.dumps(message) + "\n" for message in messages))
+        self._tail.extend(messages)
+        self._count += len(messages)
+
+    async def set(self, messages: list[ChatCompletionMessageParam], vars: dict[str, Any]) -> None:
+        """
+        Completely replace the messages with the new messages.
+        """
+        self._write(messages)
+
+    async def compact(self, keep_last: int | None = None) -> None:
+        """
+        Rewrite the messages file, dropping any partially written message, and,
+        if keep_last is set, all but the most recent keep_last messages.
+        """
+        messages = self._read()
+        if keep_last is not None:
+            messages = messages[-keep_last:] if keep_last > 0 else []
+        self._write(messages)
+
+    def delete_all(self) -> None:
+        self._write([])
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+
+        text = self.messages_file.read_text(encoding="utf-8")
+        messages = self._parse(text)
+        if text and not text.endswith("\n"):
+            # a message was not completely written, such as when the process
+            # was stopped while appending; remove it before appending more
+            self._write(messages)
+            return
+
+        self._tail.clear()
+        self._tail.extend(messages)
+        self._count = len(messages)
+        self._loaded = True
+
+    def _read(self) -> list[ChatCompletionMessageParam]:
+        return self._parse(self.messages_file.read_text(encoding="utf-8"))
+
+    def _parse(self, text: str) -> list[ChatCompletionMessageParam]:
+        messages: list[ChatCompletionMessageParam] = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                messages.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning("skipping unreadable message in %s", self.messages_file)
+        return messages
+
+    def _write(self, messages: list[ChatCompletionMessageParam]) -> None:
+        temp_file = self.messages_file.with_suffix(".jsonl.tmp")
+        temp_file.write_text("".join(json.dumps(message) + "\n" for message in messages), encoding="utf-8")
+        temp_file.replace(self.messages_file)
+
+        self._tail.clear()
+        self._tail.extend(messages)
+        self._count = len(messages)
+        self._loaded = True
@@ -1,5 +1,10 @@
+import hashlib
+import json
+
+import httpx
+from assistant_extensions.ai_clients.shared_clients import SharedClients
 from azure.identity import DefaultAzureCredential, get_bearer_token_provider
-from openai import AsyncAzureOpenAI, AsyncOpenAI
+from openai import AsyncAzureOpenAI, AsyncOpenAI, DefaultAsyncHttpxClient
 from openai.lib.azure import AsyncAzureADTokenProvider
 
 from .config import (
@@ -10,10 +15,49 @@ from .config import (
     ServiceConfig,
 )
 
+# clients are shared per service configuration, see get_client
+_shared_clients = SharedClients[AsyncOpenAI](name="openai")
+
+
+def get_client(service_config: ServiceConfig, *, api_version: str = "2024-08-01-preview") -> AsyncOpenAI:
+    """
+    Returns the process-wide AsyncOpenAI client for the provided service configuration, creating it on first use, so
+    that requests reuse its pooled connections rather than connecting for each response.
+
+    The client is shared: do not close it, or use it with `async with`. Get the client for each operation rather than
+    keeping it, as clients that are not requested for a while, and have no requests in flight, are closed. Call
+    close_clients on shutdown.
+    """
+    return _shared_clients.get(
+        (_config_hash(service_config), api_version),
+        lambda transport: create_client(
+            service_config, api_version=api_version, http_client=DefaultAsyncHttpxClient(transport=transport)
+        ),
+    )
+
+
+async def close_clients() -> None:
+    """
+    Closes all shared clients. Clients requested afterwards are created anew.
+    """
+    await _shared_clients.close()
+
+
+def _config_hash(service_config: ServiceConfig) -> str:
+    # the hash covers the secrets too, so that a change of key gets a new client, without keeping them in the key
+    config_json = json.dumps(service_config.model_dump(mode="python"), sort_keys=True, default=str)
+    return hashlib.sha256(f"{type(service_config).__name__}:{config_json}".encode()).hexdigest()
+
 
-def create_client(service_config: ServiceConfig, *, api_version: str = "2024-08-01-preview") -> AsyncOpenAI:
+def create_client(
+    service_config: ServiceConfig,
+    *,
+    api_version: str = "2024-08-01-preview",
+    http_client: httpx.AsyncClient | None = None,
+) -> AsyncOpenAI:
     """
-    Creates an AsyncOpenAI client based on the provided service configuration.
+    Creates an AsyncOpenAI client based on the provided service configuration. The client is owned by the caller,
+    which is responsible for closing it; see get_client for a shared client.
     """
     match service_config:
         case AzureOpenAIServiceConfig():
@@ -24,6 +68,7 @@ def create_client(service_config: ServiceConfig, *, api_version: str = "2024-08-
                         azure_deployment=service_config.azure_openai_deployment,
                         azure_endpoint=str(service_config.azure_openai_endpoint),
                         api_version=api_version,
+                        http_client=http_client,
                     )
 
                 case AzureOpenAIAzureIdentityAuthConfig():
@@ -32,6 +77,7 @@ def create_client(service_config: ServiceConfig, *, api_version: str = "2024-08-
                         azure_deployment=service_config.azure_openai_deployment,
                         azure_endpoint=str(service_config.azure_openai_endpoint),
                         api_version=api_version,
+                        http_client=http_client,
                     )
 
                 case _:
@@ -41,6 +87,7 @@ def create_client(service_config: ServiceConfig, *, api_version: str = "2024-08-
             return AsyncOpenAI(
                 api_key=service_config.openai_api_key,
                 organization=service_config.openai_organization_id or None,
+                http_client=http_client,
             )
 
         case _:
@@ -0,0 +1,103 @@
+import dataclasses
+import inspect
+from dataclasses import dataclass
+from enum import StrEnum
+from typing import Any, Callable, Mapping
+
+from openai import NotGiven
+from pydantic import BaseModel
+
+# In summary, long values are cut shorter than these limits.
+SUMMARY_MAX_STRING_LENGTH = 200
+SUMMARY_MAX_LIST_LENGTH = 10
+
+
+class DebugLevel(StrEnum):
+    off = "off"
+    summary = "summary"
+    full = "full"
+
+
+@dataclass
+class DebugCapture:
+    """
+    Captures values, such as completion requests and responses, for debug
+    metadata. Values are given as functions, which are only called if the level
+    is not off, and the captured copy is cut to the size limits, so that large
+    prompts, such as ones with attachments, are not serialized in full for
+    every request.
+    """
+
+    level: DebugLevel = DebugLevel.full
+    # Strings, such as message content and image data, are cut to this length.
+    max_string_length: int = 5000
+    # Lists, such as messages, are cut to this number of items.
+    max_list_length: int = 100
+
+    @property
+    def enabled(self) -> bool:
+        return self.level != DebugLevel.off
+
+    def capture(self, value: Callable[[], Any]) -> Any:
+        """
+        Return a serializable copy of the value returned by the function, cut to
+        the size limits of the level, or None if the level is off.
+        """
+        if not self.enabled:
+            return None
+
+        max_string_length = self.max_string_length
+        max_list_length = self.max_list_length
+        if self.level == DebugLevel.summary:
+            max_string_length = min(max_string_length, SUMMARY_MAX_STRING_LENGTH)
+            max_list_length = min(max_list_length, SUMMARY_MAX_LIST_LENGTH)
+
+        return _capped(value(), max_string_length, max_list_length)
+
+    def add(self, metadata: dict[str, Any], key: str, value: Callable[[], Any]) -> None:
+        """
+        Add the captured value to the metadata under key, unless the level is off.
+        """
+        if self.enabled:
+            metadata[key] = self.capture(value)
+
+
+def _capped(value: Any, max_string_length: int, max_list_length: int) -> Any:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+
+    if isinstance(value, str):
+        if len(value) <= max_string_length:
+            return value
+        return f"{value[:max_string_length]}... ({len(value) - max_string_length} more characters)"
+
+    if isinstance(value, NotGiven):
+        return None
+
+    # A pydantic BaseModel class, such as a response format, is stored by name.
+    if inspect.isclass(value):
+        return value.__name__
+
+    if isinstance(value, BaseModel):
+        value = dict(value)
+    elif dataclasses.is_dataclass(value):
+        value = {field.name: getattr(value, field.name) for field in dataclasses.fields(value)}
+
+    if isinstance(value, Mapping):
+        return {str(key): _capped(item, max_string_length, max_list_length) for key, item in value.items()}
+
+    if isinstance(value, (list, tuple, set)):
+        items = list(value)
+        if len(items) <= max_list_length:
+            return [_capped(item, max_string_length, max_list_length) for item in items]
+        # keep the first and the last items, such as the instructions and the latest messages
+        head = (max_list_length + 1) // 2
+        tail = max_list_length - head
+        return [
+            *(_capped(item, max_string_length, max_list_length) for item in items[:head]),
+            f"... ({len(items) - max_list_length} more items)",
+            *(_capped(item, max_string_length, max_list_length) for item in items[len(items) - tail :]),
+        ]
+
+    # UUIDs, datetimes and other values are stored as strings.
+    return str(value)
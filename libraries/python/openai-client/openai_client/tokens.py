@@ -1,33 +1,42 @@
 import base64
+import functools
+import hashlib
 import logging
 import math
 import re
+from collections import OrderedDict
 from fractions import Fraction
 from io import BytesIO
 from typing import Iterable, Sequence
 
 import tiktoken
+from assistant_extensions.ai_clients.images import image_dims_from_base64_header
 from openai.types.chat import ChatCompletionMessageParam, ChatCompletionToolParam
 from PIL import Image
 
 logger = logging.getLogger(__name__)
 
 
-def num_tokens_from_message(message: ChatCompletionMessageParam, model: str) -> int:
-    """
-    Return the number of tokens used by a single message.
+# the number of token counts to remember, by content hash, across calls
+TOKEN_COUNT_CACHE_SIZE = 10_000
 
-    Note that the exact way that tokens are counted from messages may change from model to model.
-    Consider the counts from this function an estimate, not a timeless guarantee.
+_token_counts: OrderedDict[tuple[str, bytes], int] = OrderedDict()
 
-    Reference: https://cookbook.openai.com/examples/how_to_count_tokens_with_tiktoken#6-counting-tokens-for-chat-completions-api-calls
-    """
 
+@functools.cache
+def _encoding_for_model(model: str, default_encoding: str) -> tiktoken.Encoding:
     try:
-        encoding = tiktoken.encoding_for_model(model)
+        return tiktoken.encoding_for_model(model)
     except KeyError:
-        logger.warning("model %s not found. Using cl100k_base encoding.", model)
-        encoding = tiktoken.get_encoding("cl100k_base")
+        logger.warning("model %s not found. Using %s encoding.", model, default_encoding)
+        return tiktoken.get_encoding(default_encoding)
+
+
+@functools.cache
+def _message_token_settings(model: str) -> tuple[str, int, int]:
+    """
+    Return the model to count tokens for, and the number of tokens per message and per name for it.
+    """
 
     if model in {
         "gpt-3.5-turbo-0125",
@@ -41,48 +50,113 @@ def num_tokens_from_message(message: ChatCompletionMessageParam, model: str) ->
         "o1-preview",
         "o1-mini",
     }:
-        tokens_per_message = 3
-        tokens_per_name = 1
+        return model, 3, 1
     elif "gpt-3.5-turbo" in model:
         logger.debug("gpt-3.5-turbo may update over time. Returning num tokens assuming gpt-3.5-turbo-0125.")
-        return num_tokens_from_message(message, model="gpt-3.5-turbo-0125")
+        return _message_token_settings("gpt-3.5-turbo-0125")
     elif "gpt-4o-mini" in model:
         logger.debug("gpt-4o-mini may update over time. Returning num tokens assuming gpt-4o-mini-2024-07-18.")
-        return num_tokens_from_message(message, model="gpt-4o-mini-2024-07-18")
+        return _message_token_settings("gpt-4o-mini-2024-07-18")
     elif "gpt-4o" in model:
         logger.debug("gpt-4o may update over time. Returning num tokens assuming gpt-4o-2024-08-06.")
-        return num_tokens_from_message(message, model="gpt-4o-2024-08-06")
+        return _message_token_settings("gpt-4o-2024-08-06")
     elif "gpt-4" in model:
         logger.debug("gpt-4 may update over time. Returning num tokens assuming gpt-4-0613.")
-        return num_tokens_from_message(message, model="gpt-4-0613")
+        return _message_token_settings("gpt-4-0613")
     else:
         raise NotImplementedError(f"num_tokens_from_messages() is not implemented for model {model}.")
 
-    num_tokens = tokens_per_message
-    for key, value in message.items():
-        if isinstance(value, list):
-            # For GPT-4-vision support, based on https://github.com/openai/openai-cookbook/pull/881/files
-            for item in value:
-                # Note: item[type] does not seem to be counted in the token count
-                if item["type"] == "text":
-                    num_tokens += len(encoding.encode(item["text"]))
-                elif item["type"] == "image_url":
-                    num_tokens += count_tokens_for_image(
-                        item["image_url"]["url"], model=model, detail=item["image_url"].get("detail", "auto")
-                    )
-        elif isinstance(value, str):
-            num_tokens += len(encoding.encode(value))
-        elif value is None:
-            # Null values do not consume tokens
-            pass
-        else:
-            raise ValueError(f"Could not encode unsupported message value type: {type(value)}")
-        if key == "name":
-            num_tokens += tokens_per_name
+
+def num_tokens_for_texts(texts: Sequence[str], encoding: tiktoken.Encoding) -> list[int]:
+    """
+    Return the number of tokens in each of the texts. Texts that were counted before, by content hash, are not
+    encoded again, and the others are encoded in one batch.
+    """
+
+    keys = [
+        (encoding.name, hashlib.blake2b(text.encode(errors="surrogatepass"), digest_size=16).digest()) for text in texts
+    ]
+    counts = [_token_counts.get(key) for key in keys]
+
+    missing = [index for index, count in enumerate(counts) if count is None]
+    if missing:
+        encoded = encoding.encode_batch([texts[index] for index in missing])
+        for index, tokens in zip(missing, encoded):
+            counts[index] = len(tokens)
+            _token_counts[keys[index]] = len(tokens)
+
+    for key in keys:
+        _token_counts.move_to_end(key)
+    while len(_token_counts) > TOKEN_COUNT_CACHE_SIZE:
+        _token_counts.popitem(last=False)
+
+    return [count or 0 for count in counts]
+
+
+def num_tokens_for_each_message(messages: Iterable[ChatCompletionMessageParam], model: str) -> list[int]:
+    """
+    Return the number of tokens used by each message. The text of all messages is encoded in one batch.
+
+    Note that the exact way that tokens are counted from messages may change from model to model.
+    Consider the counts from this function an estimate, not a timeless guarantee.
+
+    Reference: https://cookbook.openai.com/examples/how_to_count_tokens_with_tiktoken#6-counting-tokens-for-chat-completions-api-calls
+    """
+
+    model, tokens_per_message, tokens_per_name = _message_token_settings(model)
+    encoding = _encoding_for_model(model, "cl100k_base")
+
+    num_tokens: list[int] = []
+    # the texts to encode, and the index of the message each belongs to
+    texts: list[str] = []
+    text_messages: list[int] = []
+
+    for message_index, message in enumerate(messages):
+        message_tokens = tokens_per_message
+        for key, value in message.items():
+            if isinstance(value, list):
+                # For GPT-4-vision support, based on https://github.com/openai/openai-cookbook/pull/881/files
+                for item in value:
+                    # Note: item[type] does not seem to be counted in the token count
+                    if item["type"] == "text":
+                        texts.append(item["text"])
+                        text_messages.append(message_index)
+                    elif item["type"] == "image_url":
+                        message_tokens += count_tokens_for_image(
+                            item["image_url"]["url"], model=model, detail=item["image_url"].get("detail", "auto")
+                        )
+            elif isinstance(value, str):
+                texts.append(value)
+                text_messages.append(message_index)
+            elif value is None:
+                # Null values do not consume tokens
+                pass
+            else:
+                raise ValueError(f"Could not encode unsupported message value type: {type(value)}")
+            if key == "name":
+                message_tokens += tokens_per_name
+
+        num_tokens.append(message_tokens)
+
+    for message_index, text_tokens in zip(text_messages, num_tokens_for_texts(texts, encoding)):
+        num_tokens[message_index] += text_tokens
 
     return num_tokens
 
 
+def num_tokens_from_message(message: ChatCompletionMessageParam, model: str) -> int:
+    """
+    Return the number of tokens used by a single message.
+
+    Note that the exact way that tokens are counted from messages may change from model to model.
+    Consider the counts from this function an estimate, not a timeless guarantee.
+
+    Reference: https://cookbook.openai.com/examples/how_to_count_tokens_with_tiktoken#6-counting-tokens-for-chat-completions-api-calls
+    """
+
+    return num_tokens_for_each_message([message], model)[0]
+
+
 def num_tokens_from_messages(messages: Iterable[ChatCompletionMessageParam], model: str) -> int:
     """
     Return the number of tokens used by a list of messages.
@@ -96,7 +170,7 @@ def num_tokens_from_messages(messages: Iterable[ChatCompletionMessageParam], mod
     Reference: https://cookbook.openai.com/examples/how_to_count_tokens_with_tiktoken#6-counting-tokens-for-chat-completions-api-calls
     """
 
-    num_tokens = sum((num_tokens_from_message(message, model) for message in messages))
+    num_tokens = sum(num_tokens_for_each_message(messages, model))
     num_tokens += 3  # every reply is primed with <|start|>assistant<|message|>
 
     return num_tokens
@@ -139,13 +213,11 @@ def num_tokens_from_tools_and_messages(
     else:
         raise NotImplementedError(f"num_tokens_from_tools_and_messages() is not implemented for model {model}.")
 
-    try:
-        encoding = tiktoken.encoding_for_model(model)
-    except KeyError:
-        logger.warning("model %s not found. Using o200k_base encoding.", model)
-        encoding = tiktoken.get_encoding("o200k_base")
+    encoding = _encoding_for_model(model, "o200k_base")
 
     func_token_count = 0
+    # the texts to encode, which are encoded in one batch
+    texts: list[str] = []
     for f in tools:
         func_token_count += func_init  # Add tokens for start of each function
         function = f["function"]
@@ -154,7 +226,7 @@ def num_tokens_from_tools_and_messages(
         if f_desc.endswith("."):
             f_desc = f_desc[:-1]
         line = f_name + ":" + f_desc
-        func_token_count += len(encoding.encode(line))  # Add tokens for set name and description
+        texts.append(line)  # Add tokens for set name and description
         if (
             "parameters" in function
             and "properties" in function["parameters"]
@@ -171,14 +243,16 @@ def num_tokens_from_tools_and_messages(
                     func_token_count += enum_init  # Add tokens if property has enum list
                     for item in function["parameters"]["properties"][key]["enum"]:
                         func_token_count += enum_item
-                        func_token_count += len(encoding.encode(item))
+                        texts.append(item)
                 if p_desc.endswith("."):
                     p_desc = p_desc[:-1]
                 line = f"{p_name}:{p_type}:{p_desc}"
-                func_token_count += len(encoding.encode(line))
+                texts.append(line)
     if len(tools) > 0:
         func_token_count += func_end
 
+    func_token_count += sum(num_tokens_for_texts(texts, encoding))
+
     messages_token_count = num_tokens_from_messages(messages, model)
     total_tokens = messages_token_count + func_token_count
 
@@ -189,6 +263,11 @@ def get_image_dims(image_uri: str) -> tuple[int, int]:
     # From https://github.com/openai/openai-cookbook/pull/881/files
     if re.match(r"data:image\/\w+;base64", image_uri):
         image_uri = re.sub(r"data:image\/\w+;base64,", "", image_uri)
+
+        dims = image_dims_from_base64_header(image_uri)
+        if dims is not None:
+            return dims
+
         with Image.open(BytesIO(base64.b64decode(image_uri))) as image:
             return image.size
     else:
@@ -1,6 +1,8 @@
 import ast
+import asyncio
 import inspect
 import json
+import logging
 from dataclasses import dataclass
 from typing import Any, Callable, Iterable
 
@@ -21,6 +23,7 @@ from pydantic.fields import FieldInfo
 
 from . import logger
 from .completion import assistant_message_from_completion
+from .debug import DebugCapture
 from .errors import CompletionError, validate_completion
 from .logging import add_serializable_data, make_completion_args_serializable
 
@@ -373,12 +376,15 @@ class ToolFunctions:
         ]
         return tools or NOT_GIVEN
 
-    async def execute_tool_call(self, tool_call: ParsedFunctionToolCall) -> ChatCompletionMessageParam | None:
+    async def execute_tool_call(
+        self, tool_call: ParsedFunctionToolCall, timeout_seconds: float | None = None
+    ) -> ChatCompletionMessageParam | None:
         """
         Execute a function as requested by a ParsedFunctionToolCall (generated
         by the Chat Completions API) and return the response as a
         ChatCompletionMessageParam message (as required by the Chat Completions
-        API)
+        API). If the function does not complete within timeout_seconds, the
+        response is an error message.
         """
         function = tool_call.function
         if self.has_function(function.name):
@@ -389,14 +395,20 @@ class ToolFunctions:
             value: Any = None
             try:
                 kwargs: dict[str, Any] = json.loads(function.arguments)
-                value = await self.execute_function(function.name, (), kwargs, string_response=True)
+                async with asyncio.timeout(timeout_seconds):
+                    value = await self.execute_function(function.name, (), kwargs, string_response=True)
+            except TimeoutError:
+                logger.error("Function timed out.", extra=add_serializable_data({"name": function.name}))
+                value = f"Error: {function.name} did not complete within {timeout_seconds} seconds."
             except Exception as e:
                 logger.error("Error.", extra=add_serializable_data({"error": e}))
                 value = f"Error: {e}"
             finally:
-                logger.debug(
-                    "Function response.", extra=add_serializable_data({"tool_call_id": tool_call.id, "content": value})
-                )
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(
+                        "Function response.",
+                        extra=add_serializable_data({"tool_call_id": tool_call.id, "content": value}),
+                    )
                 return {
                     "role": "tool",
                     "content": value,
@@ -406,12 +418,38 @@ class ToolFunctions:
             logger.error(f"Function not found: {function.name}")
             return None
 
+    async def execute_tool_calls(
+        self,
+        tool_calls: Iterable[ParsedFunctionToolCall],
+        max_concurrency: int | None = None,
+        timeout_seconds: float | None = None,
+    ) -> list[ChatCompletionMessageParam]:
+        """
+        Execute the tool calls concurrently, at most max_concurrency at a time
+        (all at once if None), and return their response messages in the order
+        of the tool calls. Tool calls for unknown functions have no response.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+        async def execute(tool_call: ParsedFunctionToolCall) -> ChatCompletionMessageParam | None:
+            if semaphore is None:
+                return await self.execute_tool_call(tool_call, timeout_seconds)
+            async with semaphore:
+                return await self.execute_tool_call(tool_call, timeout_seconds)
+
+        results = await asyncio.gather(*(execute(tool_call) for tool_call in tool_calls))
+        return [result for result in results if result]
+
 
 async def complete_with_tool_calls(
     async_client: AsyncOpenAI | AsyncAzureOpenAI,
     completion_args: dict[str, Any],
     tool_functions: ToolFunctions,
     metadata: dict[str, Any] = {},
+    max_tool_rounds: int = 1,
+    max_concurrent_tool_calls: int | None = None,
+    tool_call_timeout_seconds: float | None = None,
+    debug: DebugCapture | None = None,
 ) -> tuple[ParsedChatCompletion | None, list[ChatCompletionMessageParam]]:
     """
     Complete a chat response with tool calls handled by the supplied tool
@@ -425,7 +463,18 @@ async def complete_with_tool_calls(
     - tool_functions: A ToolFunctions object that contains the tool functions to
       be available to be called.
     - metadata: Metadata to be added to the completion response.
+    - max_tool_rounds: The number of rounds of tool calls to run. After each
+      round, the tools stay available to the next completion until the round
+      limit, when the final completion is made without tools.
+    - max_concurrent_tool_calls: The number of tool calls of a round to run at
+      once. If None, all of them run concurrently.
+    - tool_call_timeout_seconds: The time a tool call may take before its
+      response is replaced with an error message. If None, there is no limit.
+    - debug: How much of the completion requests and responses to capture in
+      the metadata. If None, they are captured in full, with long values cut.
     """
+    debug = debug or DebugCapture()
+
     # Pull out a reference to the completion args messages.
     messages: list[ChatCompletionMessageParam] = completion_args.get("messages", [])
     new_messages: list[ChatCompletionMessageParam] = []
@@ -436,15 +485,19 @@ async def complete_with_tool_calls(
         completion_args["tools"] = tool_functions.chat_completion_tools()
 
     # Completion call.
-    logger.debug("Completion call.", extra=add_serializable_data(make_completion_args_serializable(completion_args)))
-    metadata["completion_args"] = make_completion_args_serializable(completion_args)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Completion call.", extra=add_serializable_data(make_completion_args_serializable(completion_args))
+        )
+    debug.add(metadata, "completion_args", lambda: completion_args)
     try:
         completion = await async_client.beta.chat.completions.parse(
             **completion_args,
         )
         validate_completion(completion)
-        logger.debug("Completion response.", extra=add_serializable_data({"completion": completion.model_dump()}))
-        metadata["completion"] = completion.model_dump()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Completion response.", extra=add_serializable_data({"completion": completion.model_dump()}))
+        debug.add(metadata, "completion", lambda: completion)
     except CompletionError as e:
         completion_error = CompletionError(e)
         metadata["completion_error"] = completion_error.message
@@ -463,36 +516,48 @@ async def complete_with_tool_calls(
     if not completion_message.tool_calls:
         return completion, new_messages
 
-    # Call all tool functions and generate return messages.
-    for tool_call in completion_message.tool_calls:
-        function_call_result_message = await tool_functions.execute_tool_call(tool_call)
-        if function_call_result_message:
-            new_messages.append(function_call_result_message)
+    # Call all tool functions and generate return messages, in the order of the
+    # tool calls.
+    new_messages.extend(
+        await tool_functions.execute_tool_calls(
+            completion_message.tool_calls,
+            max_concurrency=max_concurrent_tool_calls,
+            timeout_seconds=tool_call_timeout_seconds,
+        )
+    )
+
+    # Further rounds, in which the model can call tools with the results of the
+    # previous round, until it responds without tool calls.
+    for tool_round in range(1, max_tool_rounds):
+        round_args = {**completion_args, "messages": [*messages, *new_messages]}
+        if "tool_choice" in round_args:
+            # A required tool choice applies to the first round only.
+            del round_args["tool_choice"]
+        round_completion = await _tool_completion(async_client, round_args, metadata, f"tool_round_{tool_round}", debug)
+
+        round_assistant_message = assistant_message_from_completion(round_completion)
+        if round_assistant_message:
+            new_messages.append(round_assistant_message)
+
+        round_completion_message = round_completion.choices[0].message
+        if not round_completion_message.tool_calls:
+            return round_completion, new_messages
+
+        new_messages.extend(
+            await tool_functions.execute_tool_calls(
+                round_completion_message.tool_calls,
+                max_concurrency=max_concurrent_tool_calls,
+                timeout_seconds=tool_call_timeout_seconds,
+            )
+        )
 
     # Completion call for final response.
     final_args = {**completion_args, "messages": [*messages, *new_messages]}
     if "tools" in final_args:
-        # TODO: We *could* allow a while "tools" loop and let the agent keep going?
         del final_args["tools"]
     if "tool_choice" in final_args:
         del final_args["tool_choice"]
-    logger.debug("Tool completion call.", extra=add_serializable_data(make_completion_args_serializable(final_args)))
-    metadata["tool_completion_args"] = make_completion_args_serializable(final_args)
-    try:
-        tool_completion: ParsedChatCompletion = await async_client.beta.chat.completions.parse(
-            **final_args,
-        )
-        validate_completion(tool_completion)
-        logger.debug("Tool completion response.", extra=add_serializable_data({"completion": completion.model_dump()}))
-        metadata["tool_completion"] = completion.model_dump()
-    except Exception as e:
-        tool_completion_error = CompletionError(e)
-        metadata["tool_completion_error"] = tool_completion_error.message
-        logger.error(
-            tool_completion_error.message,
-            extra=add_serializable_data({"completion_error": tool_completion_error.body, "metadata": metadata}),
-        )
-        raise tool_completion_error from e
+    tool_completion = await _tool_completion(async_client, final_args, metadata, "tool_completion", debug)
 
     # Add assistant response to messages.
     tool_completion_assistant_message = assistant_message_from_completion(tool_completion)
@@ -500,3 +565,41 @@ async def complete_with_tool_calls(
         new_messages.append(tool_completion_assistant_message)
 
     return tool_completion, new_messages
+
+
+async def _tool_completion(
+    async_client: AsyncOpenAI | AsyncAzureOpenAI,
+    completion_args: dict[str, Any],
+    metadata: dict[str, Any],
+    metadata_key: str,
+    debug: DebugCapture,
+) -> ParsedChatCompletion:
+    """
+    Completion call following a round of tool calls. The arguments, response
+    and any error are added to the metadata under keys prefixed by metadata_key.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Tool completion call.", extra=add_serializable_data(make_completion_args_serializable(completion_args))
+        )
+    debug.add(metadata, f"{metadata_key}_args", lambda: completion_args)
+    try:
+        completion: ParsedChatCompletion = await async_client.beta.chat.completions.parse(
+            **completion_args,
+        )
+        validate_completion(completion)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Tool completion response.", extra=add_serializable_data({"completion": completion.model_dump()})
+            )
+        debug.add(metadata, metadata_key, lambda: completion)
+    except Exception as e:
+        completion_error = CompletionError(e)
+        metadata[f"{metadata_key}_error"] = completion_error.message
+        logger.error(
+            completion_error.message,
+            extra=add_serializable_data({"completion_error": completion_error.body, "metadata": metadata}),
+        )
+        raise completion_error from e
+
+    return completion
@@ -0,0 +1,73 @@
+import asyncio
+from typing import AsyncIterator, Iterator
+
+import httpx
+import openai_client
+import openai_client.client
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def shared_clients() -> Iterator[None]:
+    yield
+    asyncio.run(openai_client.close_clients())
+
+
+def test_get_client_shares_clients_per_config() -> None:
+    config = openai_client.OpenAIServiceConfig(openai_api_key="key-1")
+
+    client = openai_client.get_client(config)
+    assert openai_client.get_client(openai_client.OpenAIServiceConfig(openai_api_key="key-1")) is client
+
+    # a different secret, or api version, gets its own client
+    assert openai_client.get_client(openai_client.OpenAIServiceConfig(openai_api_key="key-2")) is not client
+    assert openai_client.get_client(config, api_version="2024-06-01") is not client
+
+    # closed clients, such as ones used with `async with`, are replaced
+    asyncio.run(client.close())
+    replacement = openai_client.get_client(config)
+    assert replacement is not client
+    assert not replacement.is_closed()
+
+
+def test_get_client_closes_idle_clients(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(openai_client.client._shared_clients, "idle_timeout_seconds", 0.0)
+
+    config = openai_client.OpenAIServiceConfig(openai_api_key="key")
+    idle_client = openai_client.get_client(config)
+
+    async def get_client_later() -> None:
+        assert openai_client.get_client(config) is not idle_client
+        # the idle client is closed in the background
+        await asyncio.sleep(0)
+
+    asyncio.run(get_client_later())
+    assert idle_client.is_closed()
+
+
+def test_get_client_keeps_idle_clients_with_requests_in_flight(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(openai_client.client._shared_clients, "idle_timeout_seconds", 0.0)
+
+    async def content() -> AsyncIterator[bytes]:
+        yield b"streamed"
+
+    monkeypatch.setattr(
+        openai_client.client._shared_clients,
+        "_create_transport",
+        lambda: httpx.MockTransport(lambda request: httpx.Response(200, content=content())),
+    )
+
+    config = openai_client.OpenAIServiceConfig(openai_api_key="key")
+
+    async def stream_while_getting_client() -> None:
+        client = openai_client.get_client(config)
+        async with client._client.stream("GET", "https://example.test/") as response:
+            # the client is idle for longer than the timeout, but is streaming a response
+            assert openai_client.get_client(config) is client
+            assert await response.aread() == b"streamed"
+
+        assert openai_client.get_client(config) is not client
+        await asyncio.sleep(0)
+        assert client.is_closed()
+
+    asyncio.run(stream_while_getting_client())
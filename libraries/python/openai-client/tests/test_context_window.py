@@ -0,0 +1,132 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+from openai.types.chat import ChatCompletionMessageParam
+from openai_client.chat_driver import (
+    AppendOnlyMessageHistoryProvider,
+    AppendOnlyMessageHistoryProviderConfig,
+    InMemoryMessageHistoryProvider,
+    TokenBudgetContextWindow,
+    context_window,
+)
+
+# the messages whose tokens were counted
+COUNTED: list[Any] = []
+
+
+@pytest.fixture(autouse=True)
+def token_counts(monkeypatch: pytest.MonkeyPatch) -> None:
+    COUNTED.clear()
+
+    # count a token per character of content, as the tokenizer may not be available
+    def num_tokens_for_each_message(messages: list[Any], model: str) -> list[int]:
+        COUNTED.extend(message.get("content") for message in messages)
+        return [len(message.get("content") or "") for message in messages]
+
+    monkeypatch.setattr(context_window, "num_tokens_for_each_message", num_tokens_for_each_message)
+    monkeypatch.setattr(
+        context_window,
+        "num_tokens_from_messages",
+        lambda messages, model: sum(len(message.get("content") or "") for message in messages),
+    )
+
+
+MESSAGES: list[ChatCompletionMessageParam] = [
+    {"role": "system", "content": "pin"},
+    {"role": "user", "content": "aaaa"},
+    {"role": "assistant", "tool_calls": [{"id": "1", "type": "function", "function": {"name": "f", "arguments": ""}}]},
+    {"role": "tool", "tool_call_id": "1", "content": "bbbb"},
+    {"role": "assistant", "content": "cccc"},
+    {"role": "user", "content": "dddd"},
+]
+
+
+def contents(messages: list[ChatCompletionMessageParam]) -> list[Any]:
+    return [message.get("content") for message in messages]
+
+
+def history(messages: list[ChatCompletionMessageParam]) -> InMemoryMessageHistoryProvider:
+    return InMemoryMessageHistoryProvider(list(messages))
+
+
+async def summarize_first_characters(summary: str | None, messages: list[ChatCompletionMessageParam]) -> str:
+    return (summary or "") + "".join(message.get("content") or "" for message in messages)[:2]
+
+
+def test_token_budget_context_window() -> None:
+    instructions: Any = [{"role": "system", "content": "ii"}]
+
+    # everything fits
+    window = TokenBudgetContextWindow(max_tokens=100)
+    assert asyncio.run(window.select(instructions, history(MESSAGES), "model")) == MESSAGES
+
+    # pinned messages are kept, and tool messages are not separated from their tool calls
+    window = TokenBudgetContextWindow(max_tokens=2 + 3 + 12)
+    assert contents(asyncio.run(window.select(instructions, history(MESSAGES), "model"))) == [
+        "pin",
+        None,
+        "bbbb",
+        "cccc",
+        "dddd",
+    ]
+    window = TokenBudgetContextWindow(max_tokens=2 + 3 + 11)
+    assert contents(asyncio.run(window.select(instructions, history(MESSAGES), "model"))) == ["pin", "cccc", "dddd"]
+
+    # the newest message is sent even if it does not fit
+    window = TokenBudgetContextWindow(max_tokens=1)
+    assert contents(asyncio.run(window.select(instructions, history(MESSAGES), "model"))) == ["pin", "dddd"]
+
+
+def test_token_budget_context_window_summary() -> None:
+    summarized: list[list[Any]] = []
+
+    async def summarizer(summary: str | None, messages: list[ChatCompletionMessageParam]) -> str:
+        summarized.append(contents(messages))
+        return await summarize_first_characters(summary, messages)
+
+    window = TokenBudgetContextWindow(max_tokens=3 + 8, summarizer=summarizer, max_summary_tokens=0)
+    provider = history(MESSAGES[:5])
+
+    selected = asyncio.run(window.select([], provider, "model"))
+    assert contents(selected) == [context_window.SUMMARY_PREFIX + "aa", "pin", None, "bbbb", "cccc"]
+
+    # only the messages dropped since the previous summary are summarized
+    asyncio.run(provider.append(MESSAGES[5]))
+    selected = asyncio.run(window.select([], provider, "model"))
+    assert contents(selected) == [context_window.SUMMARY_PREFIX + "aabb", "pin", "cccc", "dddd"]
+    assert summarized == [["aaaa"], [None, "bbbb"]]
+
+    # nothing more is dropped, so the summary is reused
+    asyncio.run(window.select([], provider, "model"))
+    assert len(summarized) == 2
+
+    # the summary is kept for each history
+    other_provider = history(MESSAGES[4:])
+    assert contents(asyncio.run(window.select([], other_provider, "model"))) == ["cccc", "dddd"]
+    assert contents(asyncio.run(window.select([], provider, "model")))[0] == context_window.SUMMARY_PREFIX + "aabb"
+
+    # a replaced history starts over
+    provider.set([{"role": "user", "content": "eeee"}], {})
+    assert contents(asyncio.run(window.select([], provider, "model"))) == ["eeee"]
+
+
+def test_token_budget_context_window_reads_after_dropped_messages(tmp_path: Path) -> None:
+    def provider() -> AppendOnlyMessageHistoryProvider:
+        return AppendOnlyMessageHistoryProvider(
+            AppendOnlyMessageHistoryProviderConfig(session_id="session", data_dir=tmp_path, messages=MESSAGES)
+        )
+
+    def window() -> TokenBudgetContextWindow:
+        return TokenBudgetContextWindow(max_tokens=3 + 8, summarizer=summarize_first_characters, max_summary_tokens=0)
+
+    expected = [context_window.SUMMARY_PREFIX + "aa", "pin", "cccc", "dddd"]
+    assert contents(asyncio.run(window().select([], provider(), "model"))) == expected
+
+    # the state is saved with the history, and only the messages in the window are read and counted again
+    assert json.loads((tmp_path / context_window.STATE_FILE_NAME).read_text())["dropped_count"] == 4
+    COUNTED.clear()
+    assert contents(asyncio.run(window().select([], provider(), "model"))) == expected
+    assert COUNTED == ["cccc", "dddd", "pin"]
@@ -0,0 +1,46 @@
+from dataclasses import dataclass
+
+from openai import NOT_GIVEN
+from openai_client import DebugCapture, DebugLevel
+from pydantic import BaseModel
+
+
+class _ResponseFormat(BaseModel):
+    text: str
+
+
+@dataclass
+class _Message:
+    role: str
+    content: str
+
+
+def test_debug_capture_levels() -> None:
+    calls = 0
+
+    def completion_args() -> dict:
+        nonlocal calls
+        calls += 1
+        return {
+            "messages": [_Message(role="user", content="x" * 300) for _ in range(12)],
+            "response_format": _ResponseFormat,
+            "tools": NOT_GIVEN,
+        }
+
+    # values are not produced when the level is off
+    metadata: dict = {}
+    DebugCapture(level=DebugLevel.off).add(metadata, "completion_args", completion_args)
+    assert metadata == {}
+    assert calls == 0
+
+    full = DebugCapture(level=DebugLevel.full, max_string_length=250).capture(completion_args)
+    assert len(full["messages"]) == 12
+    assert full["messages"][0] == {"role": "user", "content": "x" * 250 + "... (50 more characters)"}
+    assert full["response_format"] == "_ResponseFormat"
+    assert full["tools"] is None
+
+    # the summary keeps the first and last items of long lists, and cuts strings shorter
+    summary = DebugCapture(level=DebugLevel.summary).capture(completion_args)
+    assert len(summary["messages"]) == 11
+    assert summary["messages"][5] == "... (2 more items)"
+    assert summary["messages"][0]["content"] == "x" * 200 + "... (100 more characters)"
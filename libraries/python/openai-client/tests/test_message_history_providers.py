@@ -0,0 +1,63 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+from openai_client.chat_driver import AppendOnlyMessageHistoryProvider, AppendOnlyMessageHistoryProviderConfig
+from openai_client.chat_driver.message_history_providers import append_only_message_history_provider
+
+
+def test_append_only_message_history_provider(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # count a token per character of content, as the tokenizer may not be available
+    monkeypatch.setattr(
+        append_only_message_history_provider,
+        "num_tokens_for_each_message",
+        lambda messages, model: [len(message["content"]) for message in messages],
+    )
+
+    def provider(tail_size: int = 2) -> AppendOnlyMessageHistoryProvider:
+        return AppendOnlyMessageHistoryProvider(
+            AppendOnlyMessageHistoryProviderConfig(session_id="session", data_dir=tmp_path, tail_size=tail_size)
+        )
+
+    async def run() -> None:
+        history = provider()
+        await history.append({"role": "user", "content": "one"})
+        await history.extend([{"role": "assistant", "content": "two"}, {"role": "user", "content": "three"}])
+
+        # each message is appended as a line
+        lines = (tmp_path / "messages.jsonl").read_text().splitlines()
+        assert [json.loads(line)["content"] for line in lines] == ["one", "two", "three"]
+
+        # reads within the tail are served from memory, others from the file
+        assert [message["content"] for message in await history.get_last(2)] == ["two", "three"]
+        assert [message["content"] for message in await history.get_last(5)] == ["one", "two", "three"]
+        assert [message["content"] for message in await history.get()] == ["one", "two", "three"]
+        assert [message["content"] for message in await history.get_within_token_budget(5, "model")] == ["three"]
+        assert len(await history.get_within_token_budget(11, "model")) == 3
+
+        # a partially written message is dropped when the history is loaded
+        with (tmp_path / "messages.jsonl").open("a") as file:
+            file.write('{"role": "user", "con')
+        history = provider()
+        await history.append({"role": "assistant", "content": "four"})
+        assert [message["content"] for message in await provider().get()] == ["one", "two", "three", "four"]
+
+        await history.compact(keep_last=1)
+        assert [message["content"] for message in await provider().get()] == ["four"]
+
+        history.delete_all()
+        assert await provider().get() == []
+
+    asyncio.run(run())
+
+
+def test_append_only_message_history_provider_moves_local_history(tmp_path: Path) -> None:
+    (tmp_path / "messages.json").write_text(json.dumps([{"role": "user", "content": "one"}], indent=2))
+
+    history = AppendOnlyMessageHistoryProvider(
+        AppendOnlyMessageHistoryProviderConfig(session_id="session", data_dir=tmp_path)
+    )
+
+    assert asyncio.run(history.get()) == [{"role": "user", "content": "one"}]
+    assert not (tmp_path / "messages.json").exists()
@@ -1,9 +1,15 @@
+import base64
 import os
+from io import BytesIO
+from unittest import mock
 
 import openai_client
+import openai_client.tokens
 import pytest
+import tiktoken
 from openai import OpenAI
 from openai.types.chat import ChatCompletionMessageParam, ChatCompletionToolParam
+from PIL import Image
 
 
 @pytest.fixture
@@ -151,3 +157,40 @@ def test_num_tokens_for_tools_and_messages(model: str, client: OpenAI) -> None:
     assert actual_num_tokens == expected_num_tokens, (
         f"num_tokens_from_tools_and_messages() does not match the OpenAI API response for model {model}."
     )
+
+
+@pytest.mark.parametrize(
+    ("image_format", "mode", "lossless"),
+    [
+        ("PNG", "RGB", False),
+        ("GIF", "RGB", False),
+        ("JPEG", "RGB", False),
+        ("WEBP", "RGB", False),
+        ("WEBP", "RGB", True),
+        ("WEBP", "RGBA", False),
+    ],
+)
+def test_get_image_dims(image_format: str, mode: str, lossless: bool) -> None:
+    buffer = BytesIO()
+    Image.new(mode, (321, 123)).save(buffer, format=image_format, lossless=lossless)
+    image_uri = f"data:image/{image_format.lower()};base64,{base64.b64encode(buffer.getvalue()).decode()}"
+
+    with mock.patch.object(Image, "open", side_effect=AssertionError("image should not be decoded")):
+        assert openai_client.tokens.get_image_dims(image_uri) == (321, 123)
+
+
+def test_num_tokens_for_texts() -> None:
+    # a byte-level encoding, which does not need to be downloaded
+    encoding = tiktoken.Encoding(
+        name="test_bytes",
+        pat_str=r"\S+|\s+",
+        mergeable_ranks={bytes([i]): i for i in range(256)},
+        special_tokens={},
+    )
+
+    with mock.patch.object(encoding, "encode_batch", wraps=encoding.encode_batch) as encode_batch:
+        assert openai_client.num_tokens_for_texts(["abc", "de"], encoding) == [3, 2]
+        assert openai_client.num_tokens_for_texts(["de", "fghi", "abc"], encoding) == [2, 4, 3]
+
+    # texts that were counted before are not encoded again
+    assert [call.args[0] for call in encode_batch.call_args_list] == [["abc", "de"], ["fghi"]]
@@ -0,0 +1,143 @@
+import asyncio
+import json
+from typing import Any
+
+from openai.types.chat import (
+    ParsedChatCompletion,
+    ParsedChatCompletionMessage,
+    ParsedChoice,
+    ParsedFunction,
+    ParsedFunctionToolCall,
+)
+from openai_client.tools import ToolFunction, ToolFunctions, complete_with_tool_calls
+
+
+def _tool_call(id: str, name: str, **kwargs: Any) -> ParsedFunctionToolCall:
+    return ParsedFunctionToolCall(
+        id=id, type="function", function=ParsedFunction(name=name, arguments=json.dumps(kwargs))
+    )
+
+
+def _completion(content: str | None = None, tool_calls: list[ParsedFunctionToolCall] | None = None) -> Any:
+    return ParsedChatCompletion(
+        id="completion",
+        object="chat.completion",
+        created=0,
+        model="model",
+        choices=[
+            ParsedChoice(
+                index=0,
+                finish_reason="tool_calls" if tool_calls else "stop",
+                message=ParsedChatCompletionMessage(role="assistant", content=content, tool_calls=tool_calls),
+            )
+        ],
+    )
+
+
+class _FakeClient:
+    def __init__(self, responses: list[Any]) -> None:
+        self.responses = responses
+        self.calls: list[dict[str, Any]] = []
+        # stands in for client.beta.chat.completions
+        self.beta = self
+        self.chat = self
+        self.completions = self
+
+    async def parse(self, **kwargs: Any) -> Any:
+        self.calls.append(kwargs)
+        return self.responses.pop(0)
+
+
+def test_execute_tool_calls_concurrently() -> None:
+    running = 0
+    max_running = 0
+
+    async def wait(seconds: float) -> str:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            running -= 1
+        return f"waited {seconds}"
+
+    tool_functions = ToolFunctions([ToolFunction(wait)])
+    tool_calls = [
+        _tool_call("1", "wait", seconds=0.03),
+        _tool_call("2", "wait", seconds=0.01),
+        _tool_call("3", "unknown"),
+        _tool_call("4", "wait", seconds=0.02),
+        _tool_call("5", "wait", seconds=1.0),
+    ]
+
+    messages = asyncio.run(tool_functions.execute_tool_calls(tool_calls, max_concurrency=2, timeout_seconds=0.1))
+
+    # responses are in the order of the calls, regardless of completion order
+    assert [message["tool_call_id"] for message in messages] == ["1", "2", "4", "5"]
+    assert [message["content"] for message in messages[:3]] == ["waited 0.03", "waited 0.01", "waited 0.02"]
+    assert messages[3]["content"] == "Error: wait did not complete within 0.1 seconds."
+    assert max_running == 2
+
+
+def test_complete_with_tool_calls_multiple_rounds() -> None:
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    client = _FakeClient([
+        _completion(tool_calls=[_tool_call("1", "add", a=1, b=2), _tool_call("2", "add", a=3, b=4)]),
+        _completion(tool_calls=[_tool_call("3", "add", a=3, b=7)]),
+        _completion(content="10"),
+    ])
+    metadata: dict[str, Any] = {}
+
+    completion, new_messages = asyncio.run(
+        complete_with_tool_calls(
+            client,  # type: ignore
+            {"model": "model", "messages": [{"role": "user", "content": "1 + 2 + 3 + 4"}], "tool_choice": "required"},
+            ToolFunctions([ToolFunction(add)]),
+            metadata=metadata,
+            max_tool_rounds=3,
+        )
+    )
+
+    assert completion is not None and completion.choices[0].message.content == "10"
+    assert [(message["role"], message.get("tool_call_id")) for message in new_messages] == [
+        ("assistant", None),
+        ("tool", "1"),
+        ("tool", "2"),
+        ("assistant", None),
+        ("tool", "3"),
+        ("assistant", None),
+    ]
+    assert [message.get("content") for message in new_messages if message["role"] == "tool"] == ["3", "7", "10"]
+
+    # tools stay available after the first round, but the required tool choice does not
+    assert "tools" in client.calls[1] and "tool_choice" not in client.calls[1]
+    assert "tool_round_1" in metadata and "tool_round_2" in metadata
+
+
+def test_complete_with_tool_calls_round_limit() -> None:
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    client = _FakeClient([
+        _completion(tool_calls=[_tool_call("1", "add", a=1, b=2)]),
+        _completion(content="3"),
+    ])
+    metadata: dict[str, Any] = {}
+
+    completion, new_messages = asyncio.run(
+        complete_with_tool_calls(
+            client,  # type: ignore
+            {"model": "model", "messages": [{"role": "user", "content": "1 + 2"}]},
+            ToolFunctions([ToolFunction(add)]),
+            metadata=metadata,
+        )
+    )
+
+    # after the last round, the final completion is made without tools
+    assert completion is not None and completion.choices[0].message.content == "3"
+    assert len(new_messages) == 3
+    assert "tools" not in client.calls[1]
+    assert metadata["tool_completion"]["choices"][0]["message"]["content"] == "3"
@@ -20,14 +20,18 @@ from semantic_workbench_api_model.assistant_model import (
     StatePutRequestModel,
     StateResponseModel,
 )
-from semantic_workbench_api_model.workbench_model import ConversationEvent
+from semantic_workbench_api_model.workbench_model import (
+    ConversationEvent,
+    ConversationEventBatch,
+    ConversationEventBatchResult,
+)
 
 HEADER_API_KEY = "X-API-Key"
 
 
 # HTTPX transport factory can be overridden to return an ASGI transport for testing
-def httpx_transport_factory() -> httpx.AsyncHTTPTransport:
-    return httpx.AsyncHTTPTransport(retries=3)
+def httpx_transport_factory(limits: httpx.Limits | None = None, http2: bool = False) -> httpx.AsyncBaseTransport:
+    return httpx.AsyncHTTPTransport(retries=3, limits=limits or httpx.Limits(), http2=http2)
 
 
 class AuthParams(BaseModel):
@@ -79,11 +83,24 @@ class AssistantResponseError(AssistantError):
 
 
 class AssistantClient:
-    def __init__(self, httpx_client_factory: Callable[[], httpx.AsyncClient]) -> None:
+    def __init__(
+        self,
+        httpx_client_factory: Callable[[], httpx.AsyncClient],
+        path_prefix: str = "",
+        owns_client: bool = True,
+    ) -> None:
+        """
+        The path prefix is prepended to every request path, so that clients for multiple assistants can share the
+        HTTP client, and its connection pool, of their assistant service. Clients that do not own their HTTP client
+        leave it open on close.
+        """
         self._client = httpx_client_factory()
+        self._path_prefix = path_prefix
+        self._owns_client = owns_client
 
     async def __aenter__(self) -> Self:
-        self._client = await self._client.__aenter__()
+        if self._owns_client:
+            self._client = await self._client.__aenter__()
         return self
 
     async def __aexit__(
@@ -92,15 +109,17 @@ class AssistantClient:
         exc_value: BaseException | None = None,
         traceback: types.TracebackType | None = None,
     ) -> None:
-        await self._client.__aexit__(exc_type, exc_value, traceback)
+        if self._owns_client:
+            await self._client.__aexit__(exc_type, exc_value, traceback)
 
     async def aclose(self) -> None:
-        await self._client.aclose()
+        if self._owns_client:
+            await self._client.aclose()
 
     async def put_conversation(self, request: ConversationPutRequestModel, from_export: IO[bytes] | None) -> None:
         try:
             http_response = await self._client.put(
-                f"/conversations/{request.id}",
+                f"{self._path_prefix}/conversations/{request.id}",
                 data={"conversation": request.model_dump_json()},
                 files={"from_export": from_export} if from_export is not None else None,
             )
@@ -112,7 +131,7 @@ class AssistantClient:
 
     async def delete_conversation(self, conversation_id: uuid.UUID) -> None:
         try:
-            http_response = await self._client.delete(f"/conversations/{conversation_id}")
+            http_response = await self._client.delete(f"{self._path_prefix}/conversations/{conversation_id}")
             if http_response.status_code == httpx.codes.NOT_FOUND:
                 return
 
@@ -125,7 +144,7 @@ class AssistantClient:
     async def post_conversation_event(self, event: ConversationEvent) -> None:
         try:
             http_response = await self._client.post(
-                f"/conversations/{event.conversation_id}/events",
+                f"{self._path_prefix}/conversations/{event.conversation_id}/events",
                 json=event.model_dump(mode="json"),
             )
         except httpx.RequestError as e:
@@ -136,7 +155,7 @@ class AssistantClient:
 
     async def get_config(self) -> ConfigResponseModel:
         try:
-            http_response = await self._client.get("/config")
+            http_response = await self._client.get(f"{self._path_prefix}/config")
         except httpx.RequestError as e:
             raise AssistantConnectionError(e) from e
 
@@ -147,7 +166,9 @@ class AssistantClient:
 
     async def put_config(self, updated_config: ConfigPutRequestModel) -> ConfigResponseModel:
         try:
-            http_response = await self._client.put("/config", json=updated_config.model_dump(mode="json"))
+            http_response = await self._client.put(
+                f"{self._path_prefix}/config", json=updated_config.model_dump(mode="json")
+            )
         except httpx.RequestError as e:
             raise AssistantConnectionError(e) from e
 
@@ -159,7 +180,9 @@ class AssistantClient:
     @asynccontextmanager
     async def get_exported_data(self) -> AsyncGenerator[AsyncIterator[bytes], Any]:
         try:
-            http_response = await self._client.send(self._client.build_request("GET", "/export-data"), stream=True)
+            http_response = await self._client.send(
+                self._client.build_request("GET", f"{self._path_prefix}/export-data"), stream=True
+            )
         except httpx.RequestError as e:
             raise AssistantConnectionError(e) from e
 
@@ -183,7 +206,7 @@ class AssistantClient:
     ) -> AsyncGenerator[AsyncIterator[bytes], Any]:
         try:
             http_response = await self._client.send(
-                self._client.build_request("GET", f"/conversations/{conversation_id}/export-data"),
+                self._client.build_request("GET", f"{self._path_prefix}/conversations/{conversation_id}/export-data"),
                 stream=True,
             )
         except httpx.RequestError as e:
@@ -204,7 +227,7 @@ class AssistantClient:
 
     async def get_state_descriptions(self, conversation_id: uuid.UUID) -> StateDescriptionListResponseModel:
         try:
-            http_response = await self._client.get(f"/conversations/{conversation_id}/states")
+            http_response = await self._client.get(f"{self._path_prefix}/conversations/{conversation_id}/states")
         except httpx.RequestError as e:
             raise AssistantConnectionError(e) from e
 
@@ -215,7 +238,9 @@ class AssistantClient:
 
     async def get_state(self, conversation_id: uuid.UUID, state_id: str) -> StateResponseModel:
         try:
-            http_response = await self._client.get(f"/conversations/{conversation_id}/states/{state_id}")
+            http_response = await self._client.get(
+                f"{self._path_prefix}/conversations/{conversation_id}/states/{state_id}"
+            )
         except httpx.RequestError as e:
             raise AssistantConnectionError(e) from e
 
@@ -232,7 +257,7 @@ class AssistantClient:
     ) -> StateResponseModel:
         try:
             http_response = await self._client.put(
-                f"/conversations/{conversation_id}/states/{state_id}",
+                f"{self._path_prefix}/conversations/{conversation_id}/states/{state_id}",
                 json=updated_state.model_dump(mode="json"),
             )
         except httpx.RequestError as e:
@@ -266,6 +291,17 @@ class AssistantServiceClient:
     async def aclose(self) -> None:
         await self._client.aclose()
 
+    def for_assistant(self, assistant_id: uuid.UUID) -> AssistantClient:
+        """
+        Returns a client for the assistant that shares this client's connection pool. The returned client does not
+        need to be closed, and must not be used after this client is closed.
+        """
+        return AssistantClient(
+            httpx_client_factory=lambda: self._client,
+            path_prefix=f"/{assistant_id}",
+            owns_client=False,
+        )
+
     async def put_assistant(
         self,
         assistant_id: uuid.UUID,
@@ -296,6 +332,21 @@ class AssistantServiceClient:
         if not response.is_success:
             raise AssistantResponseError(response)
 
+    async def post_conversation_events(self, request: ConversationEventBatch) -> ConversationEventBatchResult:
+        try:
+            response = await self._client.post("/events", json=request.model_dump(mode="json"))
+        except httpx.RequestError as e:
+            raise AssistantConnectionError(e) from e
+
+        if not response.is_success:
+            raise AssistantResponseError(response)
+
+        # assistant services that do not report the result of each event delivered all of them
+        if not response.content:
+            return ConversationEventBatchResult()
+
+        return ConversationEventBatchResult.model_validate(response.json())
+
     async def get_service_info(self) -> ServiceInfoModel:
         try:
             response = await self._client.get("/")
@@ -313,19 +364,29 @@ class AssistantServiceClientBuilder:
         self,
         base_url: str,
         api_key: str,
+        limits: httpx.Limits | None = None,
+        http2: bool = False,
+        transport: httpx.AsyncBaseTransport | None = None,
     ) -> None:
+        """
+        HTTP/2 requires the h2 package (httpx[http2]).
+
+        A transport, if provided, is used instead of one from httpx_transport_factory, and is closed with the client;
+        only use it for a single client.
+        """
         self._base_url = base_url.strip("/")
         self._api_key = api_key
+        self._limits = limits or httpx.Limits()
+        self._http2 = http2
+        self._transport = transport
 
     def _client(self, *additional_paths: str) -> httpx.AsyncClient:
         return httpx.AsyncClient(
-            transport=httpx_transport_factory(),
+            transport=self._transport or httpx_transport_factory(limits=self._limits, http2=self._http2),
             base_url="/".join([self._base_url, *additional_paths]),
             timeout=httpx.Timeout(5.0, connect=10.0, read=60.0),
-            headers={
-                **AuthParams(api_key=self._api_key).to_request_headers(),
-                asgi_correlation_id.CorrelationIdMiddleware.header_name: asgi_correlation_id.correlation_id.get() or "",
-            },
+            headers=AuthParams(api_key=self._api_key).to_request_headers(),
+            event_hooks={"request": [_set_correlation_id_header]},
         )
 
     def for_service(self) -> AssistantServiceClient:
@@ -335,3 +396,10 @@ class AssistantServiceClientBuilder:
         return AssistantClient(
             httpx_client_factory=lambda: self._client(str(assistant_id)),
         )
+
+
+async def _set_correlation_id_header(request: httpx.Request) -> None:
+    # pooled clients are long-lived and shared, so the correlation id is set per request rather than per client
+    request.headers[asgi_correlation_id.CorrelationIdMiddleware.header_name] = (
+        asgi_correlation_id.correlation_id.get() or ""
+    )
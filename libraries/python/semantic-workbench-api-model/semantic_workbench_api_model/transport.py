@@ -0,0 +1,54 @@
+from typing import AsyncIterator
+
+import httpx
+
+
+class InFlightCountingTransport(httpx.AsyncBaseTransport):
+    """
+    Counts the requests that are in flight, from when they are sent until their response is closed, so that a shared
+    client is not closed as idle while it is still in use, such as by a long streamed response.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self._transport = transport
+        self.in_flight = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.in_flight += 1
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self.in_flight -= 1
+            raise
+
+        if response.is_closed:
+            # the content was read by the transport
+            self.in_flight -= 1
+            return response
+
+        response.stream = _InFlightResponseStream(response.stream, self)
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class _InFlightResponseStream(httpx.AsyncByteStream):
+    def __init__(
+        self, stream: httpx.SyncByteStream | httpx.AsyncByteStream, transport: InFlightCountingTransport
+    ) -> None:
+        self._stream = stream
+        self._transport = transport
+        self._closed = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        assert isinstance(self._stream, httpx.AsyncByteStream)
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._transport.in_flight -= 1
+        if isinstance(self._stream, httpx.AsyncByteStream):
+            await self._stream.aclose()
@@ -150,6 +150,8 @@ class MessageType(StrEnum):
 
 class ConversationMessage(BaseModel):
     id: uuid.UUID
+    # position of the message in the conversation, for keyset pagination; None for messages not yet stored
+    sequence: int | None = None
     sender: MessageSender
     message_type: MessageType = MessageType.chat
     timestamp: datetime.datetime
@@ -441,6 +443,25 @@ class NewConversationMessage(BaseModel):
     debug_data: dict[str, Any] | None = None
 
 
+class NewConversationMessageDelta(BaseModel):
+    """
+    Content to append to a message that is being streamed. A streamed message is not stored until it is created,
+    with its full content and the id it was streamed with, which finalizes it.
+    """
+
+    content: str
+    message_type: MessageType = MessageType.chat
+    content_type: str = "text/plain"
+
+
+class ConversationMessageDelta(BaseModel):
+    message_id: uuid.UUID
+    sender: MessageSender
+    message_type: MessageType
+    content_type: str
+    content: str
+
+
 class NewConversationShare(BaseModel):
     conversation_id: uuid.UUID
     label: str
@@ -458,9 +479,20 @@ class UpdateParticipant(BaseModel):
     metadata: dict[str, Any] | None = None
 
 
+class NewConversationMessageBatch(BaseModel):
+    """
+    Messages to create together, in order. The sender's participant update, if provided, is applied after the
+    messages are created, saving a separate request.
+    """
+
+    messages: list[NewConversationMessage]
+    update_participant: UpdateParticipant | None = None
+
+
 class ConversationEventType(StrEnum):
     message_created = "message.created"
     message_deleted = "message.deleted"
+    message_delta = "message.delta"
     participant_created = "participant.created"
     participant_updated = "participant.updated"
     file_created = "file.created"
@@ -473,6 +505,8 @@ class ConversationEventType(StrEnum):
     conversation_created = "conversation.created"
     conversation_updated = "conversation.updated"
     conversation_deleted = "conversation.deleted"
+    # sent only to SSE clients, when events they missed cannot be delivered; they should refetch the conversation
+    conversation_reset = "conversation.reset"
 
 
 class ConversationEvent(BaseModel):
@@ -482,3 +516,26 @@ class ConversationEvent(BaseModel):
     event: ConversationEventType
     timestamp: datetime.datetime = Field(default_factory=lambda: datetime.datetime.now(datetime.UTC))
     data: dict[str, Any] = {}
+
+
+class ConversationEventBatchItem(BaseModel):
+    assistant_id: str
+    event: ConversationEvent
+
+
+class ConversationEventBatch(BaseModel):
+    """
+    Events for any of the assistants of an assistant service, across conversations. The events for each
+    conversation are delivered in the order they appear in the list.
+    """
+
+    events: list[ConversationEventBatchItem]
+
+
+class ConversationEventBatchResult(BaseModel):
+    """
+    The indexes, in the batch, of the events that were not delivered. After an event fails, the later events of its
+    conversation are not delivered either, so that they can be delivered again in order.
+    """
+
+    undelivered: list[int] = []
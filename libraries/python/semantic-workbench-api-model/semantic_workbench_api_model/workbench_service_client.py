@@ -12,6 +12,7 @@ import asgi_correlation_id
 import httpx
 
 from . import assistant_model, workbench_model
+from .assistant_service_client import _set_correlation_id_header
 
 HEADER_ASSISTANT_SERVICE_ID = "X-Assistant-Service-ID"
 HEADER_ASSISTANT_ID = "X-Assistant-ID"
@@ -19,8 +20,8 @@ HEADER_API_KEY = "X-API-Key"
 
 
 # HTTPX transport factory can be overridden to return an ASGI transport for testing
-def httpx_transport_factory() -> httpx.AsyncHTTPTransport:
-    return httpx.AsyncHTTPTransport(retries=3)
+def httpx_transport_factory(limits: httpx.Limits | None = None) -> httpx.AsyncHTTPTransport:
+    return httpx.AsyncHTTPTransport(retries=3, limits=limits or httpx.Limits())
 
 
 @dataclass
@@ -69,17 +70,40 @@ class ConversationAPIClient:
         self,
         conversation_id: str,
         httpx_client_factory: Callable[[], httpx.AsyncClient],
+        request_headers_factory: Callable[[], Mapping[str, str]] | None = None,
+        owns_client: bool = True,
     ) -> None:
+        """
+        Clients that own their HTTP client create one per call. Clients that do not own their HTTP client share it,
+        and its connection pool, leave it open after each call, and send the request headers on every request.
+        """
         self._conversation_id = conversation_id
         self._httpx_client_factory = httpx_client_factory
+        self._request_headers_factory = request_headers_factory
+        self._owns_client = owns_client
+
+    @property
+    def _request_headers(self) -> dict[str, str]:
+        if self._request_headers_factory is None:
+            return {}
+        return dict(self._request_headers_factory())
 
     @property
     def _client(self) -> httpx.AsyncClient:
         return self._httpx_client_factory()
 
-    async def get_sse_session(self, event_source_url: str) -> AsyncIterator[dict]:
+    @asynccontextmanager
+    async def _request_client(self) -> AsyncIterator[httpx.AsyncClient]:
+        if not self._owns_client:
+            yield self._client
+            return
+
         async with self._client as client:
-            async with client.stream("GET", event_source_url) as response:
+            yield client
+
+    async def get_sse_session(self, event_source_url: str) -> AsyncIterator[dict]:
+        async with self._request_client() as client:
+            async with client.stream("GET", event_source_url, headers=self._request_headers) as response:
                 event = {}
                 async for line in response.aiter_lines():
                     if line == "":
@@ -111,8 +135,10 @@ class ConversationAPIClient:
                     yield event
 
     async def delete_conversation(self) -> None:
-        async with self._client as client:
-            http_response = await client.delete(f"/conversations/{self._conversation_id}")
+        async with self._request_client() as client:
+            http_response = await client.delete(
+                f"/conversations/{self._conversation_id}", headers=self._request_headers
+            )
             if http_response.status_code == httpx.codes.NOT_FOUND:
                 return
             http_response.raise_for_status()
@@ -120,40 +146,45 @@ class ConversationAPIClient:
     async def duplicate_conversation(
         self, new_conversation: workbench_model.NewConversation
     ) -> workbench_model.ConversationImportResult:
-        async with self._client as client:
+        async with self._request_client() as client:
             http_response = await client.post(
                 f"/conversations/{self._conversation_id}",
                 json=new_conversation.model_dump(exclude_defaults=True, exclude_unset=True, mode="json"),
+                headers=self._request_headers,
             )
             http_response.raise_for_status()
             return workbench_model.ConversationImportResult.model_validate(http_response.json())
 
     async def get_conversation(self) -> workbench_model.Conversation:
-        async with self._client as client:
-            http_response = await client.get(f"/conversations/{self._conversation_id}")
+        async with self._request_client() as client:
+            http_response = await client.get(f"/conversations/{self._conversation_id}", headers=self._request_headers)
             http_response.raise_for_status()
             return workbench_model.Conversation.model_validate(http_response.json())
 
     async def get_participant_me(self) -> workbench_model.ConversationParticipant:
-        async with self._client as client:
-            http_response = await client.get(f"/conversations/{self._conversation_id}/participants/me")
+        async with self._request_client() as client:
+            http_response = await client.get(
+                f"/conversations/{self._conversation_id}/participants/me", headers=self._request_headers
+            )
             http_response.raise_for_status()
             return workbench_model.ConversationParticipant.model_validate(http_response.json())
 
     async def get_participant(self, participant_id: str) -> workbench_model.ConversationParticipant:
-        async with self._client as client:
+        async with self._request_client() as client:
             http_response = await client.get(
                 f"/conversations/{self._conversation_id}/participants/{participant_id}",
                 params={"include_inactive": True},
+                headers=self._request_headers,
             )
             http_response.raise_for_status()
             return workbench_model.ConversationParticipant.model_validate(http_response.json())
 
     async def get_participants(self, *, include_inactive: bool = False) -> workbench_model.ConversationParticipantList:
-        async with self._client as client:
+        async with self._request_client() as client:
             http_response = await client.get(
                 f"/conversations/{self._conversation_id}/participants",
                 params={"include_inactive": include_inactive},
+                headers=self._request_headers,
             )
             if http_response.status_code == httpx.codes.NOT_FOUND:
                 return workbench_model.ConversationParticipantList(participants=[])
@@ -166,10 +197,11 @@ class ConversationAPIClient:
         participant_id: str,
         participant: workbench_model.UpdateParticipant,
     ) -> workbench_model.ConversationParticipant:
-        async with self._client as client:
+        async with self._request_client() as client:
             http_response = await client.patch(
                 f"/conversations/{self._conversation_id}/participants/{participant_id}",
                 json=participant.model_dump(exclude_defaults=True, exclude_unset=True, mode="json"),
+                headers=self._request_headers,
             )
             http_response.raise_for_status()
             return workbench_model.ConversationParticipant.model_validate(http_response.json())
@@ -184,8 +216,10 @@ class ConversationAPIClient:
         self,
         message_id: uuid.UUID,
     ) -> workbench_model.ConversationMessage:
-        async with self._client as client:
-            http_response = await client.get(f"/conversations/{self._conversation_id}/messages/{message_id}")
+        async with self._request_client() as client:
+            http_response = await client.get(
+                f"/conversations/{self._conversation_id}/messages/{message_id}", headers=self._request_headers
+            )
             http_response.raise_for_status()
             return workbench_model.ConversationMessage.model_validate(http_response.json())
 
@@ -197,8 +231,10 @@ class ConversationAPIClient:
         participant_ids: Iterable[str] | None = None,
         participant_role: workbench_model.ParticipantRole | None = None,
         limit: int | None = None,
+        before_sequence: int | None = None,
+        after_sequence: int | None = None,
     ) -> workbench_model.ConversationMessageList:
-        async with self._client as client:
+        async with self._request_client() as client:
             params: dict[str, str | list[str]] = {}
             if message_types:
                 params["message_type"] = [mt.value for mt in message_types]
@@ -210,23 +246,59 @@ class ConversationAPIClient:
                 params["before"] = str(before)
             if after:
                 params["after"] = str(after)
+            if before_sequence is not None:
+                params["before_sequence"] = str(before_sequence)
+            if after_sequence is not None:
+                params["after_sequence"] = str(after_sequence)
             if limit:
                 params["limit"] = str(limit)
 
-            http_response = await client.get(f"/conversations/{self._conversation_id}/messages", params=params)
+            http_response = await client.get(
+                f"/conversations/{self._conversation_id}/messages", params=params, headers=self._request_headers
+            )
             http_response.raise_for_status()
             return workbench_model.ConversationMessageList.model_validate(http_response.json())
 
     async def send_messages(
         self,
         *messages: workbench_model.NewConversationMessage,
+        update_participant: workbench_model.UpdateParticipant | None = None,
+    ) -> workbench_model.ConversationMessageList:
+        """
+        Sends the messages, and the participant update for the sender if provided, in one request. Workbench services
+        that do not support sending messages in batches are sent one request per message.
+        """
+        if len(messages) <= 1 and update_participant is None:
+            return await self._send_messages_individually(*messages)
+
+        async with self._request_client() as client:
+            http_response = await client.post(
+                f"/conversations/{self._conversation_id}/messages/batch",
+                json=workbench_model.NewConversationMessageBatch(
+                    messages=list(messages), update_participant=update_participant
+                ).model_dump(mode="json"),
+                headers=self._request_headers,
+            )
+            if http_response.status_code not in (httpx.codes.NOT_FOUND, httpx.codes.METHOD_NOT_ALLOWED):
+                http_response.raise_for_status()
+                return workbench_model.ConversationMessageList.model_validate(http_response.json())
+
+        message_list = await self._send_messages_individually(*messages)
+        if update_participant is not None:
+            await self.update_participant_me(update_participant)
+        return message_list
+
+    async def _send_messages_individually(
+        self,
+        *messages: workbench_model.NewConversationMessage,
     ) -> workbench_model.ConversationMessageList:
         messages_out = []
-        async with self._client as client:
+        async with self._request_client() as client:
             for message in messages:
                 http_response = await client.post(
                     f"/conversations/{self._conversation_id}/messages",
                     json=message.model_dump(mode="json"),
+                    headers=self._request_headers,
                 )
                 http_response.raise_for_status()
                 message_out = workbench_model.ConversationMessage.model_validate(http_response.json())
@@ -234,16 +306,34 @@ class ConversationAPIClient:
 
         return workbench_model.ConversationMessageList(messages=messages_out)
 
+    async def send_message_delta(
+        self,
+        message_id: uuid.UUID,
+        delta: workbench_model.NewConversationMessageDelta,
+    ) -> None:
+        """
+        Sends content to append to a message that is being streamed. The message is finalized by sending it, with
+        its full content, with the same id.
+        """
+        async with self._request_client() as client:
+            http_response = await client.post(
+                f"/conversations/{self._conversation_id}/messages/{message_id}/deltas",
+                json=delta.model_dump(mode="json"),
+                headers=self._request_headers,
+            )
+            http_response.raise_for_status()
+
     async def send_conversation_state_event(
         self,
         assistant_id: str,
         state_event: workbench_model.AssistantStateEvent,
     ) -> None:
-        async with self._client as client:
+        async with self._request_client() as client:
             http_response = await client.post(
                 f"/assistants/{assistant_id}/states/events",
                 params={"conversation_id": self._conversation_id},
                 json=state_event.model_dump(mode="json"),
+                headers=self._request_headers,
             )
             http_response.raise_for_status()
 
@@ -253,10 +343,11 @@ class ConversationAPIClient:
         file_content: io.BytesIO,
         content_type: str = "application/octet-stream",
     ) -> workbench_model.File:
-        async with self._client as client:
+        async with self._request_client() as client:
             http_response = await client.put(
                 f"/conversations/{self._conversation_id}/files",
                 files=[("files", (filename, file_content, content_type))],
+                headers=self._request_headers,
             )
             http_response.raise_for_status()
 
@@ -269,8 +360,10 @@ class ConversationAPIClient:
         filename: str,
         chunk_size: int | None = None,
     ) -> AsyncGenerator[AsyncIterator[bytes], Any]:
-        async with self._client as client:
-            request = client.build_request("GET", f"/conversations/{self._conversation_id}/files/{filename}")
+        async with self._request_client() as client:
+            request = client.build_request(
+                "GET", f"/conversations/{self._conversation_id}/files/{filename}", headers=self._request_headers
+            )
             http_response = await client.send(request, stream=True)
             http_response.raise_for_status()
 
@@ -280,9 +373,11 @@ class ConversationAPIClient:
                 await http_response.aclose()
 
     async def get_file(self, filename: str) -> workbench_model.File | None:
-        async with self._client as client:
+        async with self._request_client() as client:
             params = {"prefix": filename}
-            http_response = await client.get(f"/conversations/{self._conversation_id}/files", params=params)
+            http_response = await client.get(
+                f"/conversations/{self._conversation_id}/files", params=params, headers=self._request_headers
+            )
             http_response.raise_for_status()
 
             files_response = workbench_model.FileList.model_validate(http_response.json())
@@ -298,16 +393,20 @@ class ConversationAPIClient:
             return None
 
     async def get_files(self, prefix: str | None = None) -> workbench_model.FileList:
-        async with self._client as client:
+        async with self._request_client() as client:
             params = {"prefix": prefix} if prefix else {}
-            http_response = await client.get(f"/conversations/{self._conversation_id}/files", params=params)
+            http_response = await client.get(
+                f"/conversations/{self._conversation_id}/files", params=params, headers=self._request_headers
+            )
             http_response.raise_for_status()
 
             return workbench_model.FileList.model_validate(http_response.json())
 
     async def file_exists(self, filename: str) -> bool:
-        async with self._client as client:
-            http_response = await client.get(f"/conversations/{self._conversation_id}/files/{filename}/versions")
+        async with self._request_client() as client:
+            http_response = await client.get(
+                f"/conversations/{self._conversation_id}/files/{filename}/versions", headers=self._request_headers
+            )
             match http_response.status_code:
                 case 200:
                     return True
@@ -318,8 +417,10 @@ class ConversationAPIClient:
         return False
 
     async def delete_file(self, filename: str) -> None:
-        async with self._client as client:
-            http_response = await client.delete(f"/conversations/{self._conversation_id}/files/{filename}")
+        async with self._request_client() as client:
+            http_response = await client.delete(
+                f"/conversations/{self._conversation_id}/files/{filename}", headers=self._request_headers
+            )
             if http_response.status_code == httpx.codes.NOT_FOUND:
                 return
             http_response.raise_for_status()
@@ -473,17 +574,55 @@ class AssistantServiceAPIClient:
 
 
 class WorkbenchServiceClientBuilder:
-    """Builder for assistant-services to create clients to interact with the Workbench service."""
+    """
+    Builder for assistant-services to create clients to interact with the Workbench service.
+
+    Conversation clients share one pooled HTTP client, which is created on first use and kept open until the builder
+    is closed, so that calls to the Workbench service reuse connections.
+    """
 
     def __init__(
         self,
         base_url: str,
         assistant_service_id: str,
         api_key: str,
+        limits: httpx.Limits | None = None,
     ) -> None:
         self._base_url = base_url
         self._assistant_service_id = assistant_service_id
         self._api_key = api_key
+        self._limits = limits or httpx.Limits()
+        self._pooled_client: httpx.AsyncClient | None = None
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None = None,
+        exc_value: BaseException | None = None,
+        traceback: types.TracebackType | None = None,
+    ) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        client, self._pooled_client = self._pooled_client, None
+        if client is not None:
+            await client.aclose()
+
+    def _pooled(self) -> httpx.AsyncClient:
+        if self._pooled_client is None or self._pooled_client.is_closed:
+            self._pooled_client = httpx.AsyncClient(
+                # httpx ignores the client's limits when a transport is provided, so the transport is given them
+                transport=httpx_transport_factory(limits=self._limits),
+                base_url=self._base_url,
+                timeout=httpx.Timeout(5.0, connect=10.0, read=60.0),
+                headers=AssistantServiceRequestHeaders(
+                    assistant_service_id=self._assistant_service_id, api_key=self._api_key
+                ).to_headers(),
+                event_hooks={"request": [_set_correlation_id_header]},
+            )
+        return self._pooled_client
 
     def _client(self, *headers: AssistantServiceRequestHeaders | AssistantRequestHeaders) -> httpx.AsyncClient:
         client = httpx.AsyncClient(
@@ -506,12 +645,15 @@ class WorkbenchServiceClientBuilder:
         )
 
     def for_conversation(self, assistant_id: str, conversation_id: str) -> ConversationAPIClient:
+        """
+        Returns a client that uses the builder's pooled HTTP client. The returned client does not need to be closed,
+        and must not be used after the builder is closed.
+        """
         return ConversationAPIClient(
             conversation_id=conversation_id,
-            httpx_client_factory=lambda: self._client(
-                AssistantServiceRequestHeaders(assistant_service_id=self._assistant_service_id, api_key=self._api_key),
-                AssistantRequestHeaders(assistant_id=uuid.UUID(assistant_id)),
-            ),
+            httpx_client_factory=self._pooled,
+            request_headers_factory=lambda: AssistantRequestHeaders(assistant_id=uuid.UUID(assistant_id)).to_headers(),
+            owns_client=False,
         )
 
 
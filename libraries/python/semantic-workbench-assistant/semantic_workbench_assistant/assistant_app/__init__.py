@@ -7,7 +7,7 @@ from .content_safety import (
     ContentSafetyEvaluationResult,
     ContentSafetyEvaluator,
 )
-from .context import AssistantContext, ConversationContext, storage_directory_for_context
+from .context import AssistantContext, ConversationContext, ConversationMessageStream, storage_directory_for_context
 from .error import BadRequestError, ConflictError, NotFoundError
 from .export_import import FileStorageAssistantDataExporter, FileStorageConversationDataExporter
 from .protocol import (
@@ -17,6 +17,7 @@ from .protocol import (
     AssistantConfigProvider,
     AssistantConversationInspectorStateDataModel,
     AssistantConversationInspectorStateProvider,
+    EventCoalescingOptions,
 )
 
 __all__ = [
@@ -31,6 +32,7 @@ __all__ = [
     "AssistantConversationInspectorStateProvider",
     "BaseModelAssistantConfig",
     "ConversationContext",
+    "ConversationMessageStream",
     "ContentSafety",
     "ContentSafetyEvaluation",
     "ContentSafetyEvaluationResult",
@@ -40,5 +42,6 @@ __all__ = [
     "BadRequestError",
     "NotFoundError",
     "ConflictError",
+    "EventCoalescingOptions",
     "storage_directory_for_context",
 ]
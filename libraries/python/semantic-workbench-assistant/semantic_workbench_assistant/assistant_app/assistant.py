@@ -19,6 +19,7 @@ from .protocol import (
     AssistantDataExporter,
     ContentInterceptor,
     ConversationDataExporter,
+    EventCoalescingOptions,
     Events,
 )
 from .service import AssistantService
@@ -41,6 +42,7 @@ class AssistantApp:
         conversation_data_exporter: ConversationDataExporter = FileStorageConversationDataExporter(),
         inspector_state_providers: Mapping[str, AssistantConversationInspectorStateProvider] | None = None,
         content_interceptor: ContentInterceptor | None = ContentSafety(AlwaysWarnContentSafetyEvaluator.factory),
+        event_coalescing: EventCoalescingOptions = EventCoalescingOptions(),
     ) -> None:
         self.assistant_service_id = assistant_service_id
         self.assistant_service_name = assistant_service_name
@@ -53,6 +55,7 @@ class AssistantApp:
         self.conversation_data_exporter = conversation_data_exporter
         self.inspector_state_providers = dict(inspector_state_providers or {})
         self.content_interceptor = content_interceptor
+        self.event_coalescing = event_coalescing
 
         self.events = Events()
 
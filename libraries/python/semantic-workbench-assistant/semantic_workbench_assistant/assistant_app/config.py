@@ -1,6 +1,9 @@
+import asyncio
 import logging
+import os
 import pathlib
-from typing import Any, Generic, TypeVar
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Generic, TypeVar
 
 from pydantic import (
     BaseModel,
@@ -25,15 +28,32 @@ logger = logging.getLogger(__name__)
 
 ConfigModelT = TypeVar("ConfigModelT", bound=BaseModel)
 
+ConfigSubscriber = Callable[[AssistantContext, ConfigModelT], Awaitable[None] | None]
+
+
+@dataclass
+class _CachedConfig(Generic[ConfigModelT]):
+    config: ConfigModelT
+    # the stat of the export/import file the config was read from, when it was not read from the private file,
+    # which is only ever written by _set
+    fallback_stat: tuple[int, int] | None = None
+    from_private_path: bool = False
+
 
 class BaseModelAssistantConfig(Generic[ConfigModelT]):
     """
     Assistant-config implementation that uses a BaseModel for default config.
+
+    Configs are cached in memory once read, so the validated config object is shared by all callers of get, which
+    must not modify it.
     """
 
     def __init__(self, cls: type[ConfigModelT]) -> None:
         self._cls = cls
         self._ui_schema = get_ui_schema(cls)
+        self._json_schema: dict[str, Any] | None = None
+        self._cache: dict[pathlib.Path, _CachedConfig[ConfigModelT]] = {}
+        self._subscribers: list[ConfigSubscriber[ConfigModelT]] = []
 
     def _private_path_for(self, assistant_context: AssistantContext) -> pathlib.Path:
         # store assistant config, including secrets, in a separate partition that is never exported
@@ -44,19 +64,50 @@ class BaseModelAssistantConfig(Generic[ConfigModelT]):
         return storage_directory_for_context(assistant_context) / "config.json"
 
     async def get(self, assistant_context: AssistantContext) -> ConfigModelT:
-        path = self._private_path_for(assistant_context)
+        private_path = self._private_path_for(assistant_context)
 
-        if not path.exists():
+        cached = self._cache.get(private_path)
+        if cached is not None and (cached.from_private_path or not self._fallback_changed(assistant_context, cached)):
+            return cached.config
+
+        path = private_path
+        from_private_path = path.exists()
+        if not from_private_path:
             # if the config file hasn't been written yet, check the export/import path
             path = self._export_import_path_for(assistant_context)
 
+        fallback_stat = None if from_private_path else _stat(path)
+
         config = None
         try:
             config = read_model(path, self._cls)
         except ValidationError as e:
             logger.warning("exception reading config; path: %s", path, exc_info=e)
 
-        return config or self._cls.model_construct()
+        config = config or self._cls.model_construct()
+        self._cache[private_path] = _CachedConfig(
+            config=config, fallback_stat=fallback_stat, from_private_path=from_private_path
+        )
+        return config
+
+    def subscribe(self, subscriber: ConfigSubscriber[ConfigModelT]) -> Callable[[], None]:
+        """
+        Registers a subscriber that is called with the new config whenever the config of an assistant is set.
+        Returns a function that unsubscribes.
+        """
+        self._subscribers.append(subscriber)
+
+        def unsubscribe() -> None:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+        return unsubscribe
+
+    def _fallback_changed(self, assistant_context: AssistantContext, cached: _CachedConfig[ConfigModelT]) -> bool:
+        # the export/import file is replaced when assistant data is imported, rather than by _set
+        if self._private_path_for(assistant_context).exists():
+            return True
+        return _stat(self._export_import_path_for(assistant_context)) != cached.fallback_stat
 
     async def _set(self, assistant_context: AssistantContext, config: ConfigModelT) -> None:
         # save the config with secrets serialized with their actual values for the assistant
@@ -76,6 +127,16 @@ class BaseModelAssistantConfig(Generic[ConfigModelT]):
             ),
         )
 
+        self._cache[self._private_path_for(assistant_context)] = _CachedConfig(config=config, from_private_path=True)
+
+        for subscriber in list(self._subscribers):
+            try:
+                result = subscriber(assistant_context, config)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception:
+                logger.exception("error in config subscriber %s", subscriber)
+
     @property
     def provider(self) -> AssistantConfigProvider:
         class _ConfigProvider:
@@ -91,10 +152,13 @@ class BaseModelAssistantConfig(Generic[ConfigModelT]):
                     for error in e.errors(include_url=False):
                         errors.append(str(error))
 
+                if self._provider._json_schema is None:
+                    self._provider._json_schema = self._provider._cls.model_json_schema()
+
                 return AssistantConfigDataModel(
                     config=config.model_dump(mode="json"),
                     errors=errors,
-                    json_schema=config.model_json_schema(),
+                    json_schema=self._provider._json_schema,
                     ui_schema=self._provider._ui_schema,
                 )
 
@@ -111,3 +175,11 @@ class BaseModelAssistantConfig(Generic[ConfigModelT]):
                 await self._provider._set(assistant_context, updated_config)
 
         return _ConfigProvider(self)
+
+
+def _stat(path: pathlib.Path) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_ino)
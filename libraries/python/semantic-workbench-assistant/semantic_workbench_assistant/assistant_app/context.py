@@ -2,6 +2,7 @@ import asyncio
 import io
 import logging
 import pathlib
+import time
 import uuid
 from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
@@ -11,10 +12,13 @@ import semantic_workbench_api_model
 import semantic_workbench_api_model.workbench_service_client
 from semantic_workbench_api_model import workbench_model
 
-from .. import settings
+from .. import settings, workbench_client_pool
 
 logger = logging.getLogger(__name__)
 
+# holds references to status update tasks, which may outlive the context that started them
+_background_tasks: set[asyncio.Task] = set()
+
 
 @dataclass
 class AssistantContext:
@@ -34,31 +38,73 @@ class ConversationContext:
     _status_stack: list[str | None] = field(default_factory=list)
     _prior_status: str | None = field(default=None)
 
+    # status updates are debounced, and sent along with messages when possible
+    _status_update_lock: asyncio.Lock = field(default_factory=asyncio.Lock, compare=False, repr=False)
+    _pending_status: str | None = field(default=None, compare=False, repr=False)
+    _has_pending_status: bool = field(default=False, compare=False, repr=False)
+    _reported_status: str | None = field(default=None, compare=False, repr=False)
+    _has_reported_status: bool = field(default=False, compare=False, repr=False)
+    _status_flush_task: asyncio.Task | None = field(default=None, compare=False, repr=False)
+
     @property
     def _workbench_client(self) -> semantic_workbench_api_model.workbench_service_client.ConversationAPIClient:
-        return semantic_workbench_api_model.workbench_service_client.WorkbenchServiceClientBuilder(
-            base_url=str(settings.workbench_service_url),
-            assistant_service_id=self.assistant._assistant_service_id,
-            api_key=settings.workbench_service_api_key,
-        ).for_conversation(self.assistant.id, self.id)
+        return workbench_client_pool.builder_for(self.assistant._assistant_service_id).for_conversation(
+            self.assistant.id, self.id
+        )
 
     async def send_messages(
         self, messages: workbench_model.NewConversationMessage | list[workbench_model.NewConversationMessage]
     ) -> workbench_model.ConversationMessageList:
         if not isinstance(messages, list):
             messages = [messages]
-        return await self._workbench_client.send_messages(*messages)
+        async with self._status_update_lock:
+            # a pending status update is sent with the messages, rather than in a request of its own
+            status_update = self._take_pending_status_update()
+            message_list = await self._workbench_client.send_messages(*messages, update_participant=status_update)
+            if status_update is not None:
+                self._set_reported_status(status_update.status)
+            return message_list
+
+    def stream_message(
+        self,
+        message_type: workbench_model.MessageType = workbench_model.MessageType.chat,
+        content_type: str = "text/plain",
+    ) -> "ConversationMessageStream":
+        """
+        Returns a message whose content is shown to the users as it is appended, such as while it is generated. The
+        message is stored when it is finalized.
+
+        Example:
+        ```python
+        message_stream = conversation.stream_message()
+        async for chunk in generate_response():
+            await message_stream.append(chunk)
+        await message_stream.finalize()
+        ```
+        """
+        return ConversationMessageStream(context=self, message_type=message_type, content_type=content_type)
 
     async def update_participant_me(
         self, participant: workbench_model.UpdateParticipant
     ) -> workbench_model.ConversationParticipant:
-        return await self._workbench_client.update_participant_me(participant)
+        async with self._status_update_lock:
+            # the update supersedes any pending status update
+            self._has_pending_status = False
+            participant_me = await self._workbench_client.update_participant_me(participant)
+            self._set_reported_status(participant_me.status)
+            return participant_me
 
     @asynccontextmanager
     async def set_status(self, status: str | None) -> AsyncGenerator[None, None]:
         """
         Context manager to update the participant status and reset it when done.
 
+        Status updates are debounced, and sent with the next messages when possible, so short-lived statuses cost no
+        requests. Call flush_status to send a pending status update immediately.
+
+        On exit, the status of the enclosing scope is restored, or no status outside of any scope. Before, the status
+        of the most recently entered scope was restored by later scopes, even after that scope had exited.
+
         Example:
         ```python
         async with conversation.set_status("processing ..."):
@@ -68,15 +114,56 @@ class ConversationContext:
         async with self._status_lock:
             self._status_stack.append(self._prior_status)
             self._prior_status = status
-        await self._workbench_client.update_participant_me(workbench_model.UpdateParticipant(status=status))
+        self._queue_status_update(status)
         try:
             yield
         finally:
             async with self._status_lock:
                 revert_to_status = self._status_stack.pop()
-            await self._workbench_client.update_participant_me(
-                workbench_model.UpdateParticipant(status=revert_to_status)
-            )
+                self._prior_status = revert_to_status
+            self._queue_status_update(revert_to_status)
+
+    def _queue_status_update(self, status: str | None) -> None:
+        """
+        Queues the status to be sent after the debounce interval, so that a status that is replaced within the
+        interval, such as one for a short-lived scope, is never sent.
+        """
+        self._pending_status = status
+        self._has_pending_status = True
+        if self._status_flush_task is None or self._status_flush_task.done():
+            self._status_flush_task = asyncio.create_task(self._flush_status_update_after_debounce())
+            _background_tasks.add(self._status_flush_task)
+            self._status_flush_task.add_done_callback(_background_tasks.discard)
+
+    def _take_pending_status_update(self) -> workbench_model.UpdateParticipant | None:
+        if not self._has_pending_status:
+            return None
+        self._has_pending_status = False
+        if self._has_reported_status and self._reported_status == self._pending_status:
+            return None
+        return workbench_model.UpdateParticipant(status=self._pending_status)
+
+    def _set_reported_status(self, status: str | None) -> None:
+        self._reported_status = status
+        self._has_reported_status = True
+
+    async def _flush_status_update_after_debounce(self) -> None:
+        await asyncio.sleep(settings.workbench_service_status_debounce_seconds)
+        try:
+            await self.flush_status()
+        except Exception:
+            logger.exception("error updating participant status; conversation_id: %s", self.id)
+
+    async def flush_status(self) -> None:
+        """
+        Sends the pending status update, if any, without waiting for the debounce interval.
+        """
+        async with self._status_update_lock:
+            status_update = self._take_pending_status_update()
+            if status_update is None:
+                return
+            await self._workbench_client.update_participant_me(status_update)
+            self._set_reported_status(status_update.status)
 
     async def get_conversation(self) -> workbench_model.Conversation:
         return await self._workbench_client.get_conversation()
@@ -92,6 +179,8 @@ class ConversationContext:
         participant_ids: list[str] | None = None,
         participant_role: workbench_model.ParticipantRole | None = None,
         limit: int | None = None,
+        before_sequence: int | None = None,
+        after_sequence: int | None = None,
     ) -> workbench_model.ConversationMessageList:
         return await self._workbench_client.get_messages(
             before=before,
@@ -100,6 +189,8 @@ class ConversationContext:
             participant_ids=participant_ids,
             participant_role=participant_role,
             limit=limit,
+            before_sequence=before_sequence,
+            after_sequence=after_sequence,
         )
 
     async def send_conversation_state_event(self, state_event: workbench_model.AssistantStateEvent) -> None:
@@ -156,6 +247,84 @@ class ConversationContext:
         )
 
 
+class ConversationMessageStream:
+    """
+    A message that is streamed to the users in a conversation. Appended content is sent as deltas, at most once per
+    interval so that generating many small chunks does not cost a request each, and the message is stored, with
+    its full content, when it is finalized.
+
+    Deltas are only sent when the workbench_service_message_deltas_enabled setting is on; otherwise the content is
+    only sent when the message is finalized.
+    """
+
+    def __init__(
+        self,
+        context: ConversationContext,
+        message_type: workbench_model.MessageType,
+        content_type: str,
+    ) -> None:
+        self.id = uuid.uuid4()
+        self._context = context
+        self._message_type = message_type
+        self._content_type = content_type
+        self._content: list[str] = []
+        self._unsent_content: list[str] = []
+        self._last_sent = 0.0
+        self._streaming = settings.workbench_service_message_deltas_enabled
+
+    @property
+    def content(self) -> str:
+        return "".join(self._content)
+
+    async def append(self, content: str) -> None:
+        if not content:
+            return
+
+        self._content.append(content)
+        self._unsent_content.append(content)
+
+        if time.monotonic() - self._last_sent >= settings.workbench_service_message_delta_interval_seconds:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """
+        Sends the content appended since the last delta, without waiting for the interval.
+        """
+        if not self._unsent_content or not self._streaming:
+            return
+
+        delta = workbench_model.NewConversationMessageDelta(
+            content="".join(self._unsent_content),
+            message_type=self._message_type,
+            content_type=self._content_type,
+        )
+        self._unsent_content.clear()
+        self._last_sent = time.monotonic()
+
+        try:
+            await self._context._workbench_client.send_message_delta(self.id, delta)
+        except Exception:
+            # streaming is best effort, as the full content is sent when the message is finalized
+            logger.exception("error sending message delta; conversation_id: %s", self._context.id)
+            self._streaming = False
+
+    async def finalize(
+        self, message: workbench_model.NewConversationMessage | None = None
+    ) -> workbench_model.ConversationMessageList:
+        """
+        Sends the message, which replaces the streamed content for the users. By default, the message has the
+        streamed content; pass a message to send different content, a different type, or metadata.
+        """
+        if message is None:
+            message = workbench_model.NewConversationMessage(
+                content=self.content,
+                message_type=self._message_type,
+                content_type=self._content_type,
+            )
+
+        return await self._context.send_messages(message.model_copy(update={"id": self.id}))
+
+
 def storage_directory_for_context(context: AssistantContext | ConversationContext, partition: str = "") -> pathlib.Path:
     match context:
         case AssistantContext():
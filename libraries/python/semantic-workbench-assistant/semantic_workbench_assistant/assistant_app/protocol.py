@@ -85,6 +85,32 @@ class AssistantConfigDataModel:
     ui_schema: dict[str, Any] | None = field(default=None)
 
 
+@dataclass
+class EventCoalescingOptions:
+    """
+    Options for the coalescing of the events that are queued for a conversation, before they are handled.
+    """
+
+    drop_superseded_events: bool = True
+    """
+    Skip participant and file updated events that are superseded by a later updated, or deleted, event for the same
+    participant or file in the queue.
+    """
+
+    debounce_user_messages_seconds: float = 0.0
+    """
+    When greater than zero, wait this long for more events after a message from another participant, so that quick
+    successive messages are handed to the on_created_batch handlers together. Only messages from other participants
+    restart the wait.
+    """
+
+    debounce_user_messages_max_seconds: float = 2.0
+    """
+    The longest time to wait for more events after the first message from another participant in a batch, however
+    many messages follow it, so that a busy conversation is still handled.
+    """
+
+
 class AssistantConfigProvider(Protocol):
     async def get(self, assistant_context: AssistantContext) -> AssistantConfigDataModel: ...
 
@@ -190,24 +216,41 @@ ConversationFileEventHandler = Callable[
     Awaitable[None] | None,
 ]
 
+ConversationMessageBatchEventHandler = Callable[
+    [ConversationContext, list[workbench_model.ConversationEvent], list[workbench_model.ConversationMessage]],
+    Awaitable[None] | None,
+]
+
 ServiceLifecycleEventHandler = Callable[[None], Awaitable[None] | None]
 
 
-class MessageEvents(ObjectEventHandlers[ConversationMessageEventHandler]):
+class MessageEventHandlers(ObjectEventHandlers[ConversationMessageEventHandler]):
     def __init__(self) -> None:
         super().__init__(on_updated=False)
 
-        self.chat = ObjectEventHandlers[ConversationMessageEventHandler](on_updated=False)
-        self.log = ObjectEventHandlers[ConversationMessageEventHandler](on_updated=False)
-        self.note = ObjectEventHandlers[ConversationMessageEventHandler](on_updated=False)
-        self.notice = ObjectEventHandlers[ConversationMessageEventHandler](on_updated=False)
-        self.command = ObjectEventHandlers[ConversationMessageEventHandler](on_updated=False)
-        self.command_response = ObjectEventHandlers[ConversationMessageEventHandler](on_updated=False)
+        self._on_created_batch_handlers = EventHandlerList[ConversationMessageBatchEventHandler]()
+        self.on_created_batch = _create_decorator(self._on_created_batch_handlers, "others")
+        """
+        event handler for the messages created since the queue of the conversation was last handled, called once
+        after the created event handlers of each; excluding messages from this assistant service
+        """
+
+
+class MessageEvents(MessageEventHandlers):
+    def __init__(self) -> None:
+        super().__init__()
+
+        self.chat = MessageEventHandlers()
+        self.log = MessageEventHandlers()
+        self.note = MessageEventHandlers()
+        self.notice = MessageEventHandlers()
+        self.command = MessageEventHandlers()
+        self.command_response = MessageEventHandlers()
         # ensure we have an event handler for each message type
         for event_type in workbench_model.MessageType:
             assert getattr(self, str(event_type).replace("-", "_"))
 
-    def __getitem__(self, key: workbench_model.MessageType) -> ObjectEventHandlers[ConversationMessageEventHandler]:
+    def __getitem__(self, key: workbench_model.MessageType) -> MessageEventHandlers:
         match key:
             case workbench_model.MessageType.chat:
                 return self.chat
@@ -300,6 +343,9 @@ class AssistantAppProtocol(Protocol):
     @property
     def content_interceptor(self) -> ContentInterceptor | None: ...
 
+    @property
+    def event_coalescing(self) -> EventCoalescingOptions: ...
+
     @property
     def inspector_state_providers(self) -> Mapping[str, AssistantConversationInspectorStateProvider]: ...
 
@@ -3,14 +3,15 @@ import contextlib
 import functools
 import logging
 import pathlib
+import time
 import uuid
 from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, replace
 from typing import (
     IO,
     AsyncContextManager,
     AsyncIterator,
     Callable,
-    NoReturn,
     TypeVar,
     cast,
 )
@@ -18,7 +19,7 @@ from typing import (
 import asgi_correlation_id
 from fastapi import HTTPException, status
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel, Field, ValidationError
 from semantic_workbench_api_model import assistant_model, workbench_model
 
 from .. import settings
@@ -53,15 +54,194 @@ class _AssistantState(BaseModel):
 
 class _PersistedAssistantStates(BaseModel):
     """
-    Private model for persisted assistant states for the AssistantService.
+    Private model for the assistant states file written by earlier versions of the AssistantService, read only to
+    migrate it.
     """
 
     assistants: dict[str, _AssistantState] = {}
 
 
+class _AssistantStateStore:
+    """
+    Private in-memory index of the assistant and conversation states for the AssistantService. The index is loaded
+    from storage on first use and is authoritative from then on. Changes are written behind, one file per changed
+    assistant, so that lookups never touch the disk and a change only rewrites the state of its own assistant.
+    """
+
+    def __init__(self, root_path: pathlib.Path, flush_delay_seconds: float) -> None:
+        self._states_path = root_path / "assistant_states"
+        # earlier versions kept the states of all assistants in a single file
+        self._legacy_states_path = root_path / "assistant_states.json"
+        self._flush_delay_seconds = flush_delay_seconds
+        self._assistants: dict[str, _AssistantState] | None = None
+        self._dirty_assistant_ids: set[str] = set()
+        self._flush_task: asyncio.Task | None = None
+
+    def get(self, assistant_id: str) -> _AssistantState | None:
+        return self._index().get(assistant_id)
+
+    def put(self, assistant_state: _AssistantState) -> None:
+        self._index()[assistant_state.assistant_id] = assistant_state
+        self._mark_dirty(assistant_state.assistant_id)
+
+    def delete(self, assistant_id: str) -> None:
+        if self._index().pop(assistant_id, None) is not None:
+            self._mark_dirty(assistant_id)
+
+    def put_conversation(self, assistant_id: str, conversation_state: _ConversationState) -> None:
+        assistant_state = require_found(self.get(assistant_id))
+        assistant_state.conversations[conversation_state.conversation_id] = conversation_state
+        self._mark_dirty(assistant_id)
+
+    def delete_conversation(self, assistant_id: str, conversation_id: str) -> bool:
+        assistant_state = self.get(assistant_id)
+        if assistant_state is None or assistant_state.conversations.pop(conversation_id, None) is None:
+            return False
+        self._mark_dirty(assistant_id)
+        return True
+
+    def flush(self) -> None:
+        """
+        Writes the states of the assistants that changed since the last flush.
+        """
+        dirty_assistant_ids, self._dirty_assistant_ids = self._dirty_assistant_ids, set()
+        for assistant_id in dirty_assistant_ids:
+            path = self._path_for(assistant_id)
+            assistant_state = self._index().get(assistant_id)
+            try:
+                if assistant_state is None:
+                    path.unlink(missing_ok=True)
+                    continue
+                write_model(path, assistant_state)
+            except Exception:
+                logger.exception("error writing assistant state; assistant_id: %s", assistant_id)
+                self._dirty_assistant_ids.add(assistant_id)
+
+    async def aclose(self) -> None:
+        """
+        Cancels the pending flush, if any, and flushes all changes.
+        """
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flush_task
+            self._flush_task = None
+
+        self.flush()
+
+    def _mark_dirty(self, assistant_id: str) -> None:
+        self._dirty_assistant_ids.add(assistant_id)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        # changes made during the delay are written by the same flush
+        await asyncio.sleep(self._flush_delay_seconds)
+        self.flush()
+
+    def _path_for(self, assistant_id: str) -> pathlib.Path:
+        return self._states_path / f"{assistant_id}.json"
+
+    def _index(self) -> dict[str, _AssistantState]:
+        if self._assistants is None:
+            self._assistants = self._load()
+        return self._assistants
+
+    def _load(self) -> dict[str, _AssistantState]:
+        assistants: dict[str, _AssistantState] = {}
+
+        for file_path in sorted(self._states_path.glob("*.json")):
+            try:
+                assistant_state = read_model(file_path, _AssistantState)
+            except ValidationError:
+                logger.warning("invalid assistant state, ignoring; path: %s", file_path, exc_info=True)
+                continue
+            if assistant_state is not None:
+                assistants[assistant_state.assistant_id] = assistant_state
+
+        try:
+            legacy_states = read_model(self._legacy_states_path, _PersistedAssistantStates)
+        except ValidationError:
+            logger.warning("invalid assistant states, ignoring; path: %s", self._legacy_states_path, exc_info=True)
+            legacy_states = None
+
+        if legacy_states is not None:
+            for assistant_id, assistant_state in legacy_states.assistants.items():
+                if assistant_id in assistants:
+                    continue
+                assistants[assistant_id] = assistant_state
+                write_model(self._path_for(assistant_id), assistant_state)
+            self._legacy_states_path.unlink(missing_ok=True)
+
+        return assistants
+
+
 class _Event(BaseModel):
     assistant_id: str
     event: workbench_model.ConversationEvent
+    enqueued_at: float = Field(default_factory=time.monotonic)
+
+
+class _EventQueue(asyncio.Queue[_Event]):
+    @property
+    def oldest_enqueued_at(self) -> float | None:
+        # asyncio.Queue keeps its items in self._queue, which subclasses are meant to use
+        return self._queue[0].enqueued_at if self._queue else None
+
+
+@dataclass
+class EventQueueMetrics:
+    """
+    Metrics of the per-conversation event queues of the AssistantService.
+    """
+
+    enqueued: int = 0
+    forwarded: int = 0
+    superseded: int = 0
+    # conversations with queued events, or events being handled
+    active_queues: int = 0
+    # events waiting in all queues
+    queue_depth: int = 0
+    # seconds that the oldest waiting event has been queued for
+    oldest_queued_seconds: float = 0.0
+    # seconds that the most recently forwarded event was queued for
+    last_lag_seconds: float = 0.0
+
+
+def _is_message_from_other_participant(wrapper: _Event) -> bool:
+    if wrapper.event.event != workbench_model.ConversationEventType.message_created:
+        return False
+    sender = wrapper.event.data.get("message", {}).get("sender", {})
+    return sender.get("participant_id") != wrapper.assistant_id
+
+
+def _superseding_key(event: workbench_model.ConversationEvent) -> tuple[str, str] | None:
+    match event.event:
+        case workbench_model.ConversationEventType.participant_updated:
+            return ("participant", str(event.data.get("participant", {}).get("id")))
+        case workbench_model.ConversationEventType.file_updated | workbench_model.ConversationEventType.file_deleted:
+            return ("file", str(event.data.get("file", {}).get("filename")))
+    return None
+
+
+def _drop_superseded_events(wrappers: list[_Event]) -> list[_Event]:
+    """
+    Drops the participant and file updated events that are followed by a later updated, or deleted, event for the
+    same participant or file, as the later event carries the latest state.
+    """
+    later_keys: set[tuple[str, str]] = set()
+    kept: list[_Event] = []
+    for wrapper in reversed(wrappers):
+        key = _superseding_key(wrapper.event)
+        if key is not None:
+            is_update = wrapper.event.event != workbench_model.ConversationEventType.file_deleted
+            if is_update and key in later_keys:
+                continue
+            later_keys.add(key)
+        kept.append(wrapper)
+
+    kept.reverse()
+    return kept
 
 
 def translate_assistant_errors(func):
@@ -127,9 +307,11 @@ class AssistantService(FastAPIAssistantService):
         )
 
         self._root_path = pathlib.Path(settings.storage.root)
-        self._assistant_states_path = self._root_path / "assistant_states.json"
-        self._event_queue_lock = asyncio.Lock()
-        self._conversation_event_queues: dict[tuple[str, str], asyncio.Queue[_Event]] = {}
+        self._assistant_states = _AssistantStateStore(
+            self._root_path, flush_delay_seconds=settings.assistant_states_flush_delay_seconds
+        )
+        self._conversation_event_queues: dict[tuple[str, str], _EventQueue] = {}
+        self._event_queue_metrics = EventQueueMetrics()
         self._conversation_event_tasks: set[asyncio.Task] = set()
         register_lifespan_handler(self.lifespan)
 
@@ -153,21 +335,7 @@ class AssistantService(FastAPIAssistantService):
                 if isinstance(result, Exception):
                     logging.exception("event handling task raised exception", exc_info=result)
 
-    def read_assistant_states(self) -> _PersistedAssistantStates:
-        states = None
-        try:
-            states = read_model(self._assistant_states_path, _PersistedAssistantStates)
-        except FileNotFoundError:
-            pass
-        except ValidationError:
-            logging.warning(
-                "invalid assistant states, returning new state; path: %s", self._assistant_states_path, exc_info=True
-            )
-
-        return states or _PersistedAssistantStates()
-
-    def write_assistant_states(self, new_states: _PersistedAssistantStates) -> None:
-        write_model(self._assistant_states_path, new_states)
+            await self._assistant_states.aclose()
 
     def _build_assistant_context(self, assistant_id: str, assistant_name: str) -> AssistantContext:
         return AssistantContext(
@@ -177,15 +345,13 @@ class AssistantService(FastAPIAssistantService):
         )
 
     def get_assistant_context(self, assistant_id: str) -> AssistantContext | None:
-        states = self.read_assistant_states()
-        assistant_state = states.assistants.get(assistant_id)
+        assistant_state = self._assistant_states.get(assistant_id)
         if assistant_state is None:
             return None
         return self._build_assistant_context(assistant_state.assistant_id, assistant_state.assistant_name)
 
     def get_conversation_context(self, assistant_id: str, conversation_id: str) -> ConversationContext | None:
-        states = self.read_assistant_states()
-        assistant_state = states.assistants.get(assistant_id)
+        assistant_state = self._assistant_states.get(assistant_id)
         if assistant_state is None:
             return None
         conversation_state = assistant_state.conversations.get(conversation_id)
@@ -245,17 +411,16 @@ class AssistantService(FastAPIAssistantService):
         from_export: IO[bytes] | None = None,
     ) -> assistant_model.AssistantResponseModel:
         is_new = False
-        states = self.read_assistant_states()
+        existing_state = self._assistant_states.get(assistant_id)
 
-        assistant_state = states.assistants.get(assistant_id) or _AssistantState(
+        assistant_state = existing_state or _AssistantState(
             assistant_id=assistant_id,
             assistant_name=assistant.assistant_name,
         )
         assistant_state.assistant_name = assistant.assistant_name
 
-        is_new = not from_export and assistant_id not in states.assistants
-        states.assistants[assistant_id] = assistant_state
-        self.write_assistant_states(states)
+        is_new = not from_export and existing_state is None
+        self._assistant_states.put(assistant_state)
 
         assistant_context = require_found(self.get_assistant_context(assistant_id))
         if is_new:
@@ -290,19 +455,16 @@ class AssistantService(FastAPIAssistantService):
         if assistant_context is None:
             return
 
-        states = self.read_assistant_states()
-        assistant_state = states.assistants.get(assistant_id)
+        assistant_state = self._assistant_states.get(assistant_id)
 
         if assistant_state is None:
             return
 
         # delete conversations
-        for conversation_id in assistant_state.conversations:
+        for conversation_id in list(assistant_state.conversations):
             await self.delete_conversation(assistant_id, conversation_id)
 
-        states = self.read_assistant_states()
-        states.assistants.pop(assistant_id, None)
-        self.write_assistant_states(states)
+        self._assistant_states.delete(assistant_id)
 
         await self.assistant_app.events.assistant._on_deleted_handlers(True, assistant_context)
 
@@ -335,8 +497,7 @@ class AssistantService(FastAPIAssistantService):
         conversation: assistant_model.ConversationPutRequestModel,
         from_export: IO[bytes] | None = None,
     ) -> assistant_model.ConversationResponseModel:
-        states = self.read_assistant_states()
-        assistant_state = require_found(states.assistants.get(assistant_id))
+        assistant_state = require_found(self._assistant_states.get(assistant_id))
 
         conversation_state = assistant_state.conversations.get(conversation_id) or _ConversationState(
             conversation_id=conversation_id,
@@ -346,8 +507,7 @@ class AssistantService(FastAPIAssistantService):
 
         conversation_state.title = conversation.title
 
-        assistant_state.conversations[conversation_id] = conversation_state
-        self.write_assistant_states(states)
+        self._assistant_states.put_conversation(assistant_id, conversation_state)
 
         conversation_context = require_found(self.get_conversation_context(assistant_id, conversation_id))
 
@@ -385,66 +545,162 @@ class AssistantService(FastAPIAssistantService):
         if conversation_context is None:
             return None
 
-        states = self.read_assistant_states()
-        assistant_state = require_found(states.assistants.get(assistant_id))
-        if assistant_state.conversations.pop(conversation_id, None) is None:
+        if not self._assistant_states.delete_conversation(assistant_id, conversation_id):
             return
-        self.write_assistant_states(states)
 
         await self.assistant_app.events.conversation._on_deleted_handlers(True, conversation_context)
 
-    async def _get_or_create_queue(self, assistant_id: str, conversation_id: str) -> asyncio.Queue[_Event]:
-        key = (assistant_id, conversation_id)
-        async with self._event_queue_lock:
-            queue = self._conversation_event_queues.get(key)
-            if queue is not None:
-                return queue
+    @property
+    def event_queue_metrics(self) -> EventQueueMetrics:
+        """
+        A snapshot of the metrics of the per-conversation event queues.
+        """
+        now = time.monotonic()
+        oldest_enqueued_at = min(
+            (
+                enqueued_at
+                for queue in self._conversation_event_queues.values()
+                if (enqueued_at := queue.oldest_enqueued_at) is not None
+            ),
+            default=now,
+        )
+        return replace(
+            self._event_queue_metrics,
+            active_queues=len(self._conversation_event_queues),
+            queue_depth=sum(queue.qsize() for queue in self._conversation_event_queues.values()),
+            oldest_queued_seconds=now - oldest_enqueued_at,
+        )
 
-            queue = asyncio.Queue()
+    def _enqueue_event(self, wrapper: _Event) -> None:
+        """
+        Queues the event for its conversation, starting a worker for the conversation if it has none. There is at
+        most one worker per conversation, so that its events are handled in order.
+        """
+        key = (wrapper.assistant_id, str(wrapper.event.conversation_id))
+        queue = self._conversation_event_queues.get(key)
+        if queue is None:
+            queue = _EventQueue()
             self._conversation_event_queues[key] = queue
-            task = asyncio.create_task(self._forward_events_from_queue(queue))
+            task = asyncio.create_task(self._forward_events_from_queue(key, queue))
             self._conversation_event_tasks.add(task)
             task.add_done_callback(self._conversation_event_tasks.discard)
-            return queue
 
-    async def _forward_events_from_queue(self, queue: asyncio.Queue[_Event]) -> NoReturn:
+        queue.put_nowait(wrapper)
+        self._event_queue_metrics.enqueued += 1
+
+    async def _forward_events_from_queue(self, key: tuple[str, str], queue: _EventQueue) -> None:
         """
-        De-queues events and makes the call to process_workbench_event.
+        De-queues events, together with the events queued behind them, and makes the calls to process them. Once the
+        queue is empty, the queue is removed and the worker ends; the next event for the conversation starts a new one.
         """
-        while True:
-            try:
-                wrapper = None
-                try:
-                    async with asyncio.timeout(1):
-                        wrapper = await queue.get()
-                except asyncio.TimeoutError:
-                    continue
+        try:
+            while not queue.empty():
+                wrapper = queue.get_nowait()
+                queue.task_done()
 
-                except RuntimeError as e:
+                try:
+                    wrappers = await self._collect_queued_events(queue, [wrapper])
+                    await self._forward_events(wrappers)
+                except Exception:
                     logging.exception("exception in _forward_events_from_queue loop")
-                    if e.args[0] == "Event loop is closed":
-                        break
 
+        finally:
+            # there is no await between the last check for events and the removal, so no event can be left behind
+            if self._conversation_event_queues.get(key) is queue:
+                del self._conversation_event_queues[key]
+
+    async def _collect_queued_events(self, queue: _EventQueue, wrappers: list[_Event]) -> list[_Event]:
+        """
+        Adds the events that are already queued to the batch. When debouncing user messages, and the batch has a
+        message from another participant, also adds the events that arrive until no message from another
+        participant has arrived for the debounce interval, or until the maximum wait after the first one.
+        """
+        coalescing = self.assistant_app.event_coalescing
+        loop = asyncio.get_running_loop()
+        first_message_at: float | None = None
+        last_message_at: float | None = None
+
+        def track(wrapper: _Event) -> None:
+            nonlocal first_message_at, last_message_at
+            if _is_message_from_other_participant(wrapper):
+                last_message_at = loop.time()
+                if first_message_at is None:
+                    first_message_at = last_message_at
+
+        for wrapper in wrappers:
+            track(wrapper)
+
+        while True:
+            while not queue.empty():
+                wrapper = queue.get_nowait()
                 queue.task_done()
+                wrappers.append(wrapper)
+                track(wrapper)
 
-                if wrapper is None:
-                    continue
+            if coalescing.debounce_user_messages_seconds <= 0 or first_message_at is None or last_message_at is None:
+                return wrappers
 
-                assistant_id = wrapper.assistant_id
-                event = wrapper.event
+            deadline = min(
+                last_message_at + coalescing.debounce_user_messages_seconds,
+                first_message_at + coalescing.debounce_user_messages_max_seconds,
+            )
+            try:
+                async with asyncio.timeout_at(deadline):
+                    wrapper = await queue.get()
+            except asyncio.TimeoutError:
+                return wrappers
 
-                asgi_correlation_id.correlation_id.set(event.correlation_id)
+            queue.task_done()
+            wrappers.append(wrapper)
+            track(wrapper)
 
-                conversation_context = self.get_conversation_context(
-                    assistant_id=assistant_id, conversation_id=str(event.conversation_id)
-                )
-                if conversation_context is None:
-                    continue
+    async def _forward_events(self, wrappers: list[_Event]) -> None:
+        if self.assistant_app.event_coalescing.drop_superseded_events:
+            coalesced_wrappers = _drop_superseded_events(wrappers)
+            self._event_queue_metrics.superseded += len(wrappers) - len(coalesced_wrappers)
+            wrappers = coalesced_wrappers
 
-                await self._forward_event(conversation_context, event)
+        conversation_context: ConversationContext | None = None
+        created_events: list[workbench_model.ConversationEvent] = []
+        created_messages: list[workbench_model.ConversationMessage] = []
 
-            except Exception:
-                logging.exception("exception in _forward_events_from_queue loop")
+        for wrapper in wrappers:
+            event = wrapper.event
+
+            self._event_queue_metrics.forwarded += 1
+            self._event_queue_metrics.last_lag_seconds = time.monotonic() - wrapper.enqueued_at
+
+            asgi_correlation_id.correlation_id.set(event.correlation_id)
+
+            conversation_context = self.get_conversation_context(
+                assistant_id=wrapper.assistant_id, conversation_id=str(event.conversation_id)
+            )
+            if conversation_context is None:
+                continue
+
+            created = await self._forward_event(conversation_context, event)
+            if created is not None:
+                created_events.append(created[0])
+                created_messages.append(created[1])
+
+        if conversation_context is None or not created_messages:
+            return
+
+        message_events = self.assistant_app.events.conversation.message
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(
+                message_events._on_created_batch_handlers(True, conversation_context, created_events, created_messages)
+            )
+            for message_type in {message.message_type for message in created_messages}:
+                indexes = [i for i, message in enumerate(created_messages) if message.message_type == message_type]
+                tg.create_task(
+                    message_events[message_type]._on_created_batch_handlers(
+                        True,
+                        conversation_context,
+                        [created_events[i] for i in indexes],
+                        [created_messages[i] for i in indexes],
+                    )
+                )
 
     @translate_assistant_errors
     async def post_conversation_event(
@@ -456,12 +712,15 @@ class AssistantService(FastAPIAssistantService):
         """
         _ = require_found(self.get_conversation_context(assistant_id, conversation_id))
 
-        queue = await self._get_or_create_queue(assistant_id=assistant_id, conversation_id=conversation_id)
-        await queue.put(_Event(assistant_id=assistant_id, event=event))
+        self._enqueue_event(_Event(assistant_id=assistant_id, event=event))
 
     async def _forward_event(
         self, conversation_context: ConversationContext, event: workbench_model.ConversationEvent
-    ) -> None:
+    ) -> tuple[workbench_model.ConversationEvent, workbench_model.ConversationMessage] | None:
+        """
+        Calls the handlers for the event. Returns the event and the message, for a message created by another
+        participant, so that it can be handed to the batch handlers.
+        """
         updated_event = event
 
         content_interceptor = self.assistant_app.content_interceptor
@@ -477,7 +736,7 @@ class AssistantService(FastAPIAssistantService):
                     event.event,
                     content_interceptor.__class__.__name__,
                 )
-                return
+                return None
 
         match updated_event.event:
             case workbench_model.ConversationEventType.message_created:
@@ -501,6 +760,9 @@ class AssistantService(FastAPIAssistantService):
                         )
                     )
 
+                if event_originated_externally:
+                    return updated_event, message
+
             case workbench_model.ConversationEventType.message_deleted:
                 try:
                     message = workbench_model.ConversationMessage.model_validate(updated_event.data.get("message", {}))
@@ -586,6 +848,8 @@ class AssistantService(FastAPIAssistantService):
                     event_originated_externally, conversation_context, updated_event, file
                 )
 
+        return None
+
     @translate_assistant_errors
     async def get_conversation_state_descriptions(
         self, assistant_id: str, conversation_id: str
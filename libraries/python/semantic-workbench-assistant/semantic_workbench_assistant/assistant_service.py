@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import random
+import uuid
 from abc import ABC, abstractmethod
 from contextlib import AsyncExitStack, asynccontextmanager
 from typing import (
@@ -40,7 +41,7 @@ from semantic_workbench_api_model import (
 )
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
-from . import auth, settings
+from . import auth, settings, workbench_client_pool
 
 logger = logging.getLogger(__name__)
 
@@ -97,6 +98,9 @@ class FastAPIAssistantService(ABC):
                     except asyncio.CancelledError:
                         pass
 
+                    # release the pooled connections shared by conversation clients
+                    await workbench_client_pool.aclose()
+
         register_lifespan_handler(lifespan)
 
     async def _periodically_ping_semantic_workbench(
@@ -174,11 +178,7 @@ class FastAPIAssistantService(ABC):
 
     @property
     def workbench_client(self) -> workbench_service_client.WorkbenchServiceClientBuilder:
-        return workbench_service_client.WorkbenchServiceClientBuilder(
-            base_url=str(settings.workbench_service_url),
-            assistant_service_id=self.service_id,
-            api_key=settings.workbench_service_api_key,
-        )
+        return workbench_client_pool.builder_for(self.service_id)
 
     @abstractmethod
     async def get_service_info(self) -> assistant_model.ServiceInfoModel:
@@ -254,6 +254,48 @@ class FastAPIAssistantService(ABC):
     ) -> None:
         pass
 
+    async def post_conversation_events(
+        self,
+        events: list[workbench_model.ConversationEventBatchItem],
+    ) -> workbench_model.ConversationEventBatchResult:
+        """
+        Receives a batch of events for any of the service's assistants and conversations, in order. Events for
+        assistants or conversations that do not exist are skipped. An event that fails does not fail the rest of the
+        batch; it, and the later events of its conversation, are returned as undelivered, so that the sender can
+        deliver them again in order.
+        """
+        result = workbench_model.ConversationEventBatchResult()
+        failed_conversations: set[tuple[str, uuid.UUID]] = set()
+        for index, item in enumerate(events):
+            conversation_key = (item.assistant_id, item.event.conversation_id)
+            if conversation_key in failed_conversations:
+                result.undelivered.append(index)
+                continue
+
+            try:
+                await self.post_conversation_event(item.assistant_id, str(item.event.conversation_id), item.event)
+                continue
+
+            except Exception as e:
+                if isinstance(e, HTTPException) and e.status_code == status.HTTP_404_NOT_FOUND:
+                    logger.debug(
+                        "skipping event for unknown assistant or conversation; assistant_id: %s, conversation_id: %s",
+                        item.assistant_id,
+                        item.event.conversation_id,
+                    )
+                    continue
+
+                logger.exception(
+                    "error receiving event; assistant_id: %s, conversation_id: %s",
+                    item.assistant_id,
+                    item.event.conversation_id,
+                )
+
+            result.undelivered.append(index)
+            failed_conversations.add(conversation_key)
+
+        return result
+
     @abstractmethod
     async def get_conversation_state_descriptions(
         self, assistant_id: str, conversation_id: str
@@ -304,6 +346,15 @@ def _assistant_service_api(
     async def get_service_description() -> assistant_model.ServiceInfoModel:
         return await service.get_service_info()
 
+    @app.post(
+        "/events",
+        description="Notify assistants of a batch of events, across conversations, returning those not delivered",
+    )
+    async def post_conversation_events(
+        request: workbench_model.ConversationEventBatch,
+    ) -> workbench_model.ConversationEventBatchResult:
+        return await service.post_conversation_events(request.events)
+
     @app.put(
         "/{assistant_id}",
         description=(
@@ -18,6 +18,13 @@ class Settings(BaseSettings):
     workbench_service_url: HttpUrl = Url("http://127.0.0.1:3000")
     workbench_service_api_key: str = ""
     workbench_service_ping_interval_seconds: float = 20.0
+    workbench_service_status_debounce_seconds: float = 0.25
+    # streamed messages are only sent as deltas when enabled, as the workbench app does not render them yet; until
+    # then, each delta would cost the workbench service a request and an event that no client uses
+    workbench_service_message_deltas_enabled: bool = False
+    workbench_service_message_delta_interval_seconds: float = 0.05
+
+    assistant_states_flush_delay_seconds: float = 0.1
 
     assistant_service_id: str | None = None
     assistant_service_name: str | None = None
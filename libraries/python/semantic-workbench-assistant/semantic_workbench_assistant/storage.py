@@ -1,6 +1,7 @@
 import logging
 import os
 import pathlib
+import uuid
 from typing import Any, Iterator, TypeVar
 
 from pydantic import BaseModel
@@ -16,13 +17,18 @@ class FileStorageSettings(BaseSettings):
 
 
 def write_model(file_path: os.PathLike, value: BaseModel, serialization_context: dict[str, Any] | None = None) -> None:
-    """Write a pydantic model to a file."""
+    """Write a pydantic model to a file. The file is replaced atomically, so readers never see a partial write."""
     path = pathlib.Path(file_path)
     if not path.parent.exists():
-        path.parent.mkdir(parents=True)
+        path.parent.mkdir(parents=True, exist_ok=True)
 
     data_json = value.model_dump_json(context=serialization_context)
-    path.write_text(data_json, encoding="utf-8")
+    temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        temp_path.write_text(data_json, encoding="utf-8")
+        temp_path.replace(path)
+    finally:
+        temp_path.unlink(missing_ok=True)
 
 
 ModelT = TypeVar("ModelT", bound=BaseModel)
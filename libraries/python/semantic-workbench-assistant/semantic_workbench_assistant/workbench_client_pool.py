@@ -0,0 +1,42 @@
+import logging
+
+from semantic_workbench_api_model.workbench_service_client import WorkbenchServiceClientBuilder
+
+from . import settings
+
+logger = logging.getLogger(__name__)
+
+_builders: dict[tuple[str, str, str], WorkbenchServiceClientBuilder] = {}
+
+
+def builder_for(assistant_service_id: str) -> WorkbenchServiceClientBuilder:
+    """
+    Returns the process-wide client builder for the assistant service, so that all conversation clients share one
+    pooled HTTP client to the Workbench service. Builders are keyed by the current settings, so a change of settings
+    is picked up by a new builder.
+    """
+    base_url = str(settings.workbench_service_url)
+    api_key = settings.workbench_service_api_key
+    key = (base_url, assistant_service_id, api_key)
+
+    builder = _builders.get(key)
+    if builder is None:
+        builder = WorkbenchServiceClientBuilder(
+            base_url=base_url,
+            assistant_service_id=assistant_service_id,
+            api_key=api_key,
+        )
+        _builders[key] = builder
+
+    return builder
+
+
+async def aclose() -> None:
+    """
+    Closes the pooled HTTP clients of all builders. Builders remain usable, and open new clients on next use.
+    """
+    for builder in list(_builders.values()):
+        try:
+            await builder.aclose()
+        except Exception:
+            logger.exception("error closing workbench service client")
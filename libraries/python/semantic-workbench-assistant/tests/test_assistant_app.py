@@ -1,10 +1,12 @@
 import asyncio
 import datetime
 import io
+import json
 import pathlib
 import random
 import shutil
 import tempfile
+import time
 import uuid
 from contextlib import asynccontextmanager
 from typing import IO, AsyncIterator
@@ -15,7 +17,7 @@ import pytest
 import semantic_workbench_api_model
 import semantic_workbench_api_model.assistant_service_client
 from asgi_lifespan import LifespanManager
-from fastapi import HTTPException
+from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from semantic_workbench_api_model import (
     assistant_model,
@@ -23,7 +25,7 @@ from semantic_workbench_api_model import (
     workbench_model,
     workbench_service_client,
 )
-from semantic_workbench_assistant import settings, storage
+from semantic_workbench_assistant import settings, storage, workbench_client_pool
 from semantic_workbench_assistant.assistant_app import (
     AssistantApp,
     AssistantContext,
@@ -32,11 +34,13 @@ from semantic_workbench_assistant.assistant_app import (
     BaseModelAssistantConfig,
     ConflictError,
     ConversationContext,
+    EventCoalescingOptions,
     FileStorageConversationDataExporter,
     NotFoundError,
 )
 from semantic_workbench_assistant.assistant_app.context import storage_directory_for_context
 from semantic_workbench_assistant.assistant_app.service import (
+    AssistantService,
     translate_assistant_errors,
 )
 from semantic_workbench_assistant.config import (
@@ -109,8 +113,10 @@ async def test_assistant_with_event_handlers(
 
     service = app.fastapi_app()
 
-    monkeypatch.setattr(assistant_service_client, "httpx_transport_factory", lambda: httpx.ASGITransport(app=service))
-    monkeypatch.setattr(workbench_service_client, "httpx_transport_factory", lambda: AllOKTransport())
+    monkeypatch.setattr(
+        assistant_service_client, "httpx_transport_factory", lambda **_: httpx.ASGITransport(app=service)
+    )
+    monkeypatch.setattr(workbench_service_client, "httpx_transport_factory", lambda **_: AllOKTransport())
 
     async with LifespanManager(service):
         assistant_id = uuid.uuid4()
@@ -225,6 +231,459 @@ async def test_assistant_with_event_handlers(
         assert message_created_all_calls == 3
 
 
+async def test_assistant_with_batched_events(
+    monkeypatch: pytest.MonkeyPatch, storage_settings: storage.FileStorageSettings
+) -> None:
+    monkeypatch.setattr(settings, "storage", storage_settings)
+
+    app = AssistantApp(
+        assistant_service_id="assistant_id",
+        assistant_service_name="service name",
+        assistant_service_description="service description",
+    )
+
+    received_messages: list[str] = []
+
+    @app.events.conversation.message.on_created
+    async def on_message_created(
+        conversation_context: ConversationContext,
+        _: workbench_model.ConversationEvent,
+        message: workbench_model.ConversationMessage,
+    ) -> None:
+        received_messages.append(message.content)
+
+    service = app.fastapi_app()
+
+    monkeypatch.setattr(
+        assistant_service_client, "httpx_transport_factory", lambda **_: httpx.ASGITransport(app=service)
+    )
+    monkeypatch.setattr(workbench_service_client, "httpx_transport_factory", lambda **_: AllOKTransport())
+
+    async with LifespanManager(service):
+        assistant_id = uuid.uuid4()
+        conversation_id = uuid.uuid4()
+
+        client_builder = assistant_service_client.AssistantServiceClientBuilder("https://fake", "")
+        service_client = client_builder.for_service()
+        instance_client = client_builder.for_assistant(assistant_id)
+
+        await service_client.put_assistant(
+            assistant_id=assistant_id,
+            request=assistant_model.AssistantPutRequestModel(assistant_name="my assistant"),
+            from_export=None,
+        )
+        await instance_client.put_conversation(
+            request=assistant_model.ConversationPutRequestModel(id=str(conversation_id), title="My conversation"),
+            from_export=None,
+        )
+
+        def message_event(conversation_id: uuid.UUID, content: str) -> workbench_model.ConversationEvent:
+            return workbench_model.ConversationEvent(
+                conversation_id=conversation_id,
+                correlation_id="",
+                event=workbench_model.ConversationEventType.message_created,
+                data={
+                    "message": workbench_model.ConversationMessage(
+                        id=uuid.uuid4(),
+                        sender=workbench_model.MessageSender(
+                            participant_role=workbench_model.ParticipantRole.user, participant_id="user"
+                        ),
+                        message_type=workbench_model.MessageType.chat,
+                        timestamp=datetime.datetime.now(),
+                        content_type="text/plain",
+                        content=content,
+                        filenames=[],
+                        metadata={},
+                        has_debug_data=False,
+                    ).model_dump(mode="json")
+                },
+            )
+
+        await service_client.post_conversation_events(
+            workbench_model.ConversationEventBatch(
+                events=[
+                    workbench_model.ConversationEventBatchItem(
+                        assistant_id=str(assistant_id), event=message_event(conversation_id, "first")
+                    ),
+                    # events for unknown conversations are skipped without failing the batch
+                    workbench_model.ConversationEventBatchItem(
+                        assistant_id=str(assistant_id), event=message_event(uuid.uuid4(), "unknown")
+                    ),
+                    workbench_model.ConversationEventBatchItem(
+                        assistant_id=str(assistant_id), event=message_event(conversation_id, "second")
+                    ),
+                ]
+            )
+        )
+
+        assert received_messages == ["first", "second"]
+
+        other_conversation_id = uuid.uuid4()
+        await instance_client.put_conversation(
+            request=assistant_model.ConversationPutRequestModel(id=str(other_conversation_id), title="Other"),
+            from_export=None,
+        )
+
+        post_conversation_event = AssistantService.post_conversation_event
+
+        async def failing_post_conversation_event(
+            self, assistant_id: str, conversation_id: str, event: workbench_model.ConversationEvent
+        ) -> None:
+            if event.data["message"]["content"] == "failing":
+                raise HTTPException(status_code=500, detail="failed")
+            await post_conversation_event(self, assistant_id, conversation_id, event)
+
+        monkeypatch.setattr(AssistantService, "post_conversation_event", failing_post_conversation_event)
+
+        # a failed event does not fail the batch; it, and the later events of its conversation, are undelivered
+        result = await service_client.post_conversation_events(
+            workbench_model.ConversationEventBatch(
+                events=[
+                    workbench_model.ConversationEventBatchItem(
+                        assistant_id=str(assistant_id), event=message_event(conversation_id, "failing")
+                    ),
+                    workbench_model.ConversationEventBatchItem(
+                        assistant_id=str(assistant_id), event=message_event(other_conversation_id, "other")
+                    ),
+                    workbench_model.ConversationEventBatchItem(
+                        assistant_id=str(assistant_id), event=message_event(conversation_id, "after failing")
+                    ),
+                ]
+            )
+        )
+
+        assert result.undelivered == [0, 2]
+        assert received_messages == ["first", "second", "other"]
+
+
+@pytest.mark.parametrize("debounce_user_messages_seconds", [0.0, 0.1])
+async def test_assistant_with_coalesced_events(
+    monkeypatch: pytest.MonkeyPatch,
+    storage_settings: storage.FileStorageSettings,
+    debounce_user_messages_seconds: float,
+) -> None:
+    monkeypatch.setattr(settings, "storage", storage_settings)
+
+    app = AssistantApp(
+        assistant_service_id="assistant_id",
+        assistant_service_name="service name",
+        assistant_service_description="service description",
+        event_coalescing=EventCoalescingOptions(
+            debounce_user_messages_seconds=debounce_user_messages_seconds,
+            debounce_user_messages_max_seconds=debounce_user_messages_seconds * 3,
+        ),
+    )
+
+    received_messages: list[str] = []
+    received_batches: list[list[str]] = []
+    received_batch_times: list[float] = []
+    received_chat_batches: list[list[str]] = []
+    updated_participants: list[str] = []
+    updated_files: list[int] = []
+
+    @app.events.conversation.message.on_created
+    async def on_message_created(
+        conversation_context: ConversationContext,
+        _: workbench_model.ConversationEvent,
+        message: workbench_model.ConversationMessage,
+    ) -> None:
+        received_messages.append(message.content)
+
+    @app.events.conversation.message.on_created_batch
+    async def on_message_created_batch(
+        conversation_context: ConversationContext,
+        _: list[workbench_model.ConversationEvent],
+        messages: list[workbench_model.ConversationMessage],
+    ) -> None:
+        received_batches.append([message.content for message in messages])
+        received_batch_times.append(time.monotonic())
+
+    @app.events.conversation.message.chat.on_created_batch
+    async def on_chat_message_created_batch(
+        conversation_context: ConversationContext,
+        _: list[workbench_model.ConversationEvent],
+        messages: list[workbench_model.ConversationMessage],
+    ) -> None:
+        received_chat_batches.append([message.content for message in messages])
+
+    @app.events.conversation.participant.on_updated
+    async def on_participant_updated(
+        conversation_context: ConversationContext,
+        _: workbench_model.ConversationEvent,
+        participant: workbench_model.ConversationParticipant,
+    ) -> None:
+        updated_participants.append(participant.name)
+
+    @app.events.conversation.file.on_updated
+    async def on_file_updated(
+        conversation_context: ConversationContext,
+        _: workbench_model.ConversationEvent,
+        file: workbench_model.File,
+    ) -> None:
+        updated_files.append(file.current_version)
+
+    service = app.fastapi_app()
+
+    monkeypatch.setattr(
+        assistant_service_client, "httpx_transport_factory", lambda **_: httpx.ASGITransport(app=service)
+    )
+    monkeypatch.setattr(workbench_service_client, "httpx_transport_factory", lambda **_: AllOKTransport())
+
+    async with LifespanManager(service):
+        assistant_id = uuid.uuid4()
+        conversation_id = uuid.uuid4()
+
+        client_builder = assistant_service_client.AssistantServiceClientBuilder("https://fake", "")
+        service_client = client_builder.for_service()
+        instance_client = client_builder.for_assistant(assistant_id)
+
+        await service_client.put_assistant(
+            assistant_id=assistant_id,
+            request=assistant_model.AssistantPutRequestModel(assistant_name="my assistant"),
+            from_export=None,
+        )
+        await instance_client.put_conversation(
+            request=assistant_model.ConversationPutRequestModel(id=str(conversation_id), title="My conversation"),
+            from_export=None,
+        )
+
+        now = datetime.datetime.now()
+
+        def message_event(
+            content: str, message_type: workbench_model.MessageType = workbench_model.MessageType.chat
+        ) -> workbench_model.ConversationEventBatchItem:
+            return workbench_model.ConversationEventBatchItem(
+                assistant_id=str(assistant_id),
+                event=workbench_model.ConversationEvent(
+                    conversation_id=conversation_id,
+                    correlation_id="",
+                    event=workbench_model.ConversationEventType.message_created,
+                    data={
+                        "message": workbench_model.ConversationMessage(
+                            id=uuid.uuid4(),
+                            sender=workbench_model.MessageSender(
+                                participant_role=workbench_model.ParticipantRole.user, participant_id="user"
+                            ),
+                            message_type=message_type,
+                            timestamp=now,
+                            content_type="text/plain",
+                            content=content,
+                            filenames=[],
+                            metadata={},
+                            has_debug_data=False,
+                        ).model_dump(mode="json")
+                    },
+                ),
+            )
+
+        def participant_updated_event(name: str) -> workbench_model.ConversationEventBatchItem:
+            return workbench_model.ConversationEventBatchItem(
+                assistant_id=str(assistant_id),
+                event=workbench_model.ConversationEvent(
+                    conversation_id=conversation_id,
+                    correlation_id="",
+                    event=workbench_model.ConversationEventType.participant_updated,
+                    data={
+                        "participant": workbench_model.ConversationParticipant(
+                            role=workbench_model.ParticipantRole.user,
+                            id="user",
+                            conversation_id=conversation_id,
+                            name=name,
+                            image=None,
+                            status=None,
+                            status_updated_timestamp=now,
+                            active_participant=True,
+                            conversation_permission=workbench_model.ConversationPermission.read_write,
+                            metadata={},
+                        ).model_dump(mode="json")
+                    },
+                ),
+            )
+
+        def file_updated_event(version: int) -> workbench_model.ConversationEventBatchItem:
+            return workbench_model.ConversationEventBatchItem(
+                assistant_id=str(assistant_id),
+                event=workbench_model.ConversationEvent(
+                    conversation_id=conversation_id,
+                    correlation_id="",
+                    event=workbench_model.ConversationEventType.file_updated,
+                    data={
+                        "file": workbench_model.File(
+                            conversation_id=conversation_id,
+                            created_datetime=now,
+                            updated_datetime=now,
+                            filename="file.txt",
+                            current_version=version,
+                            content_type="text/plain",
+                            file_size=1,
+                            participant_id="user",
+                            participant_role=workbench_model.ParticipantRole.user,
+                            metadata={},
+                        ).model_dump(mode="json")
+                    },
+                ),
+            )
+
+        # events that are queued together are coalesced
+        await service_client.post_conversation_events(
+            workbench_model.ConversationEventBatch(
+                events=[
+                    participant_updated_event("first name"),
+                    file_updated_event(1),
+                    message_event("first"),
+                    participant_updated_event("second name"),
+                    file_updated_event(2),
+                    message_event("second"),
+                    message_event("note", workbench_model.MessageType.note),
+                ]
+            )
+        )
+        await asyncio.sleep(0.1 + debounce_user_messages_seconds * 2)
+
+        assert updated_participants == ["second name"]
+        assert updated_files == [2]
+        assert received_messages == ["first", "second", "note"]
+        assert received_batches == [["first", "second", "note"]]
+        assert received_chat_batches == [["first", "second"]]
+
+        # events that are posted separately are batched only when debouncing
+        received_batches.clear()
+        for content in ["third", "fourth"]:
+            await service_client.post_conversation_events(
+                workbench_model.ConversationEventBatch(events=[message_event(content)])
+            )
+
+        await asyncio.sleep(0.1 + debounce_user_messages_seconds * 2)
+
+        assert received_messages == ["first", "second", "note", "third", "fourth"]
+        if debounce_user_messages_seconds:
+            assert received_batches == [["third", "fourth"]]
+        else:
+            assert received_batches == [["third"], ["fourth"]]
+
+        if not debounce_user_messages_seconds:
+            return
+
+        # only messages from other participants extend the wait
+        received_batches.clear()
+        received_batch_times.clear()
+        await service_client.post_conversation_events(
+            workbench_model.ConversationEventBatch(events=[message_event("fifth")])
+        )
+        posted_at = time.monotonic()
+        for index in range(8):
+            await service_client.post_conversation_events(
+                workbench_model.ConversationEventBatch(events=[participant_updated_event(f"name {index}")])
+            )
+            await asyncio.sleep(debounce_user_messages_seconds / 2)
+
+        assert received_batches == [["fifth"]]
+        assert received_batch_times[0] - posted_at < debounce_user_messages_seconds * 2
+
+        # a batch is handled after the maximum wait, even when messages keep arriving
+        received_batches.clear()
+        for index in range(8):
+            await service_client.post_conversation_events(
+                workbench_model.ConversationEventBatch(events=[message_event(f"message {index}")])
+            )
+            await asyncio.sleep(debounce_user_messages_seconds / 2)
+        await asyncio.sleep(0.1 + debounce_user_messages_seconds * 2)
+
+        assert len(received_batches) > 1
+        assert [content for batch in received_batches for content in batch] == [f"message {i}" for i in range(8)]
+
+
+async def test_assistant_service_reclaims_idle_event_queues(
+    monkeypatch: pytest.MonkeyPatch, storage_settings: storage.FileStorageSettings
+) -> None:
+    monkeypatch.setattr(settings, "storage", storage_settings)
+    monkeypatch.setattr(workbench_service_client, "httpx_transport_factory", lambda **_: AllOKTransport())
+
+    app = AssistantApp(
+        assistant_service_id="assistant_id",
+        assistant_service_name="service name",
+        assistant_service_description="service description",
+        content_interceptor=None,
+    )
+
+    handled = asyncio.Event()
+    release = asyncio.Event()
+    received_messages: list[str] = []
+
+    @app.events.conversation.message.on_created
+    async def on_message_created(
+        conversation_context: ConversationContext,
+        _: workbench_model.ConversationEvent,
+        message: workbench_model.ConversationMessage,
+    ) -> None:
+        received_messages.append(message.content)
+        handled.set()
+        await release.wait()
+
+    service = AssistantService(assistant_app=app, register_lifespan_handler=lambda _: None)
+
+    async with service.lifespan():
+        assistant_id = str(uuid.uuid4())
+        conversation_id = uuid.uuid4()
+        await service.put_assistant(
+            assistant_id, assistant_model.AssistantPutRequestModel(assistant_name="my assistant")
+        )
+        await service.put_conversation(
+            assistant_id,
+            str(conversation_id),
+            assistant_model.ConversationPutRequestModel(id=str(conversation_id), title="My conversation"),
+        )
+
+        def message_event(content: str) -> workbench_model.ConversationEvent:
+            return workbench_model.ConversationEvent(
+                conversation_id=conversation_id,
+                correlation_id="",
+                event=workbench_model.ConversationEventType.message_created,
+                data={
+                    "message": workbench_model.ConversationMessage(
+                        id=uuid.uuid4(),
+                        sender=workbench_model.MessageSender(
+                            participant_role=workbench_model.ParticipantRole.user, participant_id="user"
+                        ),
+                        message_type=workbench_model.MessageType.chat,
+                        timestamp=datetime.datetime.now(),
+                        content_type="text/plain",
+                        content=content,
+                        filenames=[],
+                        metadata={},
+                        has_debug_data=False,
+                    ).model_dump(mode="json")
+                },
+            )
+
+        await service.post_conversation_event(assistant_id, str(conversation_id), message_event("first"))
+        await handled.wait()
+        await service.post_conversation_event(assistant_id, str(conversation_id), message_event("second"))
+
+        metrics = service.event_queue_metrics
+        assert metrics.enqueued == 2
+        assert metrics.forwarded == 1
+        assert metrics.active_queues == 1
+        assert metrics.queue_depth == 1
+        assert metrics.oldest_queued_seconds >= 0
+
+        release.set()
+        await asyncio.wait_for(asyncio.gather(*service._conversation_event_tasks), timeout=5)
+
+        # the worker ends with its queue, and the next event starts a new one
+        assert received_messages == ["first", "second"]
+        metrics = service.event_queue_metrics
+        assert metrics.forwarded == 2
+        assert metrics.active_queues == 0
+        assert metrics.queue_depth == 0
+
+        await service.post_conversation_event(assistant_id, str(conversation_id), message_event("third"))
+        await asyncio.wait_for(asyncio.gather(*service._conversation_event_tasks), timeout=5)
+
+        assert received_messages == ["first", "second", "third"]
+        assert service.event_queue_metrics.active_queues == 0
+
+
 async def test_assistant_with_inspector(
     monkeypatch: pytest.MonkeyPatch, storage_settings: storage.FileStorageSettings
 ) -> None:
@@ -250,8 +709,10 @@ async def test_assistant_with_inspector(
 
     service = app.fastapi_app()
 
-    monkeypatch.setattr(assistant_service_client, "httpx_transport_factory", lambda: httpx.ASGITransport(app=service))
-    monkeypatch.setattr(workbench_service_client, "httpx_transport_factory", lambda: AllOKTransport())
+    monkeypatch.setattr(
+        assistant_service_client, "httpx_transport_factory", lambda **_: httpx.ASGITransport(app=service)
+    )
+    monkeypatch.setattr(workbench_service_client, "httpx_transport_factory", lambda **_: AllOKTransport())
 
     async with LifespanManager(service):
         assistant_id = uuid.uuid4()
@@ -321,8 +782,10 @@ async def test_assistant_with_state_exporter(
 
     service = app.fastapi_app()
 
-    monkeypatch.setattr(assistant_service_client, "httpx_transport_factory", lambda: httpx.ASGITransport(app=service))
-    monkeypatch.setattr(workbench_service_client, "httpx_transport_factory", lambda: AllOKTransport())
+    monkeypatch.setattr(
+        assistant_service_client, "httpx_transport_factory", lambda **_: httpx.ASGITransport(app=service)
+    )
+    monkeypatch.setattr(workbench_service_client, "httpx_transport_factory", lambda **_: AllOKTransport())
 
     async with LifespanManager(service):
         assistant_id = uuid.uuid4()
@@ -400,8 +863,10 @@ async def test_assistant_with_config_provider(
 
     service = app.fastapi_app()
 
-    monkeypatch.setattr(assistant_service_client, "httpx_transport_factory", lambda: httpx.ASGITransport(app=service))
-    monkeypatch.setattr(workbench_service_client, "httpx_transport_factory", lambda: AllOKTransport())
+    monkeypatch.setattr(
+        assistant_service_client, "httpx_transport_factory", lambda **_: httpx.ASGITransport(app=service)
+    )
+    monkeypatch.setattr(workbench_service_client, "httpx_transport_factory", lambda **_: AllOKTransport())
 
     async with LifespanManager(service):
         assistant_id = uuid.uuid4()
@@ -498,6 +963,133 @@ async def test_assistant_with_config_provider(
         assert e.value.status_code == 400
 
 
+async def test_base_model_assistant_config_cache(
+    monkeypatch: pytest.MonkeyPatch, storage_settings: storage.FileStorageSettings
+) -> None:
+    monkeypatch.setattr(settings, "storage", storage_settings)
+
+    class TestConfigModel(BaseModel):
+        test_key: str = "test_value"
+
+    assistant_config = BaseModelAssistantConfig(TestConfigModel)
+    assistant_context = AssistantContext(_assistant_service_id="", id=str(uuid.uuid4()), name="my assistant")
+
+    subscriber_calls: list[TestConfigModel] = []
+
+    async def subscriber(context: AssistantContext, config: TestConfigModel) -> None:
+        subscriber_calls.append(config)
+
+    unsubscribe = assistant_config.subscribe(subscriber)
+
+    # the default config is cached until a config is imported
+    config = await assistant_config.get(assistant_context)
+    assert config.test_key == "test_value"
+    assert await assistant_config.get(assistant_context) is config
+
+    export_import_path = storage_directory_for_context(assistant_context) / "config.json"
+    storage.write_model(export_import_path, TestConfigModel(test_key="imported_value"))
+    config = await assistant_config.get(assistant_context)
+    assert config.test_key == "imported_value"
+
+    # a config that is set is shared with all callers, without reading the file
+    await assistant_config.provider.set(assistant_context, {"test_key": "updated_value"})
+    assert [config.test_key for config in subscriber_calls] == ["updated_value"]
+
+    with mock.patch("semantic_workbench_assistant.assistant_app.config.read_model") as read_model:
+        config = await assistant_config.get(assistant_context)
+        assert config.test_key == "updated_value"
+        assert await assistant_config.get(assistant_context) is config
+        read_model.assert_not_called()
+
+    unsubscribe()
+    await assistant_config.provider.set(assistant_context, {"test_key": "final_value"})
+    assert [config.test_key for config in subscriber_calls] == ["updated_value"]
+    assert (await assistant_config.get(assistant_context)).test_key == "final_value"
+
+
+async def test_assistant_states_persistence(
+    monkeypatch: pytest.MonkeyPatch, storage_settings: storage.FileStorageSettings
+) -> None:
+    monkeypatch.setattr(settings, "storage", storage_settings)
+    monkeypatch.setattr(workbench_service_client, "httpx_transport_factory", lambda **_: AllOKTransport())
+
+    # states written by earlier versions, in a single file, are migrated
+    legacy_assistant_id = uuid.uuid4()
+    legacy_conversation_id = uuid.uuid4()
+    legacy_states_path = pathlib.Path(storage_settings.root) / "assistant_states.json"
+    legacy_states_path.write_text(
+        json.dumps({
+            "assistants": {
+                str(legacy_assistant_id): {
+                    "assistant_id": str(legacy_assistant_id),
+                    "assistant_name": "legacy assistant",
+                    "conversations": {
+                        str(legacy_conversation_id): {
+                            "conversation_id": str(legacy_conversation_id),
+                            "title": "legacy conversation",
+                        },
+                    },
+                },
+            },
+        })
+    )
+
+    assistant_id = uuid.uuid4()
+    conversation_ids = [uuid.uuid4() for _ in range(3)]
+
+    def build_service() -> tuple[FastAPI, assistant_service_client.AssistantServiceClientBuilder]:
+        app = AssistantApp(
+            assistant_service_id="assistant_id",
+            assistant_service_name="service name",
+            assistant_service_description="service description",
+        )
+        service = app.fastapi_app()
+        monkeypatch.setattr(
+            assistant_service_client, "httpx_transport_factory", lambda **_: httpx.ASGITransport(app=service)
+        )
+        return service, assistant_service_client.AssistantServiceClientBuilder("https://fake", "")
+
+    service, client_builder = build_service()
+    instance_client = client_builder.for_assistant(assistant_id)
+    async with LifespanManager(service):
+        await client_builder.for_service().put_assistant(
+            assistant_id=assistant_id,
+            request=assistant_model.AssistantPutRequestModel(assistant_name="my assistant"),
+            from_export=None,
+        )
+        for conversation_id in conversation_ids:
+            await instance_client.put_conversation(
+                request=assistant_model.ConversationPutRequestModel(id=str(conversation_id), title="My conversation"),
+                from_export=None,
+            )
+        await instance_client.delete_conversation(conversation_ids[0])
+
+        # the index is authoritative; the migrated states are served without the legacy file
+        assert not legacy_states_path.exists()
+        await client_builder.for_assistant(legacy_assistant_id).get_state_descriptions(legacy_conversation_id)
+
+    # each assistant has its own file, written no later than shutdown
+    states_path = pathlib.Path(storage_settings.root) / "assistant_states"
+    assert sorted(path.name for path in states_path.iterdir()) == sorted([
+        f"{assistant_id}.json",
+        f"{legacy_assistant_id}.json",
+    ])
+
+    service, client_builder = build_service()
+    instance_client = client_builder.for_assistant(assistant_id)
+    async with LifespanManager(service):
+        with pytest.raises(assistant_service_client.AssistantResponseError) as e:
+            await instance_client.get_state_descriptions(conversation_ids[0])
+        assert e.value.status_code == 404
+
+        for conversation_id in conversation_ids[1:]:
+            await instance_client.get_state_descriptions(conversation_id)
+
+        await client_builder.for_service().delete_assistant(legacy_assistant_id)
+
+    assert sorted(path.name for path in states_path.iterdir()) == [f"{assistant_id}.json"]
+
+
 async def test_file_system_storage_state_data_provider_to_empty_dir(
     storage_settings: storage.FileStorageSettings, monkeypatch: pytest.MonkeyPatch
 ) -> None:
@@ -645,3 +1237,252 @@ async def test_translate_assistant_errors(
 
     if isinstance(exc_info.value, HTTPException):
         assert exc_info.value.status_code == expected_status_code
+
+
+async def test_conversation_contexts_share_workbench_client(monkeypatch: pytest.MonkeyPatch) -> None:
+    requests: list[httpx.Request] = []
+    transports: list[httpx.AsyncBaseTransport] = []
+    transport_limits: list[httpx.Limits | None] = []
+
+    class RecordingTransport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(200, json={"files": []})
+
+    def transport_factory(limits: httpx.Limits | None = None) -> httpx.AsyncBaseTransport:
+        transport = RecordingTransport()
+        transports.append(transport)
+        transport_limits.append(limits)
+        return transport
+
+    monkeypatch.setattr(workbench_service_client, "httpx_transport_factory", transport_factory)
+
+    assistant_ids = [str(uuid.uuid4()), str(uuid.uuid4())]
+    contexts = [
+        ConversationContext(
+            id=str(uuid.uuid4()),
+            title="conversation",
+            assistant=AssistantContext(id=assistant_id, name="assistant", _assistant_service_id="pooled-service"),
+        )
+        for assistant_id in assistant_ids
+    ]
+
+    try:
+        for context in contexts:
+            await context.get_files()
+            await context.get_files()
+
+        # one HTTP client, and connection pool, is shared by all conversation clients
+        assert len(transports) == 1
+        # the pool limits are applied to the transport, as the client ignores them when given a transport
+        assert transport_limits == [httpx.Limits()]
+        assert [request.headers[workbench_service_client.HEADER_ASSISTANT_ID] for request in requests] == [
+            assistant_ids[0],
+            assistant_ids[0],
+            assistant_ids[1],
+            assistant_ids[1],
+        ]
+        assert all(
+            request.headers[workbench_service_client.HEADER_ASSISTANT_SERVICE_ID] == "pooled-service"
+            for request in requests
+        )
+
+    finally:
+        await workbench_client_pool.aclose()
+
+    # a new client is opened on use after the pool is closed
+    await contexts[0].get_files()
+    assert len(transports) == 2
+    await workbench_client_pool.aclose()
+
+
+async def test_conversation_context_debounces_status_updates(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "workbench_service_status_debounce_seconds", 0.05)
+
+    conversation_id = uuid.uuid4()
+    assistant_id = str(uuid.uuid4())
+    requests: list[httpx.Request] = []
+
+    class RecordingTransport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request) -> httpx.Response:
+            await request.aread()
+            requests.append(request)
+            if request.method == "PATCH":
+                participant = workbench_model.ConversationParticipant(
+                    role=workbench_model.ParticipantRole.assistant,
+                    id=assistant_id,
+                    conversation_id=conversation_id,
+                    name="assistant",
+                    image=None,
+                    status=json.loads(request.content).get("status"),
+                    status_updated_timestamp=datetime.datetime.now(datetime.UTC),
+                    active_participant=True,
+                    conversation_permission=workbench_model.ConversationPermission.read_write,
+                    metadata={},
+                )
+                return httpx.Response(200, json=participant.model_dump(mode="json"))
+            return httpx.Response(200, json={"messages": []})
+
+    monkeypatch.setattr(workbench_service_client, "httpx_transport_factory", lambda **_: RecordingTransport())
+
+    context = ConversationContext(
+        id=str(conversation_id),
+        title="conversation",
+        assistant=AssistantContext(id=assistant_id, name="assistant", _assistant_service_id="debounce-service"),
+    )
+
+    try:
+        # a status that is replaced within the debounce interval is not sent
+        async with context.set_status("short-lived"):
+            pass
+        await asyncio.sleep(0.1)
+        assert [(request.method, json.loads(request.content)) for request in requests] == [
+            # only the final status, clearing the status, is sent
+            ("PATCH", {}),
+        ]
+
+        # a pending status is sent with the messages
+        requests.clear()
+        async with context.set_status("thinking..."):
+            await context.send_messages(workbench_model.NewConversationMessage(content="hello"))
+            await asyncio.sleep(0.1)
+            assert [(request.method, request.url.path) for request in requests] == [
+                ("POST", f"/conversations/{conversation_id}/messages/batch"),
+            ]
+            assert json.loads(requests[0].content)["update_participant"]["status"] == "thinking..."
+
+        await context.flush_status()
+        assert [(request.method, request.url.path) for request in requests] == [
+            ("POST", f"/conversations/{conversation_id}/messages/batch"),
+            ("PATCH", f"/conversations/{conversation_id}/participants/me"),
+        ]
+
+    finally:
+        await workbench_client_pool.aclose()
+
+
+async def test_conversation_context_restores_status_of_enclosing_scope(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "workbench_service_status_debounce_seconds", 60)
+
+    conversation_id = uuid.uuid4()
+    assistant_id = str(uuid.uuid4())
+    statuses: list[str | None] = []
+
+    class RecordingTransport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request) -> httpx.Response:
+            await request.aread()
+            statuses.append(json.loads(request.content).get("status"))
+            participant = workbench_model.ConversationParticipant(
+                role=workbench_model.ParticipantRole.assistant,
+                id=assistant_id,
+                conversation_id=conversation_id,
+                name="assistant",
+                image=None,
+                status=statuses[-1],
+                status_updated_timestamp=datetime.datetime.now(datetime.UTC),
+                active_participant=True,
+                conversation_permission=workbench_model.ConversationPermission.read_write,
+                metadata={},
+            )
+            return httpx.Response(200, json=participant.model_dump(mode="json"))
+
+    monkeypatch.setattr(workbench_service_client, "httpx_transport_factory", lambda **_: RecordingTransport())
+
+    context = ConversationContext(
+        id=str(conversation_id),
+        title="conversation",
+        assistant=AssistantContext(id=assistant_id, name="assistant", _assistant_service_id="status-service"),
+    )
+
+    try:
+        async with context.set_status("outer"):
+            async with context.set_status("inner"):
+                await context.flush_status()
+            await context.flush_status()
+        await context.flush_status()
+
+        # a later scope restores no status, rather than the status of the last scope that was entered
+        async with context.set_status("next"):
+            await context.flush_status()
+        await context.flush_status()
+
+        assert statuses == ["inner", "outer", None, "next", None]
+
+    finally:
+        if context._status_flush_task is not None:
+            context._status_flush_task.cancel()
+        await workbench_client_pool.aclose()
+
+
+async def test_conversation_context_streams_message(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "workbench_service_message_deltas_enabled", True)
+    monkeypatch.setattr(settings, "workbench_service_message_delta_interval_seconds", 60)
+
+    conversation_id = uuid.uuid4()
+    assistant_id = str(uuid.uuid4())
+    requests: list[httpx.Request] = []
+
+    class RecordingTransport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request) -> httpx.Response:
+            await request.aread()
+            requests.append(request)
+            if request.url.path.endswith("/deltas"):
+                return httpx.Response(204)
+            new_message = workbench_model.NewConversationMessage.model_validate_json(request.content)
+            message = workbench_model.ConversationMessage(
+                id=new_message.id or uuid.uuid4(),
+                sender=workbench_model.MessageSender(
+                    participant_role=workbench_model.ParticipantRole.assistant, participant_id=assistant_id
+                ),
+                timestamp=datetime.datetime.now(datetime.UTC),
+                content_type=new_message.content_type,
+                content=new_message.content,
+                filenames=[],
+                metadata={},
+                has_debug_data=False,
+            )
+            return httpx.Response(200, json=message.model_dump(mode="json"))
+
+    monkeypatch.setattr(workbench_service_client, "httpx_transport_factory", lambda **_: RecordingTransport())
+
+    context = ConversationContext(
+        id=str(conversation_id),
+        title="conversation",
+        assistant=AssistantContext(id=assistant_id, name="assistant", _assistant_service_id="stream-service"),
+    )
+
+    try:
+        message_stream = context.stream_message()
+
+        # the first content is sent immediately, and the rest once per interval
+        for chunk in ["Hello", ",", " world"]:
+            await message_stream.append(chunk)
+        await message_stream.flush()
+
+        message_list = await message_stream.finalize()
+
+        assert [(request.method, request.url.path) for request in requests] == [
+            ("POST", f"/conversations/{conversation_id}/messages/{message_stream.id}/deltas"),
+            ("POST", f"/conversations/{conversation_id}/messages/{message_stream.id}/deltas"),
+            ("POST", f"/conversations/{conversation_id}/messages"),
+        ]
+        assert [json.loads(request.content)["content"] for request in requests] == [
+            "Hello",
+            ", world",
+            "Hello, world",
+        ]
+        assert message_list.messages[0].id == message_stream.id
+
+        # without deltas, only the finalized message is sent
+        monkeypatch.setattr(settings, "workbench_service_message_deltas_enabled", False)
+        requests.clear()
+        message_stream = context.stream_message()
+        await message_stream.append("Hello")
+        await message_stream.flush()
+        await message_stream.finalize()
+        assert [(request.method, request.url.path) for request in requests] == [
+            ("POST", f"/conversations/{conversation_id}/messages"),
+        ]
+
+    finally:
+        await workbench_client_pool.aclose()
@@ -11,11 +11,8 @@ from openai.types.chat.completion_create_params import (
 from openai_client.chat_driver import (
     ChatDriver,
     ChatDriverConfig,
-    LocalMessageHistoryProvider,
-    LocalMessageHistoryProviderConfig,
 )
 from openai_client.completion import TEXT_RESPONSE_FORMAT
-from openai_client.messages import format_with_liquid
 
 from skill_library.routine_stack import RoutineStack
 
@@ -203,10 +200,6 @@ class Assistant:
             "and arguments."
             "Available routines: {routines}. "
         )
-        if chat_driver_config.message_provider is None:
-            chat_driver_config.message_provider = LocalMessageHistoryProvider(
-                LocalMessageHistoryProviderConfig(session_id=self.assistant_id, formatter=format_with_liquid)
-            )
         chat_functions = ChatFunctions(self)
         config.commands = chat_functions.list_functions()
         config.functions = [chat_functions.list_actions, chat_functions.list_routines]
@@ -89,13 +89,19 @@ export const AssistantInspector: React.FC<AssistantInspectorProps> = (props) =>
         [assistantId, stateDescription.id, conversationId, refetchState],
     );
 
+    const handleResetEvent = React.useCallback(() => {
+        refetchState();
+    }, [refetchState]);
+
     React.useEffect(() => {
         workbenchConversationEvents.addEventListener('assistant.state.updated', handleEvent);
+        workbenchConversationEvents.addEventListener('conversation.reset', handleResetEvent);
 
         return () => {
             workbenchConversationEvents.removeEventListener('assistant.state.updated', handleEvent);
+            workbenchConversationEvents.removeEventListener('conversation.reset', handleResetEvent);
         };
-    }, [handleEvent]);
+    }, [handleEvent, handleResetEvent]);
 
     React.useEffect(() => {
         if (isFetchingState) return;
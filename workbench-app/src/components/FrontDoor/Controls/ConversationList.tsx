@@ -85,6 +85,7 @@ export const ConversationList: React.FC<ConversationListProps> = (props) => {
         workbenchUserEvents.addEventListener('conversation.updated', conversationHandler);
         workbenchUserEvents.addEventListener('participant.created', conversationHandler);
         workbenchUserEvents.addEventListener('participant.updated', conversationHandler);
+        workbenchUserEvents.addEventListener('conversation.reset', conversationHandler);
 
         return () => {
             // remove event listeners
@@ -93,6 +94,7 @@ export const ConversationList: React.FC<ConversationListProps> = (props) => {
             workbenchUserEvents.removeEventListener('conversation.updated', conversationHandler);
             workbenchUserEvents.removeEventListener('participant.created', conversationHandler);
             workbenchUserEvents.removeEventListener('participant.updated', conversationHandler);
+            workbenchUserEvents.removeEventListener('conversation.reset', conversationHandler);
         };
     }, [conversationsLoading, conversationsUninitialized, environment.url, refetchConversations]);
 
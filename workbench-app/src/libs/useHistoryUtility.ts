@@ -23,11 +23,13 @@ export const useHistoryUtility = (conversationId: string) => {
         data: conversation,
         error: conversationError,
         isLoading: conversationIsLoading,
+        refetch: conversationRefetch,
     } = useGetConversationQuery(conversationId, { refetchOnMountOrArgChange: true });
     const {
         data: allConversationMessages,
         error: allConversationMessagesError,
         isLoading: allConversationMessagesIsLoading,
+        refetch: allConversationMessagesRefetch,
     } = useGetAllConversationMessagesQuery({
         conversationId,
         limit: Constants.app.maxMessagesPerRequest,
@@ -36,6 +38,7 @@ export const useHistoryUtility = (conversationId: string) => {
         data: conversationParticipants,
         error: conversationParticipantsError,
         isLoading: conversationParticipantsIsLoading,
+        refetch: conversationParticipantsRefetch,
     } = useGetConversationParticipantsQuery(conversationId);
     const {
         data: assistants,
@@ -47,6 +50,7 @@ export const useHistoryUtility = (conversationId: string) => {
         data: conversationFiles,
         error: conversationFilesError,
         isLoading: conversationFilesIsLoading,
+        refetch: conversationFilesRefetch,
     } = useGetConversationFilesQuery(conversationId);
 
     const { data: assistantCapabilities, isFetching: assistantCapabilitiesIsFetching } = useGetAssistantCapabilities(
@@ -141,12 +145,28 @@ export const useHistoryUtility = (conversationId: string) => {
         [dispatch, conversationId, conversationParticipants],
     );
 
+    // handler for when events were missed and cannot be delivered, so the conversation is refetched
+    const onReset = React.useCallback(() => {
+        conversationRefetch();
+        allConversationMessagesRefetch();
+        conversationParticipantsRefetch();
+        assistantsRefetch();
+        conversationFilesRefetch();
+    }, [
+        conversationRefetch,
+        allConversationMessagesRefetch,
+        conversationParticipantsRefetch,
+        assistantsRefetch,
+        conversationFilesRefetch,
+    ]);
+
     // subscribe to conversation events
     useConversationEvents(conversationId, {
         onMessageCreated,
         onMessageDeleted,
         onParticipantCreated,
         onParticipantUpdated,
+        onReset,
     });
 
     // endregion
@@ -0,0 +1,30 @@
+"""index conversationmessage conversation_id sequence
+
+Revision ID: 15fba1494cac
+Revises: a106de176394
+Create Date: 2026-10-18 10:15:12.418226
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "15fba1494cac"
+down_revision: Union[str, None] = "a106de176394"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_conversationmessage_conversation_id_sequence",
+        "conversationmessage",
+        ["conversation_id", "sequence"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_conversationmessage_conversation_id_sequence", table_name="conversationmessage")
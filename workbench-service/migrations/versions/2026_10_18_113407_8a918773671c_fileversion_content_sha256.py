@@ -0,0 +1,31 @@
+"""fileversion content_sha256
+
+Revision ID: 8a918773671c
+Revises: 15fba1494cac
+Create Date: 2026-10-18 11:34:07.520913
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8a918773671c"
+down_revision: Union[str, None] = "15fba1494cac"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("fileversion") as batch_op:
+        batch_op.add_column(sa.Column("content_sha256", sqlmodel.AutoString(), nullable=True))
+        batch_op.create_index(op.f("ix_fileversion_content_sha256"), ["content_sha256"], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("fileversion") as batch_op:
+        batch_op.drop_index(op.f("ix_fileversion_content_sha256"))
+        batch_op.drop_column("content_sha256")
@@ -1,6 +1,9 @@
+from typing import Literal
+
 from pydantic import HttpUrl
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from .event import SlowConsumerPolicy
 from .files import StorageSettings
 from .logging_config import LoggingSettings
 
@@ -13,6 +16,14 @@ class DBSettings(BaseSettings):
     alembic_config_path: str = "./alembic.ini"
 
 
+class EventBusSettings(BaseSettings):
+    # "postgresql" fans events out to every node through LISTEN/NOTIFY on the database configured in DBSettings
+    backend: Literal["in_memory", "postgresql"] = "in_memory"
+    postgresql_channel: str = "workbench_conversation_events"
+    postgresql_publish_pool_size: int = 2
+    postgresql_reconnect_interval_seconds: float = 5.0
+
+
 class ApiKeySettings(BaseSettings):
     key_vault_url: HttpUrl | None = None
 
@@ -37,6 +48,40 @@ class WebServiceSettings(BaseSettings):
 
     assistant_service_online_check_interval_seconds: float = 10.0
 
+    # conversation to assistant routing is cached, and invalidated by participant events; the ttl is a backstop
+    assistant_routing_cache_max_conversations: int = 10_000
+    assistant_routing_cache_ttl_seconds: float = 60.0
+
+    # one HTTP client, with a connection pool of these limits, is shared by all assistants of an assistant service;
+    # HTTP/2 requires the h2 package
+    assistant_service_http_max_connections: int = 100
+    assistant_service_http_max_keepalive_connections: int = 20
+    assistant_service_http_keepalive_expiry_seconds: float = 30.0
+    assistant_service_http2: bool = False
+    assistant_service_client_idle_timeout_seconds: float = 600.0
+
+    # events queued for an assistant service are delivered in batches of up to this many events
+    assistant_event_batch_max_size: int = 100
+    # events that an assistant service did not accept are delivered again, after the delay, up to this many attempts
+    assistant_event_max_delivery_attempts: int = 3
+    assistant_event_retry_delay_seconds: float = 1.0
+
+    # recent events retained per conversation for SSE clients that reconnect with a Last-Event-ID
+    sse_replay_buffer_events_per_conversation: int = 200
+    sse_replay_buffer_max_conversations: int = 1_000
+
+    # events queued per SSE subscriber, and what to do when a subscriber falls that far behind; by default it is
+    # disconnected, and resumes from the replay buffer when it reconnects, so that no event is lost
+    sse_queue_max_size: int = 100
+    sse_slow_consumer_policy: SlowConsumerPolicy = SlowConsumerPolicy.disconnect
+
+    @property
+    def sse_subscriber_queue_max_size(self) -> int:
+        # a subscriber that falls behind, and reconnects with the Last-Event-ID of the last event it received, can
+        # only resume if that event is still in the replay buffer, behind the events queued for it and the event
+        # that disconnected it; the default leaves room for the events published while it reconnects
+        return max(min(self.sse_queue_max_size, self.sse_replay_buffer_events_per_conversation - 2), 1)
+
 
 class WorkflowSettings(BaseSettings):
     model_config = SettingsConfigDict(env_prefix="workflow__", env_nested_delimiter="_", env_file=".env", extra="allow")
@@ -61,6 +106,7 @@ class Settings(BaseSettings):
     )
 
     db: DBSettings = DBSettings()
+    event_bus: EventBusSettings = EventBusSettings()
     storage: StorageSettings = StorageSettings()
     logging: LoggingSettings = LoggingSettings()
     service: WebServiceSettings = WebServiceSettings()
@@ -1,5 +1,6 @@
 from . import participant, user
 from .assistant import AssistantController
+from .assistant_routing_table import AssistantRoutingTable
 from .assistant_service_client_pool import AssistantServiceClientPool
 from .assistant_service_registration import AssistantServiceRegistrationController
 from .conversation import ConversationController
@@ -16,6 +17,7 @@ from .user import UserController
 
 __all__ = [
     "AssistantController",
+    "AssistantRoutingTable",
     "AssistantServiceRegistrationController",
     "AssistantServiceClientPool",
     "ConversationController",
@@ -2,14 +2,13 @@ import asyncio
 import datetime
 import io
 import logging
-import pathlib
 import re
 import shutil
-import tempfile
 import uuid
 import zipfile
-from typing import IO, AsyncContextManager, Awaitable, BinaryIO, Callable, NamedTuple
+from typing import IO, AsyncContextManager, AsyncGenerator, AsyncIterator, Awaitable, BinaryIO, Callable, NamedTuple
 
+import cachetools
 import httpx
 from semantic_workbench_api_model.assistant_model import (
     AssistantPutRequestModel,
@@ -28,13 +27,14 @@ from semantic_workbench_api_model.workbench_model import (
     AssistantList,
     AssistantStateEvent,
     ConversationEvent,
+    ConversationEventBatch,
+    ConversationEventBatchItem,
     ConversationEventType,
     ConversationImportResult,
     NewAssistant,
     NewConversation,
     UpdateAssistant,
 )
-from sqlalchemy.orm import joinedload
 from sqlmodel import col, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
@@ -43,6 +43,7 @@ from ..event import ConversationEventQueueItem
 from . import convert, exceptions, export_import
 from . import participant as participant_
 from . import user as user_
+from .assistant_routing_table import AssistantRoutingTable
 from .assistant_service_client_pool import AssistantServiceClientPool
 
 logger = logging.getLogger(__name__)
@@ -50,7 +51,7 @@ logger = logging.getLogger(__name__)
 
 ExportResult = NamedTuple(
     "ExportResult",
-    [("file_path", str), ("content_type", str), ("filename", str), ("cleanup", Callable[[], None])],
+    [("stream", AsyncIterator[bytes]), ("content_type", str), ("filename", str)],
 )
 
 
@@ -60,12 +61,17 @@ class AssistantController:
         get_session: Callable[[], AsyncContextManager[AsyncSession]],
         notify_event: Callable[[ConversationEventQueueItem], Awaitable],
         client_pool: AssistantServiceClientPool,
+        routing_table: AssistantRoutingTable,
         file_storage: files.Storage,
     ) -> None:
         self._get_session = get_session
         self._notify_event = notify_event
         self._client_pool = client_pool
+        self._routing_table = routing_table
         self._file_storage = file_storage
+        # assistant services that do not support batched event delivery; rechecked after the ttl, in case the
+        # service is upgraded
+        self._batch_unsupported_services: cachetools.TTLCache[str, bool] = cachetools.TTLCache(maxsize=1_000, ttl=300)
 
     async def _ensure_assistant(
         self,
@@ -129,14 +135,14 @@ class AssistantController:
         )
 
     async def forward_event_to_assistant(self, assistant_id: uuid.UUID, event: ConversationEvent) -> None:
-        async with self._get_session() as session:
-            assistant = (
-                await session.exec(
-                    select(db.Assistant)
-                    .where(db.Assistant.assistant_id == assistant_id)
-                    .options(joinedload(db.Assistant.related_assistant_service_registration, innerjoin=True))
-                )
-            ).one()
+        assistant = await self._routing_table.get_assistant(assistant_id)
+        if assistant is None:
+            logger.info(
+                "not forwarding event to assistant that no longer exists; assistant_id: %s, conversation_id: %s",
+                assistant_id,
+                event.conversation_id,
+            )
+            return
 
         try:
             await (await self._client_pool.assistant_client(assistant)).post_conversation_event(event=event)
@@ -149,6 +155,84 @@ class AssistantController:
                     event,
                 )
 
+    async def forward_events_to_assistant_service(
+        self, assistant_service_id: str, events: list[tuple[uuid.UUID, ConversationEvent]]
+    ) -> list[int]:
+        """
+        Forwards events for the assistants of a single assistant service in one request, preserving their order.
+        Returns the indexes of the events that were not delivered, so that they can be forwarded again; after an
+        event fails, the later events of its conversation are not delivered either. Falls back to forwarding the
+        events one at a time to assistant services that do not support batches. Events for assistants that no longer
+        exist are skipped.
+        """
+        if not events:
+            return []
+
+        if assistant_service_id not in self._batch_unsupported_services:
+            assistants: dict[uuid.UUID, db.Assistant | None] = {}
+            for assistant_id, _ in events:
+                if assistant_id not in assistants:
+                    assistants[assistant_id] = await self._routing_table.get_assistant(assistant_id)
+
+            # the indexes, in events, of the events that are sent
+            sent_indexes = [
+                index for index, (assistant_id, _) in enumerate(events) if assistants[assistant_id] is not None
+            ]
+            if len(sent_indexes) < len(events):
+                logger.info(
+                    "not forwarding events to assistants that no longer exist; assistant_service_id: %s, event"
+                    " count: %s",
+                    assistant_service_id,
+                    len(events) - len(sent_indexes),
+                )
+            if not sent_indexes:
+                return []
+
+            registration = next(
+                assistant.related_assistant_service_registration
+                for assistant in assistants.values()
+                if assistant is not None
+            )
+            request = ConversationEventBatch(
+                events=[
+                    ConversationEventBatchItem(assistant_id=str(events[index][0]), event=events[index][1])
+                    for index in sent_indexes
+                ]
+            )
+            try:
+                result = await (
+                    await self._client_pool.service_client(registration=registration)
+                ).post_conversation_events(request)
+                if result.undelivered:
+                    logger.warning(
+                        "assistant service did not accept all events; assistant_service_id: %s, event count: %s,"
+                        " undelivered count: %s",
+                        assistant_service_id,
+                        len(sent_indexes),
+                        len(result.undelivered),
+                    )
+                return [sent_indexes[index] for index in result.undelivered]
+
+            except AssistantError as e:
+                if e.status_code not in [httpx.codes.NOT_FOUND, httpx.codes.METHOD_NOT_ALLOWED]:
+                    # the request failed as a whole, so none of the events are known to be delivered
+                    logger.exception(
+                        "error forwarding events to assistant service; assistant_service_id: %s, event count: %s",
+                        assistant_service_id,
+                        len(sent_indexes),
+                    )
+                    return sent_indexes
+
+                logger.info(
+                    "assistant service does not support batched events; assistant_service_id: %s",
+                    assistant_service_id,
+                )
+                self._batch_unsupported_services[assistant_service_id] = True
+
+        for assistant_id, event in events:
+            await self.forward_event_to_assistant(assistant_id=assistant_id, event=event)
+        return []
+
     async def _remove_assistant_from_conversation(
         self,
         session: AsyncSession,
@@ -350,6 +434,10 @@ class AssistantController:
             await session.delete(assistant)
             await session.commit()
 
+        # the participant events raised above precede the commit, so invalidate again now that it is visible
+        for conversation in conversations:
+            self._routing_table.invalidate_conversation(conversation.conversation_id)
+
     async def get_assistants(
         self,
         user_principal: auth.UserPrincipal,
@@ -566,102 +654,104 @@ class AssistantController:
                 f"assistant_{export_file_name}_{datetime.datetime.now(datetime.UTC).strftime('%Y%m%d%H%M%S')}"
             )
 
-            return await self._export(
-                session=session,
-                export_filename_prefix=export_file_name,
-                conversation_ids=conversation_ids,
-                assistant_ids=set((assistant_id,)),
-            )
+        return self._export(
+            export_filename_prefix=export_file_name,
+            conversation_ids=conversation_ids,
+            assistant_ids=set((assistant_id,)),
+        )
 
-    async def _export(
+    def _export(
         self,
         conversation_ids: set[uuid.UUID],
         assistant_ids: set[uuid.UUID],
-        session: AsyncSession,
         export_filename_prefix: str,
     ) -> ExportResult:
-        temp_dir_path = pathlib.Path(tempfile.mkdtemp())
+        return ExportResult(
+            stream=export_import.stream_zip(
+                self._export_entries(conversation_ids=conversation_ids, assistant_ids=assistant_ids)
+            ),
+            content_type="application/zip",
+            filename=export_filename_prefix + ".zip",
+        )
 
-        # write all files to a temporary directory
-        export_dir_path = temp_dir_path / "export"
-        export_dir_path.mkdir()
+    async def _export_entries(
+        self,
+        conversation_ids: set[uuid.UUID],
+        assistant_ids: set[uuid.UUID],
+    ) -> AsyncGenerator[export_import.ZipEntry, None]:
+        # the export is produced while the response is streamed, after the request's session has closed; the
+        # database is read in short sessions, so that none is held open while the response waits on the client
 
         # export records from database
-        with (export_dir_path / AssistantController.EXPORT_WORKBENCH_FILENAME).open("+wb") as workbench_file:
-            async for file_bytes in export_import.export_file(
+        yield (
+            AssistantController.EXPORT_WORKBENCH_FILENAME,
+            export_import.export_file(
                 conversation_ids=conversation_ids,
                 assistant_ids=assistant_ids,
-                session=session,
-            ):
-                workbench_file.write(file_bytes)
+                get_session=self._get_session,
+            ),
+        )
 
-        # export files from storage
-        for conversation_id in conversation_ids:
-            source_dir = self._file_storage.path_for(namespace=str(conversation_id), filename="")
-            if not source_dir.is_dir():
+        # export file content from blob storage
+        async with self._get_session() as session:
+            blob_sha256s = (
+                await session.exec(
+                    select(db.FileVersion.content_sha256)
+                    .join(db.File)
+                    .where(col(db.File.conversation_id).in_(conversation_ids))
+                    .where(col(db.FileVersion.content_sha256).is_not(None))
+                    .distinct()
+                )
+            ).all()
+        for sha256 in blob_sha256s:
+            if sha256 is None:
                 continue
+            yield f"blobs/{sha256}", self._file_storage.read_blob(sha256)
 
-            conversation_dir = export_dir_path / "files" / str(conversation_id)
-            conversation_dir.mkdir(parents=True)
-
-            await asyncio.to_thread(shutil.copytree, src=source_dir, dst=conversation_dir, dirs_exist_ok=True)
+        # export files stored by name, before blob storage
+        for conversation_id in conversation_ids:
+            for stored_name in await self._file_storage.list_stored_files(namespace=str(conversation_id)):
+                yield (
+                    f"files/{conversation_id}/{stored_name}",
+                    self._file_storage.read_stored_file(namespace=str(conversation_id), stored_name=stored_name),
+                )
 
-        # enumerate assistants
-        assistants = await session.exec(select(db.Assistant).where(col(db.Assistant.assistant_id).in_(assistant_ids)))
+        # enumerate assistants, and the conversations of each
+        async with self._get_session() as session:
+            assistants = (
+                await session.exec(select(db.Assistant).where(col(db.Assistant.assistant_id).in_(assistant_ids)))
+            ).all()
+            assistant_participants = (
+                await session.exec(
+                    select(db.AssistantParticipant)
+                    .where(col(db.AssistantParticipant.assistant_id).in_(assistant_ids))
+                    .where(col(db.AssistantParticipant.conversation_id).in_(conversation_ids))
+                )
+            ).all()
 
         for assistant in assistants:
             assistant_client = await self._client_pool.assistant_client(assistant)
+            assistant_dir = f"assistants/{assistant.assistant_id}"
 
             # export assistant data
-            assistant_dir = export_dir_path / "assistants" / str(assistant.assistant_id)
-            assistant_dir.mkdir(parents=True)
-
-            with (assistant_dir / AssistantController.EXPORT_ASSISTANT_DATA_FILENAME).open("wb") as assistant_file:
-                async with assistant_client.get_exported_data() as response:
-                    async for chunk in response:
-                        assistant_file.write(chunk)
-
-            # enumerate assistant conversations
-            assistant_participants = await session.exec(
-                select(db.AssistantParticipant)
-                .where(db.AssistantParticipant.assistant_id == assistant.assistant_id)
-                .where(col(db.AssistantParticipant.conversation_id).in_(conversation_ids))
-            )
+            async with assistant_client.get_exported_data() as response:
+                yield f"{assistant_dir}/{AssistantController.EXPORT_ASSISTANT_DATA_FILENAME}", response
 
             for assistant_participant in assistant_participants:
-                conversation_dir = assistant_dir / "conversations" / str(assistant_participant.conversation_id)
-                conversation_dir.mkdir(parents=True)
+                if assistant_participant.assistant_id != assistant.assistant_id:
+                    continue
 
                 # export assistant conversation data
-                with (conversation_dir / AssistantController.EXPORT_ASSISTANT_CONVERSATION_DATA_FILENAME).open(
-                    "wb"
-                ) as conversation_file:
-                    async with assistant_client.get_exported_conversation_data(
-                        conversation_id=assistant_participant.conversation_id
-                    ) as response:
-                        async for chunk in response:
-                            conversation_file.write(chunk)
-
-        # zip the export directory
-        zip_file_path = await asyncio.to_thread(
-            shutil.make_archive,
-            base_name=str(temp_dir_path / "zip"),
-            format="zip",
-            root_dir=export_dir_path,
-            base_dir="",
-            logger=logger,
-            verbose=True,
-        )
-
-        def _cleanup() -> None:
-            shutil.rmtree(temp_dir_path, ignore_errors=True)
-
-        return ExportResult(
-            file_path=zip_file_path,
-            content_type="application/zip",
-            filename=export_filename_prefix + ".zip",
-            cleanup=_cleanup,
-        )
+                async with assistant_client.get_exported_conversation_data(
+                    conversation_id=assistant_participant.conversation_id
+                ) as response:
+                    yield (
+                        (
+                            f"{assistant_dir}/conversations/{assistant_participant.conversation_id}/"
+                            f"{AssistantController.EXPORT_ASSISTANT_CONVERSATION_DATA_FILENAME}"
+                        ),
+                        response,
+                    )
 
     async def export_conversations(
         self,
@@ -692,14 +782,13 @@ class AssistantController:
                 ).unique()
             )
 
-            return await self._export(
-                session=session,
-                export_filename_prefix=(
-                    f"semantic_workbench_conversation_export_{datetime.datetime.now(datetime.UTC).strftime('%Y%m%d%H%M%S')}"
-                ),
-                conversation_ids=conversation_ids,
-                assistant_ids=assistant_ids,
-            )
+        return self._export(
+            export_filename_prefix=(
+                f"semantic_workbench_conversation_export_{datetime.datetime.now(datetime.UTC).strftime('%Y%m%d%H%M%S')}"
+            ),
+            conversation_ids=conversation_ids,
+            assistant_ids=assistant_ids,
+        )
 
     async def import_conversations(
         self,
@@ -707,31 +796,63 @@ class AssistantController:
         user_principal: auth.UserPrincipal,
     ) -> ConversationImportResult:
         async with self._get_session() as session:
-            with tempfile.TemporaryDirectory() as extraction_dir:
-                extraction_path = pathlib.Path(extraction_dir)
+            # entries are read directly from the zip file, rather than extracted to disk
+            try:
+                zip_file = zipfile.ZipFile(file=from_export, mode="r")
+            except zipfile.BadZipFile as e:
+                raise exceptions.InvalidArgumentError(detail=f"the export is not a valid zip file: {e}") from e
+
+            with zip_file:
+                export_import.validate_zip(zip_file)
+                entry_names = [name for name in zip_file.namelist() if not name.endswith("/")]
+
+                async def _log_progress(record_count: int) -> None:
+                    logger.info("importing conversations; records imported: %d", record_count)
+
+                # import file content into blob storage; content that is already stored is not stored again.
+                # the records may only refer to content that is included, and verified, in the export
+                blob_sha256s: set[str] = set()
+                for name in entry_names:
+                    if not name.startswith("blobs/"):
+                        continue
 
-                # extract the zip file to a temporary directory
-                with zipfile.ZipFile(file=from_export, mode="r") as zip_file:
-                    await asyncio.to_thread(zip_file.extractall, path=extraction_path)
+                    expected_sha256 = name.removeprefix("blobs/")
+                    with zip_file.open(name) as blob_file:
+                        blob = await self._file_storage.write_blob(files.AsyncFileReader(blob_file))
+                    if blob.sha256 != expected_sha256:
+                        raise exceptions.InvalidArgumentError(
+                            detail=(
+                                f"file content does not match its address; expected: {expected_sha256}, actual:"
+                                f" {blob.sha256}"
+                            )
+                        )
+                    blob_sha256s.add(blob.sha256)
 
                 # import records into database
-                with (extraction_path / AssistantController.EXPORT_WORKBENCH_FILENAME).open("rb") as workbench_file:
+                with zip_file.open(AssistantController.EXPORT_WORKBENCH_FILENAME) as workbench_file:
                     import_result = await export_import.import_files(
                         session=session,
                         owner_id=user_principal.user_id,
                         files=[workbench_file],
+                        on_progress=_log_progress,
+                        blob_sha256s=blob_sha256s,
                     )
 
                 await session.commit()
 
-                # import files into storage
+                # import files stored by name, before blob storage
                 for old_conversation_id, new_conversation_id in import_result.conversation_id_old_to_new.items():
-                    files_path = extraction_path / "files" / str(old_conversation_id)
-                    if not files_path.is_dir():
-                        continue
-
-                    storage_path = self._file_storage.path_for(namespace=str(new_conversation_id), filename="")
-                    await asyncio.to_thread(shutil.copytree, src=files_path, dst=storage_path)
+                    files_prefix = f"files/{old_conversation_id}/"
+                    for name in entry_names:
+                        if not name.startswith(files_prefix):
+                            continue
+
+                        with zip_file.open(name) as stored_file:
+                            await self._file_storage.write_stored_file(
+                                namespace=str(new_conversation_id),
+                                stored_name=name.removeprefix(files_prefix),
+                                content=files.AsyncFileReader(stored_file),
+                            )
 
                 try:
                     # enumerate assistants
@@ -755,11 +876,11 @@ class AssistantController:
                                 detail=f"assistant service id {assistant.assistant_service_id} is not valid"
                             )
 
-                        assistant_dir = extraction_path / "assistants" / str(old_assistant_id)
+                        assistant_dir = f"assistants/{old_assistant_id}"
 
                         # create the assistant from the assistant data file
-                        with (assistant_dir / AssistantController.EXPORT_ASSISTANT_DATA_FILENAME).open(
-                            "rb"
+                        with zip_file.open(
+                            f"{assistant_dir}/{AssistantController.EXPORT_ASSISTANT_DATA_FILENAME}"
                         ) as assistant_file:
                             try:
                                 await self._put_assistant(
@@ -781,12 +902,12 @@ class AssistantController:
                                     )
                                 ).one()
 
-                                conversation_dir = assistant_dir / "conversations" / str(old_conversation_id)
+                                conversation_dir = f"{assistant_dir}/conversations/{old_conversation_id}"
 
                                 # create the conversation from the conversation data file
-                                with (
-                                    conversation_dir / AssistantController.EXPORT_ASSISTANT_CONVERSATION_DATA_FILENAME
-                                ).open("rb") as conversation_file:
+                                with zip_file.open(
+                                    f"{conversation_dir}/{AssistantController.EXPORT_ASSISTANT_CONVERSATION_DATA_FILENAME}"
+                                ) as conversation_file:
                                     try:
                                         await self.connect_assistant_to_conversation(
                                             conversation=new_conversation,
@@ -929,7 +1050,8 @@ class AssistantController:
                     )
                     session.add(new_version)
 
-            # Copy files associated with the conversation
+            # File versions in blob storage are shared by the copies above; only copy the files stored by name,
+            # before blob storage
             original_files_path = self._file_storage.path_for(
                 namespace=str(original_conversation.conversation_id), filename=""
             )
@@ -0,0 +1,104 @@
+import logging
+import uuid
+from typing import AsyncContextManager, Callable
+
+import cachetools
+from semantic_workbench_api_model.workbench_model import ConversationEvent, ConversationEventType
+from sqlalchemy.orm import joinedload
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .. import db
+
+logger = logging.getLogger(__name__)
+
+
+class AssistantRoutingTable:
+    """
+    Caches the assistants that receive the events of each conversation: the active assistant participants whose
+    assistant service is online.
+
+    Every change that affects routing raises a participant event for the conversation, so entries are invalidated
+    when those events are delivered through the event bus, on every node. Changes to assistant service
+    registrations invalidate the whole table. Entries also expire after a TTL, as a backstop for changes made on
+    other nodes that do not raise participant events.
+    """
+
+    def __init__(
+        self,
+        get_session: Callable[[], AsyncContextManager[AsyncSession]],
+        max_conversations: int,
+        ttl_seconds: float,
+    ) -> None:
+        self._get_session = get_session
+        self._conversation_assistants: cachetools.TTLCache[uuid.UUID, list[uuid.UUID]] = cachetools.TTLCache(
+            maxsize=max_conversations, ttl=ttl_seconds
+        )
+        self._assistants: cachetools.TTLCache[uuid.UUID, db.Assistant] = cachetools.TTLCache(
+            maxsize=max_conversations, ttl=ttl_seconds
+        )
+
+    async def assistant_ids_for_conversation(self, conversation_id: uuid.UUID) -> list[uuid.UUID]:
+        assistant_ids = self._conversation_assistants.get(conversation_id)
+        if assistant_ids is not None:
+            return assistant_ids
+
+        async with self._get_session() as session:
+            assistants = (
+                await session.exec(
+                    select(db.Assistant)
+                    .join(
+                        db.AssistantParticipant,
+                        col(db.Assistant.assistant_id) == col(db.AssistantParticipant.assistant_id),
+                    )
+                    .join(db.AssistantServiceRegistration)
+                    .where(col(db.AssistantServiceRegistration.assistant_service_online).is_(True))
+                    .where(col(db.AssistantParticipant.active_participant).is_(True))
+                    .where(db.AssistantParticipant.conversation_id == conversation_id)
+                    .options(joinedload(db.Assistant.related_assistant_service_registration, innerjoin=True))
+                )
+            ).all()
+
+        # refresh the cached assistants, which are used when forwarding the events
+        for assistant in assistants:
+            self._assistants[assistant.assistant_id] = assistant
+
+        assistant_ids = [assistant.assistant_id for assistant in assistants]
+        self._conversation_assistants[conversation_id] = assistant_ids
+        return assistant_ids
+
+    async def get_assistant(self, assistant_id: uuid.UUID) -> db.Assistant | None:
+        """
+        Returns the assistant, with its assistant service registration loaded, or None if it no longer exists.
+        """
+        assistant = self._assistants.get(assistant_id)
+        if assistant is not None:
+            return assistant
+
+        async with self._get_session() as session:
+            assistant = (
+                await session.exec(
+                    select(db.Assistant)
+                    .where(db.Assistant.assistant_id == assistant_id)
+                    .options(joinedload(db.Assistant.related_assistant_service_registration, innerjoin=True))
+                )
+            ).one_or_none()
+
+        if assistant is not None:
+            self._assistants[assistant_id] = assistant
+        return assistant
+
+    def invalidate_conversation(self, conversation_id: uuid.UUID) -> None:
+        self._conversation_assistants.pop(conversation_id, None)
+
+    def invalidate_all(self) -> None:
+        self._conversation_assistants.clear()
+        self._assistants.clear()
+
+    async def on_conversation_event(self, event: ConversationEvent) -> None:
+        if event.event in [
+            ConversationEventType.participant_created,
+            ConversationEventType.participant_updated,
+            ConversationEventType.conversation_deleted,
+        ]:
+            self.invalidate_conversation(event.conversation_id)
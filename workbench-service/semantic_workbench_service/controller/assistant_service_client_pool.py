@@ -1,29 +1,58 @@
 import asyncio
+import logging
+import time
 from typing import Self
 
+import httpx
+from semantic_workbench_api_model import assistant_service_client
 from semantic_workbench_api_model.assistant_service_client import (
     AssistantClient,
     AssistantServiceClient,
     AssistantServiceClientBuilder,
 )
+from semantic_workbench_api_model.transport import InFlightCountingTransport
 
 from .. import assistant_api_key, db
 
+logger = logging.getLogger(__name__)
+
 
 class AssistantServiceClientPool:
-    def __init__(self, api_key_store: assistant_api_key.ApiKeyStore) -> None:
+    """
+    Shares one HTTP client, and its connection pool, per assistant service registration. Assistant clients use the
+    HTTP client of their assistant service, with the assistant id as a path prefix.
+
+    Clients that have not been used for the idle timeout, and have no requests in flight, are closed, which also
+    releases the clients for assistant service URLs that have since changed.
+    """
+
+    def __init__(
+        self,
+        api_key_store: assistant_api_key.ApiKeyStore,
+        limits: httpx.Limits | None = None,
+        http2: bool = False,
+        idle_timeout_seconds: float = 600.0,
+    ) -> None:
         self._api_key_store = api_key_store
+        self._limits = limits or httpx.Limits()
+        self._http2 = http2
+        self._idle_timeout_seconds = idle_timeout_seconds
         self._service_clients: dict[str, AssistantServiceClient] = {}
-        self._assistant_clients: dict[str, AssistantClient] = {}
+        self._last_used: dict[str, float] = {}
+        self._transports: dict[str, InFlightCountingTransport] = {}
         self._client_lock = asyncio.Lock()
 
-    def __aenter__(self) -> Self:
+    async def __aenter__(self) -> Self:
         return self
 
     async def __aexit__(self, exc_type, exc_value, traceback) -> None:
-        for client in self._service_clients.values():
-            await client.aclose()
-        for client in self._assistant_clients.values():
+        async with self._client_lock:
+            clients = list(self._service_clients.values())
+            self._service_clients.clear()
+            self._last_used.clear()
+            self._transports.clear()
+
+        for client in clients:
             await client.aclose()
 
     async def service_client(self, registration: db.AssistantServiceRegistration) -> AssistantServiceClient:
@@ -31,30 +60,59 @@ class AssistantServiceClientPool:
         url = registration.assistant_service_url
         key = f"{service_id}-{url}"
 
-        if key not in self._service_clients:
+        now = time.monotonic()
+        client = self._service_clients.get(key)
+        if client is None:
             async with self._client_lock:
-                if key not in self._service_clients:
-                    self._service_clients[key] = (await self._client_builder(registration)).for_service()
+                client = self._service_clients.get(key)
+                if client is None:
+                    transport = InFlightCountingTransport(
+                        assistant_service_client.httpx_transport_factory(limits=self._limits, http2=self._http2)
+                    )
+                    client = (await self._client_builder(registration, transport)).for_service()
+                    self._service_clients[key] = client
+                    self._transports[key] = transport
 
-        return self._service_clients[key]
+        self._last_used[key] = now
+        await self._close_idle_clients(now)
+        return client
 
     async def assistant_client(self, assistant: db.Assistant) -> AssistantClient:
-        assistant_id = assistant.assistant_id
-        url = assistant.related_assistant_service_registration.assistant_service_url
-        key = f"{assistant_id}-{url}"
+        service_client = await self.service_client(assistant.related_assistant_service_registration)
+        return service_client.for_assistant(assistant.assistant_id)
 
-        if key not in self._assistant_clients:
-            async with self._client_lock:
-                if key not in self._assistant_clients:
-                    self._assistant_clients[key] = (
-                        await self._client_builder(assistant.related_assistant_service_registration)
-                    ).for_assistant(assistant_id)
+    def _is_idle(self, key: str, now: float) -> bool:
+        last_used = self._last_used.get(key)
+        if last_used is None or now - last_used <= self._idle_timeout_seconds:
+            return False
+        # a client that is streaming a response, such as an export, is still in use
+        transport = self._transports.get(key)
+        return transport is None or transport.in_flight == 0
+
+    async def _close_idle_clients(self, now: float) -> None:
+        idle_keys = [key for key in self._last_used if self._is_idle(key, now)]
+        if not idle_keys:
+            return
 
-        return self._assistant_clients[key]
+        idle_clients: list[tuple[str, AssistantServiceClient]] = []
+        async with self._client_lock:
+            for key in idle_keys:
+                if not self._is_idle(key, now):
+                    continue
+                self._last_used.pop(key, None)
+                self._transports.pop(key, None)
+                client = self._service_clients.pop(key, None)
+                if client is not None:
+                    idle_clients.append((key, client))
+
+        for key, client in idle_clients:
+            logger.debug("closing idle assistant service client; key: %s", key)
+            await client.aclose()
 
     async def _client_builder(
         self,
         registration: db.AssistantServiceRegistration,
+        transport: httpx.AsyncBaseTransport,
     ) -> AssistantServiceClientBuilder:
         api_key = await self._api_key_store.get(registration.api_key_name)
         if api_key is None:
@@ -63,4 +121,7 @@ class AssistantServiceClientPool:
         return AssistantServiceClientBuilder(
             base_url=str(registration.assistant_service_url),
             api_key=api_key,
+            limits=self._limits,
+            http2=self._http2,
+            transport=transport,
         )
@@ -20,6 +20,7 @@ from ..event import ConversationEventQueueItem
 from . import convert, exceptions
 from . import participant as participant_
 from . import user as user_
+from .assistant_routing_table import AssistantRoutingTable
 from .assistant_service_client_pool import AssistantServiceClientPool
 
 logger = logging.getLogger(__name__)
@@ -32,11 +33,13 @@ class AssistantServiceRegistrationController:
         notify_event: Callable[[ConversationEventQueueItem], Awaitable],
         api_key_store: assistant_api_key.ApiKeyStore,
         client_pool: AssistantServiceClientPool,
+        routing_table: AssistantRoutingTable,
     ) -> None:
         self._get_session = get_session
         self._notify_event = notify_event
         self._api_key_store = api_key_store
         self._client_pool = client_pool
+        self._routing_table = routing_table
 
     @property
     def _registration_is_secured(self) -> bool:
@@ -210,6 +213,7 @@ class AssistantServiceRegistrationController:
             raise exceptions.ForbiddenError()
 
         background_task_args: Iterable = ()
+        routing_changed = False
         async with self._get_session() as session:
             registration = (
                 await session.exec(
@@ -238,6 +242,7 @@ class AssistantServiceRegistrationController:
 
             if registration.assistant_service_url != str(update_assistant_service_url.url):
                 registration.assistant_service_url = str(update_assistant_service_url.url)
+                routing_changed = True
                 logger.info(
                     "updated assistant service url; assistant_service_id: %s, url: %s",
                     assistant_service_id,
@@ -250,12 +255,16 @@ class AssistantServiceRegistrationController:
 
             if not registration.assistant_service_online:
                 registration.assistant_service_online = True
+                routing_changed = True
                 background_task_args = (self._update_participants, assistant_service_id)
 
             session.add(registration)
             await session.commit()
             await session.refresh(registration)
 
+        if routing_changed:
+            self._routing_table.invalidate_all()
+
         return convert.assistant_service_registration_from_db(
             registration, include_api_key_name=self._registration_is_secured
         ), background_task_args
@@ -360,6 +369,8 @@ class AssistantServiceRegistrationController:
             await session.delete(registration)
             await session.commit()
 
+            self._routing_table.invalidate_all()
+
             await self._api_key_store.delete(registration.api_key_name)
 
     async def get_service_info(self, assistant_service_id: str) -> ServiceInfoModel:
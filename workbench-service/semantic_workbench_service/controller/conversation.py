@@ -12,12 +12,15 @@ from semantic_workbench_api_model.workbench_model import (
     ConversationList,
     ConversationMessage,
     ConversationMessageDebug,
+    ConversationMessageDelta,
     ConversationMessageList,
     ConversationParticipant,
     ConversationParticipantList,
+    MessageSender,
     MessageType,
     NewConversation,
     NewConversationMessage,
+    NewConversationMessageDelta,
     ParticipantRole,
     UpdateConversation,
     UpdateParticipant,
@@ -638,6 +641,23 @@ class ConversationController:
         conversation_id: uuid.UUID,
         new_message: NewConversationMessage,
     ) -> ConversationMessage:
+        message_list = await self.create_conversation_messages(
+            principal=principal,
+            conversation_id=conversation_id,
+            new_messages=[new_message],
+        )
+        return message_list.messages[0]
+
+    async def create_conversation_messages(
+        self,
+        principal: auth.ActorPrincipal,
+        conversation_id: uuid.UUID,
+        new_messages: list[NewConversationMessage],
+    ) -> ConversationMessageList:
+        """
+        Creates the messages, in order, in a single transaction. The message_created events are raised together,
+        after the commit, so they are forwarded to assistants as one batch.
+        """
         async with self._get_session() as session:
             conversation = (
                 await session.exec(
@@ -649,80 +669,141 @@ class ConversationController:
             if conversation is None:
                 raise exceptions.NotFoundError()
 
-            if (
-                new_message.id is not None
-                and (
+            new_message_ids = [new_message.id for new_message in new_messages if new_message.id is not None]
+            if len(new_message_ids) != len(set(new_message_ids)):
+                raise exceptions.InvalidArgumentError(detail="message ids must be unique")
+
+            if new_message_ids:
+                existing_message_id = (
                     await session.exec(
-                        query.select(db.ConversationMessage)
+                        select(db.ConversationMessage.message_id)
                         .where(db.ConversationMessage.conversation_id == conversation_id)
-                        .where(db.ConversationMessage.message_id == new_message.id)
+                        .where(col(db.ConversationMessage.message_id).in_(new_message_ids))
+                        .limit(1)
                     )
-                ).one_or_none()
-                is not None
-            ):
-                raise exceptions.ConflictError(f"message with id {new_message.id} already exists")
+                ).first()
+                if existing_message_id is not None:
+                    raise exceptions.ConflictError(f"message with id {existing_message_id} already exists")
+
+            messages: list[tuple[db.ConversationMessage, bool]] = []
+            for new_message in new_messages:
+                role, participant_id = self._message_sender(principal, new_message.sender)
+
+                # pop "debug" from metadata, if it exists, and merge with the debug field
+                message_debug = (new_message.metadata or {}).pop("debug", None)
+                # ensure that message_debug is a dictionary, in cases like {"debug": "some message"}, or {"debug": [1,2]}
+                if message_debug and not isinstance(message_debug, dict):
+                    message_debug = {"debug": message_debug}
+                message_debug = deepmerge.always_merger.merge(message_debug or {}, new_message.debug_data or {})
+
+                message = db.ConversationMessage(
+                    conversation_id=conversation.conversation_id,
+                    sender_participant_role=role,
+                    sender_participant_id=participant_id,
+                    message_type=new_message.message_type.value,
+                    content=new_message.content,
+                    content_type=new_message.content_type,
+                    filenames=new_message.filenames or [],
+                    meta_data=new_message.metadata or {},
+                )
+                if new_message.id is not None:
+                    message.message_id = new_message.id
+
+                session.add(message)
+
+                if message_debug:
+                    debug = db.ConversationMessageDebug(
+                        message_id=message.message_id,
+                        data=message_debug,
+                    )
+                    session.add(debug)
 
-            match principal:
-                case auth.UserPrincipal():
-                    role = "user"
-                    participant_id = principal.user_id
-                case auth.AssistantServicePrincipal():
-                    # allow assistants to send messages as users, if provided
-                    if new_message.sender is not None and new_message.sender.participant_role == "user":
-                        role = "user"
-                        participant_id = new_message.sender.participant_id
-                    else:
-                        role = "assistant"
-                        participant_id = str(principal.assistant_id)
-
-            # pop "debug" from metadata, if it exists, and merge with the debug field
-            message_debug = (new_message.metadata or {}).pop("debug", None)
-            # ensure that message_debug is a dictionary, in cases like {"debug": "some message"}, or {"debug": [1,2]}
-            if message_debug and not isinstance(message_debug, dict):
-                message_debug = {"debug": message_debug}
-            message_debug = deepmerge.always_merger.merge(message_debug or {}, new_message.debug_data or {})
-
-            message = db.ConversationMessage(
-                conversation_id=conversation.conversation_id,
-                sender_participant_role=role,
-                sender_participant_id=participant_id,
-                message_type=new_message.message_type.value,
-                content=new_message.content,
-                content_type=new_message.content_type,
-                filenames=new_message.filenames or [],
-                meta_data=new_message.metadata or {},
-            )
-            if new_message.id is not None:
-                message.message_id = new_message.id
+                messages.append((message, bool(message_debug)))
 
-            session.add(message)
+            await session.commit()
+            for message, _ in messages:
+                await session.refresh(message)
+
+        message_responses = [
+            convert.conversation_message_from_db(message, has_debug=has_debug) for message, has_debug in messages
+        ]
 
-            if message_debug:
-                debug = db.ConversationMessageDebug(
-                    message_id=message.message_id,
-                    data=message_debug,
+        # each message keeps an event of its own, rather than one event for all of them, as SSE clients and
+        # assistants handle message_created events of a single message. the events are queued together, so the
+        # assistant service forwarding delivers them in one request, and assistants coalesce them into one response
+        for message_response in message_responses:
+            await self._notify_event(
+                ConversationEventQueueItem(
+                    event=ConversationEvent(
+                        conversation_id=conversation_id,
+                        event=ConversationEventType.message_created,
+                        data={
+                            "message": message_response.model_dump(),
+                        },
+                    ),
                 )
-                session.add(debug)
+            )
 
-            await session.commit()
-            await session.refresh(message)
+        return ConversationMessageList(messages=message_responses)
+
+    @staticmethod
+    def _message_sender(principal: auth.ActorPrincipal, sender: MessageSender | None) -> tuple[str, str]:
+        """
+        Returns the role and participant id of the sender of a message from the principal.
+        """
+        match principal:
+            case auth.UserPrincipal():
+                return "user", principal.user_id
+            case auth.AssistantServicePrincipal():
+                # allow assistants to send messages as users, if provided
+                if sender is not None and sender.participant_role == "user":
+                    return "user", sender.participant_id
+                return "assistant", str(principal.assistant_id)
+
+    async def append_conversation_message_delta(
+        self,
+        principal: auth.ActorPrincipal,
+        conversation_id: uuid.UUID,
+        message_id: uuid.UUID,
+        new_delta: NewConversationMessageDelta,
+    ) -> None:
+        """
+        Relays content for a message that is being streamed to the users in the conversation. Deltas are not
+        stored; the message is stored when it is created with its full content and the same id.
+        """
+        async with self._get_session() as session:
+            conversation = (
+                await session.exec(
+                    query.select_conversations_for(principal=principal).where(
+                        db.Conversation.conversation_id == conversation_id
+                    )
+                )
+            ).one_or_none()
+            if conversation is None:
+                raise exceptions.NotFoundError()
 
-        message_response = convert.conversation_message_from_db(message, has_debug=bool(message_debug))
+        role, participant_id = self._message_sender(principal, None)
 
         await self._notify_event(
             ConversationEventQueueItem(
                 event=ConversationEvent(
                     conversation_id=conversation_id,
-                    event=ConversationEventType.message_created,
+                    event=ConversationEventType.message_delta,
                     data={
-                        "message": message_response.model_dump(),
+                        "message_delta": ConversationMessageDelta(
+                            message_id=message_id,
+                            sender=MessageSender(participant_role=ParticipantRole(role), participant_id=participant_id),
+                            message_type=new_delta.message_type,
+                            content_type=new_delta.content_type,
+                            content=new_delta.content,
+                        ).model_dump(),
                     },
                 ),
+                # assistants receive the message when it is created
+                event_audience={"user"},
             )
         )
 
-        return message_response
-
     async def get_message(
         self, principal: auth.ActorPrincipal, conversation_id: uuid.UUID, message_id: uuid.UUID
     ) -> ConversationMessage:
@@ -767,8 +848,16 @@ class ConversationController:
         message_types: list[MessageType] | None = None,
         before: uuid.UUID | None = None,
         after: uuid.UUID | None = None,
+        before_sequence: int | None = None,
+        after_sequence: int | None = None,
         limit: int = 100,
     ) -> ConversationMessageList:
+        """
+        Returns the latest messages matching the filters, in sequence order. For keyset pagination, pass the
+        sequence of the first message of a page as before_sequence to get the previous page, or the sequence of the
+        last message of a page as after_sequence to get the next page, which starts right after it. The before and
+        after message ids are resolved to their sequences.
+        """
         async with self._get_session() as session:
             conversation = (
                 await session.exec(
@@ -800,36 +889,44 @@ class ConversationController:
                 )
 
             if before is not None:
-                boundary = (
-                    await session.exec(
-                        query.select_conversation_messages_for(principal=principal).where(
-                            db.ConversationMessage.message_id == before
-                        )
-                    )
-                ).one_or_none()
-                if boundary is not None:
-                    select_query = select_query.where(db.ConversationMessage.sequence < boundary.sequence)
+                boundary_sequence = await self._message_sequence(session, principal, conversation_id, before)
+                if boundary_sequence is not None:
+                    select_query = select_query.where(db.ConversationMessage.sequence < boundary_sequence)
 
             if after is not None:
-                boundary = (
-                    await session.exec(
-                        query.select_conversation_messages_for(principal=principal).where(
-                            db.ConversationMessage.message_id == after
-                        )
-                    )
-                ).one_or_none()
-                if boundary is not None:
-                    select_query = select_query.where(db.ConversationMessage.sequence > boundary.sequence)
+                boundary_sequence = await self._message_sequence(session, principal, conversation_id, after)
+                if boundary_sequence is not None:
+                    select_query = select_query.where(db.ConversationMessage.sequence > boundary_sequence)
+
+            if before_sequence is not None:
+                select_query = select_query.where(db.ConversationMessage.sequence < before_sequence)
+
+            if after_sequence is not None:
+                select_query = select_query.where(db.ConversationMessage.sequence > after_sequence)
 
-            messages = list(
-                (
-                    await session.exec(select_query.order_by(col(db.ConversationMessage.sequence).desc()).limit(limit))
-                ).all()
+            # paging forwards, the page is the messages that follow the cursor, rather than the latest messages
+            forwards = after_sequence is not None
+            sequence_order = (
+                col(db.ConversationMessage.sequence).asc() if forwards else col(db.ConversationMessage.sequence).desc()
             )
-            messages.reverse()
+            messages = list((await session.exec(select_query.order_by(sequence_order).limit(limit))).all())
+            if not forwards:
+                messages.reverse()
 
             return convert.conversation_message_list_from_db(messages)
 
+    @staticmethod
+    async def _message_sequence(
+        session: AsyncSession, principal: auth.ActorPrincipal, conversation_id: uuid.UUID, message_id: uuid.UUID
+    ) -> int | None:
+        return (
+            await session.exec(
+                query.select_conversation_message_sequences_for(principal=principal)
+                .where(db.ConversationMessage.conversation_id == conversation_id)
+                .where(db.ConversationMessage.message_id == message_id)
+            )
+        ).one_or_none()
+
     async def delete_message(
         self,
         conversation_id: uuid.UUID,
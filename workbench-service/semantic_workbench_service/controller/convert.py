@@ -242,6 +242,7 @@ def conversation_share_redemption_list_from_db(
 def conversation_message_from_db(model: db.ConversationMessage, has_debug: bool) -> ConversationMessage:
     return ConversationMessage(
         id=model.message_id,
+        sequence=model.sequence,
         sender=MessageSender(
             participant_id=model.sender_participant_id,
             participant_role=ParticipantRole(model.sender_participant_role),
@@ -1,18 +1,41 @@
+import asyncio
 import collections
+import contextlib
 import datetime
+import io
+import json
+import logging
 import re
-import tempfile
 import uuid
+import zipfile
 from operator import or_
-from typing import IO, Any, AsyncGenerator, Generator, Iterable, Iterator
+from typing import (
+    IO,
+    Any,
+    AsyncContextManager,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Collection,
+    Iterable,
+)
 
 from attr import dataclass
 from pydantic import BaseModel
-from sqlalchemy import ScalarResult, func
+from sqlalchemy import Select, func, tuple_
 from sqlmodel import SQLModel, col, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from .. import db
+from . import exceptions
+
+logger = logging.getLogger(__name__)
+
+EXPORT_PAGE_SIZE = 500
+EXPORT_MANIFEST_FILENAME = "manifest.json"
+EXPORT_ERROR_FILENAME = "export_error.txt"
+IMPORT_BATCH_SIZE = 500
 
 
 class _Record(BaseModel):
@@ -25,96 +48,162 @@ def _model_record(model: SQLModel) -> _Record:
     return _Record(type=model.__class__.__name__, data=data)
 
 
-def _lines_from(records: Iterator[_Record]) -> Generator[bytes, None, None]:
-    for record in records:
-        yield (record.model_dump_json() + "\n").encode("utf-8")
+def _line_from(record: _Record) -> bytes:
+    return (record.model_dump_json() + "\n").encode("utf-8")
 
 
 async def export_file(
     conversation_ids: set[uuid.UUID],
     assistant_ids: set[uuid.UUID],
-    session: AsyncSession,
+    get_session: Callable[[], AsyncContextManager[AsyncSession]],
 ) -> AsyncGenerator[bytes, None]:
-    assistants = await session.exec(
-        select(db.Assistant)
-        .where(col(db.Assistant.assistant_id).in_(assistant_ids))
-        .order_by(col(db.Assistant.assistant_id).asc())
-    )
-
-    conversations = await session.exec(
-        select(db.Conversation)
-        .where(col(db.Conversation.conversation_id).in_(conversation_ids))
-        .order_by(col(db.Conversation.conversation_id).asc())
-    )
-
-    files = await session.exec(
-        select(db.File)
-        .where(col(db.File.conversation_id).in_(conversation_ids))
-        .order_by(col(db.File.conversation_id).asc())
-        .order_by(col(db.File.created_datetime).asc())
-    )
-
-    file_versions = await session.exec(
-        select(db.FileVersion)
-        .join(db.File)
-        .where(col(db.File.conversation_id).in_(conversation_ids))
-        .order_by(col(db.File.conversation_id).asc())
-        .order_by(col(db.File.created_datetime).asc())
-        .order_by(col(db.FileVersion.version).asc())
-    )
-
-    messages = await session.exec(
-        select(db.ConversationMessage)
-        .where(col(db.ConversationMessage.conversation_id).in_(conversation_ids))
-        .order_by(col(db.ConversationMessage.conversation_id).asc())
-        .order_by(col(db.ConversationMessage.sequence).asc())
-    )
-
-    message_debugs = await session.exec(
-        select(db.ConversationMessageDebug)
-        .join(db.ConversationMessage)
-        .where(col(db.ConversationMessage.conversation_id).in_(conversation_ids))
-        .order_by(col(db.ConversationMessage.conversation_id).asc())
-        .order_by(col(db.ConversationMessage.sequence).asc())
-    )
-
-    user_participants = await session.exec(
-        select(db.UserParticipant)
-        .where(col(db.UserParticipant.conversation_id).in_(conversation_ids))
-        .order_by(col(db.UserParticipant.conversation_id).asc())
-        .order_by(col(db.UserParticipant.joined_datetime).asc())
-    )
+    """
+    Yields the records as NDJSON lines, reading each query in pages by its key, so that the records are never all
+    held in memory at once. Each page is read in a session of its own, so that no session is held open while the
+    export is streamed to a slow client.
+    """
+    queries: list[tuple[Select, list[Any]]] = [
+        (
+            select(db.Assistant).where(col(db.Assistant.assistant_id).in_(assistant_ids)),
+            [col(db.Assistant.assistant_id)],
+        ),
+        (
+            select(db.Conversation).where(col(db.Conversation.conversation_id).in_(conversation_ids)),
+            [col(db.Conversation.conversation_id)],
+        ),
+        (
+            # messages are imported in sequence order
+            select(db.ConversationMessage).where(col(db.ConversationMessage.conversation_id).in_(conversation_ids)),
+            [col(db.ConversationMessage.conversation_id), col(db.ConversationMessage.sequence)],
+        ),
+        (
+            select(db.ConversationMessageDebug)
+            .join(db.ConversationMessage)
+            .where(col(db.ConversationMessage.conversation_id).in_(conversation_ids)),
+            [col(db.ConversationMessageDebug.message_id)],
+        ),
+        (
+            select(db.UserParticipant).where(col(db.UserParticipant.conversation_id).in_(conversation_ids)),
+            [col(db.UserParticipant.conversation_id), col(db.UserParticipant.user_id)],
+        ),
+        (
+            select(db.AssistantParticipant).where(col(db.AssistantParticipant.conversation_id).in_(conversation_ids)),
+            [col(db.AssistantParticipant.conversation_id), col(db.AssistantParticipant.assistant_id)],
+        ),
+        (
+            select(db.File).where(col(db.File.conversation_id).in_(conversation_ids)),
+            [col(db.File.file_id)],
+        ),
+        (
+            select(db.FileVersion).join(db.File).where(col(db.File.conversation_id).in_(conversation_ids)),
+            [col(db.FileVersion.file_id), col(db.FileVersion.version)],
+        ),
+    ]
+
+    for query, key_columns in queries:
+        last_key: tuple[Any, ...] | None = None
+        while True:
+            page_query = query.order_by(*key_columns).limit(EXPORT_PAGE_SIZE)
+            if last_key is not None:
+                page_query = page_query.where(tuple_(*key_columns) > last_key)
+
+            async with get_session() as session:
+                records = (await session.exec(page_query)).all()
+
+            for record in records:
+                yield _line_from(_model_record(record))
+
+            if len(records) < EXPORT_PAGE_SIZE:
+                break
+            last_key = tuple(getattr(records[-1], column.key) for column in key_columns)
+
+
+class _ZipStreamBuffer(io.RawIOBase):
+    """
+    A write-only, non-seekable sink for a zip file. As it cannot seek, zipfile writes the size and CRC of each
+    entry after the entry's content, so the zip can be produced in a single pass and drained as it is written.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._buffer.extend(b)
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+ZipEntry = tuple[str, AsyncIterator[bytes]]
+
+
+async def stream_zip(entries: AsyncGenerator[ZipEntry, None]) -> AsyncGenerator[bytes, None]:
+    """
+    Yields a zip file of the entries, compressing each entry's content as it is produced. Only the compressor state
+    and the current chunk are held in memory.
+
+    As the response has started by the time an entry fails, the zip is completed with an error entry in place of the
+    manifest, which lists the entries of a complete export. Both are checked by validate_zip on import.
+    """
+    sink = _ZipStreamBuffer()
+    entry_names: list[str] = []
+    async with contextlib.aclosing(entries):
+        with zipfile.ZipFile(sink, mode="w") as zip_file:
+            try:
+                async for name, content in entries:
+                    # the size is not known up front, so allow for entries larger than 4 GiB
+                    with zip_file.open(_zip_info(name), mode="w", force_zip64=True) as entry:
+                        async for chunk in content:
+                            await asyncio.to_thread(entry.write, chunk)
+                            if data := sink.drain():
+                                yield data
+
+                    entry_names.append(name)
+                    if data := sink.drain():
+                        yield data
+
+                zip_file.writestr(_zip_info(EXPORT_MANIFEST_FILENAME), json.dumps({"entries": entry_names}))
+
+            except Exception as e:
+                logger.exception("error producing zip entries; the zip is marked as incomplete")
+                zip_file.writestr(_zip_info(EXPORT_ERROR_FILENAME), f"the export is incomplete; error: {e}")
+
+    if data := sink.drain():
+        yield data
+
+
+def _zip_info(name: str) -> zipfile.ZipInfo:
+    zip_info = zipfile.ZipInfo(name, date_time=datetime.datetime.now().timetuple()[:6])
+    zip_info.compress_type = zipfile.ZIP_DEFLATED
+    return zip_info
+
+
+def validate_zip(zip_file: zipfile.ZipFile) -> None:
+    """
+    Raises InvalidArgumentError if the zip, produced by stream_zip, is marked as incomplete, or is missing an entry
+    listed in its manifest. Exports from before the manifest was added have neither, and are accepted.
+    """
+    names = set(zip_file.namelist())
+    if EXPORT_ERROR_FILENAME in names:
+        raise exceptions.InvalidArgumentError(
+            detail=zip_file.read(EXPORT_ERROR_FILENAME).decode("utf-8", errors="replace")
+        )
 
-    assistant_participants = await session.exec(
-        select(db.AssistantParticipant)
-        .where(col(db.AssistantParticipant.conversation_id).in_(conversation_ids))
-        .order_by(col(db.AssistantParticipant.conversation_id).asc())
-        .order_by(col(db.AssistantParticipant.joined_datetime).asc())
-    )
+    if EXPORT_MANIFEST_FILENAME not in names:
+        return
 
-    def _records(*sources: ScalarResult) -> Generator[_Record, None, None]:
-        for source in sources:
-            for record in source:
-                yield _model_record(record)
-
-    with tempfile.TemporaryFile() as f:
-        f.writelines(
-            _lines_from(
-                _records(
-                    assistants,
-                    conversations,
-                    messages,
-                    message_debugs,
-                    user_participants,
-                    assistant_participants,
-                    files,
-                    file_versions,
-                )
-            )
+    manifest = json.loads(zip_file.read(EXPORT_MANIFEST_FILENAME))
+    missing_names = [name for name in manifest.get("entries", []) if name not in names]
+    if missing_names:
+        raise exceptions.InvalidArgumentError(
+            detail=f"the export is incomplete; missing entries: {', '.join(missing_names)}"
         )
-        f.seek(0)
-        for line in iter(lambda: f.readline(), b""):
-            yield line
 
 
 @dataclass
@@ -126,7 +215,22 @@ class ImportResult:
     file_id_old_to_new: dict[uuid.UUID, uuid.UUID]
 
 
-async def import_files(session: AsyncSession, owner_id: str, files: Iterable[IO[bytes]]) -> ImportResult:
+async def import_files(
+    session: AsyncSession,
+    owner_id: str,
+    files: Iterable[IO[bytes]],
+    batch_size: int = IMPORT_BATCH_SIZE,
+    on_progress: Callable[[int], Awaitable[None]] | None = None,
+    blob_sha256s: Collection[str] = (),
+) -> ImportResult:
+    """
+    Imports the records from the NDJSON files, reading and inserting them in batches, so that memory use is bounded
+    by the batch size rather than the size of the files. on_progress is called with the number of records imported
+    so far, after each batch.
+
+    blob_sha256s are the addresses of the file content stored from the same export. A file version that refers to
+    any other content is rejected, as that content may belong to another user.
+    """
     result = ImportResult(
         assistant_id_old_to_new={},
         conversation_id_old_to_new={},
@@ -275,17 +379,44 @@ async def import_files(session: AsyncSession, owner_id: str, files: Iterable[IO[
                     raise RuntimeError(f"file_id {file_version.file_id} is not found")
                 file_version.file_id = file_id
 
+                if file_version.content_sha256 is not None and file_version.content_sha256 not in blob_sha256s:
+                    raise exceptions.InvalidArgumentError(
+                        detail=f"file content {file_version.content_sha256} is not included in the export"
+                    )
+
                 if file_version.participant_role == "assistant":
                     assistant_id = result.assistant_id_old_to_new.get(uuid.UUID(file_version.participant_id))
                     if assistant_id is not None:
                         file_version.participant_id = str(assistant_id)
                 session.add(file_version)
 
+    def _read_lines(file: IO[bytes]) -> list[bytes]:
+        lines: list[bytes] = []
+        while len(lines) < batch_size and (line := file.readline()):
+            lines.append(line)
+        return lines
+
+    record_count = 0
     for file in files:
-        for line in iter(lambda: file.readline(), b""):
-            record = _Record.model_validate_json(line.decode("utf-8"))
-            await _process_record(record)
+        previous_type = None
+        while lines := await asyncio.to_thread(_read_lines, file):
+            for line in lines:
+                record = _Record.model_validate_json(line.decode("utf-8"))
+                # records refer to records of the preceding types, so those are flushed first
+                if previous_type is not None and record.type != previous_type:
+                    await session.flush()
+                previous_type = record.type
+
+                await _process_record(record)
+
             await session.flush()
+            # the inserted records are not used again, so they are released from the session's identity map to keep
+            # memory bounded by the batch size
+            session.expunge_all()
+
+            record_count += len(lines)
+            if on_progress is not None:
+                await on_progress(record_count)
 
     # ensure the owner is a participant in all conversations
     for _, conversation_id in result.conversation_id_old_to_new.items():
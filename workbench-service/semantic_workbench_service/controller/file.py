@@ -2,10 +2,9 @@ import uuid
 from typing import (
     Any,
     AsyncContextManager,
+    AsyncIterator,
     Awaitable,
     Callable,
-    Generator,
-    Iterable,
     NamedTuple,
 )
 
@@ -23,8 +22,10 @@ from .. import auth, db, files, query
 from ..event import ConversationEventQueueItem
 from . import convert, exceptions
 
+UNUSED_BLOB_BATCH_SIZE = 500
+
 DownloadFileResult = NamedTuple(
-    "DownloadFileResult", [("filename", str), ("content_type", str), ("stream", Iterable[bytes])]
+    "DownloadFileResult", [("filename", str), ("content_type", str), ("stream", AsyncIterator[bytes])]
 )
 
 
@@ -39,6 +40,43 @@ class FileController:
         self._notify_event = notify_event
         self._file_storage = file_storage
 
+    async def _delete_unreferenced_blobs(self, session: AsyncSession, blob_sha256s: set[str]) -> int:
+        if not blob_sha256s:
+            return 0
+
+        referenced_sha256s = set(
+            (
+                await session.exec(
+                    select(db.FileVersion.content_sha256)
+                    .where(col(db.FileVersion.content_sha256).in_(blob_sha256s))
+                    .distinct()
+                )
+            ).all()
+        )
+
+        # a blob that was written recently is kept, as an upload of identical content may not be committed yet; it
+        # is deleted by delete_unused_blobs later
+        deleted_count = 0
+        for sha256 in blob_sha256s - referenced_sha256s:
+            if await self._file_storage.delete_unused_blob(sha256):
+                deleted_count += 1
+        return deleted_count
+
+    async def delete_unused_blobs(self) -> int:
+        """
+        Deletes the blobs that no file version refers to, and that have not been written for the grace period, such
+        as the content of deleted conversations. Returns the number of blobs deleted.
+        """
+        blob_sha256s = await self._file_storage.list_unused_blobs()
+
+        deleted_count = 0
+        async with self._get_session() as session:
+            for start in range(0, len(blob_sha256s), UNUSED_BLOB_BATCH_SIZE):
+                deleted_count += await self._delete_unreferenced_blobs(
+                    session, set(blob_sha256s[start : start + UNUSED_BLOB_BATCH_SIZE])
+                )
+        return deleted_count
+
     async def upload_files(
         self,
         conversation_id: uuid.UUID,
@@ -100,6 +138,8 @@ class FileController:
             file_record_and_versions: list[tuple[db.File, db.FileVersion]] = []
 
             for file_record, upload_file in file_record_and_uploads:
+                blob = await self._file_storage.write_blob(content=upload_file)
+
                 file_record.current_version += 1
                 new_version = db.FileVersion(
                     file_id=file_record.file_id,
@@ -107,17 +147,13 @@ class FileController:
                     participant_id=participant_id,
                     version=file_record.current_version,
                     content_type=upload_file.content_type or "",
-                    file_size=upload_file.size or 0,
+                    file_size=blob.size,
                     meta_data=file_metadata.get(file_record.filename, {}),
                     storage_filename=f"{file_record.file_id.hex}_{file_record.current_version}",
+                    content_sha256=blob.sha256,
                 )
                 file_record_and_versions.append((file_record, new_version))
 
-                self._file_storage.write_file(
-                    namespace=str(conversation_id),
-                    filename=new_version.storage_filename,
-                    content=upload_file.file,
-                )
                 session.add(file_record)
                 session.add(new_version)
 
@@ -243,20 +279,19 @@ class FileController:
 
             file_record, version_record = file_records
 
-        def generator_wrapper() -> Generator[bytes, Any, None]:
-            with self._file_storage.read_file(
-                namespace=str(conversation_id),
-                filename=version_record.storage_filename,
-            ) as file:
-                for chunk in iter(lambda: file.read(100 * 1_024), b""):
-                    yield chunk
-
         filename = file_record.filename.split("/")[-1]
 
         return DownloadFileResult(
             filename=filename,
             content_type=version_record.content_type,
-            stream=generator_wrapper(),
+            stream=(
+                self._file_storage.read_blob(version_record.content_sha256)
+                if version_record.content_sha256 is not None
+                else self._file_storage.read_file(
+                    namespace=str(conversation_id),
+                    filename=version_record.storage_filename,
+                )
+            ),
         )
 
     async def delete_file(
@@ -297,16 +332,22 @@ class FileController:
             ).all()
 
             for version_record in version_records:
-                self._file_storage.delete_file(
-                    namespace=str(conversation_id),
-                    filename=version_record.storage_filename,
-                )
+                if version_record.content_sha256 is None:
+                    await self._file_storage.delete_file(
+                        namespace=str(conversation_id),
+                        filename=version_record.storage_filename,
+                    )
                 await session.delete(version_record)
             await session.commit()
 
             await session.delete(file_record)
             await session.commit()
 
+            # blobs are shared by identical content, across files and conversations; the file versions that refer
+            # to a blob are its references
+            blob_sha256s = {v.content_sha256 for v in version_records if v.content_sha256 is not None}
+            await self._delete_unreferenced_blobs(session, blob_sha256s)
+
         await self._notify_event(
             ConversationEventQueueItem(
                 event=ConversationEvent(
@@ -299,6 +299,11 @@ class ConversationMessage(SQLModel, table=True):
     # this relationship is needed to enforce correct INSERT order by SQLModel
     related_conversation: Conversation = Relationship()
 
+    __table_args__ = (
+        # supports keyset pagination of the messages in a conversation
+        sqlalchemy.Index("ix_conversationmessage_conversation_id_sequence", "conversation_id", "sequence"),
+    )
+
 
 class ConversationMessageDebug(SQLModel, table=True):
     message_id: uuid.UUID = Field(
@@ -363,6 +368,8 @@ class FileVersion(SQLModel, table=True):
     content_type: str
     file_size: int
     storage_filename: str
+    # the address of the content in blob storage; None for versions stored by storage_filename
+    content_sha256: str | None = Field(default=None, index=True)
 
     # this relationship is needed to enforce correct INSERT order by SQLModel
     related_file: File = Relationship()
@@ -1,9 +1,226 @@
-from typing import Literal
+import asyncio
+import collections
+import dataclasses
+import logging
+import uuid
+from enum import StrEnum
+from typing import Any, Literal
 
+import cachetools
 from pydantic import BaseModel
-from semantic_workbench_api_model.workbench_model import ConversationEvent
+from semantic_workbench_api_model.workbench_model import ConversationEvent, ConversationEventType
+
+logger = logging.getLogger(__name__)
 
 
 class ConversationEventQueueItem(BaseModel):
     event: ConversationEvent
     event_audience: set[Literal["user", "assistant"]] = set(["user", "assistant"])
+
+
+class ConversationEventReplayBuffer:
+    """
+    Retains the most recent events for recently active conversations, so that SSE clients that reconnect with a
+    Last-Event-ID can be sent only the events they missed. Message deltas are not retained; they are previews of a
+    message that is created with its full content, so they would only push other events out of the buffer.
+    """
+
+    def __init__(self, max_events_per_conversation: int, max_conversations: int) -> None:
+        self._max_events_per_conversation = max_events_per_conversation
+        self._buffers: cachetools.LRUCache[uuid.UUID, collections.deque[ConversationEvent]] = cachetools.LRUCache(
+            maxsize=max_conversations
+        )
+
+    def append(self, event: ConversationEvent) -> None:
+        if not is_replayable(event):
+            return
+
+        buffer = self._buffers.get(event.conversation_id)
+        if buffer is None:
+            buffer = collections.deque(maxlen=self._max_events_per_conversation)
+            self._buffers[event.conversation_id] = buffer
+        buffer.append(event)
+
+    def events_after(self, conversation_id: uuid.UUID, last_event_id: str) -> list[ConversationEvent] | None:
+        """
+        Returns the events that followed the event with the given id, or None if that event is no longer buffered.
+        """
+        buffer = self._buffers.get(conversation_id)
+        if buffer is None:
+            return None
+
+        events = list(buffer)
+        for index, event in enumerate(events):
+            if event.id == last_event_id:
+                return events[index + 1 :]
+
+        return None
+
+
+def is_replayable(event: ConversationEvent) -> bool:
+    """
+    Returns whether the event is retained for replay. SSE clients are not sent the ids of other events, so that
+    they reconnect with the id of the last event that can be replayed.
+    """
+    return event.event not in (ConversationEventType.message_delta, ConversationEventType.conversation_reset)
+
+
+class SlowConsumerPolicy(StrEnum):
+    coalesce = "coalesce"
+    """
+    When full, replace a queued event that is superseded by the new one; otherwise drop the oldest, and send the
+    subscriber a conversation reset.
+    """
+    drop_oldest = "drop_oldest"
+    """When full, drop the oldest queued event, and send the subscriber a conversation reset."""
+    disconnect = "disconnect"
+    """When full, disconnect the subscriber. It can reconnect and resume with its Last-Event-ID."""
+
+
+@dataclasses.dataclass
+class SubscriberQueueMetrics:
+    enqueued: int = 0
+    coalesced: int = 0
+    dropped: int = 0
+    disconnected: int = 0
+
+
+def _coalesce_key(event: ConversationEvent) -> tuple[Any, ...] | None:
+    """
+    Returns a key shared by events that carry the full, latest state of the same thing, such that only the most
+    recent of them needs to be delivered. Returns None for events that must not be coalesced.
+    """
+    match event.event:
+        case ConversationEventType.conversation_updated:
+            return (event.event,)
+        case ConversationEventType.participant_updated:
+            return (event.event, event.data.get("participant", {}).get("id"))
+        case ConversationEventType.file_updated:
+            return (event.event, event.data.get("file", {}).get("filename"))
+        case ConversationEventType.assistant_state_updated:
+            return (event.event, event.data.get("assistant_id"), event.data.get("state_id"))
+        case _:
+            return None
+
+
+class ConversationEventSubscriberQueue:
+    """
+    A bounded queue of events for a single SSE subscriber. Publishing never blocks; when the subscriber falls
+    behind, the configured SlowConsumerPolicy is applied. When an event is dropped, the subscriber is next sent a
+    conversation reset, so that it refetches the conversation rather than miss the event.
+    """
+
+    def __init__(self, max_size: int, policy: SlowConsumerPolicy, metrics: SubscriberQueueMetrics) -> None:
+        self._max_size = max_size
+        self._policy = policy
+        self._metrics = metrics
+        self._events: collections.deque[ConversationEvent] = collections.deque()
+        self._reset: ConversationEvent | None = None
+        self._available = asyncio.Event()
+        self.disconnected = False
+
+    def __len__(self) -> int:
+        return len(self._events) + (1 if self._reset is not None else 0)
+
+    def put_nowait(self, event: ConversationEvent) -> None:
+        if self.disconnected:
+            return
+
+        if self._merge_delta(event):
+            self._metrics.coalesced += 1
+            return
+
+        if len(self._events) >= self._max_size:
+            match self._policy:
+                case SlowConsumerPolicy.disconnect:
+                    self.disconnected = True
+                    self._events.clear()
+                    self._available.set()
+                    self._metrics.disconnected += 1
+                    logger.warning(
+                        "disconnecting slow sse subscriber; conversation_id: %s, total disconnected: %s",
+                        event.conversation_id,
+                        self._metrics.disconnected,
+                    )
+                    return
+
+                case SlowConsumerPolicy.coalesce if self._remove_superseded(event):
+                    self._metrics.coalesced += 1
+
+                case _:
+                    self._events.popleft()
+                    if self._reset is None:
+                        self._reset = ConversationEvent(
+                            conversation_id=event.conversation_id, event=ConversationEventType.conversation_reset
+                        )
+                    self._metrics.dropped += 1
+                    logger.debug(
+                        "dropped oldest event for slow sse subscriber; conversation_id: %s, total dropped: %s",
+                        event.conversation_id,
+                        self._metrics.dropped,
+                    )
+
+        self._events.append(event)
+        self._available.set()
+        self._metrics.enqueued += 1
+
+    async def get(self) -> ConversationEvent | None:
+        """
+        Waits for the next event. Returns None if the subscriber has been disconnected.
+        """
+        while not len(self) and not self.disconnected:
+            self._available.clear()
+            await self._available.wait()
+
+        if self.disconnected:
+            return None
+
+        if self._reset is not None:
+            reset, self._reset = self._reset, None
+            return reset
+
+        return self._events.popleft()
+
+    def _merge_delta(self, event: ConversationEvent) -> bool:
+        """
+        Appends the content of a message delta to a queued delta of the same message, so that a subscriber that is
+        behind is sent one delta per message, rather than one per chunk.
+        """
+        if event.event != ConversationEventType.message_delta:
+            return False
+
+        message_delta = event.data.get("message_delta", {})
+        for index, queued_event in enumerate(self._events):
+            if queued_event.event != ConversationEventType.message_delta:
+                continue
+
+            queued_delta = queued_event.data.get("message_delta", {})
+            if queued_delta.get("message_id") != message_delta.get("message_id"):
+                continue
+
+            self._events[index] = queued_event.model_copy(
+                update={
+                    "data": {
+                        **queued_event.data,
+                        "message_delta": {
+                            **queued_delta,
+                            "content": queued_delta.get("content", "") + message_delta.get("content", ""),
+                        },
+                    }
+                }
+            )
+            return True
+
+        return False
+
+    def _remove_superseded(self, event: ConversationEvent) -> bool:
+        key = _coalesce_key(event)
+        if key is None:
+            return False
+
+        for queued_event in self._events:
+            if _coalesce_key(queued_event) == key:
+                self._events.remove(queued_event)
+                return True
+
+        return False
@@ -0,0 +1,255 @@
+import asyncio
+import contextlib
+import json
+import logging
+import math
+import uuid
+from typing import Awaitable, Callable, Protocol, Self
+
+import asyncpg
+from semantic_workbench_api_model.workbench_model import ConversationEvent
+
+from . import settings
+from .config import DBSettings
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[ConversationEvent], Awaitable[None]]
+
+
+class EventBus(Protocol):
+    """
+    Fans conversation events out to the subscribers on every node running the workbench service.
+    """
+
+    def subscribe(self, handler: EventHandler) -> None: ...
+
+    async def publish(self, event: ConversationEvent) -> None: ...
+
+    async def __aenter__(self) -> Self: ...
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None: ...
+
+
+class InMemoryEventBus(EventBus):
+    """
+    Delivers events to the subscribers in this process only. Suitable for a single worker.
+    """
+
+    def __init__(self) -> None:
+        self._handlers: list[EventHandler] = []
+
+    def subscribe(self, handler: EventHandler) -> None:
+        self._handlers.append(handler)
+
+    async def publish(self, event: ConversationEvent) -> None:
+        await _deliver(self._handlers, event)
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        pass
+
+
+class PostgreSQLEventBus(EventBus):
+    """
+    Delivers events to the subscribers on every node, using PostgreSQL LISTEN/NOTIFY.
+
+    Events are delivered to the local subscribers directly on publish, and to the subscribers on other nodes
+    through a NOTIFY on the configured channel. Payloads larger than the NOTIFY limit are split into chunks that
+    are sent in a single transaction, so they arrive contiguously and in order.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        ssl: str,
+        channel: str,
+        publish_pool_size: int,
+        reconnect_interval_seconds: float,
+    ) -> None:
+        self._dsn = dsn
+        self._ssl = ssl
+        self._channel = channel
+        self._publish_pool_size = publish_pool_size
+        self._reconnect_interval_seconds = reconnect_interval_seconds
+        self._node_id = uuid.uuid4().hex
+        self._handlers: list[EventHandler] = []
+        self._assembler = NotifyPayloadAssembler()
+        self._received_queue: asyncio.Queue[ConversationEvent] = asyncio.Queue()
+        self._pool: asyncpg.Pool | None = None
+        self._listen_connection: asyncpg.Connection | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def subscribe(self, handler: EventHandler) -> None:
+        self._handlers.append(handler)
+
+    async def publish(self, event: ConversationEvent) -> None:
+        await _deliver(self._handlers, event)
+
+        if self._pool is None:
+            logger.warning("event bus is not started; event not published to other nodes; event_id: %s", event.id)
+            return
+
+        try:
+            payloads = encode_notify_payloads(origin=self._node_id, event=event)
+            async with self._pool.acquire() as connection, connection.transaction():
+                for payload in payloads:
+                    await connection.execute("SELECT pg_notify($1, $2)", self._channel, payload)
+        except Exception:
+            logger.exception(
+                "failed to publish event to other nodes; conversation_id: %s, event: %s, event_id: %s",
+                event.conversation_id,
+                event.event,
+                event.id,
+            )
+
+    async def __aenter__(self) -> Self:
+        self._pool = await asyncpg.create_pool(
+            dsn=self._dsn, ssl=self._ssl, min_size=1, max_size=self._publish_pool_size
+        )
+        await self._listen()
+
+        for coroutine, name in (
+            (self._dispatch_received_events(), "event_bus_dispatch"),
+            (self._supervise_listen_connection(), "event_bus_supervise"),
+        ):
+            self._tasks.add(asyncio.create_task(coroutine, name=name))
+
+        logger.info("started postgresql event bus; channel: %s, node_id: %s", self._channel, self._node_id)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        for task in self._tasks:
+            task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+        if self._listen_connection is not None:
+            with contextlib.suppress(Exception):
+                await self._listen_connection.close()
+            self._listen_connection = None
+
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def _listen(self) -> None:
+        connection: asyncpg.Connection = await asyncpg.connect(dsn=self._dsn, ssl=self._ssl)
+        await connection.add_listener(self._channel, self._on_notification)
+        self._listen_connection = connection
+
+    def _on_notification(self, connection: object, pid: int, channel: str, payload: str) -> None:
+        try:
+            origin, event = self._assembler.add(payload)
+        except Exception:
+            logger.exception("failed to decode event bus notification; channel: %s", channel)
+            return
+
+        if event is None or origin == self._node_id:
+            return
+
+        self._received_queue.put_nowait(event)
+
+    async def _dispatch_received_events(self) -> None:
+        while True:
+            event = await self._received_queue.get()
+            await _deliver(self._handlers, event)
+
+    async def _supervise_listen_connection(self) -> None:
+        while True:
+            await asyncio.sleep(self._reconnect_interval_seconds)
+
+            if self._listen_connection is not None and not self._listen_connection.is_closed():
+                continue
+
+            logger.warning("event bus listen connection lost; reconnecting; channel: %s", self._channel)
+            try:
+                await self._listen()
+            except Exception:
+                logger.exception("failed to reconnect event bus listen connection; channel: %s", self._channel)
+
+
+async def _deliver(handlers: list[EventHandler], event: ConversationEvent) -> None:
+    for handler in handlers:
+        try:
+            await handler(event)
+        except Exception:
+            logger.exception(
+                "exception in event bus handler; conversation_id: %s, event: %s, event_id: %s",
+                event.conversation_id,
+                event.event,
+                event.id,
+            )
+
+
+# PostgreSQL limits NOTIFY payloads to 8000 bytes; leave room for the chunk header
+NOTIFY_MAX_CHUNK_LENGTH = 7_500
+
+
+def encode_notify_payloads(
+    origin: str, event: ConversationEvent, max_chunk_length: int = NOTIFY_MAX_CHUNK_LENGTH
+) -> list[str]:
+    """
+    Encodes the event as one or more NOTIFY payloads in the form "origin:message_id:index:count:chunk".
+    """
+    # ensure_ascii keeps the payload length in characters equal to its length in bytes
+    body = json.dumps(event.model_dump(mode="json"), ensure_ascii=True, separators=(",", ":"))
+    message_id = uuid.uuid4().hex
+    count = max(1, math.ceil(len(body) / max_chunk_length))
+    return [
+        f"{origin}:{message_id}:{index}:{count}:{body[index * max_chunk_length : (index + 1) * max_chunk_length]}"
+        for index in range(count)
+    ]
+
+
+class NotifyPayloadAssembler:
+    """
+    Reassembles events from the NOTIFY payloads produced by encode_notify_payloads.
+    """
+
+    def __init__(self) -> None:
+        self._partial: dict[str, list[str]] = {}
+
+    def add(self, payload: str) -> tuple[str, ConversationEvent | None]:
+        origin, message_id, index_str, count_str, chunk = payload.split(":", 4)
+        index, count = int(index_str), int(count_str)
+
+        if count == 1:
+            return origin, ConversationEvent.model_validate_json(chunk)
+
+        chunks = self._partial.setdefault(message_id, [])
+        if index != len(chunks):
+            # chunks of a message are sent in one transaction, so a gap means the message is incomplete
+            self._partial.pop(message_id, None)
+            raise ValueError(f"unexpected chunk {index} of {count} for message {message_id}")
+
+        chunks.append(chunk)
+        if len(chunks) < count:
+            return origin, None
+
+        self._partial.pop(message_id, None)
+        return origin, ConversationEvent.model_validate_json("".join(chunks))
+
+
+def _asyncpg_dsn(db_settings: DBSettings) -> str:
+    return db_settings.url.replace("postgresql+asyncpg://", "postgresql://")
+
+
+def get_event_bus() -> EventBus:
+    match settings.event_bus.backend:
+        case "postgresql":
+            logger.info("creating PostgreSQLEventBus; channel: %s", settings.event_bus.postgresql_channel)
+            return PostgreSQLEventBus(
+                dsn=_asyncpg_dsn(settings.db),
+                ssl=settings.db.postgresql_ssl_mode,
+                channel=settings.event_bus.postgresql_channel,
+                publish_pool_size=settings.event_bus.postgresql_publish_pool_size,
+                reconnect_interval_seconds=settings.event_bus.postgresql_reconnect_interval_seconds,
+            )
+
+        case _:
+            logger.info("creating InMemoryEventBus")
+            return InMemoryEventBus()
@@ -1,21 +1,64 @@
+import asyncio
 import hashlib
 import logging
+import os
 import pathlib
-from contextlib import contextmanager
-from typing import BinaryIO, Iterator
+import time
+import uuid
+from typing import IO, AsyncIterator, NamedTuple, Protocol
 
 from pydantic_settings import BaseSettings
 
 logger = logging.getLogger(__name__)
 
+FILE_CHUNK_SIZE = 100 * 1_024
+
 
 class StorageSettings(BaseSettings):
     root: str = ".data/files"
 
+    # a blob that no file version refers to is only deleted once it has not been written for this long, so that an
+    # upload of identical content, that is not yet committed, keeps its blob; unused blobs are checked at the interval
+    unused_blob_grace_period_seconds: float = 3_600.0
+    unused_blob_check_interval_seconds: float = 3_600.0
+
+
+class AsyncReadable(Protocol):
+    async def read(self, size: int = -1) -> bytes: ...
+
+
+class AsyncFileReader:
+    """
+    Adapts a blocking binary file, such as an entry in a zip file, to AsyncReadable by reading it in a thread.
+    """
+
+    def __init__(self, file: IO[bytes]) -> None:
+        self._file = file
+
+    async def read(self, size: int = -1) -> bytes:
+        return await asyncio.to_thread(self._file.read, size)
+
+
+class BlobInfo(NamedTuple):
+    sha256: str
+    size: int
+
 
 class Storage:
+    """
+    Stores files on the local file system. Blocking file I/O is offloaded to threads, in chunks, so that large
+    files do not stall the event loop.
+
+    File content is stored as blobs, addressed by the SHA-256 of the content, so identical content is stored once,
+    however many file versions refer to it. Deleting a blob is left to the caller, once no file version refers to
+    it. As the file versions that refer to a blob are committed after it is written, a blob is only deleted as
+    unused once it has not been written for the grace period. Files written by name, under a namespace, predate
+    blobs and remain readable.
+    """
+
     def __init__(self, settings: StorageSettings):
         self.root = pathlib.Path(settings.root)
+        self.unused_blob_grace_period_seconds = settings.unused_blob_grace_period_seconds
         self._initialized = False
 
     def _ensure_initialized(self):
@@ -41,22 +84,159 @@ class Storage:
         filename_hash = hashlib.sha256(filename.encode("utf-8")).hexdigest()
         return namespace_path / filename_hash
 
-    def file_exists(self, namespace: str, filename: str) -> bool:
+    async def file_exists(self, namespace: str, filename: str) -> bool:
         file_path = self._file_path(namespace, filename)
-        return file_path.exists()
+        return await asyncio.to_thread(file_path.exists)
 
-    def write_file(self, namespace: str, filename: str, content: BinaryIO) -> None:
-        file_path = self._file_path(namespace, filename, mkdir=True)
-        with open(file_path, "wb") as f:
-            for chunk in iter(lambda: content.read(100 * 1_024), b""):
-                f.write(chunk)
+    async def write_file(self, namespace: str, filename: str, content: AsyncReadable) -> None:
+        file_path = await asyncio.to_thread(self._file_path, namespace, filename, mkdir=True)
+        await _write_path(file_path, content)
 
-    def delete_file(self, namespace: str, filename: str) -> None:
+    async def delete_file(self, namespace: str, filename: str) -> None:
         file_path = self._file_path(namespace, filename)
-        file_path.unlink(missing_ok=True)
+        await asyncio.to_thread(file_path.unlink, missing_ok=True)
 
-    @contextmanager
-    def read_file(self, namespace: str, filename: str) -> Iterator[BinaryIO]:
-        file_path = self._file_path(namespace, filename)
-        with open(file_path, "rb") as f:
-            yield f
+    async def read_file(self, namespace: str, filename: str) -> AsyncIterator[bytes]:
+        async for chunk in _read_path(self._file_path(namespace, filename)):
+            yield chunk
+
+    def _stored_file_path(self, namespace: str, stored_name: str, mkdir=False) -> pathlib.Path:
+        self._ensure_initialized()
+        namespace_path = self.root / namespace
+        if mkdir:
+            namespace_path.mkdir(exist_ok=True)
+        return namespace_path / pathlib.PurePath(stored_name).name
+
+    def _stored_names(self, namespace: str) -> list[str]:
+        namespace_path = self.root / namespace
+        if not namespace_path.is_dir():
+            return []
+        return sorted(path.name for path in namespace_path.iterdir() if path.is_file())
+
+    async def list_stored_files(self, namespace: str) -> list[str]:
+        """
+        Returns the names that the files written by name in the namespace are stored under, for export.
+        """
+        return await asyncio.to_thread(self._stored_names, namespace)
+
+    async def read_stored_file(self, namespace: str, stored_name: str) -> AsyncIterator[bytes]:
+        async for chunk in _read_path(self._stored_file_path(namespace, stored_name)):
+            yield chunk
+
+    async def write_stored_file(self, namespace: str, stored_name: str, content: AsyncReadable) -> None:
+        file_path = await asyncio.to_thread(self._stored_file_path, namespace, stored_name, mkdir=True)
+        await _write_path(file_path, content)
+
+    def _blob_path(self, sha256: str) -> pathlib.Path:
+        return self.root / "blobs" / sha256[:2] / sha256
+
+    def _blob_temp_path(self) -> pathlib.Path:
+        self._ensure_initialized()
+        temp_dir = self.root / "blobs" / "tmp"
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        return temp_dir / uuid.uuid4().hex
+
+    def _commit_blob(self, temp_path: pathlib.Path, sha256: str) -> None:
+        blob_path = self._blob_path(sha256)
+        if blob_path.exists():
+            # identical content is already stored; it is marked as written, so that it is not deleted as unused
+            try:
+                os.utime(blob_path)
+                temp_path.unlink(missing_ok=True)
+                return
+            except FileNotFoundError:
+                # the blob was deleted meanwhile; this copy is stored instead
+                pass
+
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temp_path, blob_path)
+
+    async def write_blob(self, content: AsyncReadable) -> BlobInfo:
+        """
+        Stores the content, unless identical content is already stored, and returns its address.
+        """
+        temp_path = await asyncio.to_thread(self._blob_temp_path)
+        content_hash = hashlib.sha256()
+        size = 0
+        file = await asyncio.to_thread(open, temp_path, "wb")
+        try:
+            while chunk := await content.read(FILE_CHUNK_SIZE):
+                content_hash.update(chunk)
+                size += len(chunk)
+                await asyncio.to_thread(file.write, chunk)
+        except BaseException:
+            await asyncio.to_thread(file.close)
+            await asyncio.to_thread(temp_path.unlink, missing_ok=True)
+            raise
+
+        await asyncio.to_thread(file.close)
+        sha256 = content_hash.hexdigest()
+        await asyncio.to_thread(self._commit_blob, temp_path, sha256)
+        return BlobInfo(sha256=sha256, size=size)
+
+    async def read_blob(self, sha256: str) -> AsyncIterator[bytes]:
+        async for chunk in _read_path(self._blob_path(sha256)):
+            yield chunk
+
+    async def blob_exists(self, sha256: str) -> bool:
+        return await asyncio.to_thread(self._blob_path(sha256).exists)
+
+    async def delete_blob(self, sha256: str) -> None:
+        await asyncio.to_thread(self._blob_path(sha256).unlink, missing_ok=True)
+
+    def _list_blobs_written_before(self, cutoff: float) -> list[str]:
+        blobs_dir = self.root / "blobs"
+        if not blobs_dir.exists():
+            return []
+        # blobs are stored in directories named by the first two characters of their address, unlike the tmp directory
+        return [path.name for path in blobs_dir.glob("??/*") if path.stat().st_mtime < cutoff]
+
+    async def list_unused_blobs(self) -> list[str]:
+        """
+        Returns the addresses of the blobs that have not been written for the grace period.
+        """
+        cutoff = time.time() - self.unused_blob_grace_period_seconds
+        return await asyncio.to_thread(self._list_blobs_written_before, cutoff)
+
+    def _delete_blob_written_before(self, sha256: str, cutoff: float) -> bool:
+        blob_path = self._blob_path(sha256)
+        deleted_path = self._blob_temp_path()
+        # the blob is moved aside before checking when it was written, so an upload of identical content either
+        # marked it as written before the check, or finds it missing and stores its own copy
+        try:
+            os.replace(blob_path, deleted_path)
+        except FileNotFoundError:
+            return False
+
+        if deleted_path.stat().st_mtime >= cutoff:
+            os.replace(deleted_path, blob_path)
+            return False
+
+        deleted_path.unlink()
+        return True
+
+    async def delete_unused_blob(self, sha256: str) -> bool:
+        """
+        Deletes the blob, unless it was written within the grace period, and returns whether it was deleted. The
+        caller checks that no file version refers to the blob first.
+        """
+        cutoff = time.time() - self.unused_blob_grace_period_seconds
+        return await asyncio.to_thread(self._delete_blob_written_before, sha256, cutoff)
+
+
+async def _read_path(path: pathlib.Path) -> AsyncIterator[bytes]:
+    file = await asyncio.to_thread(open, path, "rb")
+    try:
+        while chunk := await asyncio.to_thread(file.read, FILE_CHUNK_SIZE):
+            yield chunk
+    finally:
+        await asyncio.to_thread(file.close)
+
+
+async def _write_path(path: pathlib.Path, content: AsyncReadable) -> None:
+    file = await asyncio.to_thread(open, path, "wb")
+    try:
+        while chunk := await content.read(FILE_CHUNK_SIZE):
+            await asyncio.to_thread(file.write, chunk)
+    finally:
+        await asyncio.to_thread(file.close)
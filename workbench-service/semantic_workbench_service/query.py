@@ -189,6 +189,10 @@ def select_conversation_messages_for(principal: auth.ActorPrincipal) -> SelectOf
     return _select_conversation_messages_for(select(db.ConversationMessage), principal)
 
 
+def select_conversation_message_sequences_for(principal: auth.ActorPrincipal) -> SelectOfScalar[int]:
+    return _select_conversation_messages_for(select(db.ConversationMessage.sequence), principal)
+
+
 def select_conversation_message_projections_for(
     principal: auth.ActorPrincipal,
 ) -> Select[tuple[db.ConversationMessage, bool]]:
@@ -16,7 +16,7 @@ from typing import (
 )
 
 import asgi_correlation_id
-import starlette.background
+import httpx
 from asgi_correlation_id import CorrelationIdMiddleware
 from fastapi import (
     BackgroundTasks,
@@ -31,7 +31,7 @@ from fastapi import (
     status,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import StreamingResponse
 from semantic_workbench_api_model.assistant_model import (
     ConfigPutRequestModel,
     ConfigResponseModel,
@@ -67,6 +67,8 @@ from semantic_workbench_api_model.workbench_model import (
     NewAssistantServiceRegistration,
     NewConversation,
     NewConversationMessage,
+    NewConversationMessageBatch,
+    NewConversationMessageDelta,
     NewConversationShare,
     ParticipantRole,
     UpdateAssistant,
@@ -84,8 +86,14 @@ from sse_starlette import EventSourceResponse, ServerSentEvent
 
 from semantic_workbench_service import azure_speech
 
-from . import assistant_api_key, auth, controller, db, files, middleware, settings
-from .event import ConversationEventQueueItem
+from . import assistant_api_key, auth, controller, db, event_bus, files, middleware, settings
+from .event import (
+    ConversationEventQueueItem,
+    ConversationEventReplayBuffer,
+    ConversationEventSubscriberQueue,
+    SubscriberQueueMetrics,
+    is_replayable,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -95,48 +103,86 @@ def init(
     register_lifespan_handler: Callable[[Callable[[], AsyncContextManager[None]]], None],
 ) -> None:
     api_key_store = assistant_api_key.get_store()
+    conversation_event_bus = event_bus.get_event_bus()
     stop_signal: asyncio.Event = asyncio.Event()
 
     conversation_sse_queues_lock = asyncio.Lock()
-    conversation_sse_queues: dict[uuid.UUID, set[asyncio.Queue[ConversationEvent]]] = defaultdict(set)
+    conversation_sse_queues: dict[uuid.UUID, set[ConversationEventSubscriberQueue]] = defaultdict(set)
+    conversation_sse_queue_metrics = SubscriberQueueMetrics()
+    conversation_sse_replay_buffer = ConversationEventReplayBuffer(
+        max_events_per_conversation=settings.service.sse_replay_buffer_events_per_conversation,
+        max_conversations=settings.service.sse_replay_buffer_max_conversations,
+    )
 
     user_sse_queues_lock = asyncio.Lock()
-    user_sse_queues: dict[str, set[asyncio.Queue[uuid.UUID]]] = defaultdict(set)
+    # user SSE queues hold the ids of conversations with new events, or None when the client should refetch all
+    user_sse_queues: dict[str, set[asyncio.Queue[uuid.UUID | None]]] = defaultdict(set)
 
-    assistant_event_queues: dict[uuid.UUID, asyncio.Queue[ConversationEvent]] = {}
+    # events are queued per assistant service, so they can be delivered to the service in batches
+    assistant_service_event_queues: dict[str, asyncio.Queue[tuple[uuid.UUID, ConversationEvent]]] = {}
 
     background_tasks: set[asyncio.Task] = set()
 
     def _controller_get_session() -> AsyncContextManager[AsyncSession]:
         return db.create_session(app.state.db_engine)
 
-    async def _forward_events_to_assistant(
-        assistant_id: uuid.UUID, event_queue: asyncio.Queue[ConversationEvent]
+    async def _forward_events_to_assistant_service(
+        assistant_service_id: str, event_queue: asyncio.Queue[tuple[uuid.UUID, ConversationEvent]]
     ) -> NoReturn:
+        # events that were not delivered, with their delivery attempts; they are delivered again ahead of the queued
+        # events, so that the events of each conversation stay in order
+        undelivered: list[tuple[tuple[uuid.UUID, ConversationEvent], int]] = []
+
         while True:
             try:
-                event = await event_queue.get()
-                event_queue.task_done()
+                if undelivered:
+                    await asyncio.sleep(settings.service.assistant_event_retry_delay_seconds)
+                    batch, undelivered = undelivered, []
+                else:
+                    batch = [(await event_queue.get(), 0)]
+                    event_queue.task_done()
 
-                asgi_correlation_id.correlation_id.set(event.correlation_id)
+                # include the events that queued up while the previous batch was being delivered
+                while len(batch) < settings.service.assistant_event_batch_max_size and not event_queue.empty():
+                    batch.append((event_queue.get_nowait(), 0))
+                    event_queue.task_done()
+
+                asgi_correlation_id.correlation_id.set(batch[-1][0][1].correlation_id)
 
                 start_time = datetime.datetime.now(datetime.UTC)
 
-                await assistant_controller.forward_event_to_assistant(assistant_id=assistant_id, event=event)
+                undelivered_indexes = await assistant_controller.forward_events_to_assistant_service(
+                    assistant_service_id=assistant_service_id, events=[item for item, _ in batch]
+                )
 
                 end_time = datetime.datetime.now(datetime.UTC)
                 logger.debug(
-                    "forwarded event to assistant; assistant_id: %s, conversation_id: %s, event_id: %s,"
-                    " duration: %s, time since event: %s",
-                    assistant_id,
-                    event.conversation_id,
-                    event.id,
+                    "forwarded events to assistant service; assistant_service_id: %s, event count: %s,"
+                    " undelivered count: %s, duration: %s, time since first event: %s",
+                    assistant_service_id,
+                    len(batch),
+                    len(undelivered_indexes),
                     end_time - start_time,
-                    end_time - event.timestamp,
+                    end_time - batch[0][0][1].timestamp,
                 )
 
+                for index in undelivered_indexes:
+                    item, attempts = batch[index]
+                    if attempts + 1 >= settings.service.assistant_event_max_delivery_attempts:
+                        logger.error(
+                            "dropping event that was not delivered; assistant_service_id: %s, assistant_id: %s,"
+                            " conversation_id: %s, event: %s, attempts: %s",
+                            assistant_service_id,
+                            item[0],
+                            item[1].conversation_id,
+                            item[1].event,
+                            attempts + 1,
+                        )
+                        continue
+                    undelivered.append((item, attempts + 1))
+
             except Exception:
-                logger.exception("exception in _forward_events_to_assistant")
+                logger.exception("exception in _forward_events_to_assistant_service")
 
     async def _notify_event(queue_item: ConversationEventQueueItem) -> None:
         if stop_signal.is_set():
@@ -157,56 +203,32 @@ def init(
         )
 
         if "user" in queue_item.event_audience:
-            async with conversation_sse_queues_lock:
-                for queue in conversation_sse_queues.get(queue_item.event.conversation_id, {}):
-                    await queue.put(queue_item.event)
-            logger.debug(
-                "enqueued event for SSE; conversation_id: %s, event: %s, event_id: %s",
-                queue_item.event.conversation_id,
-                queue_item.event.event,
-                queue_item.event.id,
-            )
-
-            if queue_item.event.event in [
-                ConversationEventType.message_created,
-                ConversationEventType.message_deleted,
-                ConversationEventType.conversation_updated,
-                ConversationEventType.participant_created,
-                ConversationEventType.participant_updated,
-            ]:
-                task = asyncio.create_task(
-                    _notify_user_event(queue_item.event.conversation_id), name="notify_user_event"
-                )
-                background_tasks.add(task)
-                task.add_done_callback(background_tasks.discard)
+            # user events are delivered to the SSE clients connected to every node
+            await conversation_event_bus.publish(queue_item.event)
 
+        # assistant events are only forwarded by the node that raised them, so each assistant receives them once
         if "assistant" in queue_item.event_audience:
-            async with _controller_get_session() as session:
-                assistant_ids = (
-                    await session.exec(
-                        select(db.Assistant.assistant_id)
-                        .join(
-                            db.AssistantParticipant,
-                            col(db.Assistant.assistant_id) == col(db.AssistantParticipant.assistant_id),
-                        )
-                        .join(db.AssistantServiceRegistration)
-                        .where(col(db.AssistantServiceRegistration.assistant_service_online).is_(True))
-                        .where(col(db.AssistantParticipant.active_participant).is_(True))
-                        .where(db.AssistantParticipant.conversation_id == queue_item.event.conversation_id)
-                    )
-                ).all()
+            assistant_ids = await assistant_routing_table.assistant_ids_for_conversation(
+                queue_item.event.conversation_id
+            )
 
             for assistant_id in assistant_ids:
-                if assistant_id not in assistant_event_queues:
+                assistant = await assistant_routing_table.get_assistant(assistant_id)
+                if assistant is None:
+                    # the assistant was deleted since the conversation's assistants were cached
+                    continue
+
+                assistant_service_id = assistant.assistant_service_id
+                if assistant_service_id not in assistant_service_event_queues:
                     queue = asyncio.Queue()
-                    assistant_event_queues[assistant_id] = queue
+                    assistant_service_event_queues[assistant_service_id] = queue
                     task = asyncio.create_task(
-                        _forward_events_to_assistant(assistant_id, queue),
-                        name=f"forward_events_to_{assistant_id}",
+                        _forward_events_to_assistant_service(assistant_service_id, queue),
+                        name=f"forward_events_to_{assistant_service_id}",
                     )
                     background_tasks.add(task)
 
-                await assistant_event_queues[assistant_id].put(queue_item.event)
+                await assistant_service_event_queues[assistant_service_id].put((assistant_id, queue_item.event))
                 logger.debug(
                     "enqueued event for assistant; conversation_id: %s, event: %s, event_id: %s, assistant_id: %s",
                     queue_item.event.conversation_id,
@@ -215,6 +237,37 @@ def init(
                     assistant_id,
                 )
 
+    async def _notify_local_sse_clients(event: ConversationEvent) -> None:
+        if stop_signal.is_set():
+            return
+
+        async with conversation_sse_queues_lock:
+            conversation_sse_replay_buffer.append(event)
+            subscriber_queues = list(conversation_sse_queues.get(event.conversation_id, {}))
+
+        # publishing is non-blocking and outside of the lock, so a slow subscriber cannot delay the others
+        for queue in subscriber_queues:
+            queue.put_nowait(event)
+        logger.debug(
+            "enqueued event for SSE; conversation_id: %s, event: %s, event_id: %s",
+            event.conversation_id,
+            event.event,
+            event.id,
+        )
+
+        if event.event in [
+            ConversationEventType.message_created,
+            ConversationEventType.message_deleted,
+            ConversationEventType.conversation_updated,
+            ConversationEventType.participant_created,
+            ConversationEventType.participant_updated,
+        ]:
+            task = asyncio.create_task(_notify_user_event(event.conversation_id), name="notify_user_event")
+            background_tasks.add(task)
+            task.add_done_callback(background_tasks.discard)
+
+    conversation_event_bus.subscribe(_notify_local_sse_clients)
+
     async def _notify_user_event(conversation_id: uuid.UUID) -> None:
         listening_user_ids = set(user_sse_queues.keys())
         async with _controller_get_session() as session:
@@ -234,18 +287,43 @@ def init(
         async with user_sse_queues_lock:
             for user_id in active_user_participants:
                 for queue in user_sse_queues.get(user_id, {}):
-                    await queue.put(conversation_id)
+                    if queue.full():
+                        # a client this far behind is not reading its events; rather than grow without limit, or
+                        # silently drop events, its queued events are replaced by one that has it refetch them all
+                        logger.debug("user sse queue full; user_id: %s", user_id)
+                        while not queue.empty():
+                            queue.get_nowait()
+                        queue.put_nowait(None)
+                        continue
+                    queue.put_nowait(conversation_id)
                     logger.debug(
                         "enqueued event for user SSE; user_id: %s, conversation_id: %s", user_id, conversation_id
                     )
 
-    assistant_client_pool = controller.AssistantServiceClientPool(api_key_store=api_key_store)
+    assistant_client_pool = controller.AssistantServiceClientPool(
+        api_key_store=api_key_store,
+        limits=httpx.Limits(
+            max_connections=settings.service.assistant_service_http_max_connections,
+            max_keepalive_connections=settings.service.assistant_service_http_max_keepalive_connections,
+            keepalive_expiry=settings.service.assistant_service_http_keepalive_expiry_seconds,
+        ),
+        http2=settings.service.assistant_service_http2,
+        idle_timeout_seconds=settings.service.assistant_service_client_idle_timeout_seconds,
+    )
+
+    assistant_routing_table = controller.AssistantRoutingTable(
+        get_session=_controller_get_session,
+        max_conversations=settings.service.assistant_routing_cache_max_conversations,
+        ttl_seconds=settings.service.assistant_routing_cache_ttl_seconds,
+    )
+    conversation_event_bus.subscribe(assistant_routing_table.on_conversation_event)
 
     assistant_service_registration_controller = controller.AssistantServiceRegistrationController(
         get_session=_controller_get_session,
         notify_event=_notify_event,
         api_key_store=api_key_store,
         client_pool=assistant_client_pool,
+        routing_table=assistant_routing_table,
     )
 
     app.add_middleware(
@@ -269,6 +347,7 @@ def init(
         get_session=_controller_get_session,
         notify_event=_notify_event,
         client_pool=assistant_client_pool,
+        routing_table=assistant_routing_table,
         file_storage=files.Storage(settings.storage),
     )
     conversation_controller = controller.ConversationController(
@@ -289,7 +368,11 @@ def init(
 
     @asynccontextmanager
     async def _lifespan() -> AsyncIterator[None]:
-        async with db.create_engine(settings.db) as engine:
+        async with (
+            db.create_engine(settings.db) as engine,
+            conversation_event_bus,
+            assistant_client_pool,
+        ):
             await db.bootstrap_db(engine, settings=settings.db)
 
             app.state.db_engine = engine
@@ -299,6 +382,9 @@ def init(
                     _update_assistant_service_online_status(), name="update_assistant_service_online_status"
                 ),
             )
+            background_tasks.add(
+                asyncio.create_task(_delete_unused_blobs(), name="delete_unused_blobs"),
+            )
 
             try:
                 yield
@@ -323,6 +409,17 @@ def init(
             except Exception:
                 logger.exception("exception in _update_assistant_service_online_status")
 
+    async def _delete_unused_blobs() -> NoReturn:
+        while True:
+            try:
+                await asyncio.sleep(settings.storage.unused_blob_check_interval_seconds)
+                deleted_count = await file_controller.delete_unused_blobs()
+                if deleted_count:
+                    logger.info("deleted unused file content; blob count: %d", deleted_count)
+
+            except Exception:
+                logger.exception("exception in _delete_unused_blobs")
+
     @app.get("/")
     async def root() -> Response:
         return Response(status_code=status.HTTP_200_OK, content="")
@@ -466,14 +563,13 @@ def init(
     async def export_assistant(
         user_principal: auth.DependsUserPrincipal,
         assistant_id: uuid.UUID,
-    ) -> FileResponse:
+    ) -> StreamingResponse:
         result = await assistant_controller.export_assistant(user_principal=user_principal, assistant_id=assistant_id)
 
-        return FileResponse(
-            path=result.file_path,
+        return StreamingResponse(
+            result.stream,
             media_type=result.content_type,
-            filename=result.filename,
-            background=starlette.background.BackgroundTask(result.cleanup),
+            headers={"Content-Disposition": f'attachment; filename="{result.filename}"'},
         )
 
     @app.get(
@@ -483,16 +579,15 @@ def init(
     async def export_conversations(
         user_principal: auth.DependsUserPrincipal,
         conversation_ids: list[uuid.UUID] = Query(alias="id"),
-    ) -> FileResponse:
+    ) -> StreamingResponse:
         result = await assistant_controller.export_conversations(
             user_principal=user_principal, conversation_ids=set(conversation_ids)
         )
 
-        return FileResponse(
-            path=result.file_path,
+        return StreamingResponse(
+            result.stream,
             media_type=result.content_type,
-            filename=result.filename,
-            background=starlette.background.BackgroundTask(result.cleanup),
+            headers={"Content-Disposition": f'attachment; filename="{result.filename}"'},
         )
 
     @app.post("/conversations/import")
@@ -624,12 +719,38 @@ def init(
             principal_id,
             conversation_id,
         )
-        event_queue = asyncio.Queue[ConversationEvent]()
+        event_queue = ConversationEventSubscriberQueue(
+            max_size=settings.service.sse_subscriber_queue_max_size,
+            policy=settings.service.sse_slow_consumer_policy,
+            metrics=conversation_sse_queue_metrics,
+        )
+
+        last_event_id = request.headers.get("last-event-id")
 
         async with conversation_sse_queues_lock:
             queues = conversation_sse_queues[conversation_id]
             queues.add(event_queue)
 
+            # replay the events the client missed while it was disconnected; the snapshot is taken under the same
+            # lock as the queue registration so that no event is missed or sent twice
+            if last_event_id:
+                missed_events = conversation_sse_replay_buffer.events_after(conversation_id, last_event_id)
+                if missed_events is None:
+                    # the missed events cannot be replayed, so the client is told to refetch the conversation
+                    # before it is sent new events
+                    logger.debug(
+                        "last event id not in replay buffer; conversation_id: %s, last_event_id: %s",
+                        conversation_id,
+                        last_event_id,
+                    )
+                    missed_events = [
+                        ConversationEvent(
+                            conversation_id=conversation_id, event=ConversationEventType.conversation_reset
+                        )
+                    ]
+                for missed_event in missed_events:
+                    event_queue.put_nowait(missed_event)
+
         async def event_generator() -> AsyncIterator[ServerSentEvent]:
             try:
                 while True:
@@ -654,8 +775,14 @@ def init(
                         except asyncio.TimeoutError:
                             continue
 
+                        if conversation_event is None:
+                            logger.debug(
+                                "sse client disconnected for falling behind; conversation_id: %s", conversation_id
+                            )
+                            break
+
                         server_sent_event = ServerSentEvent(
-                            id=conversation_event.id,
+                            id=conversation_event.id if is_replayable(conversation_event) else None,
                             event=conversation_event.event.value,
                             data=conversation_event.model_dump_json(include={"timestamp", "data"}),
                             retry=1000,
@@ -690,7 +817,7 @@ def init(
     ) -> EventSourceResponse:
         logger.debug("client connected to user events sse; user_id: %s", user_principal.user_id)
 
-        event_queue = asyncio.Queue[uuid.UUID]()
+        event_queue = asyncio.Queue[uuid.UUID | None](maxsize=settings.service.sse_queue_max_size)
 
         async with user_sse_queues_lock:
             queues = user_sse_queues[user_principal.user_id]
@@ -720,12 +847,20 @@ def init(
                         except asyncio.TimeoutError:
                             continue
 
-                        server_sent_event = ServerSentEvent(
-                            id=uuid.uuid4().hex,
-                            event="message.created",
-                            data=json.dumps({"conversation_id": str(conversation_id)}),
-                            retry=1000,
-                        )
+                        if conversation_id is None:
+                            server_sent_event = ServerSentEvent(
+                                id=uuid.uuid4().hex,
+                                event=ConversationEventType.conversation_reset.value,
+                                data=json.dumps({}),
+                                retry=1000,
+                            )
+                        else:
+                            server_sent_event = ServerSentEvent(
+                                id=uuid.uuid4().hex,
+                                event="message.created",
+                                data=json.dumps({"conversation_id": str(conversation_id)}),
+                                retry=1000,
+                            )
                         yield server_sent_event
                         logger.debug(
                             "sent event to user sse client; user_id: %s, event: %s",
@@ -862,6 +997,8 @@ def init(
         message_types: Annotated[list[MessageType] | None, Query(alias="message_type")] = None,
         before: Annotated[uuid.UUID | None, Query()] = None,
         after: Annotated[uuid.UUID | None, Query()] = None,
+        before_sequence: Annotated[int | None, Query()] = None,
+        after_sequence: Annotated[int | None, Query()] = None,
         limit: Annotated[int, Query(lte=500)] = 100,
     ) -> ConversationMessageList:
         return await conversation_controller.get_messages(
@@ -872,6 +1009,8 @@ def init(
             message_types=message_types,
             before=before,
             after=after,
+            before_sequence=before_sequence,
+            after_sequence=after_sequence,
             limit=limit,
         )
 
@@ -887,6 +1026,45 @@ def init(
             principal=principal,
         )
 
+    @app.post("/conversations/{conversation_id}/messages/batch")
+    async def create_conversation_messages(
+        conversation_id: uuid.UUID,
+        new_message_batch: NewConversationMessageBatch,
+        principal: auth.DependsActorPrincipal,
+    ) -> ConversationMessageList:
+        message_list = await conversation_controller.create_conversation_messages(
+            conversation_id=conversation_id,
+            new_messages=new_message_batch.messages,
+            principal=principal,
+        )
+
+        if new_message_batch.update_participant is not None:
+            await conversation_controller.add_or_update_conversation_participant(
+                participant_id=_translate_participant_id_me(principal, "me"),
+                update_participant=new_message_batch.update_participant,
+                conversation_id=conversation_id,
+                principal=principal,
+            )
+
+        return message_list
+
+    @app.post(
+        "/conversations/{conversation_id}/messages/{message_id}/deltas",
+        status_code=status.HTTP_204_NO_CONTENT,
+    )
+    async def append_conversation_message_delta(
+        conversation_id: uuid.UUID,
+        message_id: uuid.UUID,
+        new_delta: NewConversationMessageDelta,
+        principal: auth.DependsActorPrincipal,
+    ) -> None:
+        await conversation_controller.append_conversation_message_delta(
+            conversation_id=conversation_id,
+            message_id=message_id,
+            new_delta=new_delta,
+            principal=principal,
+        )
+
     @app.get(
         "/conversations/{conversation_id}/messages/{message_id}",
     )
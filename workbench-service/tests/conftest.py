@@ -198,7 +198,7 @@ def workbench_service(
     )
 
     # monkeypatch workbench client to use a transport that directs requests to the workbench app
-    monkeypatch.setattr(workbench_service_client, "httpx_transport_factory", lambda: httpx.ASGITransport(app=app))
+    monkeypatch.setattr(workbench_service_client, "httpx_transport_factory", lambda **_: httpx.ASGITransport(app=app))
 
     return app
 
@@ -214,7 +214,7 @@ def canonical_assistant_service(
 
         # configure assistant client to use a specific transport that directs requests to the assistant app
         monkeypatch.setattr(
-            assistant_service_client, "httpx_transport_factory", lambda: httpx.ASGITransport(app=assistant_app)
+            assistant_service_client, "httpx_transport_factory", lambda **_: httpx.ASGITransport(app=assistant_app)
         )
 
         yield assistant_app
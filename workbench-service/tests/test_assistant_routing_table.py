@@ -0,0 +1,154 @@
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from semantic_workbench_api_model.workbench_model import (
+    ConversationEvent,
+    ConversationEventBatch,
+    ConversationEventBatchResult,
+    ConversationEventType,
+)
+from semantic_workbench_service import db
+from semantic_workbench_service.controller import AssistantController, AssistantRoutingTable
+
+
+class MockResult:
+    def __init__(self, rows: list[Any]) -> None:
+        self._rows = rows
+
+    def all(self) -> list[Any]:
+        return self._rows
+
+    def one(self) -> Any:
+        assert len(self._rows) == 1
+        return self._rows[0]
+
+    def one_or_none(self) -> Any:
+        assert len(self._rows) <= 1
+        return self._rows[0] if self._rows else None
+
+
+class MockSession:
+    def __init__(self, rows: list[Any]) -> None:
+        self.rows = rows
+        self.query_count = 0
+
+    async def exec(self, statement: Any) -> MockResult:
+        self.query_count += 1
+        return MockResult(self.rows)
+
+
+def create_routing_table(session: MockSession) -> AssistantRoutingTable:
+    @asynccontextmanager
+    async def get_session() -> AsyncIterator[Any]:
+        yield session
+
+    return AssistantRoutingTable(get_session=get_session, max_conversations=10, ttl_seconds=60)
+
+
+def create_assistant() -> db.Assistant:
+    return db.Assistant(
+        owner_id="owner", assistant_service_id="service", name="assistant", imported_from_assistant_id=None
+    )
+
+
+async def test_routing_table_caches_assistants_for_conversation() -> None:
+    assistant = create_assistant()
+    session = MockSession(rows=[assistant])
+    routing_table = create_routing_table(session)
+
+    conversation_id = uuid.uuid4()
+    assert await routing_table.assistant_ids_for_conversation(conversation_id) == [assistant.assistant_id]
+    assert await routing_table.assistant_ids_for_conversation(conversation_id) == [assistant.assistant_id]
+    assert await routing_table.get_assistant(assistant.assistant_id) is assistant
+    assert session.query_count == 1
+
+
+async def test_routing_table_invalidated_by_participant_events() -> None:
+    assistant = create_assistant()
+    session = MockSession(rows=[assistant])
+    routing_table = create_routing_table(session)
+
+    conversation_id = uuid.uuid4()
+    other_conversation_id = uuid.uuid4()
+    await routing_table.assistant_ids_for_conversation(conversation_id)
+    await routing_table.assistant_ids_for_conversation(other_conversation_id)
+
+    # events that do not change participants keep the cache
+    await routing_table.on_conversation_event(
+        ConversationEvent(conversation_id=conversation_id, event=ConversationEventType.message_created)
+    )
+    await routing_table.assistant_ids_for_conversation(conversation_id)
+    assert session.query_count == 2
+
+    session.rows = []
+    await routing_table.on_conversation_event(
+        ConversationEvent(conversation_id=conversation_id, event=ConversationEventType.participant_updated)
+    )
+    assert await routing_table.assistant_ids_for_conversation(conversation_id) == []
+    assert await routing_table.assistant_ids_for_conversation(other_conversation_id) == [assistant.assistant_id]
+    assert session.query_count == 3
+
+    routing_table.invalidate_all()
+    assert await routing_table.assistant_ids_for_conversation(other_conversation_id) == []
+    assert session.query_count == 4
+
+
+async def test_routing_table_returns_none_for_deleted_assistants() -> None:
+    session = MockSession(rows=[])
+    routing_table = create_routing_table(session)
+
+    assert await routing_table.get_assistant(uuid.uuid4()) is None
+
+
+async def test_forward_events_skips_deleted_assistants() -> None:
+    assistant = create_assistant()
+    assistant.related_assistant_service_registration = db.AssistantServiceRegistration(
+        assistant_service_id="service",
+        created_by_user_id="user",
+        name="service",
+        description="",
+        include_in_listings=False,
+        api_key_name="key",
+    )
+    session = MockSession(rows=[assistant])
+    routing_table = create_routing_table(session)
+    conversation_id = uuid.uuid4()
+    await routing_table.assistant_ids_for_conversation(conversation_id)
+
+    # the other assistant was deleted
+    session.rows = []
+    deleted_assistant_id = uuid.uuid4()
+
+    requests: list[ConversationEventBatch] = []
+
+    class MockServiceClient:
+        async def post_conversation_events(self, request: ConversationEventBatch) -> ConversationEventBatchResult:
+            requests.append(request)
+            return ConversationEventBatchResult(undelivered=[1])
+
+    class MockClientPool:
+        async def service_client(self, registration: db.AssistantServiceRegistration) -> MockServiceClient:
+            return MockServiceClient()
+
+    controller = AssistantController(
+        get_session=None,  # type: ignore
+        notify_event=None,  # type: ignore
+        client_pool=MockClientPool(),  # type: ignore
+        routing_table=routing_table,
+        file_storage=None,  # type: ignore
+    )
+
+    def message_created() -> ConversationEvent:
+        return ConversationEvent(conversation_id=conversation_id, event=ConversationEventType.message_created)
+
+    events = [
+        (deleted_assistant_id, message_created()),
+        (assistant.assistant_id, message_created()),
+        (assistant.assistant_id, message_created()),
+    ]
+    undelivered = await controller.forward_events_to_assistant_service(assistant_service_id="service", events=events)
+
+    # the events for the other assistants are forwarded, and the undelivered indexes refer to the given events
+    assert [item.event for item in requests[0].events] == [event for _, event in events[1:]]
+    assert undelivered == [2]
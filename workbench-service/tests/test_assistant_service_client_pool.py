@@ -0,0 +1,106 @@
+import asyncio
+import uuid
+from typing import AsyncIterator
+
+import httpx
+import pytest
+from pytest_httpx import HTTPXMock
+from semantic_workbench_api_model import assistant_service_client
+from semantic_workbench_service import assistant_api_key, db
+from semantic_workbench_service.controller import AssistantServiceClientPool
+
+
+def create_registration(url: str = "http://testassistantservice") -> db.AssistantServiceRegistration:
+    return db.AssistantServiceRegistration(
+        assistant_service_id="service",
+        created_by_user_id="user",
+        name="service",
+        description="",
+        api_key_name="key",
+        assistant_service_url=url,
+    )
+
+
+def create_assistant(registration: db.AssistantServiceRegistration) -> db.Assistant:
+    assistant = db.Assistant(
+        owner_id="owner",
+        assistant_service_id=registration.assistant_service_id,
+        name="assistant",
+        imported_from_assistant_id=None,
+    )
+    assistant.related_assistant_service_registration = registration
+    return assistant
+
+
+async def test_assistant_clients_share_service_client(httpx_mock: HTTPXMock) -> None:
+    registration = create_registration()
+    assistants = [create_assistant(registration) for _ in range(3)]
+    conversation_id = uuid.uuid4()
+    for assistant in assistants:
+        httpx_mock.add_response(
+            url=f"http://testassistantservice/{assistant.assistant_id}/conversations/{conversation_id}",
+            method="DELETE",
+        )
+
+    async with AssistantServiceClientPool(api_key_store=assistant_api_key.FixedApiKeyStore()) as pool:
+        service_client = await pool.service_client(registration)
+
+        for assistant in assistants:
+            assistant_client = await pool.assistant_client(assistant)
+            assert assistant_client._client is service_client._client
+
+            await assistant_client.delete_conversation(conversation_id)
+
+            # closing an assistant client leaves the shared client open
+            await assistant_client.aclose()
+            assert not service_client._client.is_closed
+
+    assert service_client._client.is_closed
+    assert [request.url.path for request in httpx_mock.get_requests()] == [
+        f"/{assistant.assistant_id}/conversations/{conversation_id}" for assistant in assistants
+    ]
+
+
+async def test_idle_service_clients_are_closed() -> None:
+    async with AssistantServiceClientPool(
+        api_key_store=assistant_api_key.FixedApiKeyStore(), idle_timeout_seconds=0.05
+    ) as pool:
+        old_url_client = await pool.service_client(create_registration(url="http://old"))
+
+        await asyncio.sleep(0.1)
+        new_url_client = await pool.service_client(create_registration(url="http://new"))
+
+        assert old_url_client._client.is_closed
+        assert not new_url_client._client.is_closed
+        assert await pool.service_client(create_registration(url="http://new")) is new_url_client
+
+        # a new client is created for a url that is used again after eviction
+        assert await pool.service_client(create_registration(url="http://old")) is not old_url_client
+
+
+async def test_service_clients_with_requests_in_flight_are_not_closed(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def content() -> AsyncIterator[bytes]:
+        yield b"exported"
+
+    monkeypatch.setattr(
+        assistant_service_client,
+        "httpx_transport_factory",
+        lambda **kwargs: httpx.MockTransport(lambda request: httpx.Response(200, content=content())),
+    )
+
+    async with AssistantServiceClientPool(
+        api_key_store=assistant_api_key.FixedApiKeyStore(), idle_timeout_seconds=0.05
+    ) as pool:
+        registration = create_registration()
+        service_client = await pool.service_client(registration)
+
+        async with service_client._client.stream("GET", "/export-data") as response:
+            # the client is idle for longer than the timeout, but is streaming a response
+            await asyncio.sleep(0.1)
+            assert await pool.service_client(create_registration(url="http://other")) is not service_client
+            assert not service_client._client.is_closed
+            assert await response.aread() == b"exported"
+
+        await asyncio.sleep(0.1)
+        await pool.service_client(create_registration(url="http://other"))
+        assert service_client._client.is_closed
@@ -0,0 +1,236 @@
+import asyncio
+import uuid
+
+from semantic_workbench_api_model.workbench_model import ConversationEvent, ConversationEventType
+from semantic_workbench_service.config import WebServiceSettings
+from semantic_workbench_service.event import (
+    ConversationEventReplayBuffer,
+    ConversationEventSubscriberQueue,
+    SlowConsumerPolicy,
+    SubscriberQueueMetrics,
+    is_replayable,
+)
+
+
+def create_event(
+    conversation_id: uuid.UUID,
+    event_type: ConversationEventType = ConversationEventType.message_created,
+    data: dict | None = None,
+) -> ConversationEvent:
+    return ConversationEvent(conversation_id=conversation_id, event=event_type, data=data or {})
+
+
+def test_replay_buffer_returns_events_after_last_event_id() -> None:
+    buffer = ConversationEventReplayBuffer(max_events_per_conversation=10, max_conversations=10)
+
+    conversation_id = uuid.uuid4()
+    events = [create_event(conversation_id) for _ in range(5)]
+    for event in events:
+        buffer.append(event)
+
+    # events for other conversations are kept separately
+    buffer.append(create_event(uuid.uuid4()))
+
+    assert buffer.events_after(conversation_id, events[1].id) == events[2:]
+    assert buffer.events_after(conversation_id, events[-1].id) == []
+    assert buffer.events_after(conversation_id, "unknown") is None
+    assert buffer.events_after(uuid.uuid4(), events[1].id) is None
+
+
+def test_replay_buffer_is_bounded() -> None:
+    buffer = ConversationEventReplayBuffer(max_events_per_conversation=3, max_conversations=2)
+
+    conversation_id = uuid.uuid4()
+    events = [create_event(conversation_id) for _ in range(5)]
+    for event in events:
+        buffer.append(event)
+
+    # the oldest events are evicted from the conversation
+    assert buffer.events_after(conversation_id, events[0].id) is None
+    assert buffer.events_after(conversation_id, events[2].id) == events[3:]
+
+    # the least recently used conversation is evicted
+    buffer.append(create_event(uuid.uuid4()))
+    buffer.append(create_event(uuid.uuid4()))
+    assert buffer.events_after(conversation_id, events[2].id) is None
+
+
+def create_delta_event(conversation_id: uuid.UUID, message_id: uuid.UUID, content: str) -> ConversationEvent:
+    return create_event(
+        conversation_id,
+        ConversationEventType.message_delta,
+        {"message_delta": {"message_id": str(message_id), "content": content}},
+    )
+
+
+def test_replay_buffer_does_not_retain_message_deltas() -> None:
+    buffer = ConversationEventReplayBuffer(max_events_per_conversation=2, max_conversations=1)
+
+    conversation_id = uuid.uuid4()
+    first = create_event(conversation_id)
+    buffer.append(first)
+    for content in ["a", "b", "c"]:
+        buffer.append(create_delta_event(conversation_id, uuid.uuid4(), content))
+    second = create_event(conversation_id)
+    buffer.append(second)
+
+    assert buffer.events_after(conversation_id, first.id) == [second]
+
+
+def test_replay_buffer_does_not_retain_reset_events() -> None:
+    buffer = ConversationEventReplayBuffer(max_events_per_conversation=10, max_conversations=1)
+
+    conversation_id = uuid.uuid4()
+    reset = create_event(conversation_id, ConversationEventType.conversation_reset)
+    buffer.append(reset)
+
+    # a client is never sent the id of a reset, so it cannot reconnect with it
+    assert not is_replayable(reset)
+    assert buffer.events_after(conversation_id, reset.id) is None
+
+
+async def drain(queue: ConversationEventSubscriberQueue) -> list[ConversationEvent]:
+    events = []
+    while len(queue):
+        event = await queue.get()
+        assert event is not None
+        events.append(event)
+    return events
+
+
+async def test_subscriber_queue_drop_oldest() -> None:
+    metrics = SubscriberQueueMetrics()
+    queue = ConversationEventSubscriberQueue(max_size=2, policy=SlowConsumerPolicy.drop_oldest, metrics=metrics)
+
+    conversation_id = uuid.uuid4()
+    events = [create_event(conversation_id) for _ in range(4)]
+    for event in events:
+        queue.put_nowait(event)
+
+    # the subscriber is sent one reset, ahead of the events that were not dropped, so that it refetches the
+    # conversation rather than miss the dropped events
+    received = await drain(queue)
+    assert received[0].event == ConversationEventType.conversation_reset
+    assert received[0].conversation_id == conversation_id
+    assert received[1:] == events[2:]
+    assert metrics == SubscriberQueueMetrics(enqueued=4, dropped=2)
+
+
+async def test_subscriber_queue_coalesce() -> None:
+    metrics = SubscriberQueueMetrics()
+    queue = ConversationEventSubscriberQueue(max_size=2, policy=SlowConsumerPolicy.coalesce, metrics=metrics)
+
+    conversation_id = uuid.uuid4()
+
+    def participant_updated(participant_id: str, status: str) -> ConversationEvent:
+        return create_event(
+            conversation_id,
+            ConversationEventType.participant_updated,
+            {"participant": {"id": participant_id, "status": status}},
+        )
+
+    first_status = participant_updated("assistant", "thinking")
+    message = create_event(conversation_id)
+    second_status = participant_updated("assistant", "typing")
+    third_message = create_event(conversation_id)
+
+    for event in (first_status, message, second_status, third_message):
+        queue.put_nowait(event)
+
+    # the superseded status is replaced; with nothing left to coalesce, the oldest event is dropped
+    received = await drain(queue)
+    assert received[0].event == ConversationEventType.conversation_reset
+    assert received[1:] == [second_status, third_message]
+    assert metrics == SubscriberQueueMetrics(enqueued=4, coalesced=1, dropped=1)
+
+
+async def test_subscriber_queue_merges_message_deltas() -> None:
+    metrics = SubscriberQueueMetrics()
+    queue = ConversationEventSubscriberQueue(max_size=10, policy=SlowConsumerPolicy.disconnect, metrics=metrics)
+
+    conversation_id = uuid.uuid4()
+    message_id = uuid.uuid4()
+    other_message_id = uuid.uuid4()
+    status = create_event(conversation_id, ConversationEventType.participant_updated)
+
+    queue.put_nowait(create_delta_event(conversation_id, message_id, "Hello"))
+    queue.put_nowait(status)
+    queue.put_nowait(create_delta_event(conversation_id, other_message_id, "Other"))
+    queue.put_nowait(create_delta_event(conversation_id, message_id, ", world"))
+
+    events = await drain(queue)
+    assert [event.event for event in events] == [
+        ConversationEventType.message_delta,
+        ConversationEventType.participant_updated,
+        ConversationEventType.message_delta,
+    ]
+    assert events[0].data["message_delta"] == {"message_id": str(message_id), "content": "Hello, world"}
+    assert events[2].data["message_delta"]["content"] == "Other"
+    assert metrics == SubscriberQueueMetrics(enqueued=3, coalesced=1)
+
+    # a delta that follows a delta that was already sent is queued
+    queue.put_nowait(create_delta_event(conversation_id, message_id, "!"))
+    assert [event.data["message_delta"]["content"] for event in await drain(queue)] == ["!"]
+
+
+async def test_subscriber_queue_disconnect() -> None:
+    metrics = SubscriberQueueMetrics()
+    queue = ConversationEventSubscriberQueue(max_size=1, policy=SlowConsumerPolicy.disconnect, metrics=metrics)
+
+    conversation_id = uuid.uuid4()
+    queue.put_nowait(create_event(conversation_id))
+    queue.put_nowait(create_event(conversation_id))
+
+    assert queue.disconnected
+    assert await queue.get() is None
+
+    # events after the disconnect are ignored
+    queue.put_nowait(create_event(conversation_id))
+    assert len(queue) == 0
+    assert metrics == SubscriberQueueMetrics(enqueued=1, disconnected=1)
+
+
+async def test_disconnected_subscriber_resumes_from_replay_buffer() -> None:
+    settings = WebServiceSettings(sse_queue_max_size=1_000, sse_replay_buffer_events_per_conversation=5)
+    assert settings.sse_subscriber_queue_max_size == 3
+
+    replay_buffer = ConversationEventReplayBuffer(
+        max_events_per_conversation=settings.sse_replay_buffer_events_per_conversation, max_conversations=1
+    )
+    queue = ConversationEventSubscriberQueue(
+        max_size=settings.sse_subscriber_queue_max_size,
+        policy=SlowConsumerPolicy.disconnect,
+        metrics=SubscriberQueueMetrics(),
+    )
+
+    conversation_id = uuid.uuid4()
+    events = [create_event(conversation_id) for _ in range(5)]
+    for event in events[:2]:
+        replay_buffer.append(event)
+        queue.put_nowait(event)
+
+    received = await queue.get()
+    assert received == events[0]
+
+    # the subscriber falls behind until it is disconnected
+    for event in events[2:]:
+        replay_buffer.append(event)
+        queue.put_nowait(event)
+    assert queue.disconnected
+
+    # the last event it received is still buffered, so it resumes without missing any events
+    assert replay_buffer.events_after(conversation_id, received.id) == events[1:]
+
+
+async def test_subscriber_queue_get_waits_for_event() -> None:
+    queue = ConversationEventSubscriberQueue(
+        max_size=1, policy=SlowConsumerPolicy.disconnect, metrics=SubscriberQueueMetrics()
+    )
+
+    event = create_event(uuid.uuid4())
+    get_task = asyncio.create_task(queue.get())
+    await asyncio.sleep(0)
+    assert not get_task.done()
+
+    queue.put_nowait(event)
+    assert await get_task == event
@@ -0,0 +1,90 @@
+import asyncio
+import uuid
+
+import pytest
+from semantic_workbench_api_model.workbench_model import ConversationEvent, ConversationEventType
+from semantic_workbench_service import event_bus
+from semantic_workbench_service.config import DBSettings
+
+
+def create_event(data: dict | None = None) -> ConversationEvent:
+    return ConversationEvent(
+        conversation_id=uuid.uuid4(),
+        event=ConversationEventType.message_created,
+        data=data or {},
+    )
+
+
+async def test_in_memory_event_bus_delivers_to_subscribers() -> None:
+    received: list[ConversationEvent] = []
+
+    async def handler(event: ConversationEvent) -> None:
+        received.append(event)
+
+    async def failing_handler(event: ConversationEvent) -> None:
+        raise RuntimeError("handler failure")
+
+    async with event_bus.InMemoryEventBus() as bus:
+        bus.subscribe(failing_handler)
+        bus.subscribe(handler)
+
+        event = create_event()
+        await bus.publish(event)
+
+    assert received == [event]
+
+
+@pytest.mark.parametrize("content_length", [10, 7_499, 7_500, 50_000])
+def test_notify_payloads_round_trip(content_length: int) -> None:
+    event = create_event(data={"message": {"content": "é" * content_length}})
+
+    payloads = event_bus.encode_notify_payloads(origin="node", event=event)
+    assert all(len(payload.encode("utf-8")) < 8000 for payload in payloads)
+
+    assembler = event_bus.NotifyPayloadAssembler()
+    results = [assembler.add(payload) for payload in payloads]
+
+    assert [result[1] for result in results[:-1]] == [None] * (len(payloads) - 1)
+    assert results[-1] == ("node", event)
+
+
+def test_notify_payload_assembler_rejects_out_of_order_chunks() -> None:
+    event = create_event(data={"content": "x" * 20_000})
+    payloads = event_bus.encode_notify_payloads(origin="node", event=event)
+
+    assembler = event_bus.NotifyPayloadAssembler()
+    with pytest.raises(ValueError):
+        assembler.add(payloads[1])
+
+
+async def test_postgresql_event_bus_delivers_across_nodes(db_type: str, request: pytest.FixtureRequest) -> None:
+    if db_type != "postgresql":
+        pytest.skip("requires postgresql")
+
+    db_settings: DBSettings = request.getfixturevalue("db_settings")
+    dsn = db_settings.url
+    channel = f"test_{uuid.uuid4().hex}"
+
+    def create_bus() -> event_bus.PostgreSQLEventBus:
+        return event_bus.PostgreSQLEventBus(
+            dsn=dsn, ssl="disable", channel=channel, publish_pool_size=1, reconnect_interval_seconds=1
+        )
+
+    received_by_node_1: list[ConversationEvent] = []
+    received_by_node_2: asyncio.Queue[ConversationEvent] = asyncio.Queue()
+
+    async def node_1_handler(event: ConversationEvent) -> None:
+        received_by_node_1.append(event)
+
+    async with create_bus() as node_1, create_bus() as node_2:
+        node_1.subscribe(node_1_handler)
+        node_2.subscribe(received_by_node_2.put)
+
+        event = create_event(data={"content": "x" * 20_000})
+        await node_1.publish(event)
+
+        async with asyncio.timeout(5):
+            assert await received_by_node_2.get() == event
+
+    # the publishing node delivers locally exactly once
+    assert received_by_node_1 == [event]
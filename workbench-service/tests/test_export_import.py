@@ -0,0 +1,61 @@
+import io
+import json
+import zipfile
+from typing import AsyncGenerator, AsyncIterator
+
+import pytest
+from semantic_workbench_service.controller import exceptions, export_import
+
+
+async def test_stream_zip() -> None:
+    async def content(*chunks: bytes) -> AsyncIterator[bytes]:
+        for chunk in chunks:
+            yield chunk
+
+    large_content = bytes(range(256)) * 1_000
+
+    async def entries() -> AsyncGenerator[export_import.ZipEntry, None]:
+        yield "workbench.jsonl", content(b'{"type": "a"}\n', b'{"type": "b"}\n')
+        yield "blobs/large", content(large_content[:100_000], large_content[100_000:])
+        yield "empty", content()
+
+    chunks = [chunk async for chunk in export_import.stream_zip(entries())]
+    assert len(chunks) > 1
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zip_file:
+        assert zip_file.testzip() is None
+        assert zip_file.namelist() == ["workbench.jsonl", "blobs/large", "empty", "manifest.json"]
+        assert zip_file.read("workbench.jsonl") == b'{"type": "a"}\n{"type": "b"}\n'
+        assert zip_file.read("blobs/large") == large_content
+        assert zip_file.read("empty") == b""
+        assert json.loads(zip_file.read("manifest.json")) == {"entries": ["workbench.jsonl", "blobs/large", "empty"]}
+        export_import.validate_zip(zip_file)
+
+
+async def test_stream_zip_marks_incomplete_zip() -> None:
+    async def failing_content() -> AsyncIterator[bytes]:
+        yield b"partial"
+        raise RuntimeError("assistant service is not available")
+
+    async def entries() -> AsyncGenerator[export_import.ZipEntry, None]:
+        yield "workbench.jsonl", failing_content()
+        yield "never", failing_content()
+
+    chunks = [chunk async for chunk in export_import.stream_zip(entries())]
+
+    # the zip is still readable, but is rejected on import
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zip_file:
+        assert zip_file.namelist() == ["workbench.jsonl", "export_error.txt"]
+        with pytest.raises(exceptions.InvalidArgumentError, match="assistant service is not available"):
+            export_import.validate_zip(zip_file)
+
+
+def test_validate_zip_rejects_missing_entries() -> None:
+    zip_bytes = io.BytesIO()
+    with zipfile.ZipFile(zip_bytes, mode="w") as zip_file:
+        zip_file.writestr("workbench.jsonl", b"")
+        zip_file.writestr("manifest.json", json.dumps({"entries": ["workbench.jsonl", "blobs/abc"]}))
+
+    with zipfile.ZipFile(zip_bytes) as zip_file:
+        with pytest.raises(exceptions.InvalidArgumentError, match="blobs/abc"):
+            export_import.validate_zip(zip_file)
@@ -1,31 +1,36 @@
+import asyncio
+import hashlib
 import io
+import os
+import time
 import uuid
 
 import pytest
+from fastapi import UploadFile
 
 from semantic_workbench_service import files
 
 
-def test_read_file_not_found(storage_settings: files.StorageSettings) -> None:
+async def read_all(file_storage: files.Storage, namespace: str, filename: str) -> bytes:
+    return b"".join([chunk async for chunk in file_storage.read_file(namespace=namespace, filename=filename)])
+
+
+async def test_read_file_not_found(storage_settings: files.StorageSettings) -> None:
     file_storage = files.Storage(settings=storage_settings)
 
-    with (
-        pytest.raises(FileNotFoundError),
-        file_storage.read_file(
-            namespace="conversation_id",
-            filename="filename",
-        ) as f,
-    ):
-        f.read()
+    with pytest.raises(FileNotFoundError):
+        await read_all(file_storage, namespace="conversation_id", filename="filename")
 
 
-def test_write_file(storage_settings: files.StorageSettings) -> None:
+async def test_write_file(storage_settings: files.StorageSettings) -> None:
     file_storage = files.Storage(settings=storage_settings)
 
-    file_storage.write_file(namespace="conversation_id", filename="filename", content=io.BytesIO(b"content"))
+    await file_storage.write_file(
+        namespace="conversation_id", filename="filename", content=UploadFile(file=io.BytesIO(b"content"))
+    )
 
 
-def test_write_read_delete_file(storage_settings: files.StorageSettings) -> None:
+async def test_write_read_delete_file(storage_settings: files.StorageSettings) -> None:
     file_storage = files.Storage(settings=storage_settings)
 
     conversation_id = uuid.uuid4().hex
@@ -33,12 +38,91 @@ def test_write_read_delete_file(storage_settings: files.StorageSettings) -> None
     file_content = b"""
     this is a text file.
     """
-    file_storage.write_file(namespace=conversation_id, filename=filename, content=io.BytesIO(file_content))
+    await file_storage.write_file(
+        namespace=conversation_id, filename=filename, content=UploadFile(file=io.BytesIO(file_content))
+    )
+
+    assert await file_storage.file_exists(namespace=conversation_id, filename=filename)
+    assert await read_all(file_storage, namespace=conversation_id, filename=filename) == file_content
+
+    await file_storage.delete_file(namespace=conversation_id, filename=filename)
+
+    assert not await file_storage.file_exists(namespace=conversation_id, filename=filename)
+    with pytest.raises(FileNotFoundError):
+        await read_all(file_storage, namespace=conversation_id, filename=filename)
+
+
+async def test_write_read_file_in_chunks(storage_settings: files.StorageSettings) -> None:
+    file_storage = files.Storage(settings=storage_settings)
+
+    file_content = bytes(range(256)) * (files.FILE_CHUNK_SIZE // 100)
+    await file_storage.write_file(
+        namespace="namespace", filename="large", content=UploadFile(file=io.BytesIO(file_content))
+    )
+
+    chunks = [chunk async for chunk in file_storage.read_file(namespace="namespace", filename="large")]
+    assert len(chunks) == 3
+    assert b"".join(chunks) == file_content
+
+
+async def test_write_identical_blobs(storage_settings: files.StorageSettings) -> None:
+    file_storage = files.Storage(settings=storage_settings)
+
+    first = await file_storage.write_blob(content=UploadFile(file=io.BytesIO(b"content")))
+    second = await file_storage.write_blob(content=UploadFile(file=io.BytesIO(b"content")))
+    other = await file_storage.write_blob(content=UploadFile(file=io.BytesIO(b"other content")))
+
+    assert first == second == files.BlobInfo(sha256=hashlib.sha256(b"content").hexdigest(), size=7)
+    assert other.sha256 != first.sha256
+    assert b"".join([chunk async for chunk in file_storage.read_blob(first.sha256)]) == b"content"
+
+    await file_storage.delete_blob(first.sha256)
+
+    assert not await file_storage.blob_exists(first.sha256)
+    assert await file_storage.blob_exists(other.sha256)
+
+
+async def test_delete_unused_blob(storage_settings: files.StorageSettings) -> None:
+    file_storage = files.Storage(settings=storage_settings)
+
+    blob = await file_storage.write_blob(content=UploadFile(file=io.BytesIO(b"content")))
+
+    # written within the grace period
+    assert not await file_storage.delete_unused_blob(blob.sha256)
+    assert await file_storage.list_unused_blobs() == []
+    assert await file_storage.blob_exists(blob.sha256)
+
+    written = time.time() - storage_settings.unused_blob_grace_period_seconds - 1
+    os.utime(file_storage._blob_path(blob.sha256), (written, written))
+    assert await file_storage.list_unused_blobs() == [blob.sha256]
+
+    # writing identical content marks the blob as written
+    await file_storage.write_blob(content=UploadFile(file=io.BytesIO(b"content")))
+    assert not await file_storage.delete_unused_blob(blob.sha256)
+
+    os.utime(file_storage._blob_path(blob.sha256), (written, written))
+    assert await file_storage.delete_unused_blob(blob.sha256)
+    assert not await file_storage.blob_exists(blob.sha256)
+    assert not await file_storage.delete_unused_blob(blob.sha256)
+
+
+async def test_delete_unused_blob_concurrent_with_write(storage_settings: files.StorageSettings) -> None:
+    file_storage = files.Storage(settings=storage_settings)
 
-    with file_storage.read_file(namespace=conversation_id, filename=filename) as f:
-        assert f.read() == file_content
+    content = bytes(range(256)) * 100
+    sha256 = hashlib.sha256(content).hexdigest()
+    written = time.time() - storage_settings.unused_blob_grace_period_seconds - 1
 
-    file_storage.delete_file(namespace=conversation_id, filename=filename)
+    for _ in range(50):
+        await file_storage.write_blob(content=UploadFile(file=io.BytesIO(content)))
+        os.utime(file_storage._blob_path(sha256), (written, written))
 
-    with pytest.raises(FileNotFoundError), file_storage.read_file(namespace=conversation_id, filename=filename) as f:
-        pass
+        # the blob is unused when the deletion starts, while an upload of identical content is in progress; however
+        # they interleave, the upload's blob is stored when it completes
+        blob, _ = await asyncio.gather(
+            file_storage.write_blob(content=UploadFile(file=io.BytesIO(content))),
+            file_storage.delete_unused_blob(sha256),
+        )
+        assert blob.sha256 == sha256
+        assert await file_storage.blob_exists(sha256)
+        assert b"".join([chunk async for chunk in file_storage.read_blob(sha256)]) == content
@@ -1,10 +1,15 @@
 import asyncio
 import datetime
+import hashlib
 import io
 import json
 import logging
+import os
+import pathlib
 import re
+import time
 import uuid
+import zipfile
 
 import httpx
 import pytest
@@ -15,6 +20,8 @@ from fastapi.testclient import TestClient
 from pydantic_core import Url
 from pytest_httpx import HTTPXMock
 from semantic_workbench_api_model import workbench_model, workbench_service_client
+from semantic_workbench_service import event_bus, files
+from semantic_workbench_service.controller import export_import
 
 from .types import MockUser
 
@@ -187,7 +194,7 @@ def test_create_assistant_add_to_conversation(
         json=new_conversation_response.model_dump(),
     )
     httpx_mock.add_response(
-        url=re.compile(f"http://testassistantservice/{id_segment}/conversations/{id_segment}/events"),
+        url="http://testassistantservice/events",
         method="POST",
     )
 
@@ -221,6 +228,143 @@ def test_create_assistant_add_to_conversation(
         assert assistant_conversations.conversations[0].id == conversation.id
 
 
+@pytest.mark.httpx_mock(can_send_already_matched_responses=True)
+def test_forward_events_to_assistant_service_without_batch_support(
+    workbench_service: FastAPI,
+    httpx_mock: HTTPXMock,
+    test_user: MockUser,
+):
+    httpx_mock.add_response(
+        url=re.compile(f"http://testassistantservice/{id_segment}"),
+        method="PUT",
+        json=api_model.AssistantResponseModel(id="123").model_dump(),
+    )
+    httpx_mock.add_response(
+        url=re.compile(f"http://testassistantservice/{id_segment}/conversations/{id_segment}"),
+        method="PUT",
+        json=api_model.ConversationResponseModel(id="123").model_dump(),
+    )
+    # an assistant service that predates the batched events endpoint
+    httpx_mock.add_response(
+        url="http://testassistantservice/events",
+        method="POST",
+        status_code=404,
+    )
+    httpx_mock.add_response(
+        url=re.compile(f"http://testassistantservice/{id_segment}/conversations/{id_segment}/events"),
+        method="POST",
+    )
+
+    with TestClient(app=workbench_service, headers=test_user.authorization_headers) as client:
+        registration = register_assistant_service(client)
+
+        http_response = client.post(
+            "/assistants",
+            json=workbench_model.NewAssistant(
+                name="test-assistant",
+                assistant_service_id=registration.assistant_service_id,
+            ).model_dump(mode="json"),
+        )
+        assert httpx.codes.is_success(http_response.status_code)
+        assistant = workbench_model.Assistant.model_validate(http_response.json())
+
+        http_response = client.post("/conversations", json={"title": "test-conversation"})
+        assert httpx.codes.is_success(http_response.status_code)
+        conversation = workbench_model.Conversation.model_validate(http_response.json())
+
+        http_response = client.put(f"/conversations/{conversation.id}/participants/{assistant.id}", json={})
+        assert httpx.codes.is_success(http_response.status_code)
+
+        def event_requests() -> list[httpx.Request]:
+            return [
+                request
+                for request in httpx_mock.get_requests(method="POST")
+                if request.url.path.endswith(f"/{assistant.id}/conversations/{conversation.id}/events")
+            ]
+
+        # the events are forwarded in the background, one at a time after the batch is rejected
+        for _ in range(50):
+            if event_requests():
+                break
+            time.sleep(0.1)
+
+        assert event_requests()
+
+
+@pytest.mark.httpx_mock(can_send_already_matched_responses=True)
+def test_forward_events_to_assistant_service_delivers_undelivered_events_again(
+    workbench_service: FastAPI,
+    httpx_mock: HTTPXMock,
+    test_user: MockUser,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    monkeypatch.setattr(semantic_workbench_service.settings.service, "assistant_event_retry_delay_seconds", 0.0)
+
+    httpx_mock.add_response(
+        url=re.compile(f"http://testassistantservice/{id_segment}"),
+        method="PUT",
+        json=api_model.AssistantResponseModel(id="123").model_dump(),
+    )
+    httpx_mock.add_response(
+        url=re.compile(f"http://testassistantservice/{id_segment}/conversations/{id_segment}"),
+        method="PUT",
+        json=api_model.ConversationResponseModel(id="123").model_dump(),
+    )
+
+    delivered_messages: list[str] = []
+    rejected_messages: list[str] = []
+
+    def post_events(request: httpx.Request) -> httpx.Response:
+        batch = workbench_model.ConversationEventBatch.model_validate_json(request.content)
+        result = workbench_model.ConversationEventBatchResult()
+        for index, item in enumerate(batch.events):
+            if item.event.event != workbench_model.ConversationEventType.message_created:
+                continue
+            content = item.event.data["message"]["content"]
+            # the assistant service does not accept the first message the first time
+            if result.undelivered or (content == "0" and not rejected_messages):
+                rejected_messages.append(content)
+                result.undelivered.append(index)
+                continue
+            delivered_messages.append(content)
+        return httpx.Response(200, json=result.model_dump())
+
+    httpx_mock.add_callback(post_events, url="http://testassistantservice/events", method="POST")
+
+    with TestClient(app=workbench_service, headers=test_user.authorization_headers) as client:
+        registration = register_assistant_service(client)
+
+        http_response = client.post(
+            "/assistants",
+            json=workbench_model.NewAssistant(
+                name="test-assistant",
+                assistant_service_id=registration.assistant_service_id,
+            ).model_dump(mode="json"),
+        )
+        assert httpx.codes.is_success(http_response.status_code)
+        assistant = workbench_model.Assistant.model_validate(http_response.json())
+
+        http_response = client.post("/conversations", json={"title": "test-conversation"})
+        assert httpx.codes.is_success(http_response.status_code)
+        conversation = workbench_model.Conversation.model_validate(http_response.json())
+
+        http_response = client.put(f"/conversations/{conversation.id}/participants/{assistant.id}", json={})
+        assert httpx.codes.is_success(http_response.status_code)
+
+        for index in range(3):
+            http_response = client.post(f"/conversations/{conversation.id}/messages", json={"content": f"{index}"})
+            assert httpx.codes.is_success(http_response.status_code)
+
+        for _ in range(50):
+            if len(delivered_messages) == 3:
+                break
+            time.sleep(0.1)
+
+        # the undelivered message is delivered again, ahead of the messages queued since
+        assert rejected_messages[0] == "0"
+        assert delivered_messages == ["0", "1", "2"]
+
+
 @pytest.mark.httpx_mock(can_send_already_matched_responses=True)
 def test_create_assistant_add_to_conversation_delete_assistant_retains_participant(
     workbench_service: FastAPI,
@@ -248,7 +392,7 @@ def test_create_assistant_add_to_conversation_delete_assistant_retains_participa
         json=new_conversation_response.model_dump(),
     )
     httpx_mock.add_response(
-        url=re.compile(f"http://testassistantservice/{id_segment}/conversations/{id_segment}/events"),
+        url="http://testassistantservice/events",
         method="POST",
     )
 
@@ -453,7 +597,7 @@ def test_create_delete_assistant(
         json=new_conversation_response.model_dump(),
     )
     httpx_mock.add_response(
-        url=re.compile(f"http://testassistantservice/{id_segment}/conversations/{id_segment}/events"),
+        url="http://testassistantservice/events",
         method="POST",
     )
     httpx_mock.add_response(
@@ -528,7 +672,7 @@ def test_create_assistant_update_participant(
         json=new_conversation_response.model_dump(),
     )
     httpx_mock.add_response(
-        url=re.compile(f"http://testassistantservice/{id_segment}/conversations/{id_segment}/events"),
+        url="http://testassistantservice/events",
         method="POST",
     )
 
@@ -764,6 +908,182 @@ def test_create_conversation_send_user_message(workbench_service: FastAPI, test_
         assert conversation.latest_message.id == message_log_id
 
 
+def test_create_conversation_page_messages_by_sequence(workbench_service: FastAPI, test_user: MockUser):
+    with TestClient(app=workbench_service, headers=test_user.authorization_headers) as client:
+        http_response = client.post("/conversations", json={"title": "test-conversation"})
+        assert httpx.codes.is_success(http_response.status_code)
+        conversation_id = workbench_model.Conversation.model_validate(http_response.json()).id
+
+        sent_ids = []
+        for index in range(7):
+            http_response = client.post(f"/conversations/{conversation_id}/messages", json={"content": f"{index}"})
+            assert httpx.codes.is_success(http_response.status_code)
+            message = workbench_model.ConversationMessage.model_validate(http_response.json())
+            assert message.sequence is not None
+            sent_ids.append(message.id)
+
+        # page backwards from the latest messages, using the sequence of the first message of each page
+        paged_ids = []
+        before_sequence = None
+        while True:
+            params = {"limit": 3}
+            if before_sequence is not None:
+                params["before_sequence"] = before_sequence
+            http_response = client.get(f"/conversations/{conversation_id}/messages", params=params)
+            assert httpx.codes.is_success(http_response.status_code)
+            messages = workbench_model.ConversationMessageList.model_validate(http_response.json()).messages
+            if not messages:
+                break
+
+            paged_ids = [message.id for message in messages] + paged_ids
+            before_sequence = messages[0].sequence
+
+        assert paged_ids == sent_ids
+
+        # page forwards
+        http_response = client.get(f"/conversations/{conversation_id}/messages", params={"limit": 1})
+        latest = workbench_model.ConversationMessageList.model_validate(http_response.json()).messages[0]
+        assert latest.sequence is not None
+
+        http_response = client.get(
+            f"/conversations/{conversation_id}/messages", params={"after_sequence": latest.sequence - 2}
+        )
+        assert httpx.codes.is_success(http_response.status_code)
+        messages = workbench_model.ConversationMessageList.model_validate(http_response.json()).messages
+        assert [message.id for message in messages] == sent_ids[-2:]
+
+        # page forwards, a limited number of messages at a time, using the sequence of the last message of each page
+        paged_ids = []
+        after_sequence = 0
+        while True:
+            http_response = client.get(
+                f"/conversations/{conversation_id}/messages", params={"after_sequence": after_sequence, "limit": 3}
+            )
+            assert httpx.codes.is_success(http_response.status_code)
+            messages = workbench_model.ConversationMessageList.model_validate(http_response.json()).messages
+            if not messages:
+                break
+
+            paged_ids += [message.id for message in messages]
+            after_sequence = messages[-1].sequence
+
+        assert paged_ids == sent_ids
+
+
+def test_create_conversation_send_message_batch(workbench_service: FastAPI, test_user: MockUser):
+    with TestClient(app=workbench_service, headers=test_user.authorization_headers) as client:
+        http_response = client.post("/conversations", json={"title": "test-conversation"})
+        assert httpx.codes.is_success(http_response.status_code)
+        conversation_id = workbench_model.Conversation.model_validate(http_response.json()).id
+
+        message_id = uuid.uuid4()
+        batch = workbench_model.NewConversationMessageBatch(
+            messages=[
+                workbench_model.NewConversationMessage(
+                    content="notice", message_type=workbench_model.MessageType.notice
+                ),
+                workbench_model.NewConversationMessage(id=message_id, content="response", debug_data={"key": "value"}),
+            ],
+            update_participant=workbench_model.UpdateParticipant(status="done"),
+        )
+        http_response = client.post(
+            f"/conversations/{conversation_id}/messages/batch", json=batch.model_dump(mode="json")
+        )
+        assert httpx.codes.is_success(http_response.status_code)
+        messages = workbench_model.ConversationMessageList.model_validate(http_response.json()).messages
+        assert [message.content for message in messages] == ["notice", "response"]
+        assert messages[1].id == message_id
+        assert [message.has_debug_data for message in messages] == [False, True]
+        assert messages[0].sequence is not None and messages[1].sequence is not None
+        assert messages[0].sequence < messages[1].sequence
+
+        http_response = client.get(
+            f"/conversations/{conversation_id}/messages", params={"message_type": ["chat", "notice"]}
+        )
+        assert httpx.codes.is_success(http_response.status_code)
+        listed = workbench_model.ConversationMessageList.model_validate(http_response.json()).messages
+        assert [message.id for message in listed] == [message.id for message in messages]
+
+        # the participant update is applied to the sender
+        http_response = client.get(f"/conversations/{conversation_id}/participants/{test_user.id}")
+        assert httpx.codes.is_success(http_response.status_code)
+        assert workbench_model.ConversationParticipant.model_validate(http_response.json()).status == "done"
+
+        # no message is created if any of the message ids exists
+        http_response = client.post(
+            f"/conversations/{conversation_id}/messages/batch",
+            json=workbench_model.NewConversationMessageBatch(
+                messages=[
+                    workbench_model.NewConversationMessage(content="new"),
+                    workbench_model.NewConversationMessage(id=message_id, content="duplicate"),
+                ]
+            ).model_dump(mode="json"),
+        )
+        assert http_response.status_code == httpx.codes.CONFLICT
+
+        http_response = client.get(
+            f"/conversations/{conversation_id}/messages", params={"message_type": ["chat", "notice"]}
+        )
+        assert len(workbench_model.ConversationMessageList.model_validate(http_response.json()).messages) == 2
+
+
+@pytest.fixture
+def published_events(monkeypatch: pytest.MonkeyPatch) -> list[workbench_model.ConversationEvent]:
+    events: list[workbench_model.ConversationEvent] = []
+
+    async def record(event: workbench_model.ConversationEvent) -> None:
+        events.append(event)
+
+    bus = event_bus.InMemoryEventBus()
+    bus.subscribe(record)
+    monkeypatch.setattr(event_bus, "get_event_bus", lambda: bus)
+    return events
+
+
+def test_stream_conversation_message(
+    published_events: list[workbench_model.ConversationEvent], workbench_service: FastAPI, test_user: MockUser
+):
+    with TestClient(app=workbench_service, headers=test_user.authorization_headers) as client:
+        http_response = client.post("/conversations", json={"title": "test-conversation"})
+        assert httpx.codes.is_success(http_response.status_code)
+        conversation_id = workbench_model.Conversation.model_validate(http_response.json()).id
+
+        message_id = uuid.uuid4()
+        for content in ["Hello", ", world"]:
+            http_response = client.post(
+                f"/conversations/{conversation_id}/messages/{message_id}/deltas",
+                json=workbench_model.NewConversationMessageDelta(content=content).model_dump(mode="json"),
+            )
+            assert http_response.status_code == httpx.codes.NO_CONTENT
+
+        deltas = [
+            workbench_model.ConversationMessageDelta.model_validate(event.data["message_delta"])
+            for event in published_events
+            if event.event == workbench_model.ConversationEventType.message_delta
+        ]
+        assert [delta.content for delta in deltas] == ["Hello", ", world"]
+        assert {delta.message_id for delta in deltas} == {message_id}
+        assert {delta.sender.participant_id for delta in deltas} == {test_user.id}
+
+        # deltas are not stored
+        http_response = client.get(f"/conversations/{conversation_id}/messages/{message_id}")
+        assert http_response.status_code == httpx.codes.NOT_FOUND
+
+        # creating the message with the same id finalizes it
+        http_response = client.post(
+            f"/conversations/{conversation_id}/messages",
+            json=workbench_model.NewConversationMessage(id=message_id, content="Hello, world").model_dump(mode="json"),
+        )
+        assert httpx.codes.is_success(http_response.status_code)
+        assert workbench_model.ConversationMessage.model_validate(http_response.json()).content == "Hello, world"
+
+        http_response = client.post(
+            f"/conversations/{uuid.uuid4()}/messages/{message_id}/deltas",
+            json=workbench_model.NewConversationMessageDelta(content="unknown").model_dump(mode="json"),
+        )
+        assert http_response.status_code == httpx.codes.NOT_FOUND
+
+
 @pytest.mark.httpx_mock(can_send_already_matched_responses=True)
 def test_create_assistant_send_assistant_message(
     workbench_service: FastAPI,
@@ -787,7 +1107,7 @@ def test_create_assistant_send_assistant_message(
         json=new_conversation_response.model_dump(),
     )
     httpx_mock.add_response(
-        url=re.compile(f"http://testassistantservice/{id_segment}/conversations/{id_segment}/events"),
+        url="http://testassistantservice/events",
         method="POST",
     )
 
@@ -843,6 +1163,56 @@ def test_create_assistant_send_assistant_message(
         assert message["metadata"] == {"assistant_id": assistant_id, "generated_by": "test"}
 
 
+def test_create_conversations_write_identical_files_shares_content(
+    workbench_service: FastAPI,
+    storage_settings: files.StorageSettings,
+    test_user: MockUser,
+):
+    def stored_blobs() -> list[pathlib.Path]:
+        return [
+            path for path in (pathlib.Path(storage_settings.root) / "blobs").glob("*/*") if path.parent.name != "tmp"
+        ]
+
+    with TestClient(app=workbench_service, headers=test_user.authorization_headers) as client:
+        conversation_ids = []
+        for _ in range(2):
+            http_response = client.post("/conversations", json={"title": "test-conversation"})
+            assert httpx.codes.is_success(http_response.status_code)
+            conversation_ids.append(http_response.json()["id"])
+
+        # identical content, in two files of one conversation and one file of another
+        for conversation_id, filenames in zip(conversation_ids, [["a.txt", "b.txt"], ["c.txt"]]):
+            http_response = client.put(
+                f"/conversations/{conversation_id}/files",
+                files=[("files", (filename, "hello world\n", "text/plain")) for filename in filenames],
+            )
+            assert httpx.codes.is_success(http_response.status_code)
+
+        assert len(stored_blobs()) == 1
+
+        http_response = client.delete(f"/conversations/{conversation_ids[0]}/files/a.txt")
+        assert httpx.codes.is_success(http_response.status_code)
+        http_response = client.delete(f"/conversations/{conversation_ids[0]}/files/b.txt")
+        assert httpx.codes.is_success(http_response.status_code)
+
+        # the content is still referenced by the other conversation
+        assert len(stored_blobs()) == 1
+        http_response = client.get(f"/conversations/{conversation_ids[1]}/files/c.txt")
+        assert httpx.codes.is_success(http_response.status_code)
+        assert http_response.text == "hello world\n"
+
+        # the content is only deleted once it has not been written for the grace period, as an upload of identical
+        # content may not be committed yet
+        (blob_path,) = stored_blobs()
+        written = time.time() - storage_settings.unused_blob_grace_period_seconds - 1
+        os.utime(blob_path, (written, written))
+
+        http_response = client.delete(f"/conversations/{conversation_ids[1]}/files/c.txt")
+        assert httpx.codes.is_success(http_response.status_code)
+
+        assert stored_blobs() == []
+
+
 def test_create_conversation_write_read_delete_file(
     workbench_service: FastAPI,
     test_user: MockUser,
@@ -972,7 +1342,7 @@ def test_create_assistant_export_import_data(
         json=new_conversation_response.model_dump(),
     )
     httpx_mock.add_response(
-        url=re.compile(f"http://testassistantservice/{id_segment}/conversations/{id_segment}/events"),
+        url="http://testassistantservice/events",
         method="POST",
     )
     httpx_mock.add_response(
@@ -1013,8 +1383,8 @@ def test_create_assistant_export_import_data(
         assert httpx.codes.is_success(http_response.status_code)
 
         assert http_response.headers["content-type"] == "application/zip"
-        assert "content-length" in http_response.headers
-        assert int(http_response.headers["content-length"]) > 0
+        # the export is streamed, so its length is not known up front
+        assert len(http_response.content) > 0
 
         logging.info("response: %s", http_response.content)
 
@@ -1070,7 +1440,7 @@ def test_create_assistant_conversations_export_import_conversations(
         json=new_conversation_response.model_dump(),
     )
     httpx_mock.add_response(
-        url=re.compile(f"http://testassistantservice/{id_segment}/conversations/{id_segment}/events"),
+        url="http://testassistantservice/events",
         method="POST",
     )
     httpx_mock.add_response(
@@ -1139,8 +1509,8 @@ def test_create_assistant_conversations_export_import_conversations(
         assert httpx.codes.is_success(http_response.status_code)
 
         assert http_response.headers["content-type"] == "application/zip"
-        assert "content-length" in http_response.headers
-        assert int(http_response.headers["content-length"]) > 0
+        # the export is streamed, so its length is not known up front
+        assert len(http_response.content) > 0
 
         logging.info("response: %s", http_response.content)
 
@@ -1208,7 +1578,11 @@ def test_create_assistant_conversations_export_import_conversations(
 def test_export_import_conversations_with_files(
     workbench_service: FastAPI,
     test_user: MockUser,
+    monkeypatch: pytest.MonkeyPatch,
 ) -> None:
+    # the records are read in more than one page
+    monkeypatch.setattr(export_import, "EXPORT_PAGE_SIZE", 2)
+
     with TestClient(app=workbench_service, headers=test_user.authorization_headers) as client:
         http_response = client.post("/conversations", json={"title": "test-conversation-1"})
         assert httpx.codes.is_success(http_response.status_code)
@@ -1268,6 +1642,64 @@ def test_export_import_conversations_with_files(
                             pytest.fail(f"unexpected file: {file.filename}")
 
 
+def test_import_conversations_rejects_file_content_not_in_export(
+    workbench_service: FastAPI,
+    test_user: MockUser,
+) -> None:
+    with TestClient(app=workbench_service, headers=test_user.authorization_headers) as client:
+        http_response = client.post("/conversations", json={"title": "test-conversation"})
+        assert httpx.codes.is_success(http_response.status_code)
+
+        conversation = workbench_model.Conversation.model_validate(http_response.json())
+
+        other_content = b"content of another user\n"
+        payload = [
+            ("files", ("test.txt", "hello world\n", "text/plain")),
+            ("files", ("other.txt", other_content, "text/plain")),
+        ]
+        http_response = client.put(f"/conversations/{conversation.id}/files", files=payload)
+        assert httpx.codes.is_success(http_response.status_code)
+
+        http_response = client.get("/conversations/export", params={"id": str(conversation.id)})
+        assert httpx.codes.is_success(http_response.status_code)
+
+        other_sha256 = hashlib.sha256(other_content).hexdigest()
+
+        def rewrite_export(rewrite_entry) -> io.BytesIO:
+            rewritten = io.BytesIO()
+            with (
+                zipfile.ZipFile(io.BytesIO(http_response.content)) as zip_file,
+                zipfile.ZipFile(rewritten, mode="w") as rewritten_zip_file,
+            ):
+                for name in zip_file.namelist():
+                    content = rewrite_entry(name, zip_file.read(name))
+                    if content is not None:
+                        rewritten_zip_file.writestr(name, content)
+            rewritten.seek(0)
+            return rewritten
+
+        # an export that refers to content that it does not include, such as another user's file
+        without_other_content = rewrite_export(
+            lambda name, content: (
+                None if name in [f"blobs/{other_sha256}", export_import.EXPORT_MANIFEST_FILENAME] else content
+            )
+        )
+        http_response_import = client.post("/conversations/import", files={"from_export": without_other_content})
+        assert http_response_import.status_code == httpx.codes.BAD_REQUEST
+
+        # an export with content that does not match its address
+        with_mismatched_content = rewrite_export(
+            lambda name, content: b"tampered" if name == f"blobs/{other_sha256}" else content
+        )
+        http_response_import = client.post("/conversations/import", files={"from_export": with_mismatched_content})
+        assert http_response_import.status_code == httpx.codes.BAD_REQUEST
+
+        http_response = client.get("/conversations")
+        assert httpx.codes.is_success(http_response.status_code)
+        conversations = workbench_model.ConversationList.model_validate(http_response.json())
+        assert [c.id for c in conversations.conversations] == [conversation.id]
+
+
 @pytest.mark.httpx_mock(can_send_already_matched_responses=True)
 def test_create_conversations_get_participants(
     workbench_service: FastAPI,
@@ -1291,7 +1723,7 @@ def test_create_conversations_get_participants(
         json=new_conversation_response.model_dump(),
     )
     httpx_mock.add_response(
-        url=re.compile(f"http://testassistantservice/{id_segment}/conversations/{id_segment}/events"),
+        url="http://testassistantservice/events",
         method="POST",
     )
 